@@ -53,6 +53,7 @@ from flask.helpers import get_env
 from . import __version__
 from .flap import config, request, set_config, setup_mako
 from .flap import tmpl_context as c
+from .lib import metrics
 from .lib.audit.base import getAudit
 from .lib.config import getLinotpConfig
 from .lib.config.global_api import LinotpAppConfig
@@ -71,7 +72,7 @@ from .lib.resolver import (
     setupResolvers,
 )
 from .lib.security.provider import SecurityProvider
-from .lib.tools.expiring_list import CustomExpiringList
+from .lib.tools.expiring_list import CustomExpiringList, DatabaseExpiringList
 from .lib.tools.flask_jwt_extended_migration import (
     JWTManager,
     get_jwt_identity,
@@ -397,8 +398,12 @@ class LinOTPApp(Flask):
         self.jwt = JWTManager(self)
 
         # initialize the block list holder (could be any database/memory class
-        # which implements the interface
-        self.jwt_blocklist = CustomExpiringList()
+        # which implements the interface - the database list is shared by
+        # all LinOTP processes, so that a logout is effective for all of them
+        if self.config["JWT_BLOCKLIST_STORE"] == "database":
+            self.jwt_blocklist = DatabaseExpiringList("jwt_blocklist")
+        else:
+            self.jwt_blocklist = CustomExpiringList()
 
         # passing the function for checking blocklist to flask_jwt_extended
         @self.jwt.token_in_blocklist_loader
@@ -446,7 +451,8 @@ class LinOTPApp(Flask):
                 e,
             )
 
-        self.create_context(request, request.environ)
+        with metrics.stage("context"):
+            self.create_context(request, request.environ)
 
     def is_request_static(self):
         return request.path.startswith(self.static_url_path)
@@ -471,6 +477,7 @@ class LinOTPApp(Flask):
                 del data
 
         log_request_timedelta(log)
+        metrics.finish_request()
 
     def setup_env(self):
         # The following functions are called here because they're
@@ -485,10 +492,13 @@ class LinOTPApp(Flask):
         # probably doing more work here than we need to. Global
         # variables suck.
 
-        set_config()
+        metrics.start_request()
 
-        if not self.is_request_static():
-            allocate_security_module()
+        with metrics.stage("context"):
+            set_config()
+
+            if not self.is_request_static():
+                allocate_security_module()
 
     def create_context(self, request, environment):
         """
@@ -1054,6 +1064,7 @@ def create_app(config_name=None, config_extra=None):
         config_name = get_env()
 
     _configure_app(app, config_name, config_extra)
+    metrics.init_metrics(app)
 
     babel = Babel(app, configure_jinja=False, default_domain="linotp")
 
@@ -27,6 +27,7 @@
 """linotp admin command.
 
 linotp admin  fix-db-encoding
+linotp admin  reconcile-token-counters
 
 """
 import sys
@@ -34,7 +35,8 @@ import sys
 from flask import current_app
 from flask.cli import AppGroup, with_appcontext
 
-from linotp.model import fix_db_encoding, setup_db
+from linotp.model import db, fix_db_encoding, setup_db
+from linotp.model.token_counter import reconcile_token_counters
 
 admin_cmds = AppGroup(
     "admin",
@@ -79,3 +81,39 @@ def fix_db_encoding_command():
 
     current_app.echo(f"Conversion response: {response}")
     sys.exit(0)
+
+
+# ------------------------------------------------------------------------- --
+# Command `linotp admin reconcile-token-counters`
+# ------------------------------------------------------------------------- --
+
+
+@admin_cmds.command(
+    "reconcile-token-counters",
+    help=(
+        """Recalculate the per realm token counters, which are used for the
+token reporting, from the token table. The counters are maintained
+incrementally with every token change - the reconciliation fixes the
+counters after changes which bypassed the incremental update and could
+be run periodically e.g. as cron job.
+"""
+    ),
+)
+@with_appcontext
+def reconcile_token_counters_command():
+    """Recalculate the token counters from the token table."""
+
+    try:
+        setup_db(current_app)
+        counters = reconcile_token_counters()
+        db.session.commit()
+
+    except Exception as exx:
+        db.session.rollback()
+        current_app.echo(f"Reconciliation could not be completed: {exx}")
+        sys.exit(1)
+
+    current_app.echo(
+        f"Token counters reconciled for {len(counters)} realms.", v=1
+    )
+    sys.exit(0)
@@ -50,12 +50,13 @@ from pathlib import Path
 from typing import Optional
 
 import click
-from sqlalchemy import asc, desc
+from sqlalchemy import and_, asc, desc
 from sqlalchemy.sql.functions import count
 
 from flask import current_app
 from flask.cli import AppGroup, with_appcontext
 
+from linotp.lib.audit.partition import AuditPartitionError, get_partitioner
 from linotp.lib.audit.SQLAudit import AuditTable
 from linotp.model import db
 
@@ -67,6 +68,9 @@ from . import get_backup_filename
 
 audit_cmds = AppGroup("audit", help="Manage audit options")
 
+# the number of audit entries, which are deleted in one transaction
+ROTATE_BATCH_SIZE = 5000
+
 
 @audit_cmds.command(
     "cleanup",
@@ -180,6 +184,143 @@ def cleanup_command(
         sys.exit(1)
 
 
+@audit_cmds.command(
+    "partition",
+    help=(
+        "Convert the audit table into a table with daily or monthly "
+        "partitions as configured by AUDIT_PARTITIONING. The existing "
+        "entries are kept in one partition, which is dropped by the "
+        "rotation once all its entries are expired. Only supported for "
+        "PostgreSQL and MySQL/MariaDB audit databases."
+    ),
+)
+@with_appcontext
+def partition_command():
+    """Partition the audit table by the entry time."""
+
+    app = current_app
+    try:
+        partitioner = get_partitioner(
+            db.get_engine(bind="auditdb"), app.config["AUDIT_PARTITIONING"]
+        )
+        if not partitioner:
+            app.echo("Error: AUDIT_PARTITIONING is not enabled.")
+            sys.exit(1)
+
+        partitions = partitioner.partition_table()
+
+        app.echo(f"Audit table partitioned into {', '.join(partitions)}.", v=1)
+
+    except AuditPartitionError as exx:
+        app.echo(f"Error: {exx!s}")
+        sys.exit(1)
+
+    except Exception as exx:
+        app.echo(f"Error while partitioning the audit table: {exx!s}")
+        sys.exit(1)
+
+
+@audit_cmds.command(
+    "rotate",
+    help=(
+        "Remove the audit log entries which are older than --keep days.\n\n"
+        "If the audit table is partitioned, the expired partitions are "
+        "dropped and the partitions for the next days or months are "
+        "created. Otherwise the expired entries are deleted in batches. "
+        "The command is meant to be run daily."
+    ),
+)
+@click.option(
+    "--keep",
+    "keep_days",
+    type=click.IntRange(min=0),
+    required=True,
+    help="The number of days the audit log entries are kept.",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=ROTATE_BATCH_SIZE,
+    help=(
+        "The number of entries deleted per transaction if the audit "
+        f"table is not partitioned. Defaults to {ROTATE_BATCH_SIZE:,}."
+    ),
+)
+@click.option(
+    "--no-export",
+    is_flag=True,
+    help="Do not write a backup file for the removed audit lines.",
+)
+@click.option(
+    "--exportdir",
+    "-e",
+    type=click.Path(exists=True, dir_okay=True),
+    help=(
+        "Defines the directory where the audit entries which are "
+        "removed are exported into.\n\nDefaults to the BACKUP_DIR "
+        "configured for LinOTP."
+    ),
+)
+@with_appcontext
+def rotate_command(
+    keep_days: int, batch_size: int, no_export: bool, exportdir: Optional[str]
+):
+    """Remove the expired audit entries."""
+
+    app = current_app
+    try:
+        if no_export:
+            export_path = None
+        else:
+            export_path = Path(exportdir or current_app.config["BACKUP_DIR"])
+            export_path.mkdir(parents=True, exist_ok=True)
+
+        sqljanitor = SQLJanitor(export_dir=export_path)
+
+        rotate_infos = sqljanitor.rotate(keep_days, batch_size=batch_size)
+
+        if rotate_infos["rotated"]:
+            app.echo(
+                f'{rotate_infos["entries_deleted"]} entries older than '
+                f"{keep_days} days removed.",
+                v=1,
+            )
+
+            if rotate_infos["export_filename"]:
+                app.echo(
+                    f'Exported into {rotate_infos["export_filename"]}',
+                    v=2,
+                )
+        else:
+            app.echo(
+                f"Nothing removed. No entries older than {keep_days} days.",
+                v=1,
+            )
+
+        if rotate_infos["partitions_dropped"]:
+            app.echo(
+                "Dropped partitions "
+                f'{", ".join(rotate_infos["partitions_dropped"])}',
+                v=2,
+            )
+
+        if rotate_infos["partitions_created"]:
+            app.echo(
+                "Created partitions "
+                f'{", ".join(rotate_infos["partitions_created"])}',
+                v=2,
+            )
+
+        app.echo(
+            f'Rotation took {rotate_infos["time_taken"]} seconds',
+            v=2,
+        )
+
+    except Exception as exx:
+        app.echo(f"Error while rotating the audit table: {exx!s}")
+        sys.exit(1)
+
+
 class SQLJanitor:
     """
     script to help the house keeping of audit entries
@@ -198,6 +339,53 @@ class SQLJanitor:
         :return: filepath of exported data or None if no export done
         """
 
+        query = (
+            db.session.query(AuditTable)
+            .filter(AuditTable.id <= export_up_to)
+            .order_by(desc(AuditTable.id))
+        )
+
+        return self._export(query, export_up_to)
+
+    def export_data_before(self, before) -> Optional[Path]:
+        """
+        export each audit row older than the given time into a csv output
+
+        :param before: all entries logged before this naive UTC datetime
+                       will be dumped
+        :return: filepath of exported data or None if no export done
+        """
+
+        condition = AuditTable.timestamp_utc < before
+
+        last_id = (
+            db.session.query(AuditTable.id)
+            .filter(condition)
+            .order_by(desc(AuditTable.id))
+            .limit(1)
+            .scalar()
+        )
+        if last_id is None:
+            return None
+
+        query = (
+            db.session.query(AuditTable)
+            .filter(condition)
+            .order_by(desc(AuditTable.id))
+            .yield_per(1000)
+        )
+
+        return self._export(query, last_id)
+
+    def _export(self, result, export_up_to) -> Optional[Path]:
+        """
+        write the audit rows of the query result into a csv file
+
+        :param result: the audit rows
+        :param export_up_to: the highest exported id for the file name
+        :return: filepath of exported data or None if no export done
+        """
+
         if not self.export_dir:
             self.app.echo(
                 "No export directory defined, skipping backup.",
@@ -208,13 +396,6 @@ class SQLJanitor:
         filename_template = f"SQLAuditExport.%s.{export_up_to}.csv"
         export_file = self.export_dir / get_backup_filename(filename_template)
         with export_file.open("w") as f:
-            result = (
-                db.session.query(AuditTable)
-                .filter(AuditTable.id <= export_up_to)
-                .order_by(desc(AuditTable.id))
-                .all()
-            )
-
             # write the csv header
             audit_columns = AuditTable.__table__.columns
             csv_header = "; ".join([column.name for column in audit_columns])
@@ -229,6 +410,8 @@ class SQLJanitor:
                         row_data.append("%d" % val)
                     elif isinstance(val, str):
                         row_data.append('"%s"' % val)
+                    elif isinstance(val, datetime.datetime):
+                        row_data.append('"%s"' % val.isoformat())
                     elif val is None:
                         row_data.append("")
                     else:
@@ -315,3 +498,121 @@ class SQLJanitor:
         cleanup_infos["time_taken"] = duration.seconds
 
         return cleanup_infos
+
+    def rotate(self, keep_days, batch_size=ROTATE_BATCH_SIZE):
+        """
+        remove the audit entries, which are older than keep_days
+
+        on a partitioned audit table the partitions, which only contain
+        expired entries, are dropped and the partitions for the next
+        periods are created. Otherwise the expired entries are deleted in
+        batches, each in its own short transaction.
+
+        :param keep_days: the number of days the audit entries are kept
+        :param batch_size: the number of entries deleted per transaction
+        :return: rotate_infos - {
+            'rotated': False,
+            'entries_deleted': 0,
+            'partitions_dropped': [],
+            'partitions_created': [],
+            'export_filename': None,
+            'time_taken': 0,
+            }
+        """
+
+        rotate_infos = {
+            "rotated": False,
+            "entries_deleted": 0,
+            "partitions_dropped": [],
+            "partitions_created": [],
+            "export_filename": None,
+            "time_taken": 0,
+        }
+
+        start_time = datetime.datetime.now()
+
+        before = datetime.datetime.utcnow() - datetime.timedelta(
+            days=keep_days
+        )
+
+        partitioner = get_partitioner(
+            db.get_engine(bind="auditdb"),
+            self.app.config["AUDIT_PARTITIONING"],
+        )
+
+        if partitioner:
+            # only whole partitions are dropped, so the entries are
+            # expired up to the end of the last expired partition
+
+            before = partitioner.expired_before(before)
+
+        if before is not None:
+            export_file = self.export_data_before(before)
+            if export_file:
+                rotate_infos["export_filename"] = str(export_file)
+
+            if partitioner:
+                rotate_infos["entries_deleted"] = (
+                    db.session.query(count(AuditTable.id))
+                    .filter(AuditTable.timestamp_utc < before)
+                    .scalar()
+                )
+                db.session.commit()
+
+                rotate_infos[
+                    "partitions_dropped"
+                ] = partitioner.drop_partitions(before, batch_size)
+            else:
+                rotate_infos["entries_deleted"] = self.delete_before(
+                    before, batch_size
+                )
+
+            rotate_infos["rotated"] = bool(
+                rotate_infos["entries_deleted"]
+                or rotate_infos["partitions_dropped"]
+            )
+
+        if partitioner:
+            rotate_infos["partitions_created"] = partitioner.add_partitions()
+
+        duration = datetime.datetime.now() - start_time
+        rotate_infos["time_taken"] = duration.seconds
+
+        return rotate_infos
+
+    def delete_before(self, before, batch_size):
+        """
+        delete the audit entries older than before in batches
+
+        :param before: naive UTC datetime
+        :param batch_size: the number of entries deleted per transaction
+        :return: the number of deleted entries
+        """
+
+        deleted = 0
+
+        while True:
+            last_id = (
+                db.session.query(AuditTable.id)
+                .filter(AuditTable.timestamp_utc < before)
+                .order_by(asc(AuditTable.id))
+                .offset(batch_size - 1)
+                .limit(1)
+                .scalar()
+            )
+
+            condition = AuditTable.timestamp_utc < before
+            if last_id is not None:
+                condition = and_(condition, AuditTable.id <= last_id)
+
+            deleted += (
+                db.session.query(AuditTable)
+                .filter(condition)
+                .delete(synchronize_session=False)
+            )
+            db.session.commit()
+
+            if last_id is None:
+                break
+
+        return deleted
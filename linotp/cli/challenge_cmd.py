@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+""" This is a janitor program, that cleans up the challenge table.
+
+    Expired and closed challenges are otherwise only removed per token
+    during the validation. The janitor deletes them in bulk chunks by
+    timestamp, so that it can be run periodically e.g. as cron job:
+
+        linotp challenge cleanup --retention 3600
+
+    in combination with the LinOTP setting
+
+        CHALLENGE_JANITOR_IN_REQUEST = False
+
+    the validation will not delete the expired challenges anymore.
+"""
+
+import datetime
+import sys
+
+import click
+from sqlalchemy import and_
+
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+from linotp.lib.token import get_tokens
+from linotp.model import db
+from linotp.model.challange import Challenge
+
+# -------------------------------------------------------------------------- --
+
+# challenge commands: cleanup
+
+challenge_cmds = AppGroup("challenge", help="Manage challenges")
+
+
+@challenge_cmds.command(
+    "cleanup",
+    help=(
+        "Delete the expired challenges from the database.\n\n"
+        "Challenges which are expired for more than --retention seconds "
+        "are deleted in chunks of --chunk-size entries. Closed challenges "
+        "are kept until they are expired, as their result is still "
+        "reported by the status check of the transaction."
+    ),
+)
+@click.option(
+    "--retention",
+    default=0,
+    type=click.IntRange(min=0),
+    help=(
+        "The number of seconds expired challenges are kept in the "
+        "database. Defaults to 0."
+    ),
+)
+@click.option(
+    "--chunk-size",
+    default=1000,
+    type=click.IntRange(min=1),
+    help=(
+        "The number of challenges which are deleted in one database "
+        "transaction. Defaults to 1,000."
+    ),
+)
+@with_appcontext
+def cleanup_command(retention: int, chunk_size: int):
+    """This function removes expired and closed challenges."""
+
+    app = current_app
+    try:
+        janitor = ChallengeJanitor(chunk_size=chunk_size)
+
+        cleanup_infos = janitor.cleanup(retention)
+
+        app.echo(
+            f'{cleanup_infos["expired_deleted"]} expired challenges and '
+            f'{cleanup_infos["legacy_deleted"]} expired challenges without '
+            "expiry time deleted.",
+            v=1,
+        )
+
+        app.echo(
+            f'Cleaning up took {cleanup_infos["time_taken"]:.3f} seconds '
+            f'({cleanup_infos["throughput"]:.0f} challenges per second)',
+            v=2,
+        )
+
+    except Exception as exx:
+        app.echo(f"Error while cleaning up challenge table: {exx!s}")
+        sys.exit(1)
+
+
+class ChallengeJanitor:
+    """
+    house keeping of the challenge table with bulk deletes
+    """
+
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = chunk_size
+
+    def _delete_chunked(self, condition) -> int:
+        """
+        delete all challenges matching the condition chunk by chunk
+
+        every chunk is committed on its own to keep the transactions and
+        locks short, while the live validation inserts new challenges.
+
+        :param condition: the sqlalchemy filter condition
+        :return: the number of deleted challenges
+        """
+
+        deleted = 0
+
+        while True:
+            ids = [
+                row.id
+                for row in db.session.query(Challenge.id)
+                .filter(condition)
+                .order_by(Challenge.id)
+                .limit(self.chunk_size)
+            ]
+
+            if not ids:
+                break
+
+            db.session.query(Challenge).filter(Challenge.id.in_(ids)).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+
+            deleted += len(ids)
+
+        return deleted
+
+    def _delete_legacy(self, cut_off: datetime.datetime) -> int:
+        """
+        delete the open and closed challenges without expiry, which are
+        expired
+
+        the validity of these challenges is only known per token, so they
+        are checked chunk by chunk with the challenge validity of their
+        token. Challenges of tokens which do not exist anymore are expired.
+
+        :param cut_off: the time before which the challenges expired
+        :return: the number of deleted challenges
+        """
+
+        deleted = 0
+        last_id = 0
+        validities = {}
+
+        condition = and_(
+            Challenge.expiry.is_(None), Challenge.timestamp < cut_off
+        )
+
+        while True:
+            rows = (
+                db.session.query(
+                    Challenge.id, Challenge.tokenserial, Challenge.timestamp
+                )
+                .filter(condition, Challenge.id > last_id)
+                .order_by(Challenge.id)
+                .limit(self.chunk_size)
+                .all()
+            )
+
+            if not rows:
+                break
+
+            last_id = rows[-1].id
+
+            ids = []
+            for row in rows:
+                if row.tokenserial not in validities:
+                    tokens = get_tokens(serial=row.tokenserial)
+                    validities[row.tokenserial] = (
+                        tokens[0].get_challenge_validity() if tokens else 0
+                    )
+
+                validity = validities[row.tokenserial]
+                if row.timestamp + datetime.timedelta(seconds=validity) < (
+                    cut_off
+                ):
+                    ids.append(row.id)
+
+            if ids:
+                db.session.query(Challenge).filter(
+                    Challenge.id.in_(ids)
+                ).delete(synchronize_session=False)
+                db.session.commit()
+
+                deleted += len(ids)
+
+        return deleted
+
+    def cleanup(self, retention: int = 0) -> dict:
+        """
+        delete the expired challenges - open and closed
+
+        :param retention: the number of seconds expired challenges are
+                          kept
+        :return: cleanup_infos - {
+            'expired_deleted': 0,
+            'legacy_deleted': 0,
+            'entries_deleted': 0,
+            'time_taken': 0.0,
+            'throughput': 0.0,
+            }
+        """
+
+        start_time = datetime.datetime.now()
+        cut_off = start_time - datetime.timedelta(seconds=retention)
+
+        # closed challenges are kept until they are expired as well, as the
+        # check_status of the transaction still reports their result
+
+        expired_deleted = self._delete_chunked(Challenge.expiry < cut_off)
+
+        # challenges, which were not migrated to the expiry column, are
+        # deleted once their token specific validity is over
+
+        legacy_deleted = self._delete_legacy(cut_off)
+
+        duration = datetime.datetime.now() - start_time
+        time_taken = duration.total_seconds()
+
+        entries_deleted = expired_deleted + legacy_deleted
+
+        return {
+            "expired_deleted": expired_deleted,
+            "legacy_deleted": legacy_deleted,
+            "entries_deleted": entries_deleted,
+            "time_taken": time_taken,
+            "throughput": entries_deleted / time_taken if time_taken else 0.0,
+        }
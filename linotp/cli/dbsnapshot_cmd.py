@@ -39,35 +39,69 @@ engine but can run into issues as the definitions of LinOTP objects evolve.
 In other words, `backup` is probably more useful in daily life (as long
 as MySQL is your thing) but `dbsnapshot` lets you migrate your LinOTP
 instance from MySQL to PostgreSQL (for example).
+
+The snapshot is a gzip compressed stream of JSON lines. Every table starts
+with a header line, which contains the table name and the column names,
+followed by one JSON array per row and an end line with the number of rows
+and the SHA-256 checksum of the row lines. Every table is written as its
+own gzip member, thus the tables could be dumped in parallel and are simply
+concatenated afterwards. Next to the snapshot a manifest file is written,
+which contains the row counts and checksums of all tables and the checksum
+of the snapshot file. The rows are read with server side cursors in chunks
+and restored with bulk statements, so that the tables do not have to fit
+in memory.
+
+Snapshots in the former format (`.sqldb`) could still be restored.
 """
 
+import base64
 import binascii
+import gzip
+import hashlib
+import json
 import os
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 import click
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.ext.serializer import dumps, loads
+from sqlalchemy import bindparam, select, types
+from sqlalchemy.ext.serializer import loads
 
 from flask import current_app
 from flask.cli import AppGroup
 
 from linotp.lib.audit.SQLAudit import AuditTable
+from linotp.model import db
 from linotp.model.config import Config
 from linotp.model.realm import Realm
 from linotp.model.token import Token
+from linotp.model.token_counter import reconcile_token_counters
 from linotp.model.tokenRealm import TokenRealm
 
 from . import get_backup_filename
 
 TIME_FORMAT = "%Y-%m-%d_%H-%M"
 
+SNAPSHOT_FORMAT = "linotp-dbsnapshot"
+SNAPSHOT_VERSION = 2
+
+BACKUP_FILENAME_TEMPLATE = "linotp_backup_%s.jsonl.gz"
+MANIFEST_FILENAME_TEMPLATE = "linotp_backup_%s.manifest.json"
+LEGACY_FILENAME_TEMPLATE = "linotp_backup_%s.sqldb"
+
+# number of rows, which are fetched from the server side cursor or are
+# restored with one bulk statement
+SNAPSHOT_CHUNK_SIZE = 1000
 
+# the models are restored in this order, so that the referenced rows of
+# the TokenRealm table are restored before
 ORM_Models = {
     "Config": Config,
+    "Realm": Realm,
     "Token": Token,
     "TokenRealm": TokenRealm,
-    "Realm": Realm,
 }
 
 # -------------------------------------------------------------------------- --
@@ -82,12 +116,18 @@ dbsnapshot_cmds = AppGroup(
 @dbsnapshot_cmds.command(
     "create", help="Create a snapshot of the database tables."
 )
-def create_command():
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of tables which are dumped in parallel.",
+)
+def create_command(parallel=1):
     """Create backup file for your database tables"""
 
     try:
         current_app.echo("Backup database ...", v=1)
-        backup_database_tables()
+        backup_database_tables(parallel=parallel)
         current_app.echo("finished", v=1)
     except Exception as exx:
         current_app.echo("Failed to backup: %r" % exx)
@@ -137,7 +177,7 @@ def list_command():
             current_app.echo(f"{backup_date} {backup_file}", err=False)
         current_app.echo("Finished", v=1)
     except Exception as exx:
-        current_app.echo("Failed to list snapshot files: {exx!r}")
+        current_app.echo(f"Failed to list snapshot files: {exx!r}")
         sys.exit(1)
 
 
@@ -146,20 +186,112 @@ def list_command():
 # backend implementation
 
 
-def backup_database_tables() -> int:
+def _encode_value(value):
     """
-    use the sqlalchemy serializer to dump the database mapped objects
+    helper - convert a column value into a json serializable value
+
+    @param value - the column value
+    @return the json compatible value
     """
-    app = current_app
 
-    backup_filename_template = "linotp_backup_%s.sqldb"
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("utf-8")
+
+    return value
+
+
+def _decode_value(column, value):
+    """
+    helper - convert a json value back into a column value
+
+    @param column - the table column the value belongs to
+    @param value - the json value
+    @return the column value
+    """
+
+    if value is None:
+        return None
+
+    if isinstance(column.type, types.DateTime):
+        return datetime.fromisoformat(value)
+
+    if isinstance(column.type, types.LargeBinary):
+        return base64.b64decode(value)
+
+    return value
+
+
+def _dump_table(engine, name: str, table, filename: str) -> dict:
+    """
+    dump the rows of one table into a gzip compressed json lines file
+
+    the rows are read with a server side cursor in chunks, thus the table
+    does not have to fit into memory.
+
+    @param engine - the database engine
+    @param name - the name of the table in the snapshot
+    @param table - the sqlalchemy table
+    @param filename - the file to write the table to
+    @return dict with the number of rows and the checksum of the rows
+    """
+
+    checksum = hashlib.sha256()
+    rows = 0
+
+    columns = [column.name for column in table.columns]
+
+    with gzip.open(
+        filename, "wt", encoding="utf-8", compresslevel=6
+    ) as table_file, engine.connect() as connection:
+        table_file.write(json.dumps({"table": name, "columns": columns}))
+        table_file.write("\n")
+
+        result = connection.execution_options(stream_results=True).execute(
+            select([table]).order_by(*table.primary_key.columns)
+        )
+
+        while True:
+            chunk = result.fetchmany(SNAPSHOT_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            for row in chunk:
+                line = json.dumps([_encode_value(value) for value in row])
+                line += "\n"
+
+                checksum.update(line.encode("utf-8"))
+                table_file.write(line)
+
+            rows += len(chunk)
+
+        result.close()
+
+        table_info = {"rows": rows, "sha256": checksum.hexdigest()}
+
+        table_file.write(json.dumps(dict(table_info, end=name)))
+        table_file.write("\n")
+
+    return table_info
+
+
+def backup_database_tables(parallel: int = 1) -> str:
+    """
+    dump the database tables into a compressed json lines snapshot file
+
+    @param parallel - the number of tables which are dumped in parallel
+    @return the name of the snapshot file
+    """
+    app = current_app
 
     # ---------------------------------------------------------------------- --
 
     # if audit is shared, it belongs to the same database, thus we make as
     # well an backup of the audit
 
-    backup_classes = ORM_Models
+    backup_classes = dict(ORM_Models)
 
     audit_db = app.config["AUDIT_DATABASE_URI"]
     if audit_db == "SHARED":
@@ -167,13 +299,20 @@ def backup_database_tables() -> int:
 
     # ---------------------------------------------------------------------- --
 
-    # setup db engine, session and meta from sql uri
+    # the database engines are thread safe, thus they could be used for the
+    # parallel dump of the tables - the engine is resolved per model, as the
+    # shared audit table is bound to the audit database
 
-    db = SQLAlchemy(app)
+    engine = db.engine
+
+    engines = {
+        name: db.get_engine(bind=getattr(model, "__bind_key__", None))
+        for name, model in backup_classes.items()
+    }
 
     app.echo(
         "extracting data from: %r:%r"
-        % (db.engine.url.drivername, db.engine.url.database),
+        % (engine.url.drivername, engine.url.database),
         v=1,
     )
 
@@ -184,41 +323,81 @@ def backup_database_tables() -> int:
     backup_dir = current_app.config["BACKUP_DIR"]
     os.makedirs(backup_dir, exist_ok=True)
 
+    now = datetime.now()
+
+    backup_filename = os.path.join(
+        backup_dir, get_backup_filename(BACKUP_FILENAME_TEMPLATE, now)
+    )
+    manifest_filename = os.path.join(
+        backup_dir, get_backup_filename(MANIFEST_FILENAME_TEMPLATE, now)
+    )
+
+    app.echo("Creating backup file: %s" % backup_filename, v=1)
+
     # ---------------------------------------------------------------------- --
 
-    # run the db serialisation and dump / pickle the data
+    # dump every table into its own gzip member and concatenate them in the
+    # restore order afterwards - the result is a valid gzip stream
 
-    filename = get_backup_filename(backup_filename_template)
-    backup_filename = os.path.join(backup_dir, filename)
+    # the workers have no application context, thus the echo is bound here
 
-    app.echo("Creating backup file: %s" % backup_filename, v=1)
+    echo = app.echo
+
+    with tempfile.TemporaryDirectory(dir=backup_dir) as tmp_dir:
 
-    with open(backup_filename, "w") as backup_file:
-        for name, model_class in backup_classes.items():
-            app.echo("Saving %s" % name, v=1)
+        def dump(name):
+            echo("Saving %s" % name, v=1)
+            return _dump_table(
+                engines[name],
+                name,
+                backup_classes[name].__table__,
+                os.path.join(tmp_dir, name),
+            )
 
-            backup_file.write("--- BEGIN %s\n" % name)
+        names = list(backup_classes.keys())
 
-            data_query = model_class.query
+        if parallel > 1:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                table_infos = list(executor.map(dump, names))
+        else:
+            table_infos = [dump(name) for name in names]
 
-            pb_file = (
-                None if app.echo.verbosity > 1 else open("/dev/null", "w")
-            )  # None => stdout
+        checksum = hashlib.sha256()
 
-            with click.progressbar(
-                data_query.all(), label=name, file=pb_file
-            ) as all_data:
-                for data in all_data:
-                    backup_file.write(
-                        binascii.hexlify(dumps(data)).decode("utf-8")
-                    )
+        with open(backup_filename, "wb") as backup_file:
+            header = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION}
+            member = gzip.compress((json.dumps(header) + "\n").encode("utf-8"))
+
+            checksum.update(member)
+            backup_file.write(member)
+
+            for name in names:
+                with open(os.path.join(tmp_dir, name), "rb") as table_file:
+                    for block in iter(lambda: table_file.read(1 << 20), b""):
+                        checksum.update(block)
+                        backup_file.write(block)
+
+    # ---------------------------------------------------------------------- --
+
+    # finally write the manifest, which allows to verify the snapshot
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": now.isoformat(),
+        "database": engine.url.drivername,
+        "file": os.path.basename(backup_filename),
+        "sha256": checksum.hexdigest(),
+        "tables": dict(zip(names, table_infos)),
+    }
 
-                app.echo(".", v=2, nl=False)
+    with open(manifest_filename, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
 
-            # final newline for detail
-            app.echo("", v=2)
+    for name, table_info in manifest["tables"].items():
+        app.echo("%s: %d rows" % (name, table_info["rows"]), v=2)
 
-            backup_file.write("\n--- END %s\n" % name)
+    return backup_filename
 
 
 def list_database_backups() -> list:
@@ -245,17 +424,22 @@ def list_database_backups() -> list:
 
     # lookup for all files in the directory that match the template
 
-    for backup_file in os.listdir(backup_dir):
-        # backup files match the "template" + "%s.sqldb" format
+    extensions = [
+        template[len(filename_template) + len("%s") :]
+        for template in (BACKUP_FILENAME_TEMPLATE, LEGACY_FILENAME_TEMPLATE)
+    ]
 
-        if backup_file.startswith(filename_template) and backup_file.endswith(
-            ".sqldb"
-        ):
-            backup_date, _, _ext = backup_file[
-                len(filename_template) :
-            ].rpartition(".")
+    for backup_file in sorted(os.listdir(backup_dir)):
+        if not backup_file.startswith(filename_template):
+            continue
+
+        for extension in extensions:
+            if backup_file.endswith(extension):
+                backup_date = backup_file[
+                    len(filename_template) : -len(extension)
+                ]
 
-            yield backup_date, backup_file
+                yield backup_date, backup_file
 
 
 # -------------------------------------------------------------------------- --
@@ -282,6 +466,16 @@ def _get_restore_filename(
     if date:
         backup_filename = os.path.join(backup_dir, template % date)
 
+        # fall back to a snapshot in the former format
+
+        legacy_filename = os.path.join(
+            backup_dir, LEGACY_FILENAME_TEMPLATE % date
+        )
+        if not os.path.isfile(backup_filename) and os.path.isfile(
+            legacy_filename
+        ):
+            backup_filename = legacy_filename
+
     elif filename:
         # check if file is absolute or relative to the backup directory
 
@@ -317,6 +511,249 @@ def _get_restore_filename(
     return backup_filename
 
 
+def _get_manifest(backup_filename: str) -> dict or None:
+    """
+    helper - load the manifest, which belongs to a snapshot file
+
+    @param backup_filename - the snapshot file name
+    @return the manifest dict or None if there is no manifest
+    """
+
+    prefix = BACKUP_FILENAME_TEMPLATE.partition("%s")[0]
+    suffix = BACKUP_FILENAME_TEMPLATE.partition("%s")[2]
+
+    backup_dir, filename = os.path.split(backup_filename)
+
+    if not (filename.startswith(prefix) and filename.endswith(suffix)):
+        return None
+
+    date = filename[len(prefix) : -len(suffix)]
+    manifest_filename = os.path.join(
+        backup_dir, MANIFEST_FILENAME_TEMPLATE % date
+    )
+
+    if not os.path.isfile(manifest_filename):
+        return None
+
+    with open(manifest_filename, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def _verify_file_checksum(backup_filename: str, manifest: dict) -> None:
+    """
+    helper - verify the checksum of the snapshot file against the manifest
+
+    @param backup_filename - the snapshot file name
+    @param manifest - the manifest of the snapshot
+    @raise ValueError if the checksum does not match
+    """
+
+    checksum = hashlib.sha256()
+
+    with open(backup_filename, "rb") as backup_file:
+        for block in iter(lambda: backup_file.read(1 << 20), b""):
+            checksum.update(block)
+
+    if checksum.hexdigest() != manifest["sha256"]:
+        raise ValueError(
+            "checksum of %s does not match the manifest" % backup_filename
+        )
+
+
+def _merge_rows(session, table, rows: list) -> None:
+    """
+    merge a chunk of rows into the table with bulk statements
+
+    rows, which already exist, are updated and the others are inserted,
+    which corresponds to the former orm merge of the restored objects.
+
+    @param session - the database session
+    @param table - the sqlalchemy table
+    @param rows - list of dicts with the column values
+    """
+
+    if not rows:
+        return
+
+    (pk_column,) = table.primary_key.columns
+
+    existing = {
+        pk
+        for (pk,) in session.execute(
+            select([pk_column]).where(
+                pk_column.in_([row[pk_column.name] for row in rows])
+            )
+        )
+    }
+
+    inserts = [row for row in rows if row[pk_column.name] not in existing]
+    updates = [row for row in rows if row[pk_column.name] in existing]
+
+    if inserts:
+        session.execute(table.insert(), inserts)
+
+    if updates:
+        columns = [name for name in updates[0] if name != pk_column.name]
+
+        if columns:
+            statement = (
+                table.update()
+                .where(pk_column == bindparam("b_pk"))
+                .values({name: bindparam(name) for name in columns})
+            )
+
+            session.execute(
+                statement,
+                [
+                    dict(
+                        {name: row[name] for name in columns},
+                        b_pk=row[pk_column.name],
+                    )
+                    for row in updates
+                ],
+            )
+
+
+def _restore_snapshot(
+    backup_filename: str, restore_tables: dict, manifest: dict = None
+) -> dict:
+    """
+    restore the tables from a compressed json lines snapshot
+
+    the rows are read as a stream and restored in chunks with bulk
+    statements. The row counts and checksums of each table are verified
+    against the end line of the table and the manifest.
+
+    @param backup_filename - the snapshot file name
+    @param restore_tables - dict of the snapshot table names and the models
+                            which should be restored
+    @param manifest - the optional manifest of the snapshot
+    @return dict with the number of restored rows per table
+    """
+    app = current_app
+
+    restored = {}
+
+    with gzip.open(backup_filename, "rt", encoding="utf-8") as backup_file:
+        header = json.loads(backup_file.readline())
+
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError("%s is not a LinOTP snapshot" % backup_filename)
+
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(
+                "unsupported snapshot version %r" % header.get("version")
+            )
+
+        name = None
+        table = None
+
+        for line in backup_file:
+            record = json.loads(line)
+
+            if isinstance(record, list):
+                # a row of the current table
+
+                checksum.update(line.encode("utf-8"))
+                rows += 1
+
+                if table is None:
+                    continue
+
+                chunk.append(
+                    {
+                        column.name: _decode_value(column, value)
+                        for column, value in zip(columns, record)
+                        if column is not None
+                    }
+                )
+
+                if len(chunk) >= SNAPSHOT_CHUNK_SIZE:
+                    _merge_rows(db.session, table, chunk)
+                    chunk = []
+
+            elif "table" in record:
+                name = record["table"]
+                checksum = hashlib.sha256()
+                rows = 0
+                chunk = []
+
+                table = None
+                if name in restore_tables:
+                    app.echo("Restoring %r" % name, v=1)
+                    table = restore_tables[name].__table__
+
+                    # columns which are not part of the current table
+                    # definition anymore are skipped
+
+                    columns = [
+                        table.columns.get(column_name)
+                        for column_name in record["columns"]
+                    ]
+
+            elif "end" in record:
+                if record["end"] != name:
+                    raise ValueError("snapshot table %r is incomplete" % name)
+
+                table_info = {"rows": rows, "sha256": checksum.hexdigest()}
+                expected = [{k: record[k] for k in ("rows", "sha256")}]
+                if manifest:
+                    expected.append(manifest["tables"].get(name))
+
+                if any(info != table_info for info in expected):
+                    raise ValueError(
+                        "snapshot table %r does not match its checksum" % name
+                    )
+
+                if table is not None:
+                    _merge_rows(db.session, table, chunk)
+                    restored[name] = rows
+                    app.echo("%s: %d rows restored" % (name, rows), v=2)
+
+                name = None
+                table = None
+
+        if name is not None:
+            raise ValueError("snapshot table %r is incomplete" % name)
+
+    return restored
+
+
+def _restore_legacy_snapshot(backup_filename: str, restore_names: list):
+    """
+    restore the database tables from a snapshot in the former format
+
+    @param backup_filename - the snapshot file name
+    @param restore_names - the names of the tables, which should be restored
+    """
+    app = current_app
+
+    with open(backup_filename, "r") as backup_file:
+        for line in backup_file:
+            line = line.strip()
+
+            if line.startswith("--- END "):
+                name = None
+
+            elif line.startswith("--- BEGIN "):
+                name = line[len("--- BEGIN ") :]
+
+            elif line and name in restore_names:
+                # unhexlify the serialized data first
+
+                data = binascii.unhexlify(line.encode("utf-8"))
+
+                # use sqlalchemy loads to de-serialize the data objects
+
+                restore_query = loads(data, db.metadata, db.session)
+
+                # merge the objects into the current session
+
+                db.session.merge(restore_query)
+
+                app.echo("Restoring %r" % name, v=1)
+
+
 def restore_database_tables(
     filename: str = None, date: str = None, table: str = None
 ) -> int:
@@ -330,11 +767,13 @@ def restore_database_tables(
     """
     app = current_app
 
-    restore_names = list(ORM_Models.keys())
+    restore_classes = dict(ORM_Models)
 
     audit_uri = app.config["AUDIT_DATABASE_URI"]
     if audit_uri == "SHARED":
-        restore_names.append("AuditTable")
+        restore_classes["AuditTable"] = AuditTable
+
+    restore_names = list(restore_classes.keys())
 
     # ---------------------------------------------------------------------- --
 
@@ -350,7 +789,7 @@ def restore_database_tables(
             restore_names = ["AuditTable"]
 
         elif table.lower() == "token":
-            restore_names = ["Token", "TokenRealm", "Realm"]
+            restore_names = ["Realm", "Token", "TokenRealm"]
 
         else:
             app.echo(
@@ -368,42 +807,40 @@ def restore_database_tables(
     # determine the backup file for the database restore
 
     backup_filename = _get_restore_filename(
-        "linotp_backup_%s.sqldb", filename, date
+        BACKUP_FILENAME_TEMPLATE, filename, date
     )
 
     # ---------------------------------------------------------------------- --
 
-    db = SQLAlchemy(app)
-
-    # ---------------------------------------------------------------------- --
-
-    # restore the sqlalchemy dump from file
+    # restore the snapshot - the transaction is only committed if all
+    # tables could be restored
 
-    with open(backup_filename, "r") as backup_file:
-        for line in backup_file:
-            line = line.strip()
-
-            if line.startswith("--- END "):
-                name = None
-
-            elif line.startswith("--- BEGIN "):
-                name = line[len("--- BEGIN ") :]
-
-            elif line and name in restore_names:
-                # unhexlify the serialized data first
-
-                data = binascii.unhexlify(line.encode("utf-8"))
-
-                # use sqlalchemy loads to de-serialize the data objects
-
-                restore_query = loads(data, db.metadata, db.session)
+    try:
+        if backup_filename.endswith(".sqldb"):
+            _restore_legacy_snapshot(backup_filename, restore_names)
 
-                # merge the objects into the current session
+        else:
+            manifest = _get_manifest(backup_filename)
+            if manifest:
+                _verify_file_checksum(backup_filename, manifest)
+
+            _restore_snapshot(
+                backup_filename,
+                {
+                    name: restore_classes[name]
+                    for name in restore_names
+                    if name in restore_classes
+                },
+                manifest,
+            )
 
-                db.session.merge(restore_query)
+        # the token counters are not maintained by the bulk restore
 
-                app.echo("Restoring %r" % name, v=1)
+        if "Token" in restore_names:
+            reconcile_token_counters()
 
-    # finally commit all de-serialized objects
+        db.session.commit()
 
-    db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+""" Commands to access the request profiles.
+
+    The profiling of a controller action is armed by
+
+        POST /maintenance/setProfiling target=validate/check requests=10
+
+    and the captured profiles are listed, fetched and shown by
+
+        linotp profile list
+        linotp profile get <name> --output validate-check.prof
+        linotp profile show <name> --sort tottime --limit 20
+
+    The fetched profiles are in the pstats format, which is read by tools
+    like snakeviz or `python -m pstats`.
+"""
+
+import datetime
+import io
+import pstats
+import shutil
+import sys
+
+import click
+
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+from linotp.lib.profiling import get_profile_path, list_profiles
+
+SORT_KEYS = ["cumulative", "tottime", "ncalls", "filename", "name"]
+
+# -------------------------------------------------------------------------- --
+
+# profile commands: list, get, show
+
+profile_cmds = AppGroup("profile", help="Access the captured request profiles")
+
+
+@profile_cmds.command("list", help="List the captured request profiles.")
+@with_appcontext
+def list_command():
+    """list the captured profiles with their size and capture time"""
+
+    app = current_app
+    try:
+        for name, size, mtime in list_profiles():
+            captured = datetime.datetime.fromtimestamp(mtime).isoformat(
+                timespec="seconds"
+            )
+            app.echo(f"{name}\t{size}\t{captured}", err=False)
+
+    except Exception as exx:
+        app.echo(f"Error while listing the profiles: {exx!s}")
+        sys.exit(1)
+
+
+@profile_cmds.command(
+    "get",
+    help=(
+        "Write the profile NAME in the pstats format to --output or, "
+        "by default, to stdout."
+    ),
+)
+@click.argument("name")
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("wb"),
+    default="-",
+    help="The file the profile is written to.",
+)
+@with_appcontext
+def get_command(name: str, output):
+    """copy a captured profile"""
+
+    app = current_app
+    try:
+        with open(get_profile_path(name), "rb") as profile:
+            shutil.copyfileobj(profile, output)
+
+    except Exception as exx:
+        app.echo(f"Error while getting the profile: {exx!s}")
+        sys.exit(1)
+
+
+@profile_cmds.command(
+    "show", help="Show the functions of the profile NAME, which took longest."
+)
+@click.argument("name")
+@click.option(
+    "--sort",
+    type=click.Choice(SORT_KEYS),
+    default="cumulative",
+    help="The key the functions are sorted by. Defaults to cumulative.",
+)
+@click.option(
+    "--limit",
+    default=30,
+    type=click.IntRange(min=1),
+    help="The number of functions shown. Defaults to 30.",
+)
+@with_appcontext
+def show_command(name: str, sort: str, limit: int):
+    """print the statistics of a captured profile"""
+
+    app = current_app
+    try:
+        stream = io.StringIO()
+        stats = pstats.Stats(get_profile_path(name), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+
+        app.echo(stream.getvalue(), err=False)
+
+    except Exception as exx:
+        app.echo(f"Error while showing the profile: {exx!s}")
+        sys.exit(1)
@@ -28,6 +28,8 @@
 """
 admin controller - interfaces to administrate LinOTP
 """
+import codecs
+import io
 import json
 import logging
 import os
@@ -51,9 +53,9 @@ from linotp.lib.audit.base import get_token_num_info
 from linotp.lib.challenges import Challenges
 from linotp.lib.context import request_context
 from linotp.lib.error import ParameterError, TokenAdminError
-from linotp.lib.ImportOTP.oath import parseOATHcsv
+from linotp.lib.ImportOTP.oath import iterate_oath_csv
 from linotp.lib.ImportOTP.safenet import ImportException, parseSafeNetXML
-from linotp.lib.ImportOTP.yubico import parseYubicoCSV
+from linotp.lib.ImportOTP.yubico import iterate_yubico_csv
 from linotp.lib.policy import (
     PolicyException,
     checkPolicyPost,
@@ -81,6 +83,7 @@ from linotp.lib.token import (
     get_tokens,
     getTokenRealms,
     getTokenType,
+    import_tokens,
     resetToken,
     setPin,
     setPinSo,
@@ -2152,7 +2155,6 @@ class AdminController(BaseController, JWTMixin):
         """
         res = "Loading token file failed!"
         known_types = ["aladdin-xml", "oathcsv", "yubikeycsv"]
-        TOKENS = {}
         res = None
 
         sendResultMethod = sendResult
@@ -2166,9 +2168,9 @@ class AdminController(BaseController, JWTMixin):
             known_types,
         )
 
-        from linotp.lib.ImportOTP.PSKC import parsePSKCdata
+        from linotp.lib.ImportOTP.PSKC import iterate_pskc_data
 
-        log.info("[loadtokens] loaded parsePSKCdata")
+        log.info("[loadtokens] loaded iterate_pskc_data")
 
         from linotp.lib.ImportOTP.DPWplain import parseDPWdata
 
@@ -2208,7 +2210,6 @@ class AdminController(BaseController, JWTMixin):
                 if "pskc_checkserial" in params:
                     pskc_checkserial = True
 
-            fileString = ""
             typeString = ""
 
             log.debug(
@@ -2223,14 +2224,19 @@ class AdminController(BaseController, JWTMixin):
             # transferred in an iframe. see:
             # http://jquery.malsup.com/form/#sample4
 
+            # the upload is not read into memory as a whole - the csv and
+            # the pskc files are parsed directly from the uploaded file
+
             if isinstance(tokenFile, FileStorage):
                 log.debug("[loadtokens] Field storage file: %s", tokenFile)
-                fileString = tokenFile.read().decode()
+                fileStream = tokenFile.stream
                 sendResultMethod = sendXMLResult
                 sendErrorMethod = sendXMLError
             else:
-                fileString = tokenFile
-            log.debug("[loadtokens] fileString: %s", fileString)
+                fileStream = io.BytesIO(tokenFile.encode("utf-8"))
+
+            fileEmpty = not fileStream.read(1)
+            fileStream.seek(0)
 
             if isinstance(fileType, FileStorage):
                 log.debug("[loadtokens] Field storage type: %s", fileType)
@@ -2247,8 +2253,8 @@ class AdminController(BaseController, JWTMixin):
                     pskc_checkserial,
                 )
 
-            if fileString == "" or typeString == "":
-                log.error("[loadtokens] file: %s", fileString)
+            if fileEmpty or typeString == "":
+                log.error("[loadtokens] file: %s", tokenFile)
                 log.error("[loadtokens] type: %s", typeString)
                 log.error(
                     "[loadtokens] Error loading/importing token file. "
@@ -2273,47 +2279,58 @@ class AdminController(BaseController, JWTMixin):
                     ),
                 )
 
-            # Parse the tokens from file and get dictionary
+            # Parse the tokens from file - the csv and the pskc files are
+            # read incrementally into a generator of (serial, token data),
+            # while the other formats require the whole file content
+
+            tokens = iter(())
+
             if typeString == "aladdin-xml":
-                TOKENS = parseSafeNetXML(fileString)
+                tokens = parseSafeNetXML(fileStream.read().decode()).items()
                 # we only do hashlib for aladdin at the moment.
                 if "aladdin_hashlib" in params:
                     hashlib = params["aladdin_hashlib"]
 
             elif typeString == "oathcsv":
-                TOKENS = parseOATHcsv(fileString)
+                tokens = iterate_oath_csv(
+                    codecs.getreader("utf-8")(fileStream)
+                )
 
             elif typeString == "yubikeycsv":
-                TOKENS = parseYubicoCSV(fileString)
+                tokens = iterate_yubico_csv(
+                    codecs.getreader("utf-8")(fileStream)
+                )
 
             elif typeString == "dpw":
-                TOKENS = parseDPWdata(fileString)
+                tokens = parseDPWdata(fileStream.read().decode()).items()
 
             elif typeString == "dat":
                 startdate = params.get("startdate", None)
-                TOKENS = parse_dat_data(fileString, startdate)
+                tokens = parse_dat_data(
+                    fileStream.read().decode(), startdate
+                ).items()
 
             elif typeString == "feitian":
-                TOKENS = parsePSKCdata(fileString, do_feitian=True)
+                tokens = iterate_pskc_data(fileStream, do_feitian=True)
 
             elif typeString == "pskc":
                 if "key" == pskc_type:
-                    TOKENS = parsePSKCdata(
-                        fileString,
+                    tokens = iterate_pskc_data(
+                        fileStream,
                         preshared_key_hex=pskc_preshared,
                         do_checkserial=pskc_checkserial,
                     )
 
                 elif "password" == pskc_type:
-                    TOKENS = parsePSKCdata(
-                        fileString,
+                    tokens = iterate_pskc_data(
+                        fileStream,
                         password=pskc_password,
                         do_checkserial=pskc_checkserial,
                     )
 
                 elif "plain" == pskc_type:
-                    TOKENS = parsePSKCdata(
-                        fileString, do_checkserial=pskc_checkserial
+                    tokens = iterate_pskc_data(
+                        fileStream, do_checkserial=pskc_checkserial
                     )
 
             tokenrealm = ""
@@ -2370,83 +2387,87 @@ class AdminController(BaseController, JWTMixin):
 
             # -------------------------------------------------------------- --
 
-            # Now import the Tokens from the dictionary
+            # Now import the Tokens chunk by chunk
 
-            log.debug(
-                "[loadtokens] read %i tokens. starting import now", len(TOKENS)
-            )
+            enable = boolean(params.get("enable", True))
 
-            ret = ""
-            th = TokenHandler()
-            for serial in TOKENS:
-                log.debug("[loadtokens] importing token %s", TOKENS[serial])
+            def token_init_params():
+                for serial, token_data in tokens:
+                    log.debug("[loadtokens] importing token %s", token_data)
 
-                log.info(
-                    "[loadtokens] initialize token. serial: %r, realm: %r",
-                    serial,
-                    tokenrealm,
-                )
+                    # for the eToken dat we assume, that it brings all its
+                    # init parameters in correct format
 
-                # for the eToken dat we assume, that it brings all its
-                # init parameters in correct format
+                    if typeString == "dat":
+                        init_param = token_data
 
-                if typeString == "dat":
-                    init_param = TOKENS[serial]
+                    else:
+                        init_param = {
+                            "serial": serial,
+                            "type": token_data["type"],
+                            "description": token_data.get(
+                                "description", "imported"
+                            ),
+                            "otpkey": token_data["hmac_key"],
+                            "otplen": token_data.get("otplen"),
+                            "timeStep": token_data.get("timeStep"),
+                            "hashlib": token_data.get("hashlib"),
+                        }
 
-                else:
-                    init_param = {
-                        "serial": serial,
-                        "type": TOKENS[serial]["type"],
-                        "description": TOKENS[serial].get(
-                            "description", "imported"
-                        ),
-                        "otpkey": TOKENS[serial]["hmac_key"],
-                        "otplen": TOKENS[serial].get("otplen"),
-                        "timeStep": TOKENS[serial].get("timeStep"),
-                        "hashlib": TOKENS[serial].get("hashlib"),
-                    }
-
-                # add ocrasuite for ocra tokens, only if ocrasuite is not empty
-                if TOKENS[serial]["type"] in ["ocra2"]:
-                    if TOKENS[serial].get("ocrasuite", "") != "":
-                        init_param["ocrasuite"] = TOKENS[serial].get(
-                            "ocrasuite"
-                        )
+                    # add ocrasuite for ocra tokens, only if ocrasuite is
+                    # not empty
+                    if token_data["type"] in ["ocra2"]:
+                        if token_data.get("ocrasuite", "") != "":
+                            init_param["ocrasuite"] = token_data.get(
+                                "ocrasuite"
+                            )
 
-                if hashlib and hashlib != "auto":
-                    init_param["hashlib"] = hashlib
+                    if hashlib and hashlib != "auto":
+                        init_param["hashlib"] = hashlib
 
-                init_param["enable"] = boolean(params.get("enable", True))
+                    init_param["enable"] = enable
 
-                (ret, _tokenObj) = th.initToken(
-                    init_param, User("", "", ""), tokenrealm=tokenrealm
+                    yield serial, init_param
+
+            # the random pin is set and the max tokens per realm and the
+            # license are checked once per chunk
+
+            imported = {}
+            for serials in import_tokens(token_init_params(), tokenrealm):
+                checkPolicyPost(
+                    "admin", "loadtokens", {"tokenrealm": tokenrealm}
                 )
 
-                # check policy to set token pin random
-                checkPolicyPost("admin", "setPin", {"serial": serial})
+                imported.update(dict.fromkeys(serials))
+
+                log.info(
+                    "[loadtokens] imported %i tokens into realm %r",
+                    len(imported),
+                    tokenrealm,
+                )
 
             # check the max tokens per realm
 
             checkPolicyPost("admin", "loadtokens", {"tokenrealm": tokenrealm})
-            log.info("[loadtokens] %i tokens imported.", len(TOKENS))
+            log.info("[loadtokens] %i tokens imported.", len(imported))
 
             res = _("%d tokens were imported from the %s file.") % (
-                len(TOKENS),
+                len(imported),
                 tokenFile.filename,
             )
 
             g.audit["info"] = "%s, %s (imported: %i)" % (
                 fileType,
                 tokenFile,
-                len(TOKENS),
+                len(imported),
             )
-            g.audit["serial"] = ", ".join(list(TOKENS.keys()))
-            g.audit["success"] = ret
+            g.audit["serial"] = ", ".join(imported)
+            g.audit["success"] = len(imported) > 0
             g.audit["realm"] = tokenrealm
 
             db.session.commit()
             return sendResultMethod(
-                response, res, opt={"imported": len(TOKENS)}
+                response, res, opt={"imported": len(imported)}
             )
 
         except PolicyException as pex:
@@ -94,6 +94,20 @@ class AuditController(BaseController):
                 ('sortname', u'number'),
                 ('sortorder', u'asc'),
                 ('query', u''), ('qtype', u'serial')]
+        :param from: (optional) only entries logged at or after this time,
+            given in ISO format like 2023-01-31T12:00:00Z. Times without
+            timezone are taken as UTC.
+        :param to: (optional) only entries logged before this time
+        :param after: (optional) keyset pagination - return the entries
+            following the entry with this number in the sort order instead
+            of the entries of the given page. Only supported for sorting by
+            number or date.
+        :param total: (optional) if set to "false", the total number of
+            matching entries is not counted and returned as null
+        :param verify: (optional) the verification of the entry signatures:
+            "all" (default) verifies every entry, "page" only the entries of
+            paged results and "none" skips the verification. The sig_check
+            of unverified entries is empty.
         :return:
             JSON response or csv format
         """
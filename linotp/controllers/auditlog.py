@@ -107,6 +107,21 @@ class AuditlogController(BaseController, JWTMixin):
         :param timestamp: filter for a specific timestamp. Leading or closing `*` can be used as a wildcard operator
         :type timestamp: str, optional
 
+        :param from: only entries logged at or after this time in ISO format like `2023-01-31T12:00:00Z`. Times without timezone are taken as UTC
+        :type from: str, optional
+
+        :param to: only entries logged before this time in ISO format
+        :type to: str, optional
+
+        :param after: keyset pagination - return the entries following the entry with this id in the sort order instead of the requested page. Only supported for sorting by `id` or `timestamp`
+        :type after: int, optional
+
+        :param total: if set to `false`, the total number of records is not counted and `totalPages` and `totalRecords` are null
+        :type total: boolean, optional
+
+        :param verify: the verification of the entry signatures: `all` (default) verifies every entry, `page` only the entries of a page with a pageSize other than 0 and `none` skips the verification. The `signatureCheck` of unverified entries is null
+        :type verify: str, optional
+
         :param action: filter for a specific action. Leading or closing `*` can be used as a wildcard operator
         :type action: str, optional
 
@@ -187,8 +202,10 @@ class AuditlogController(BaseController, JWTMixin):
             audit_obj = current_app.audit_obj
             audit_query = AuditQuery(search_dict, audit_obj)
 
+            verify = audit_query.verify_signatures()
+
             entries = [
-                audit_query.audit_obj.row2dictApiV2(rowproxy)
+                audit_query.audit_obj.row2dictApiV2(rowproxy, verify=verify)
                 for rowproxy in audit_query.get_query_result()
             ]
 
@@ -228,6 +245,11 @@ class AuditlogController(BaseController, JWTMixin):
             "client": "client",
             "logLevel": "log_level",
             "clearanceLevel": "clearance_level",
+            "from": "from",
+            "to": "to",
+            "after": "after",
+            "total": "total",
+            "verify": "verify",
         }
         search_params = {
             request_param_to_audit_query_param_mapping[k]: v
@@ -47,7 +47,7 @@ from jwt import ExpiredSignatureError, InvalidSignatureError
 from flask import Blueprint, after_this_request, current_app, g, jsonify
 
 from linotp.flap import request
-from linotp.lib import deprecated_methods, render_calling_path
+from linotp.lib import deprecated_methods, profiling, render_calling_path
 from linotp.lib.context import request_context
 from linotp.lib.realm import getRealms
 from linotp.lib.reply import sendError, sendResult
@@ -138,6 +138,7 @@ class BaseController(Blueprint, metaclass=ControllerMetaClass):
         self.jwt_exempt_methods = set()
 
         # These methods will be called before each request
+        self.before_request(self.start_profiling)
         self.before_request(self.jwt_check)
         self.before_request(self.parse_requesting_user)
         self.before_request(self.before_handler)
@@ -149,6 +150,8 @@ class BaseController(Blueprint, metaclass=ControllerMetaClass):
 
         self.after_request(jwt_refresh)
 
+        self.teardown_request(self.stop_profiling)
+
         # Add routes for all the routeable endpoints in this "controller",
         # as well as base classes.
 
@@ -218,6 +221,35 @@ class BaseController(Blueprint, metaclass=ControllerMetaClass):
                         url.replace("_", "-"), method_name, view_func=method
                     )
 
+    def start_profiling(self):
+        """
+        Start the profiling of the request if the profiling of the
+        controller action is armed by /maintenance/setProfiling.
+
+        Errors are only logged, as the profiling must not break the request.
+        """
+        target = request.endpoint.replace(".", "/")
+
+        try:
+            g.profiler = profiling.start(target)
+        except Exception as exx:
+            log.error("failed to start the profiling of %r: %r", target, exx)
+
+    def stop_profiling(self, exc):
+        """
+        Stop the profiling of the request and write the profile.
+        """
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return
+
+        target = request.endpoint.replace(".", "/")
+
+        try:
+            profiling.stop(profiler, target, request_context["RequestId"])
+        except Exception as exx:
+            log.error("failed to write the profile of %r: %r", target, exx)
+
     def jwt_check(self):
         """Check whether the current request needs to be authenticated using
         JWT, and if so, whether it contains a valid JWT access token.
@@ -32,7 +32,7 @@ from werkzeug.exceptions import InternalServerError
 
 from linotp.controllers.base import BaseController, methods
 from linotp.flap import abort, config, request, response
-from linotp.lib import deprecated_methods
+from linotp.lib import deprecated_methods, profiling
 from linotp.lib.context import request_context
 from linotp.lib.logs import set_logging_level
 from linotp.lib.reply import sendError, sendResult
@@ -125,6 +125,62 @@ class MaintenanceController(BaseController):
             log.error(exx)
             return sendError(response, exx, 1)
 
+    @methods(["POST"])
+    def setProfiling(self):
+        """
+        profile the next requests of a controller action
+
+        the requests are counted across all LinOTP processes, which pick
+        up the change within a few seconds. The profiles are written to
+        CACHE_DIR/profiles and can be fetched by `linotp profile get`.
+
+        example call:
+
+            POST /maintenance/setProfiling
+            target=validate/check
+            requests=10
+
+        (profiles the next 10 requests of /validate/check)
+
+        :param target: the controller action - <controller>/<action>
+        :param requests: the number of requests to profile - 0 stops the
+                         profiling of the action
+        :param timeout: (optional) seconds after which the profiling is
+                        stopped - defaults to 3600
+
+        :return:
+            a json result with the number of requests, which are still to
+            be profiled per controller action
+
+        :raises Exception:
+            if an error occurs an exception is serialized and returned
+
+        """
+
+        try:
+            target = self.request_params.get("target", "")
+
+            try:
+                requests = int(self.request_params.get("requests", 0))
+                timeout = int(
+                    self.request_params.get(
+                        "timeout", profiling.DEFAULT_TIMEOUT
+                    )
+                )
+            except ValueError as exx:
+                raise Exception(
+                    "requests and timeout must be numbers: %s" % exx
+                )
+
+            profiling.arm(target, requests, timeout)
+
+            return sendResult(response, profiling.get_armed())
+
+        except Exception as exx:
+            db.session.rollback()
+            log.error(exx)
+            return sendError(response, exx, 1)
+
     @deprecated_methods(["POST"])
     def check_status(self):
         """
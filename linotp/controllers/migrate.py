@@ -40,7 +40,11 @@ import os
 from linotp.controllers.base import BaseController, methods
 from linotp.flap import response
 from linotp.lib import deprecated_methods
-from linotp.lib.migrate import DecryptionError, MigrationHandler
+from linotp.lib.migrate import (
+    MIGRATE_CHUNK_SIZE,
+    DecryptionError,
+    MigrationHandler,
+)
 from linotp.lib.policy import PolicyException
 from linotp.lib.reply import sendError, sendResult
 from linotp.model import db
@@ -73,6 +77,18 @@ class MigrateController(BaseController):
         """
         return response
 
+    @staticmethod
+    def _backup_file_name(backupid):
+        """
+        helper - the name of the backup file is derived from the backupid
+
+        :param backupid: the backupid of the request
+        :return: the file name of the backup file
+        """
+
+        b_name = hashlib.sha256(backupid.encode("utf-8")).digest()[:16]
+        return "%s.hbak" % binascii.hexlify(b_name).decode()
+
     @methods(["POST"])
     def backup(self):
         """
@@ -85,8 +101,13 @@ class MigrateController(BaseController):
             - is encrypted with a given passphrase
             - and stored in an backup file (defined by the hash of backupid)
 
+        the tokens are read in chunks and every entry is written to the
+        backup file directly, so that the memory usage does not depend on
+        the number of tokens
+
         :param pass: passphrase used for encrypting data in the backup file
         :param backupid: used to controll the intermediate backup file
+        :param chunk_size (optional): the number of tokens read at once
 
         """
 
@@ -97,17 +118,20 @@ class MigrateController(BaseController):
             except KeyError as exx:
                 raise Exception("missing Parameter:%r" % exx)
 
+            chunk_size = int(
+                self.request_params.get("chunk_size", MIGRATE_CHUNK_SIZE)
+            )
+
             backup_data = {}
 
             mig = MigrationHandler()
             salt = mig.setup(passphrase=passphrase)
 
             # create the backup file
-            b_name = hashlib.sha256(backupid).digest()[:16]
-            b_name = "%s.hbak" % binascii.hexlify(b_name)
+            b_name = self._backup_file_name(backupid)
 
             with open(b_name, "w") as f:
-                f.write(json.dumps({"Salt": binascii.hexlify(salt)}))
+                f.write(json.dumps({"Salt": binascii.hexlify(salt).decode()}))
                 f.write("\n")
 
                 i = 0
@@ -118,7 +142,7 @@ class MigrateController(BaseController):
                 backup_data["Config"] = i
 
                 i = 0
-                for data in mig.get_token_data():
+                for data in mig.get_token_data(chunk_size=chunk_size):
                     f.write(json.dumps({"Token": data}))
                     f.write("\n")
                     i += 1
@@ -127,11 +151,18 @@ class MigrateController(BaseController):
                 mac = mig.calculate_mac(json.dumps(backup_data))
                 f.write(
                     json.dumps(
-                        {"Counter": backup_data, "mac": binascii.hexlify(mac)}
+                        {
+                            "Counter": backup_data,
+                            "mac": binascii.hexlify(mac).decode(),
+                        }
                     )
                 )
                 f.write("\n")
 
+            # remove the progress of a former restore of this backupid
+            if os.path.isfile(b_name + ".progress"):
+                os.remove(b_name + ".progress")
+
             result = {}
             for val in ["Token", "Config"]:
                 result[val] = backup_data[val]
@@ -148,6 +179,71 @@ class MigrateController(BaseController):
             log.error("[backup] failed: %r", exx)
             return sendError(response, exx)
 
+    @staticmethod
+    def _verify_backup_file(backup_file, passphrase):
+        """
+        helper - verify the integrity of the backup file before the restore
+
+        the backup file is read line by line: the first line contains the
+        salt, the last one the mac protected number of entries written
+
+        :param backup_file: the name of the backup file
+        :param passphrase: passphrase used for encrypting the backup file
+        :return: the initialized MigrationHandler
+        """
+
+        mig = None
+        counters = {}
+        counter_check_done = False
+
+        with open(backup_file, "r") as f:
+            for data in f:
+                if not data.strip():  # skip empty lines
+                    continue
+
+                restore_data = json.loads(data)
+
+                if not mig and "Salt" in restore_data:
+                    salt = restore_data["Salt"]
+                    mig = MigrationHandler()
+                    mig.setup(
+                        passphrase=passphrase,
+                        salt=binascii.unhexlify(salt),
+                    )
+
+                elif not mig:
+                    raise Exception("MigrationHandler not initialized!")
+
+                elif "Config" in restore_data or "Token" in restore_data:
+                    key = "Config" if "Config" in restore_data else "Token"
+                    counters[key] = counters.get(key, 0) + 1
+
+                # Counters is the last entry - compare the counters
+                elif "Counter" in restore_data:
+                    # check inzegryty for 'number of entries'
+                    backup_data = restore_data["Counter"]
+
+                    mac = mig.calculate_mac(json.dumps(backup_data))
+                    if binascii.hexlify(mac).decode() != restore_data["mac"]:
+                        raise Exception("Restore Lines mismatch")
+
+                    if backup_data.get("Token") != counters.get("Token", 0):
+                        raise Exception("Restore Token mismatch")
+
+                    if backup_data.get("Config") != counters.get("Config", 0):
+                        raise Exception("Restore Config mismatch")
+
+                    counter_check_done = True
+
+                else:
+                    log.info("unknown entry")
+
+        # if somebody removed the last line, we cry for it
+        if not counter_check_done:
+            raise Exception("incomplete migration file!")
+
+        return mig
+
     @methods(["POST"])
     def restore(self):
         """
@@ -159,14 +255,23 @@ class MigrateController(BaseController):
         backup file contains the salt, the last one the number of entries
         written
 
+        the integrity of the backup file is verified before any entry is
+        restored. The tokens are then restored and committed in chunks. The
+        number of committed entries is recorded in a progress file next to
+        the backup file, so that an interrupted restore continues with the
+        next chunk, when it is called again with the same backupid.
+
         :param pass: passphrase used for encrypting data in the backup file
         :param backupid: used to controll the intermediate backup file
         :param remove_backup (optional): if set to False, backup file will not
                 be deleted after backup.
-                Default is that backup is deleted, even in case of error
+                Default is that backup is deleted, even in case of error -
+                unless a part of the backup has already been restored
+        :param chunk_size (optional): the number of tokens committed at once
 
         """
         backup_file = ""
+        progress_file = ""
         remove_backup_file = True
 
         # error conditions
@@ -185,78 +290,73 @@ class MigrateController(BaseController):
                 missing_param = True
                 raise Exception("missing Parameter:%r" % exx)
 
-            mig = None
+            chunk_size = int(
+                self.request_params.get("chunk_size", MIGRATE_CHUNK_SIZE)
+            )
 
             # get the backup file
-            backup_file = hashlib.sha256(backupid).digest()[:16]
-            backup_file = "%s.hbak" % binascii.hexlify(backup_file)
+            backup_file = self._backup_file_name(backupid)
+            progress_file = backup_file + ".progress"
 
             if not os.path.isfile(backup_file):
                 raise Exception(
                     "No restore file found for backupid=%s" % backupid
                 )
 
+            mig = self._verify_backup_file(backup_file, passphrase)
+
+            # the number of entries restored by a former interrupted restore
+
+            restored = 0
+            if os.path.isfile(progress_file):
+                with open(progress_file, "r") as f:
+                    restored = int(f.read().strip() or 0)
+
+                log.info("[restore] continue after %d entries", restored)
+
             counters = {}
-            counter_check_done = False
+            entries = 0
+            tokens_data = []
+
+            def restore_tokens():
+                if tokens_data:
+                    mig.set_tokens_data(tokens_data)
+                db.session.commit()
+
+                # remember the committed entries
+                with open(progress_file, "w") as f:
+                    f.write("%d" % entries)
+
+                del tokens_data[:]
+
             with open(backup_file, "r") as f:
-                for data in f.readlines():
+                for data in f:
                     if not data.strip():  # skip empty lines
                         continue
 
                     restore_data = json.loads(data)
 
-                    if not mig and "Salt" in restore_data:
-                        salt = restore_data["Salt"]
-                        mig = MigrationHandler()
-                        mig.setup(
-                            passphrase=passphrase,
-                            salt=binascii.unhexlify(salt),
-                        )
-
-                    elif "Config" in restore_data and mig:
-                        config_entry = restore_data["Config"]
-                        mig.set_config_entry(config_entry)
+                    if "Config" in restore_data:
+                        entries += 1
                         counters["Config"] = counters.get("Config", 0) + 1
 
-                    elif "Token" in restore_data and mig:
-                        token_entry = restore_data["Token"]
-                        mig.set_token_data(token_entry)
-                        counters["Token"] = counters.get("Token", 0) + 1
-
-                    # Counters is the last entry - compare the counters
-                    elif "Counter" in restore_data and mig:
-                        # check inzegryty for 'number of entries'
-                        backup_data = restore_data["Counter"]
-
-                        mac = mig.calculate_mac(json.dumps(backup_data))
-                        if binascii.hexlify(mac) != restore_data["mac"]:
-                            raise Exception("Restore Lines mismatch")
+                        if entries > restored:
+                            mig.set_config_entry(restore_data["Config"])
 
-                        if restore_data["Counter"].get(
-                            "Token"
-                        ) != counters.get("Token", 0):
-                            raise Exception("Restore Token mismatch")
+                    elif "Token" in restore_data:
+                        entries += 1
+                        counters["Token"] = counters.get("Token", 0) + 1
 
-                        if restore_data["Counter"].get(
-                            "Config"
-                        ) != counters.get("Config", 0):
-                            raise Exception("Restore Config mismatch")
+                        if entries > restored:
+                            tokens_data.append(restore_data["Token"])
 
-                        counter_check_done = True
+                        if len(tokens_data) >= chunk_size:
+                            restore_tokens()
 
-                    else:
-                        if not mig:
-                            raise Exception(
-                                "MigrationHandler not initialized!"
-                            )
-                        else:
-                            log.info("unknown entry")
+            restore_tokens()
 
-            # if somebody removed the last line, we cry for it
-            if not counter_check_done:
-                raise Exception("incomplete migration file!")
+            os.remove(progress_file)
 
-            db.session.commit()
             log.debug("[restore] success")
             return sendResult(response, counters)
 
@@ -276,6 +376,10 @@ class MigrateController(BaseController):
             return sendError(response, err)
 
         finally:
+            # keep the backup file to continue a partial restore
+            if progress_file and os.path.isfile(progress_file):
+                remove_backup_file = False
+
             if remove_backup_file and os.path.isfile(backup_file):
                 if not missing_param and not decryption_error:
                     os.remove(backup_file)
@@ -30,12 +30,12 @@ monitoring controller - interfaces to monitor LinOTP
 
 import logging
 
-from flask import current_app, g
+from flask import Response, current_app, g
 
 from linotp.controllers.base import BaseController
 from linotp.flap import config, request, response
 from linotp.flap import tmpl_context as c
-from linotp.lib import deprecated_methods
+from linotp.lib import deprecated_methods, metrics
 from linotp.lib.context import request_context
 from linotp.lib.error import HSMException
 from linotp.lib.monitoring import MonitorHandler
@@ -427,3 +427,34 @@ class MonitoringController(BaseController):
             log.error(exc)
             db.session.rollback()
             return sendError(response, exc)
+
+    @deprecated_methods(["POST"])
+    def metrics(self):
+        """
+        export the request stage timings and the cache, resolver, hsm and
+        provider metrics of this LinOTP process in the Prometheus text
+        format
+
+        the metrics are only collected if METRICS_ENABLED is set. As each
+        LinOTP process keeps its own metrics, every process has to be
+        scraped on its own.
+
+        :return:
+            the metrics as text/plain response
+
+        :raises Exception:
+            if an error occurs an exception is serialized and returned
+        """
+        try:
+            if not metrics.enabled:
+                raise Exception("metrics are disabled - set METRICS_ENABLED")
+
+            return Response(
+                metrics.render(),
+                content_type="text/plain; version=0.0.4; charset=utf-8",
+            )
+
+        except Exception as exc:
+            log.error(exc)
+            db.session.rollback()
+            return sendError(response, exc)
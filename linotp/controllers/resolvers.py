@@ -283,37 +283,26 @@ class ResolversController(BaseController, JWTMixin):
                 if k not in ["page", "pageSize", "sortOrder", "sortBy"]
             }
 
-            users = resolver.get_users(search_dictionary)
             log.debug("[get_users] page: %s, page_size: %s", page, page_size)
 
-            # convert to dict
-            user_dicts = [user.as_dict() for user in users]
-
-            # sort users
-            reverse = self.request_params.get("sortOrder", "asc") == "desc"
-            sort_key = self.request_params.get("sortBy", "username")
-            try:
-                user_dicts = sorted(
-                    user_dicts,
-                    key=lambda user_dict: user_dict[sort_key] or "",
-                    reverse=reverse,
-                )
-            except KeyError:
-                raise KeyError(
-                    f"users can't be sorted by parameter {sort_key}"
-                )
+            # sorting and paging is done by the resolver if supported
+            total_records, users = resolver.get_users_page(
+                search_dictionary,
+                sort_by=self.request_params.get("sortBy", "username"),
+                sort_order=self.request_params.get("sortOrder", "asc"),
+                page=page,
+                page_size=int(page_size or 0),
+            )
+
+            records = [user.as_dict() for user in users]
+
             total_pages = 1
-            total_records = len(users)
 
             # return only one page and its metadata
             if page_size:
                 page_size = int(page_size)
-                start = page_size * page
-                end = start + page_size
-                records = user_dicts[start:end]
                 total_pages = ceil(total_records / page_size)
             else:
-                records = user_dicts
                 page_size = total_records
 
             res = {
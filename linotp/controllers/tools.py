@@ -175,8 +175,13 @@ class ToolsController(BaseController):
         """
         migrate all users and their token into a new resolver
 
-        Raises:
-            Exception: _description_
+        the tokens are migrated in chunks, where each chunk is committed,
+        so that an interrupted migration could be resumed by calling it
+        again.
+
+        :param from: the name of the src resolver
+        :param to: the name of the target resolver
+        :param dryrun: only report how many tokens could be migrated
 
         :return:
             a json result with a boolean status and request result
@@ -193,6 +198,7 @@ class ToolsController(BaseController):
         try:
             src = self.request_params["from"]
             target = self.request_params["to"]
+            dryrun = boolean(self.request_params.get("dryrun", False))
 
             from linotp.lib.resolver import getResolverList
 
@@ -205,7 +211,12 @@ class ToolsController(BaseController):
                 raise Exception("Src or Target resolver is undefined!")
 
             mg = MigrateResolverHandler()
-            ret = mg.migrate_resolver(src=src_resolver, target=target_resolver)
+            ret = mg.migrate_resolver(
+                src=src_resolver,
+                target=target_resolver,
+                dryrun=dryrun,
+                commit=not dryrun,
+            )
 
             db.session.commit()
             return sendResult(response, ret)
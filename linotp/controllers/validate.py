@@ -245,6 +245,9 @@ class ValidateController(BaseController):
         :param transactionid:
         :param serial:
         :param pass:
+        :param wait: (optional) long polling - the number of seconds the
+            request blocks until the pending transaction is answered. The
+            wait time is limited by the CHECK_STATUS_MAX_WAIT setting
 
         :return:
             a json result with a boolean status and request result
@@ -283,6 +286,15 @@ class ValidateController(BaseController):
 
             use_offline = "use_offline" in param
 
+            try:
+                wait = float(param.get("wait", 0))
+            except ValueError:
+                raise ParameterError(_('Invalid parameter "wait"!'))
+
+            wait = max(
+                0, min(wait, current_app.config["CHECK_STATUS_MAX_WAIT"])
+            )
+
             va = ValidationHandler()
             ok, opt = va.check_status(
                 transid=transid,
@@ -290,6 +302,7 @@ class ValidateController(BaseController):
                 serial=serial,
                 password=passw,
                 use_offline=use_offline,
+                wait=wait,
             )
 
             serials = []
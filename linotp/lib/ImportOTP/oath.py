@@ -65,17 +65,28 @@ def parseOATHcsv(csv):
                         'ocrasuite' : xxx  }
         }
     """
-    TOKENS = {}
+    TOKENS = dict(iterate_oath_csv(csv.split("\n")))
 
-    # we cant use the csv parser here as we have variable length data. So
-    # we do the split into lines manualy
+    log.debug("[parseOATHcsv] read the following values: %r", TOKENS)
+
+    return TOKENS
+
+
+def iterate_oath_csv(csv_lines):
+    """
+    parse the lines of an oath csv file one by one - the file format is
+    described in parseOATHcsv
 
-    csv_array = csv.split("\n")
+    :param csv_lines: iterable of the csv lines, e.g. the file object
+    :return: generator of (serial, token dict) tuples
+    """
+
+    log.debug("[iterate_oath_csv] starting to parse an oath csv file.")
 
-    log.debug("[parseOATHcsv] starting to parse an oath csv file.")
-    log.debug("[parseOATHcsv] the file contains %i lines.", len(csv_array))
+    # we cant use the csv parser here as we have variable length data. So
+    # we do the split into lines manualy
 
-    for csv_line in csv_array:
+    for csv_line in csv_lines:
         token = {}
 
         # we extend the line to contain always 8 columns
@@ -90,7 +101,7 @@ def parseOATHcsv(csv):
         serial = line[0]
         if not serial:
             log.error(
-                "[parseOATHcsv] the line %s did not contain"
+                "[iterate_oath_csv] the line %s did not contain"
                 " a serial number",
                 csv_line,
             )
@@ -108,7 +119,7 @@ def parseOATHcsv(csv):
         key = line[1]
         if not key:
             log.error(
-                "[parseOATHcsv] the line %s did not contain a hmac key",
+                "[iterate_oath_csv] the line %s did not contain a hmac key",
                 csv_line,
             )
             continue
@@ -137,7 +148,7 @@ def parseOATHcsv(csv):
 
             if not ocrasuite:
                 log.error(
-                    "[parseOATHcsv] the line %s did not contain"
+                    "[iterate_oath_csv] the line %s did not contain"
                     " the ocrasuite for the ocra2 token!",
                     csv_line,
                 )
@@ -187,13 +198,9 @@ def parseOATHcsv(csv):
         # ------------------------------------------------------------------ --
 
         log.debug(
-            "[parseOATHcsv] read the line >%s< into token: >%r<",
+            "[iterate_oath_csv] read the line >%s< into token: >%r<",
             csv_line,
             token,
         )
 
-        TOKENS[serial] = token
-
-    log.debug("[parseOATHcsv] read the following values: %r", TOKENS)
-
-    return TOKENS
+        yield serial, token
@@ -93,13 +93,25 @@ def parseYubicoCSV(csv):
                          }
         }
     """
-    TOKENS = {}
-    log.debug("[parseYubicoCSV] starting to parse an yubico csv file.")
+    TOKENS = dict(iterate_yubico_csv(csv.split("\n")))
 
-    csv_array = csv.split("\n")
+    log.debug("[parseYubicoCSV] read the following values: %r", TOKENS)
 
-    log.debug("[parseYubicoCSV] the file contains %i tokens.", len(csv_array))
-    for line in csv_array:
+    return TOKENS
+
+
+def iterate_yubico_csv(csv_lines):
+    """
+    parse the lines of a yubico csv file one by one - the file formats are
+    described in parseYubicoCSV
+
+    :param csv_lines: iterable of the csv lines, e.g. the file object
+    :return: generator of (serial, token dict) tuples
+    """
+
+    log.debug("[iterate_yubico_csv] starting to parse an yubico csv file.")
+
+    for line in csv_lines:
         l = line.split(",")
         serial = ""
         key = ""
@@ -130,7 +142,7 @@ def parseYubicoCSV(csv):
                     ttype = "yubikey"
                     otplen = 32 + len(public_id)
                     serial = "UBAM%08d_%s" % (serial_int, slot)
-                    TOKENS[serial] = {
+                    yield serial, {
                         "type": ttype,
                         "hmac_key": key,
                         "otplen": otplen,
@@ -148,7 +160,7 @@ def parseYubicoCSV(csv):
                         otplen = int(l[11])
 
                     serial = "UBOM%08d_%s" % (serial_int, slot)
-                    TOKENS[serial] = {
+                    yield serial, {
                         "type": ttype,
                         "hmac_key": key,
                         "otplen": otplen,
@@ -156,7 +168,7 @@ def parseYubicoCSV(csv):
                     }
                 else:
                     log.warning(
-                        "[parseYubicoCSV] at the moment we do only"
+                        "[iterate_yubico_csv] at the moment we do only"
                         " support Yubico OTP and HOTP: %r",
                         line,
                     )
@@ -180,7 +192,7 @@ def parseYubicoCSV(csv):
                     key = create_static_password(key)
                     otplen = len(key)
                     log.warning(
-                        "[parseYubcoCSV] We can not enroll a static mode, since we do not know"
+                        "[iterate_yubico_csv] We can not enroll a static mode, since we do not know"
                         " the private identify and so we do not know the static password."
                     )
                     continue
@@ -190,7 +202,7 @@ def parseYubicoCSV(csv):
                     serial = "UBAM%s_%s" % (serial, slot)
                     public_id = l[1].strip()
                     otplen = 32 + len(public_id)
-                TOKENS[serial] = {
+                yield serial, {
                     "type": typ,
                     "hmac_key": key,
                     "otplen": otplen,
@@ -198,11 +210,7 @@ def parseYubicoCSV(csv):
                 }
         else:
             log.warning(
-                "[parseYubicoCSV] the line %r did not contain a enough values",
+                "[iterate_yubico_csv] the line %r did not contain a enough values",
                 line,
             )
             continue
-
-    log.debug("[parseOATHcsv] read the following values: %r", TOKENS)
-
-    return TOKENS
@@ -37,20 +37,35 @@ uses a public/private key for signing the log entries
 """
 
 import datetime
+import functools
 import logging
 from binascii import unhexlify
 
-from sqlalchemy import Column, and_, asc, desc, or_, schema, types
+from sqlalchemy import (
+    Column,
+    Index,
+    and_,
+    asc,
+    desc,
+    or_,
+    schema,
+    select,
+    types,
+)
 from sqlalchemy.orm import validates
 
 from flask import current_app
 
+from linotp.lib import metrics
 from linotp.lib.audit.base import AuditBase
 from linotp.lib.crypto.rsa import RSA_Signature
 from linotp.model import db, implicit_returning
 
 log = logging.getLogger(__name__)
 
+# the number of audit entry signature checks, which are cached per process
+SIGNATURE_CACHE_SIZE = 10000
+
 
 def now() -> str:
     """
@@ -62,6 +77,39 @@ def now() -> str:
     )
 
 
+def utc_now() -> datetime.datetime:
+    """
+    Returns the naive UTC datetime to fit in the AuditTable.timestamp_utc
+    column
+    """
+    return datetime.datetime.utcnow()
+
+
+def parse_utc_time(value: str) -> datetime.datetime:
+    """
+    Parse an ISO datetime search parameter into a naive UTC datetime
+
+    datetimes without timezone are taken as UTC
+
+    :param value: the ISO datetime representation like 2023-01-31T12:00:00Z
+    :return: the naive UTC datetime
+    """
+
+    value = value.strip()
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+
+    try:
+        time = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("Invalid datetime %r - ISO format expected" % value)
+
+    if time.tzinfo is not None:
+        time = time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    return time
+
+
 ######################## MODEL ################################################
 
 
@@ -69,9 +117,15 @@ class AuditTable(db.Model):
     # query against the "auditdb" database session
     __bind_key__ = "auditdb"
 
-    __table_args__ = {
-        "implicit_returning": implicit_returning,
-    }
+    # the composite index supports the time range searches ordered by
+    # time and id
+
+    __table_args__ = (
+        Index("ix_audit_timestamp_utc_id", "timestamp_utc", "id"),
+        {
+            "implicit_returning": implicit_returning,
+        },
+    )
 
     __tablename__ = "audit"
     id = Column(
@@ -80,6 +134,9 @@ class AuditTable(db.Model):
         primary_key=True,
     )
     timestamp = Column(types.Unicode(30), default=now, index=True)
+    # the typed timestamp for the time range searches - the signed
+    # timestamp column is kept as it is part of the entry signature
+    timestamp_utc = Column(types.DateTime, default=utc_now)
     signature = Column(types.Unicode(512), default="")
     action = Column(types.Unicode(30), index=True)
     success = Column(types.Unicode(30), default="0")
@@ -177,6 +234,14 @@ class Audit(AuditBase):
             )
             raise exx
 
+        # the verification results are cached per process: the key is the
+        # signed content, which contains the entry id, and the signature, so
+        # that a modified entry is never taken from the cache
+
+        self._check_signature = functools.lru_cache(
+            maxsize=SIGNATURE_CACHE_SIZE
+        )(self._check_signature)
+
     def _attr_to_dict(self, audit_line):
         line = {}
         line["number"] = audit_line.id
@@ -223,8 +288,15 @@ class Audit(AuditBase):
 
         s_audit = getAsBytes(auditline)
 
+        return self._check_signature(s_audit, signature)
+
+    def _check_signature(self, s_audit, signature):
+        """
+        Verify the signature of the serialized audit line
+        """
         return self.rsa.verify(s_audit, unhexlify(signature))
 
+    @metrics.stage("audit")
     def log(self, param):
         """
         This method is used to log the data. It splits information of
@@ -258,7 +330,14 @@ class Audit(AuditBase):
         It should hash the data and do a hash chain and sign the data
         """
 
+        log_time = datetime.datetime.now(datetime.timezone.utc)
+        log_time = log_time.replace(
+            microsecond=log_time.microsecond // 1000 * 1000
+        )
+
         at = AuditTable(
+            timestamp=log_time.isoformat(timespec="milliseconds"),
+            timestamp_utc=log_time.replace(tzinfo=None),
             serial=param.get("serial"),
             action=param.get("action").lstrip("/"),
             success="1" if param.get("success") else "0",
@@ -300,6 +379,7 @@ class Audit(AuditBase):
         create the sqlalchemy condition from the params
         """
         conditions = []
+        time_range = []
         boolCheck = and_
         if not AND:
             boolCheck = or_
@@ -318,6 +398,14 @@ class Audit(AuditBase):
                     conditions.append(AuditTable.action_detail.like(v))
                 elif "date" == k:
                     conditions.append(AuditTable.timestamp.like(v))
+                elif "from" == k:
+                    time_range.append(
+                        AuditTable.timestamp_utc >= parse_utc_time(v)
+                    )
+                elif "to" == k:
+                    time_range.append(
+                        AuditTable.timestamp_utc < parse_utc_time(v)
+                    )
                 elif "number" == k:
                     conditions.append(AuditTable.id.like(v))
                 elif "success" == k:
@@ -341,13 +429,22 @@ class Audit(AuditBase):
         if conditions:
             all_conditions = boolCheck(*conditions)
 
+        # the time range always restricts the search
+
+        if time_range:
+            if all_conditions is not None:
+                time_range.append(all_conditions)
+            all_conditions = and_(*time_range)
+
         return all_conditions
 
-    def row2dict(self, audit_line):
+    def row2dict(self, audit_line, verify=True):
         """
         convert an SQL audit db to a audit dict
 
         :param audit_line: audit db row
+        :param verify: check the signature of the audit entry - if not, the
+                       sig_check is left empty
         :return: audit entry dict
         """
 
@@ -359,7 +456,10 @@ class Audit(AuditBase):
                 line[key] = ""
 
         # Signature check
-        # TODO: use instead the verify_init
+
+        if not verify:
+            line["sig_check"] = ""
+            return line
 
         res = self._verify(line, audit_line.signature)
         if res == 1:
@@ -369,16 +469,22 @@ class Audit(AuditBase):
 
         return line
 
-    def row2dictApiV2(self, audit_line):
+    def row2dictApiV2(self, audit_line, verify=True):
         """
         convert an SQL audit db to a audit dict for /api/v2/auditlog
 
         :param audit_line: audit db row
+        :param verify: check the signature of the audit entry - if not, the
+                       signatureCheck is None
         :return: audit entry dict
         """
 
         line = self._attr_to_dict(audit_line)
 
+        signature_check = None
+        if verify:
+            signature_check = self._verify(line, audit_line.signature)
+
         audit_dict = {
             "id": line["id"],
             "timestamp": line.get("timestamp"),
@@ -395,7 +501,7 @@ class Audit(AuditBase):
             "client": line.get("client"),
             "logLevel": line.get("log_level"),
             "clearanceLevel": line.get("clearance_level"),
-            "signatureCheck": self._verify(line, audit_line.signature),
+            "signatureCheck": signature_check,
         }
 
         # Map empty string to None
@@ -444,7 +550,7 @@ class Audit(AuditBase):
             elif "realm" == sortn:
                 order = AuditTable.realm
             elif "date" == sortn:
-                order = AuditTable.timestamp
+                order = AuditTable.timestamp_utc
             elif "administrator" == sortn:
                 order = AuditTable.administrator
             elif "success" == sortn:
@@ -462,27 +568,40 @@ class Audit(AuditBase):
             elif "clearance_level" == sortn:
                 order = AuditTable.clearance_level
 
-        # build the ordering
-        order_dir = asc(order)
+        # build the ordering - the id makes the order unique
 
+        order_by = asc
         if rp_dict.get("sortorder"):
             sorto = rp_dict.get("sortorder").lower()
             if "desc" == sorto:
-                order_dir = desc(order)
+                order_by = desc
+
+        audit_q = db.session.query(AuditTable)
+
+        if condition is not None:
+            audit_q = audit_q.filter(condition)
 
-        if condition is None:
-            audit_q = db.session.query(AuditTable).order_by(order_dir)
+        if order is AuditTable.id:
+            audit_q = audit_q.order_by(order_by(AuditTable.id))
         else:
-            audit_q = (
-                db.session.query(AuditTable)
-                .filter(condition)
-                .order_by(order_dir)
+            audit_q = audit_q.order_by(
+                order_by(order), order_by(AuditTable.id)
             )
 
-        # FIXME? BUT THIS IS SO MUCH SLOWER!
-        # FIXME: Here desc() ordering also does not work! :/
+        # keyset pagination: continue after the entry with the given id
+        # instead of skipping the entries of the previous pages
 
-        if "rp" in rp_dict or "page" in rp_dict:
+        after = rp_dict.get("after")
+
+        if after is not None:
+            audit_q = audit_q.filter(
+                self._keyset_condition(order, order_by, int(after))
+            )
+
+            if "rp" in rp_dict:
+                audit_q = audit_q.limit(int(rp_dict.get("rp")))
+
+        elif "rp" in rp_dict or "page" in rp_dict:
             # build the LIMIT and OFFSET
             page = 1
             offset = 0
@@ -505,6 +624,52 @@ class Audit(AuditBase):
         result = db.session.execute(audit_q.statement)
         return result
 
+    @staticmethod
+    def _keyset_condition(order, order_by, after):
+        """
+        build the condition for the entries following the entry with the
+        id 'after' in the search order
+
+        :param order: the column to sort by
+        :param order_by: the asc or desc sort direction
+        :param after: the id of the last entry of the previous page
+        :return: the sqlalchemy condition
+        """
+
+        if order is AuditTable.id:
+            if order_by is desc:
+                return AuditTable.id < after
+            return AuditTable.id > after
+
+        if order is not AuditTable.timestamp_utc:
+            raise ValueError(
+                "Continuing a search is only supported when sorting by "
+                "number or date"
+            )
+
+        after_time = (
+            select([AuditTable.timestamp_utc])
+            .where(AuditTable.id == after)
+            .as_scalar()
+        )
+
+        if order_by is desc:
+            return or_(
+                AuditTable.timestamp_utc < after_time,
+                and_(
+                    AuditTable.timestamp_utc == after_time,
+                    AuditTable.id < after,
+                ),
+            )
+
+        return or_(
+            AuditTable.timestamp_utc > after_time,
+            and_(
+                AuditTable.timestamp_utc == after_time,
+                AuditTable.id > after,
+            ),
+        )
+
     def getTotal(self, param, AND=True, display_error=True):
         """
         This method returns the total number of audit entries in
@@ -28,11 +28,53 @@
 
 import json
 import logging
+import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from math import ceil
 
+from flask import current_app
+
 log = logging.getLogger(__name__)
 
+# the signature verification modes of the audit search:
+# none - the signatures are not verified
+# page - only the signatures of paged results are verified
+# all - the signatures of all entries are verified
+VERIFY_MODES = ["none", "page", "all"]
+
+# the number of rows, which are verified concurrently by the workers
+VERIFY_BATCH_SIZE = 1000
+
+_verify_executor = None
+_verify_executor_pid = None
+_verify_executor_lock = threading.Lock()
+
+
+def _get_verify_executor():
+    """
+    get the process wide thread pool for the audit signature verification
+
+    :return: the executor or None if the concurrent verification is disabled
+    """
+    global _verify_executor, _verify_executor_pid
+
+    max_workers = current_app.config["AUDIT_VERIFY_WORKERS"]
+    if max_workers < 2:
+        return None
+
+    with _verify_executor_lock:
+        # the worker threads do not survive a fork of the server process
+        if _verify_executor is None or _verify_executor_pid != os.getpid():
+            _verify_executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="audit_verify"
+            )
+            _verify_executor_pid = os.getpid()
+
+        return _verify_executor
+
 
 class AuditQuery(object):
     """build the the audit query and return result iterator"""
@@ -43,6 +85,7 @@ class AuditQuery(object):
         self._columns = None
         self._search_dict = {}
         self._rp_dict = {}
+        self._total = None
 
         self.audit_obj = audit_obj
 
@@ -91,6 +134,12 @@ class AuditQuery(object):
             for key, value in list(param.items()):
                 self._search_dict[key] = value
 
+        # the time range is supported for all kind of queries
+
+        for key in ["from", "to"]:
+            if param.get(key):
+                self._search_dict[key] = param[key]
+
         if "page" in param:
             try:
                 self.page = int(param.get("page", "1") or "1")
@@ -110,6 +159,26 @@ class AuditQuery(object):
                 rp = 15
             self._rp_dict["rp"] = "%d" % rp
 
+        # keyset pagination: the page starts after the entry with this id
+
+        if param.get("after"):
+            try:
+                self._rp_dict["after"] = int(param["after"])
+            except ValueError:
+                raise ValueError("Invalid parameter after %r" % param["after"])
+
+        # the total number of entries is counted unless disabled, as it
+        # requires an additional count query on the whole search result
+
+        self.count_total = param.get("total", "true").lower() != "false"
+
+        # the signature verification could be restricted to paged results
+        # or switched off, as it dominates the cost of large exports
+
+        self.verify = (param.get("verify") or "all").lower()
+        if self.verify not in VERIFY_MODES:
+            raise ValueError("Invalid parameter verify %r" % param["verify"])
+
         self._rp_dict["sortname"] = param.get("sortname")
 
         # verify sort order: could be one of ['asc', 'desc']
@@ -139,11 +208,76 @@ class AuditQuery(object):
         )
         return self.audit_search
 
+    def verify_signatures(self):
+        """
+        check if the signatures of the query result are verified
+
+        :return: boolean
+        """
+        if self.verify == "none":
+            return False
+
+        if self.verify == "page":
+            return "rp" in self._rp_dict
+
+        return True
+
+    def get_entries(self):
+        """
+        run the query and iterate over the entries of the query result
+
+        the signatures of the rows are verified in batches by the worker
+        threads, so that the verification of large results is not limited
+        to one cpu - the order of the entries is preserved
+
+        :return: iterator of the entries
+        """
+        result = self.get_query_result()
+        verify = self.verify_signatures()
+
+        executor = _get_verify_executor() if verify else None
+
+        if executor is None:
+            return (self.get_entry(row) for row in result)
+
+        workers = current_app.config["AUDIT_VERIFY_WORKERS"]
+        return self._verified_entries(result, executor, workers)
+
+    def _verified_entries(self, result, executor, workers):
+        """
+        iterate over the result in batches, which are verified concurrently
+        """
+        rows_iter = iter(result)
+
+        while True:
+            rows = list(islice(rows_iter, VERIFY_BATCH_SIZE))
+            if not rows:
+                break
+
+            size = ceil(len(rows) / workers)
+            slices = [rows[i : i + size] for i in range(0, len(rows), size)]
+
+            for lines in executor.map(self._rows2dict, slices):
+                for line in lines:
+                    yield self.get_entry(line)
+
+    def _rows2dict(self, rows):
+        """
+        convert and verify a slice of rows - run by the worker threads
+        """
+        return [
+            row if isinstance(row, dict) else self.audit_obj.row2dict(row)
+            for row in rows
+        ]
+
     def get_entry(self, row):
         entry = {}
         if not isinstance(row, dict):
             # convert table data to dict!
-            row = self.audit_obj.row2dict(row)
+            if self.verify_signatures():
+                row = self.audit_obj.row2dict(row)
+            else:
+                row = self.audit_obj.row2dict(row, verify=False)
         if "number" in row:
             cell = []
             for col in self._columns:
@@ -165,16 +299,26 @@ class AuditQuery(object):
         return entry
 
     def get_total(self):
-        return self.audit_obj.getTotal(self._search_dict)
+        if not self.count_total:
+            return None
+
+        # the total is counted only once per query
+        if self._total is None:
+            self._total = self.audit_obj.getTotal(self._search_dict)
+
+        return self._total
 
     def get_total_pages(self):
         records_per_page = self._rp_dict.get("rp")
         if not records_per_page:
             return 1
         else:
+            total = self.get_total()
+            if total is None:
+                return None
             if int(records_per_page) < 1:
-                return self.get_total()
-            return ceil(self.get_total() / int(records_per_page))
+                return total
+            return ceil(total / int(records_per_page))
 
 
 class JSONAuditIterator(object):
@@ -187,7 +331,7 @@ class JSONAuditIterator(object):
         create the iterator from the AuditQuery object
         """
         self.audit_query = audit_query
-        self.result = iter(audit_query.get_query_result())
+        self.entries = audit_query.get_entries()
         self.page = audit_query.get_page()
         self.i = 0
         self.closed = False
@@ -207,15 +351,14 @@ class JSONAuditIterator(object):
             self.i = self.i + 1
 
         try:
-            row_data = next(self.result)
-            entry = self.audit_query.get_entry(row_data)
+            entry = next(self.entries)
             res = "%s %s" % (res, json.dumps(entry, indent=3))
 
         except StopIteration as exx:
             if self.closed is False:
-                res = '%s ], "total": %d }' % (
+                res = '%s ], "total": %s }' % (
                     prefix,
-                    self.audit_query.get_total(),
+                    json.dumps(self.audit_query.get_total()),
                 )
                 self.closed = True
             else:
@@ -237,7 +380,7 @@ class CSVAuditIterator(object):
         create the iterator from the AuditQuery object
         """
         self.audit_query = audit_query
-        self.result = iter(audit_query.get_query_result())
+        self.entries = audit_query.get_entries()
         self.page = audit_query.get_page()
 
         self.i = 0
@@ -260,8 +403,7 @@ class CSVAuditIterator(object):
                 )
                 res = headers
 
-            row_data = next(self.result)
-            entry = self.audit_query.get_entry(row_data)
+            entry = next(self.entries)
 
             raw_row = entry.get("cell", [])
 
@@ -0,0 +1,615 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+time based partitioning of the audit table
+
+on PostgreSQL and MySQL/MariaDB the audit table could be partitioned by
+the timestamp_utc column into daily or monthly partitions:
+
+- the retention of the audit entries is done by dropping whole partitions
+  instead of deleting the rows one by one, which causes lock contention
+  with the audit inserts and replication lag on large tables
+
+- the searches with a time range only read the matching partitions, as
+  the database prunes the partitions by the timestamp_utc condition
+
+the partitions are created ahead of time by the rotation, while a catch
+all partition takes the entries, for which no partition exists. these
+entries are moved into their partition, once it is created, and the
+expired ones are deleted in batches by the rotation.
+"""
+
+import datetime
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from linotp.lib.audit.SQLAudit import AuditTable
+
+log = logging.getLogger(__name__)
+
+PARTITION_MODES = ["OFF", "DAILY", "MONTHLY"]
+
+# the number of partitions, which are created ahead of time
+PARTITIONS_AHEAD = {"DAILY": 7, "MONTHLY": 2}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class AuditPartitionError(Exception):
+    pass
+
+
+def period_start(time: datetime.datetime, mode: str) -> datetime.datetime:
+    """
+    get the start of the partition period, which contains the time
+
+    :param time: naive UTC datetime
+    :param mode: DAILY or MONTHLY
+    :return: the naive UTC datetime of the period start
+    """
+    start = time.replace(hour=0, minute=0, second=0, microsecond=0)
+    if mode == "MONTHLY":
+        start = start.replace(day=1)
+    return start
+
+
+def next_period(start: datetime.datetime, mode: str) -> datetime.datetime:
+    """
+    get the start of the following partition period
+
+    :param start: the start of the period
+    :param mode: DAILY or MONTHLY
+    :return: the naive UTC datetime of the next period start
+    """
+    if mode == "MONTHLY":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+
+    return start + datetime.timedelta(days=1)
+
+
+def partition_name(start: datetime.datetime, mode: str) -> str:
+    """
+    the partition name is derived from the period start, e.g. audit_p20231031
+    for daily and audit_p202310 for monthly partitions
+    """
+    if mode == "MONTHLY":
+        return "%s_p%s" % (AuditTable.__tablename__, start.strftime("%Y%m"))
+    return "%s_p%s" % (AuditTable.__tablename__, start.strftime("%Y%m%d"))
+
+
+def partition_periods(
+    now: datetime.datetime, mode: str, ahead: int
+) -> List[Tuple[str, datetime.datetime, datetime.datetime]]:
+    """
+    get the periods of the current and the next partitions
+
+    :param now: the current naive UTC datetime
+    :param mode: DAILY or MONTHLY
+    :param ahead: the number of partitions following the current one
+    :return: list of tuples with partition name, start and end
+    """
+    periods = []
+
+    start = period_start(now, mode)
+    for _i in range(ahead + 1):
+        end = next_period(start, mode)
+        periods.append((partition_name(start, mode), start, end))
+        start = end
+
+    return periods
+
+
+def parse_upper_bound(bound: str) -> Optional[datetime.datetime]:
+    """
+    get the upper bound of a partition from the partition description
+
+    :param bound: the partition description of the database, e.g.
+                  FOR VALUES FROM ('2023-10-31 00:00:00') TO (...) or
+                  '2023-11-01 00:00:00'
+    :return: naive UTC datetime or None for partitions without upper bound
+    """
+    times = re.findall(r"'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})", bound or "")
+    if not times or "MAXVALUE" in bound.split("TO")[-1].upper():
+        return None
+
+    return datetime.datetime.strptime(times[-1], TIME_FORMAT)
+
+
+class AuditPartitioner:
+    """
+    manage the partitions of the audit table
+    """
+
+    # the partition for the rows, which are not covered by a period
+    # partition - e.g. when the rotation has not been run in time
+    catch_all = "%s_pmax" % AuditTable.__tablename__
+
+    # the former unpartitioned audit table becomes the first partition
+    legacy = "%s_plegacy" % AuditTable.__tablename__
+
+    def __init__(self, engine, mode: str):
+        self.engine = engine
+        self.mode = mode
+        self.table = AuditTable.__tablename__
+
+    def is_partitioned(self, conn) -> bool:
+        raise NotImplementedError()
+
+    def list_partitions(self, conn) -> List[Tuple[str, Optional[str]]]:
+        """
+        :return: list of the partition names and their descriptions
+        """
+        raise NotImplementedError()
+
+    def _partition_table(self, conn, periods):
+        raise NotImplementedError()
+
+    def _add_partition(self, conn, name, start, end):
+        raise NotImplementedError()
+
+    def _drop_partition(self, conn, name):
+        raise NotImplementedError()
+
+    def _purge_catch_all(self, conn, before, limit) -> int:
+        """
+        delete the entries older than before from the catch all partition
+
+        :return: the number of deleted entries
+        """
+        raise NotImplementedError()
+
+    def partition_table(self, now: datetime.datetime = None) -> List[str]:
+        """
+        convert the audit table into a partitioned table
+
+        the existing entries are kept in the legacy partition, which is
+        dropped by the rotation once all its entries are expired
+
+        :param now: the current naive UTC datetime
+        :return: the names of the created partitions
+        """
+        now = now or datetime.datetime.utcnow()
+        periods = partition_periods(
+            now, self.mode, PARTITIONS_AHEAD[self.mode]
+        )
+
+        with self.engine.begin() as conn:
+            if self.is_partitioned(conn):
+                raise AuditPartitionError(
+                    "The audit table is already partitioned."
+                )
+
+            # the partition key must not be empty
+            conn.execute(
+                AuditTable.__table__.update()
+                .where(AuditTable.timestamp_utc.is_(None))
+                .values(timestamp_utc=datetime.datetime(1970, 1, 1))
+            )
+
+            self._partition_table(conn, periods)
+
+        return [self.legacy] + [name for name, _start, _end in periods]
+
+    def add_partitions(self, now: datetime.datetime = None) -> List[str]:
+        """
+        create the partitions for the current and the next periods
+
+        :param now: the current naive UTC datetime
+        :return: the names of the created partitions
+        """
+        now = now or datetime.datetime.utcnow()
+        periods = partition_periods(
+            now, self.mode, PARTITIONS_AHEAD[self.mode]
+        )
+
+        created = []
+
+        with self.engine.begin() as conn:
+            if not self.is_partitioned(conn):
+                raise AuditPartitionError(
+                    "The audit table is not partitioned."
+                )
+
+            partitions = dict(self.list_partitions(conn))
+
+            # the legacy partition covers all entries up to its upper bound
+
+            covered = parse_upper_bound(partitions.get(self.legacy))
+
+            for name, start, end in periods:
+                if name in partitions or (covered and end <= covered):
+                    continue
+
+                self._add_partition(conn, name, start, end)
+                created.append(name)
+
+        return created
+
+    def expired_before(
+        self, before: datetime.datetime
+    ) -> Optional[datetime.datetime]:
+        """
+        get the end of the last partition, which only contains entries
+        older than before
+
+        :param before: naive UTC datetime
+        :return: the naive UTC datetime or None if no partition is expired
+        """
+        expired = None
+
+        with self.engine.connect() as conn:
+            for name, bound in self.list_partitions(conn):
+                upper = parse_upper_bound(bound)
+                if name == self.catch_all or upper is None or upper > before:
+                    continue
+
+                if expired is None or upper > expired:
+                    expired = upper
+
+        return expired
+
+    def drop_partitions(
+        self, before: datetime.datetime, batch_size: int = 10000
+    ) -> List[str]:
+        """
+        drop the partitions, which only contain entries older than before
+
+        the catch all partition is never dropped - its expired entries are
+        deleted in batches instead
+
+        :param before: naive UTC datetime
+        :param batch_size: the number of catch all entries deleted per
+                           transaction
+        :return: the names of the dropped partitions
+        """
+        dropped = []
+
+        with self.engine.begin() as conn:
+            if not self.is_partitioned(conn):
+                raise AuditPartitionError(
+                    "The audit table is not partitioned."
+                )
+
+            for name, bound in self.list_partitions(conn):
+                if name == self.catch_all:
+                    continue
+
+                upper = parse_upper_bound(bound)
+                if upper is None or upper > before:
+                    continue
+
+                self._drop_partition(conn, name)
+                dropped.append(name)
+
+        # each batch is committed on its own to keep the locks on the
+        # catch all partition short
+
+        while True:
+            with self.engine.begin() as conn:
+                deleted = self._purge_catch_all(conn, before, batch_size)
+
+            if deleted < batch_size:
+                break
+
+        return dropped
+
+
+class PostgreSQLPartitioner(AuditPartitioner):
+    """
+    native declarative range partitions of PostgreSQL 11 or newer
+    """
+
+    def is_partitioned(self, conn) -> bool:
+        return bool(
+            conn.execute(
+                text(
+                    "SELECT 1 FROM pg_partitioned_table p "
+                    "JOIN pg_class c ON c.oid = p.partrelid "
+                    "WHERE c.relname = :table "
+                    "AND pg_table_is_visible(c.oid)"
+                ),
+                table=self.table,
+            ).scalar()
+        )
+
+    def list_partitions(self, conn):
+        return [
+            (name, bound)
+            for name, bound in conn.execute(
+                text(
+                    "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                    "FROM pg_inherits i JOIN pg_class c "
+                    "ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = CAST(:table AS regclass)"
+                ),
+                table=self.table,
+            )
+        ]
+
+    def _partition_table(self, conn, periods):
+        table = self.table
+        legacy = self.legacy
+        _name, first_start, _end = periods[0]
+
+        sequence = conn.execute(
+            text("SELECT pg_get_serial_sequence(:table, 'id')"), table=table
+        ).scalar()
+
+        # the former table is attached as partition without copying the rows
+
+        conn.execute(text('ALTER TABLE "%s" RENAME TO "%s"' % (table, legacy)))
+        conn.execute(
+            text(
+                'ALTER TABLE "%s" ALTER COLUMN timestamp_utc SET NOT NULL'
+                % legacy
+            )
+        )
+        conn.execute(
+            text(
+                'CREATE TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS) '
+                "PARTITION BY RANGE (timestamp_utc)" % (table, legacy)
+            )
+        )
+
+        # the unique keys of a partitioned table must contain the
+        # partition key - the indexes of the legacy table are reused for
+        # the partitioned indexes, as they match in their definition
+
+        conn.execute(
+            text(
+                'ALTER TABLE "%s" ADD CONSTRAINT "%s_partitioned_pkey" '
+                "PRIMARY KEY (id, timestamp_utc)" % (table, table)
+            )
+        )
+
+        for index in AuditTable.__table__.indexes:
+            columns = ", ".join(column.name for column in index.columns)
+            conn.execute(text('CREATE INDEX ON "%s" (%s)' % (table, columns)))
+
+        # the id sequence must survive the drop of the legacy partition
+
+        if sequence:
+            conn.execute(
+                text('ALTER SEQUENCE %s OWNED BY "%s".id' % (sequence, table))
+            )
+
+        conn.execute(
+            text(
+                'ALTER TABLE "%s" ATTACH PARTITION "%s" '
+                "FOR VALUES FROM (MINVALUE) TO ('%s')"
+                % (table, legacy, first_start.strftime(TIME_FORMAT))
+            )
+        )
+
+        for name, start, end in periods:
+            self._create_partition(conn, name, start, end)
+
+        conn.execute(
+            text(
+                'CREATE TABLE "%s" PARTITION OF "%s" DEFAULT'
+                % (self.catch_all, table)
+            )
+        )
+
+    def _add_partition(self, conn, name, start, end):
+        period = {"start": start, "end": end}
+        in_period = "timestamp_utc >= :start AND timestamp_utc < :end"
+
+        # if the rotation has not been run in time, the entries of the
+        # period are already in the default partition and PostgreSQL
+        # refuses to create the partition - so the default partition is
+        # detached until the entries are moved into the new partition
+
+        misplaced = conn.execute(
+            text(
+                'SELECT 1 FROM "%s" WHERE %s LIMIT 1'
+                % (self.catch_all, in_period)
+            ),
+            **period,
+        ).scalar()
+
+        if not misplaced:
+            self._create_partition(conn, name, start, end)
+            return
+
+        conn.execute(
+            text(
+                'ALTER TABLE "%s" DETACH PARTITION "%s"'
+                % (self.table, self.catch_all)
+            )
+        )
+
+        self._create_partition(conn, name, start, end)
+
+        conn.execute(
+            text(
+                'INSERT INTO "%s" SELECT * FROM "%s" WHERE %s'
+                % (name, self.catch_all, in_period)
+            ),
+            **period,
+        )
+        conn.execute(
+            text('DELETE FROM "%s" WHERE %s' % (self.catch_all, in_period)),
+            **period,
+        )
+
+        conn.execute(
+            text(
+                'ALTER TABLE "%s" ATTACH PARTITION "%s" DEFAULT'
+                % (self.table, self.catch_all)
+            )
+        )
+
+    def _create_partition(self, conn, name, start, end):
+        conn.execute(
+            text(
+                'CREATE TABLE "%s" PARTITION OF "%s" '
+                "FOR VALUES FROM ('%s') TO ('%s')"
+                % (
+                    name,
+                    self.table,
+                    start.strftime(TIME_FORMAT),
+                    end.strftime(TIME_FORMAT),
+                )
+            )
+        )
+
+    def _drop_partition(self, conn, name):
+        conn.execute(text('DROP TABLE "%s"' % name))
+
+    def _purge_catch_all(self, conn, before, limit):
+        return conn.execute(
+            text(
+                'DELETE FROM "%s" WHERE ctid IN ('
+                'SELECT ctid FROM "%s" WHERE timestamp_utc < :before '
+                "LIMIT :limit)" % (self.catch_all, self.catch_all)
+            ),
+            before=before,
+            limit=limit,
+        ).rowcount
+
+
+class MySQLPartitioner(AuditPartitioner):
+    """
+    native range columns partitions of MySQL and MariaDB
+    """
+
+    def is_partitioned(self, conn) -> bool:
+        return bool(self.list_partitions(conn))
+
+    def list_partitions(self, conn):
+        return [
+            (name, bound)
+            for name, bound in conn.execute(
+                text(
+                    "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+                    "FROM information_schema.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() "
+                    "AND TABLE_NAME = :table "
+                    "AND PARTITION_NAME IS NOT NULL"
+                ),
+                table=self.table,
+            )
+        ]
+
+    def _partition_table(self, conn, periods):
+        _name, first_start, _end = periods[0]
+
+        partitions = [
+            "PARTITION %s VALUES LESS THAN ('%s')"
+            % (self.legacy, first_start.strftime(TIME_FORMAT))
+        ]
+        partitions.extend(
+            "PARTITION %s VALUES LESS THAN ('%s')"
+            % (name, end.strftime(TIME_FORMAT))
+            for name, _start, end in periods
+        )
+        partitions.append(
+            "PARTITION %s VALUES LESS THAN (MAXVALUE)" % self.catch_all
+        )
+
+        # the table is rebuilt once, as the primary key must contain the
+        # partition key
+
+        conn.execute(
+            text(
+                "ALTER TABLE %s "
+                "MODIFY timestamp_utc DATETIME NOT NULL, "
+                "DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp_utc) "
+                "PARTITION BY RANGE COLUMNS (timestamp_utc) (%s)"
+                % (self.table, ", ".join(partitions))
+            )
+        )
+
+    def _add_partition(self, conn, name, start, end):
+        # the new partition is split from the catch all partition, which
+        # is empty as long as the partitions are created in time
+        conn.execute(
+            text(
+                "ALTER TABLE %s REORGANIZE PARTITION %s INTO ("
+                "PARTITION %s VALUES LESS THAN ('%s'), "
+                "PARTITION %s VALUES LESS THAN (MAXVALUE))"
+                % (
+                    self.table,
+                    self.catch_all,
+                    name,
+                    end.strftime(TIME_FORMAT),
+                    self.catch_all,
+                )
+            )
+        )
+
+    def _drop_partition(self, conn, name):
+        conn.execute(
+            text("ALTER TABLE %s DROP PARTITION %s" % (self.table, name))
+        )
+
+    def _purge_catch_all(self, conn, before, limit):
+        return conn.execute(
+            text(
+                "DELETE FROM %s PARTITION (%s) "
+                "WHERE timestamp_utc < :before LIMIT %d"
+                % (self.table, self.catch_all, limit)
+            ),
+            before=before,
+        ).rowcount
+
+
+def get_partitioner(engine, mode: str) -> Optional[AuditPartitioner]:
+    """
+    get the partition management for the audit database
+
+    :param engine: the engine of the audit database
+    :param mode: the AUDIT_PARTITIONING mode
+    :return: the partitioner or None if the partitioning is turned off
+    """
+    if mode == "OFF":
+        return None
+
+    if mode not in PARTITION_MODES:
+        raise AuditPartitionError("Unknown partitioning mode %r" % mode)
+
+    dialect = engine.dialect.name
+
+    if dialect == "postgresql":
+        return PostgreSQLPartitioner(engine, mode)
+
+    if dialect == "mysql":
+        return MySQLPartitioner(engine, mode)
+
+    raise AuditPartitionError(
+        "The audit table partitioning is not supported for %s databases."
+        % dialect
+    )
+
+
+# eof
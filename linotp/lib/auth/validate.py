@@ -35,7 +35,9 @@ from hashlib import sha256
 from flask import g
 
 from linotp.flap import config as env
+from linotp.lib import metrics
 from linotp.lib.auth.finishtokens import FinishTokens
+from linotp.lib.challenge_notification import ChallengeWaiter
 from linotp.lib.challenges import Challenges
 from linotp.lib.context import request_context as context
 from linotp.lib.error import ParameterError
@@ -61,6 +63,7 @@ from linotp.lib.token import (
 )
 from linotp.lib.user import User, getUserId, getUserInfo
 from linotp.lib.util import modhex_decode
+from linotp.model import db
 from linotp.tokens import tokenclass_registry
 
 log = logging.getLogger(__name__)
@@ -367,6 +370,7 @@ class ValidationHandler(object):
         serial=None,
         password=None,
         use_offline=False,
+        wait=0,
     ):
         """
         check for open transactions - for polling support
@@ -376,6 +380,79 @@ class ValidationHandler(object):
         :param serial: or the serial we are searching for
         :param password: the pin/password for authorization the request
         :param use_offline: on success the offline info is returned
+        :param wait: long polling - the number of seconds to wait for an
+                     update of the still pending transaction
+
+        :return: tuple of success and detail dict
+        """
+
+        status_args = dict(
+            transid=transid,
+            user=user,
+            serial=serial,
+            password=password,
+            use_offline=use_offline,
+        )
+
+        if not wait:
+            return self._lookup_status(**status_args)
+
+        # the waiter is registered before the status is looked up, so that
+        # an update, which is committed in between, is not missed. The
+        # lookup runs in a new database transaction to see all updates,
+        # which were committed before the registration.
+
+        with ChallengeWaiter(transid) as waiter:
+            db.session.commit()
+
+            ok, reply = self._lookup_status(**status_args)
+
+            if not ok or not self._is_pending(reply):
+                return ok, reply
+
+            # release the database transaction while we are waiting, so
+            # that the updated challenges will be visible afterwards
+
+            db.session.commit()
+
+            if not waiter.wait(wait):
+                return ok, reply
+
+        # the challenges of the request are cached, which is outdated now
+
+        context["get_challenges_cache"] = {}
+
+        return self._lookup_status(**status_args)
+
+    @staticmethod
+    def _is_pending(reply):
+        """
+        check if one of the transactions is still waiting for an answer
+
+        :param reply: the check status reply
+        :return: boolean
+        """
+
+        for transaction in reply.get("transactions", {}).values():
+            if (
+                transaction.get("status") == "open"
+                and "accept" not in transaction
+                and "reject" not in transaction
+            ):
+                return True
+
+        return False
+
+    def _lookup_status(
+        self,
+        transid=None,
+        user=None,
+        serial=None,
+        password=None,
+        use_offline=False,
+    ):
+        """
+        lookup the status of the open transactions
 
         :return: tuple of success and detail dict
         """
@@ -385,8 +462,7 @@ class ValidationHandler(object):
         )
 
         # remove all expired challenges
-        if expired:
-            Challenges.delete_challenges(None, expired)
+        Challenges.delete_expired_challenges(expired)
 
         if not challenges:
             return False, None
@@ -690,6 +766,7 @@ class ValidationHandler(object):
 
         return (res, opt)
 
+    @metrics.stage("token_check")
     def checkTokenList(self, tokenList, passw, user=User(), options=None):
         """
         identify a matching token and test, if the token is valid, locked ..
@@ -949,8 +1026,7 @@ class ValidationHandler(object):
             + invalid_tokens
         ):
             expired, _valid = Challenges.get_challenges(token)
-            if expired:
-                Challenges.delete_challenges(None, expired)
+            Challenges.delete_expired_challenges(expired)
 
         log.debug(
             "Number of valid tokens found (validTokenNum): %d",
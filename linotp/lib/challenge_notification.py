@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+notification of challenge updates - for long-polling support
+
+a client, which waits for the confirmation of a push or qr challenge could
+block in `wait_for_challenge_update` until the challenge is updated instead
+of polling repeatedly.
+
+the waiters are woken up by two channels:
+
+- in-process: every waiter registers a threading.Event in the hub, which is
+  set when a challenge of the transaction is committed.
+
+- cross-worker: every waiter creates its own signal file in the DATA_DIR.
+  A worker process, which commits a challenge update, appends to all signal
+  files of the transaction, which is observed by the waiters of the other
+  worker processes. Each waiter only removes its own signal file, so that
+  the waiters of the same transaction do not interfere.
+
+the challenge updates are gathered by sqlalchemy session events, so that the
+waiters are only notified after the changes are committed and visible.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from flask import current_app, has_app_context
+
+from linotp.lib.fs_utils import ensure_dir
+from linotp.model.challange import Challenge
+
+log = logging.getLogger(__name__)
+
+# interval in seconds in which the cross-worker signal is checked
+
+POLL_INTERVAL = 0.2
+
+SESSION_INFO_KEY = "linotp.updated_challenges"
+
+_waiters = {}
+_waiters_lock = threading.Lock()
+
+
+def _parent_transid(transid):
+    """the waiters are registered for the parent transaction"""
+    return transid.partition(".")[0]
+
+
+def _signal_prefix(transid):
+    """
+    get the path prefix of the cross-worker signal files of a transaction
+
+    the transaction id is provided by the request - thus the file name is
+    derived from the hash of the id to prevent any path manipulation
+    """
+
+    signal_dir = ensure_dir(
+        current_app, "challenge signal", "DATA_DIR", "challenge_signals"
+    )
+
+    name = hashlib.sha256(transid.encode("utf-8")).hexdigest()
+    return os.path.join(signal_dir, name)
+
+
+def _signal_files(transid):
+    """get the signal files of all waiters of a transaction"""
+    return glob.glob(_signal_prefix(transid) + ".*")
+
+
+def _signal_size(signal_file):
+    try:
+        return os.stat(signal_file).st_size
+    except FileNotFoundError:
+        return None
+
+
+class ChallengeWaiter:
+    """
+    waiter for the update of the challenges of a transaction
+
+    the waiter is registered when the context is entered - an update, which
+    is committed afterwards, will wake up the waiter, even if it happens
+    before `wait` is called. Thus the status of the transaction could be
+    checked again after the registration without missing an update.
+    """
+
+    def __init__(self, transid):
+        self.transid = _parent_transid(transid)
+        self.event = threading.Event()
+        self.signal_file = None
+
+    def __enter__(self):
+        self.signal_file = "%s.%s" % (
+            _signal_prefix(self.transid),
+            uuid.uuid4().hex,
+        )
+        with open(self.signal_file, "a"):
+            pass
+
+        with _waiters_lock:
+            _waiters.setdefault(self.transid, set()).add(self.event)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with _waiters_lock:
+            waiters = _waiters.get(self.transid, set())
+            waiters.discard(self.event)
+            if not waiters:
+                _waiters.pop(self.transid, None)
+
+        try:
+            os.unlink(self.signal_file)
+        except FileNotFoundError:
+            pass
+
+    def is_updated(self):
+        """
+        :return: boolean - True if the challenges have been updated since
+                 the waiter was registered
+        """
+
+        if self.event.is_set():
+            return True
+
+        size = _signal_size(self.signal_file)
+        return bool(size)
+
+    def wait(self, timeout, poll_interval=POLL_INTERVAL):
+        """
+        block until a challenge of the transaction is updated or the
+        timeout is reached
+
+        :param timeout: the maximum time in seconds to wait
+        :param poll_interval: the interval to check the cross-worker signal
+        :return: boolean - True if the challenge has been updated
+        """
+
+        deadline = time.monotonic() + timeout
+
+        while True:
+            if self.is_updated():
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            self.event.wait(min(poll_interval, remaining))
+
+
+def wait_for_challenge_update(transid, timeout, poll_interval=POLL_INTERVAL):
+    """
+    block until a challenge of the transaction is updated or the timeout
+    is reached
+
+    :param transid: the transaction id
+    :param timeout: the maximum time in seconds to wait
+    :param poll_interval: the interval to check the cross-worker signal
+    :return: boolean - True if the challenge has been updated
+    """
+
+    with ChallengeWaiter(transid) as waiter:
+        return waiter.wait(timeout, poll_interval=poll_interval)
+
+
+def notify_challenge_update(transids):
+    """
+    wake up all waiters of the updated transactions
+
+    :param transids: iterable of transaction ids
+    """
+
+    for transid in set(_parent_transid(transid) for transid in transids):
+        with _waiters_lock:
+            waiters = list(_waiters.get(transid, ()))
+
+        for waiter in waiters:
+            waiter.set()
+
+        if not has_app_context():
+            continue
+
+        # signal the waiters of the other workers - each one has its own
+        # signal file, which might be removed in the meantime
+
+        for signal_file in _signal_files(transid):
+            try:
+                fd = os.open(signal_file, os.O_WRONLY | os.O_APPEND)
+            except FileNotFoundError:
+                continue
+
+            try:
+                os.write(fd, b".")
+            finally:
+                os.close(fd)
+
+
+@event.listens_for(Session, "after_flush")
+def _gather_updated_challenges(session, _flush_context):
+    """gather the transaction ids of all flushed challenges"""
+
+    transids = set(
+        obj.transid
+        for obj in chain(session.new, session.dirty)
+        if isinstance(obj, Challenge)
+    )
+
+    if transids:
+        session.info.setdefault(SESSION_INFO_KEY, set()).update(transids)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_updated_challenges(session):
+    """notify the waiters once the challenge updates are visible"""
+
+    transids = session.info.pop(SESSION_INFO_KEY, None)
+    if not transids:
+        return
+
+    try:
+        notify_challenge_update(transids)
+    except Exception as exx:
+        log.error("Failed to notify challenge update: %r", exx)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_updated_challenges(session):
+    session.info.pop(SESSION_INFO_KEY, None)
@@ -32,7 +32,7 @@ import logging
 
 from sqlalchemy import and_, desc
 
-from flask import g
+from flask import current_app, g
 
 import linotp
 from linotp.lib.cache_utils import cache_in_request
@@ -103,7 +103,7 @@ class Challenges(object):
             conditions += (and_(Challenge.tokenserial == serial),)
 
         if filter_open is True:
-            conditions += (and_(Challenge.session.like('%"status": "open"%')),)
+            conditions += (and_(Challenge.status == "open"),)
 
         challenges = (
             Challenge.query.filter(*conditions)
@@ -205,6 +205,7 @@ class Challenges(object):
                 # challenge data to support the implementation of a blocking
                 # based on the previous stored data
                 challenge_obj.setChallenge(message)
+                challenge_obj.set_validity(token.get_challenge_validity())
                 challenge_obj.save()
 
                 (res, message, data, attributes) = token.createChallenge(
@@ -329,6 +330,25 @@ class Challenges(object):
 
         return res
 
+    @staticmethod
+    def delete_expired_challenges(expired_challenges):
+        """
+        delete the expired challenges found during the validation
+
+        the deletion is skipped if the challenge table is cleaned up by the
+        challenge janitor (`linotp challenge cleanup`) instead.
+
+        :param expired_challenges: list of expired challenges
+        """
+
+        if not expired_challenges:
+            return
+
+        if not current_app.config["CHALLENGE_JANITOR_IN_REQUEST"]:
+            return
+
+        Challenges.delete_challenges(None, expired_challenges)
+
     def _get_challenges_cache_keygen(
         token=None, transid=None, options=None, filter_open=False
     ):
@@ -367,6 +387,11 @@ class Challenges(object):
         expired_challenges = []
         valid_chalenges = []
 
+        # the challenge validity is per token - we look it up only once
+        validities = {}
+        if token:
+            validities[serial] = token.get_challenge_validity()
+
         for challenge in challenges:
             if filter_open and not challenge.is_open():
                 log.info("Skipping non-open challenge: %r", challenge)
@@ -388,8 +413,10 @@ class Challenges(object):
 
             # lookup the validty time of the challenge which is per token
             serial = challenge.tokenserial
-            tokens = linotp.lib.token.get_tokens(serial=serial)
-            validity = tokens[0].get_challenge_validity()
+            if serial not in validities:
+                tokens = linotp.lib.token.get_tokens(serial=serial)
+                validities[serial] = tokens[0].get_challenge_validity()
+            validity = validities[serial]
 
             c_start_time = challenge.get("timestamp")
             c_expire_time = c_start_time + datetime.timedelta(seconds=validity)
@@ -491,8 +518,7 @@ class Challenges(object):
             challenge.save()
 
         # finally delete the expired ones
-        if expired_challenges:
-            Challenges.delete_challenges(None, expired_challenges)
+        Challenges.delete_expired_challenges(expired_challenges)
 
         return
 
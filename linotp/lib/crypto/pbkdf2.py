@@ -25,13 +25,57 @@
 #    Support: www.linotp.de
 #
 """
-inplace replacement for the former used library method
+pbkdf2 key derivation
+
+the key derivation is done by the hashlib.pbkdf2_hmac of the openssl
+backend, which is bit identical to the pure python PBKDF2 implementation
+of linotp.lib.ext.pbkdf2 - the pure python implementation is only used as
+fallback for hash functions, which are not supported by openssl
 """
 
+import hashlib
+import logging
 from hashlib import sha1
 
 from linotp.lib.ext.pbkdf2 import PBKDF2
 
+log = logging.getLogger(__name__)
+
+
+def _to_bytes(value):
+    """encode unicode passwords and salts as the PBKDF2 class does"""
+
+    if isinstance(value, str):
+        return value.encode("utf-8")
+
+    return value
+
 
 def pbkdf2(password, salt, dk_length, iterations=1000, hashfunc=sha1):
+    """
+    derive a key from the password and salt
+
+    :param password: the password - unicode is utf-8 encoded
+    :param salt: the salt - unicode is utf-8 encoded
+    :param dk_length: the length of the derived key in bytes
+    :param iterations: the number of iterations
+    :param hashfunc: the hash function constructor like hashlib.sha256
+
+    :return: the derived key as bytes
+    """
+
+    try:
+        hash_name = hashfunc().name
+
+        return hashlib.pbkdf2_hmac(
+            hash_name,
+            _to_bytes(password),
+            _to_bytes(salt),
+            iterations,
+            dk_length,
+        )
+
+    except (AttributeError, ValueError) as exx:
+        log.debug("Falling back to the pure python pbkdf2: %r", exx)
+
     return PBKDF2(password, salt, iterations, hashfunc).read(dk_length)
@@ -31,6 +31,9 @@ import logging
 from Cryptodome.Hash import SHA256
 from Cryptodome.PublicKey import RSA
 from Cryptodome.Signature.pkcs1_15 import PKCS115_SigScheme
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
 
 log = logging.getLogger(__name__)
 
@@ -64,6 +67,10 @@ class RSA_Signature:
     """
     encapsulate the signature handling
     which allows to switch the cryptographic implementation
+
+    the verification is done with the openssl backend of cryptography,
+    which is considerably faster than the pure python verification and
+    releases the GIL, so that many signatures could be verified in parallel
     """
 
     def __init__(self, private: bytes = None, public: bytes = None):
@@ -83,15 +90,29 @@ class RSA_Signature:
         if private:
             private_key = RSA.import_key(private)
             self.signer = PKCS115_SigScheme(private_key)
-            self.verifier = self.signer
+            self.verifier = self._load_verifier(private_key)
 
         if not self.verifier and public:
             public_key = RSA.import_key(public)
-            self.verifier = PKCS115_SigScheme(public_key)
+            self.verifier = self._load_verifier(public_key)
 
         if not self.verifier:
             raise Exception("At least a public or private key is required!")
 
+    @staticmethod
+    def _load_verifier(key):
+        """
+        load the public key for the verification from the imported key
+
+        the key is exported in der format, so that all the key formats,
+        which are supported by the import, could be used for the verification
+
+        :param key: the imported Cryptodome rsa key
+        :return: the cryptography rsa public key
+        """
+        der_key = key.publickey().export_key(format="DER")
+        return serialization.load_der_public_key(der_key)
+
     def verify(self, message: bytes, signature: bytes) -> bool:
         """
         verify a message signature
@@ -104,13 +125,13 @@ class RSA_Signature:
         if not self.verifier:
             raise Exception("Verifier not initialized!")
 
-        hashed_message = SHA256.new(message)
-
         try:
-            self.verifier.verify(hashed_message, signature)
+            self.verifier.verify(
+                signature, message, padding.PKCS1v15(), hashes.SHA256()
+            )
             return True
 
-        except ValueError as vexx:
+        except InvalidSignature as vexx:
             log.debug("Failed to verify signature: %r", vexx)
             return False
 
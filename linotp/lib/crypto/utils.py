@@ -44,13 +44,13 @@ from pysodium import crypto_sign_keypair as gen_dsa_keypair
 from pysodium import sodium as c_libsodium
 
 from linotp.lib.context import request_context as context
+from linotp.lib.crypto.pbkdf2 import pbkdf2
 from linotp.lib.error import (
     ConfigAdminError,
     HSMException,
     ProgrammingError,
     ValidateError,
 )
-from linotp.lib.ext.pbkdf2 import PBKDF2
 
 PasslibHashes = CryptContext(
     schemes=[
@@ -282,16 +282,14 @@ def kdf2(
 
     passphrase = "" + sharedsecret + activ + nonce[:-salt_len]
 
-    keyStream = PBKDF2(
+    return pbkdf2(
         binascii.unhexlify(passphrase.encode("utf-8")),
         bSalt,
+        len,
         iterations=iterations,
-        digestmodule=digestmodule,
+        hashfunc=digestmodule,
     )
 
-    key = keyStream.read(len)
-    return key
-
 
 def hash_digest(val: bytes, seed: bytes, algo=None, hsm=None):
     """
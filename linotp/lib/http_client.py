@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+pooled http client for requests to remote LinOTP servers
+
+an httplib2.Http object keeps the connections it has opened and re-uses
+them for subsequent requests to the same host (HTTP/1.1 keep-alive). As the
+Http objects are not thread safe, the pool holds one client per thread and
+per (timeout, ssl verification) setting, so that the forwarding of requests
+does not pay the tcp and tls handshake on every call.
+"""
+
+import logging
+import threading
+
+import httplib2
+
+from linotp.lib.type_utils import get_timeout
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 5.0
+
+_pool = threading.local()
+
+
+def _normalize_timeout(timeout):
+    """
+    httplib2 only supports one socket timeout - so in case of a
+    (connection timeout, response timeout) tuple we take the larger one
+
+    :param timeout: None, a number, a tuple or a timeout string like "3, 5"
+    :return: the timeout as float
+    """
+
+    if timeout is None or timeout == "":
+        return DEFAULT_TIMEOUT
+
+    timeout = get_timeout(timeout)
+
+    if isinstance(timeout, tuple):
+        return float(max(timeout))
+
+    return float(timeout)
+
+
+def get_http_client(timeout=None, ssl_verify=False):
+    """
+    get the pooled http client of the current thread
+
+    :param timeout: the socket timeout for the requests
+    :param ssl_verify: boolean - verify the server certificate
+    :return: httplib2.Http object
+    """
+
+    timeout = _normalize_timeout(timeout)
+    key = (timeout, bool(ssl_verify))
+
+    clients = getattr(_pool, "clients", None)
+    if clients is None:
+        clients = _pool.clients = {}
+
+    http = clients.get(key)
+    if http is None:
+        http = httplib2.Http(
+            timeout=timeout,
+            disable_ssl_certificate_validation=not ssl_verify,
+        )
+        clients[key] = http
+
+    return http
+
+
+def close_http_clients():
+    """
+    close all pooled connections of the current thread
+    """
+
+    clients = getattr(_pool, "clients", None) or {}
+
+    for http in clients.values():
+        http.close()
+
+    _pool.clients = {}
+
+
+def http_request(url, body, headers, timeout=None, ssl_verify=False):
+    """
+    submit a POST request via the pooled http client
+
+    in case of a transport error, the connections of the client are dropped,
+    so that the next request will establish a fresh connection
+
+    :param url: the request url
+    :param body: the urlencoded request body
+    :param headers: dict with the request headers
+    :param timeout: the socket timeout for the request
+    :param ssl_verify: boolean - verify the server certificate
+    :return: tuple of (response, content)
+    """
+
+    http = get_http_client(timeout=timeout, ssl_verify=ssl_verify)
+
+    try:
+        return http.request(url, method="POST", body=body, headers=headers)
+
+    except Exception as exx:
+        log.warning("Request to %r failed: %r", url, exx)
+        http.close()
+        raise
+
+
+# eof #
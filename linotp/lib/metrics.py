@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+request stage timing and metrics of the LinOTP process
+
+the metrics are counters and histograms, which are kept in memory per
+LinOTP process and are exported in the prometheus text format by the
+/monitoring/metrics endpoint.
+
+a request is split into stages like the policy evaluation or the resolver
+lookup. The time spent in a stage is summed up per request and observed at
+the end of the request. Stages could be nested, e.g. a resolver lookup
+during the policy evaluation - the time of the inner stage is then part of
+both stages. A stage, which is entered again while it is still active, is
+only counted once.
+
+all functions are no-ops if the METRICS_ENABLED setting is off.
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from sqlalchemy import event
+
+from flask import g, request
+
+log = logging.getLogger(__name__)
+
+enabled = False
+
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+METRICS = {
+    "linotp_request_duration_seconds": (
+        "histogram",
+        "Duration of the requests per controller.",
+    ),
+    "linotp_request_stage_seconds": (
+        "histogram",
+        "Time spent per request in the request stages.",
+    ),
+    "linotp_cache_lookups_total": (
+        "counter",
+        "Number of lookups in the caches.",
+    ),
+    "linotp_cache_misses_total": (
+        "counter",
+        "Number of lookups, which were not answered by the caches.",
+    ),
+    "linotp_resolver_lookup_seconds": (
+        "histogram",
+        "Latency of the user lookups in the user resolvers.",
+    ),
+    "linotp_hsm_wait_seconds": (
+        "histogram",
+        "Time waited to bind a security module session to the request.",
+    ),
+    "linotp_provider_send_seconds": (
+        "histogram",
+        "Time spent to submit a message via a provider.",
+    ),
+}
+
+_lock = threading.Lock()
+
+# the values are stored per (name, labels) - for the counters the value is
+# a float, for the histograms a list with the count per bucket, followed by
+# the count of the +Inf bucket, the sum and the total count
+
+_values = {}
+
+
+class RequestTimer:
+    """
+    the stage timing of one request, which is kept in flask.g
+    """
+
+    __slots__ = ("start", "stages", "_depth", "_started")
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.stages = {}
+        self._depth = {}
+        self._started = {}
+
+    def enter(self, name):
+        depth = self._depth.get(name, 0)
+        if not depth:
+            self._started[name] = perf_counter()
+        self._depth[name] = depth + 1
+
+    def leave(self, name):
+        depth = self._depth.get(name, 0)
+        if not depth:
+            return
+
+        self._depth[name] = depth - 1
+        if depth == 1:
+            duration = perf_counter() - self._started.pop(name)
+            self.stages[name] = self.stages.get(name, 0.0) + duration
+
+
+def init_metrics(app):
+    """
+    enable or disable the metrics according to the app config
+
+    the commit stage is measured by the session events, which are
+    registered only once per process.
+
+    :param app: the LinOTP app
+    """
+    global enabled
+
+    enabled = app.config["METRICS_ENABLED"]
+
+    # local import to prevent an import cycle with the model
+
+    from linotp.model import db
+
+    if not event.contains(db.session, "before_commit", _before_commit):
+        event.listen(db.session, "before_commit", _before_commit)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_rollback)
+
+
+def _before_commit(session):
+    enter_stage("commit")
+
+
+def _after_commit(session):
+    leave_stage("commit")
+
+
+def _after_rollback(session, previous_transaction):
+    leave_stage("commit")
+
+
+def reset():
+    """
+    drop all collected values
+    """
+    with _lock:
+        _values.clear()
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """
+    increment a counter
+
+    :param name: the name of the counter
+    :param amount: the amount to add
+    :param labels: the labels of the counter
+    """
+    if not enabled:
+        return
+
+    key = (name, _labels_key(labels))
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    """
+    add an observation to a histogram
+
+    :param name: the name of the histogram
+    :param value: the observed value in seconds
+    :param labels: the labels of the histogram
+    """
+    if not enabled:
+        return
+
+    key = (name, _labels_key(labels))
+    with _lock:
+        _observe(key, value)
+
+
+def _observe(key, value):
+    # the caller has to hold the lock
+
+    values = _values.get(key)
+    if values is None:
+        values = _values[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0]
+
+    values[bisect_left(BUCKETS, value)] += 1
+    values[-2] += value
+    values[-1] += 1
+
+
+@contextmanager
+def timed(name, **labels):
+    """
+    context manager and decorator to observe the duration of a block
+
+    :param name: the name of the histogram
+    :param labels: the labels of the histogram
+    """
+    if not enabled:
+        yield
+        return
+
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, perf_counter() - start, **labels)
+
+
+def _request_timer():
+    try:
+        return g.get("request_timer")
+    except RuntimeError:
+        # outside of an application context
+        return None
+
+
+def enter_stage(name):
+    """
+    start the timing of a request stage
+    """
+    if not enabled:
+        return
+
+    timer = _request_timer()
+    if timer is not None:
+        timer.enter(name)
+
+
+def leave_stage(name):
+    """
+    stop the timing of a request stage
+    """
+    if not enabled:
+        return
+
+    timer = _request_timer()
+    if timer is not None:
+        timer.leave(name)
+
+
+@contextmanager
+def stage(name):
+    """
+    context manager and decorator to time a request stage
+
+    :param name: the name of the stage
+    """
+    if not enabled:
+        yield
+        return
+
+    enter_stage(name)
+    try:
+        yield
+    finally:
+        leave_stage(name)
+
+
+def start_request():
+    """
+    start the stage timing of the current request
+    """
+    if enabled:
+        g.request_timer = RequestTimer()
+
+
+def finish_request():
+    """
+    observe the request duration and the time spent in the request stages
+
+    the requests are labeled by the controller blueprint, so that unknown
+    urls can not blow up the number of metrics.
+    """
+    if not enabled:
+        return
+
+    timer = g.pop("request_timer", None)
+    if timer is None:
+        return
+
+    duration = perf_counter() - timer.start
+    controller = request.blueprint or ""
+
+    with _lock:
+        _observe(
+            (
+                "linotp_request_duration_seconds",
+                (("controller", controller),),
+            ),
+            duration,
+        )
+        for name, seconds in timer.stages.items():
+            _observe(
+                ("linotp_request_stage_seconds", (("stage", name),)), seconds
+            )
+
+    log.debug("request stages of %r: %r", request.path, timer.stages)
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+
+    return "{%s}" % ",".join(
+        '%s="%s"' % (name, _escape(value)) for name, value in labels
+    )
+
+
+def render():
+    """
+    render the collected metrics in the prometheus text format
+
+    :return: the metrics as text
+    """
+    with _lock:
+        items = sorted(
+            (key, list(value) if isinstance(value, list) else value)
+            for key, value in _values.items()
+        )
+
+    lines = []
+    described = set()
+
+    for (name, labels), value in items:
+        if name not in described:
+            described.add(name)
+            kind, description = METRICS.get(name, ("untyped", ""))
+            lines.append("# HELP %s %s" % (name, description))
+            lines.append("# TYPE %s %s" % (name, kind))
+
+        if not isinstance(value, list):
+            lines.append("%s%s %r" % (name, _format_labels(labels), value))
+            continue
+
+        cumulative = 0
+        bounds = [repr(bound) for bound in BUCKETS] + ["+Inf"]
+        for bound, bucket_count in zip(bounds, value):
+            cumulative += bucket_count
+            lines.append(
+                "%s_bucket%s %d"
+                % (name, _format_labels(labels + (("le", bound),)), cumulative)
+            )
+        lines.append("%s_sum%s %r" % (name, _format_labels(labels), value[-2]))
+        lines.append(
+            "%s_count%s %d" % (name, _format_labels(labels), value[-1])
+        )
+
+    return "\n".join(lines) + "\n"
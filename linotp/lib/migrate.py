@@ -27,12 +27,14 @@
 """ contains the hsm migration handler"""
 
 import binascii
+import hashlib
 import hmac
+import logging
 import secrets
 from hashlib import sha256
 
 from Cryptodome.Cipher import AES
-from Cryptodome.Protocol.KDF import PBKDF2
+from sqlalchemy.orm import lazyload
 
 from linotp.lib.config import getFromConfig
 from linotp.lib.config.db_api import _storeConfigDB
@@ -42,6 +44,11 @@ from linotp.model import db
 from linotp.model.config import Config as model_config
 from linotp.model.token import Token as model_token
 
+log = logging.getLogger(__name__)
+
+# the number of tokens, which are read or written in one chunk
+MIGRATE_CHUNK_SIZE = 500
+
 
 class DecryptionError(Exception):
     pass
@@ -155,56 +162,125 @@ class MigrationHandler(object):
 
         _storeConfigDB(key, value, typ=typ, desc=desc)
 
-    def get_token_data(self):
+    def get_token_data(self, chunk_size=None):
+        """
+        iterator function, to return the token data in the migration format
+
+        the tokens are read in chunks ordered by the token id, so that the
+        tokens of large installations are not loaded at once
+
+        :param chunk_size: the number of tokens read with one query
+        :return: dictionary with the serial and the encrypted token data
+        """
+
+        chunk_size = chunk_size or MIGRATE_CHUNK_SIZE
+
+        last_id = None
+
+        while True:
+            query = model_token.query.options(lazyload(model_token.realms))
+
+            if last_id is not None:
+                query = query.filter(model_token.LinOtpTokenId > last_id)
+
+            tokens = (
+                query.order_by(model_token.LinOtpTokenId)
+                .limit(chunk_size)
+                .all()
+            )
+
+            if not tokens:
+                break
+
+            for token in tokens:
+                yield self._get_token_data(token)
+
+                # release the token from the session
+                db.session.expunge(token)
+
+            last_id = tokens[-1].LinOtpTokenId
+
+    def _get_token_data(self, token):
         """
-        get all tokens
+        get the encrypted data of one token
+
+        :param token: the token database object
+        :return: dictionary with the serial and the encrypted token data
         """
-        tokens = model_token.query.all()
-
-        for token in tokens:
-            token_data = {}
-            serial = token.LinOtpTokenSerialnumber
-            token_data["Serial"] = serial
-
-            if token.isPinEncrypted():
-                iv, enc_pin = token.get_encrypted_pin()
-                pin = SecretObj.decrypt_pin(enc_pin, hsm=self.hsm)
-                just_mac = serial + token.LinOtpPinHash
-                enc_value = self.crypter.encrypt(
-                    input_data=pin, just_mac=just_mac
-                )
-                token_data["TokenPin"] = enc_value
-
-            # the userpin is used in motp and ocra/ocra2 token
-            if token.LinOtpTokenPinUser:
-                key, iv = token.getUserPin()
-                user_pin = SecretObj.decrypt(key, iv, hsm=self.hsm)
-                just_mac = serial + token.LinOtpTokenPinUser
-                enc_value = self.crypter.encrypt(
-                    input_data=user_pin, just_mac=just_mac
-                )
-                token_data["TokenUserPin"] = enc_value
-
-            # then we retrieve as well the original value,
-            # to identify changes
-            encKey = token.LinOtpKeyEnc
-
-            key, iv = token.get_encrypted_seed()
-            secObj = SecretObj(key, iv, hsm=self.hsm)
-            seed = secObj.getKey()
+        token_data = {}
+        serial = token.LinOtpTokenSerialnumber
+        token_data["Serial"] = serial
+
+        if token.isPinEncrypted():
+            iv, enc_pin = token.get_encrypted_pin()
+            pin = SecretObj.decrypt_pin(enc_pin.decode("utf-8"), hsm=self.hsm)
+            pin = pin.decode("utf-8")
+            just_mac = serial + token.LinOtpPinHash
+            enc_value = self.crypter.encrypt(input_data=pin, just_mac=just_mac)
+            token_data["TokenPin"] = enc_value
+
+        # the userpin is used in motp and ocra/ocra2 token
+        if token.LinOtpTokenPinUser:
+            key, iv = token.getUserPin()
+            user_pin = SecretObj.decrypt(key, iv, hsm=self.hsm).decode("utf-8")
+            just_mac = serial + token.LinOtpTokenPinUser
             enc_value = self.crypter.encrypt(
-                input_data=seed, just_mac=serial + encKey
+                input_data=user_pin, just_mac=just_mac
             )
-            token_data["TokenSeed"] = enc_value
-            # next we look for tokens, where the pin is encrypted
-            yield token_data
+            token_data["TokenUserPin"] = enc_value
+
+        # then we retrieve as well the original value,
+        # to identify changes
+        encKey = token.LinOtpKeyEnc
 
-    def set_token_data(self, token_data):
+        key, iv = token.get_encrypted_seed()
+        secObj = SecretObj(key, iv, hsm=self.hsm)
+        seed = secObj.getKey().decode("utf-8")
+        enc_value = self.crypter.encrypt(
+            input_data=seed, just_mac=serial + encKey
+        )
+        token_data["TokenSeed"] = enc_value
+        return token_data
+
+    def set_tokens_data(self, tokens_data):
+        """
+        restore the data of a chunk of tokens
+
+        the tokens of the chunk are loaded with one query
+
+        :param tokens_data: list of token data dictionaries
+        """
+
+        serials = [token_data["Serial"] for token_data in tokens_data]
+
+        tokens = {
+            token.LinOtpTokenSerialnumber: token
+            for token in model_token.query.options(
+                lazyload(model_token.realms)
+            ).filter(model_token.LinOtpTokenSerialnumber.in_(serials))
+        }
+
+        for token_data in tokens_data:
+            token = tokens.get(token_data["Serial"])
+            if token is None:
+                raise Exception("Token %r not found" % token_data["Serial"])
+
+            self.set_token_data(token_data, token=token)
+
+    def set_token_data(self, token_data, token=None):
+        """
+        restore the data of one token
+
+        :param token_data: the token data dictionary
+        :param token: optional - the already loaded token database object
+        """
         serial = token_data["Serial"]
-        tokens = model_token.query.filter_by(
-            LinOtpTokenSerialnumber=serial
-        ).all()
-        token = tokens[0]
+
+        if token is None:
+            tokens = model_token.query.filter_by(
+                LinOtpTokenSerialnumber=serial
+            ).all()
+            token = tokens[0]
 
         if "TokenPin" in token_data:
             enc_pin = token_data["TokenPin"]
@@ -215,7 +291,9 @@ class MigrationHandler(object):
             # prove, we can write
             enc_pin = SecretObj.encrypt_pin(token_pin)
             iv = enc_pin.split(":")[0]
-            token.set_encrypted_pin(enc_pin, binascii.unhexlify(iv))
+            token.set_encrypted_pin(
+                enc_pin.encode("utf-8"), binascii.unhexlify(iv)
+            )
 
         if "TokenUserPin" in token_data:
             token_enc_user_pin = token_data["TokenUserPin"]
@@ -270,12 +348,14 @@ class Crypter(object):
         :return: - nothing -
         """
 
-        master_key = PBKDF2(
-            password=password,
-            salt=salt,
-            dkLen=32,
-            count=65432,
-            prf=Crypter.hmac_sha256,
+        # the former Cryptodome PBKDF2 encoded the password as latin-1
+        try:
+            b_password = password.encode("latin-1")
+        except UnicodeEncodeError:
+            b_password = password.encode("utf-8")
+
+        master_key = hashlib.pbkdf2_hmac(
+            "sha256", b_password, salt, 65432, dklen=32
         )
 
         U1 = sha256(master_key).digest()
@@ -304,9 +384,9 @@ class Crypter(object):
         mac = self.mac(iv, crypted_data, just_mac)
 
         return {
-            "iv": binascii.hexlify(iv),
-            "crypted_data": binascii.hexlify(crypted_data),
-            "mac": binascii.hexlify(mac),
+            "iv": binascii.hexlify(iv).decode(),
+            "crypted_data": binascii.hexlify(crypted_data).decode(),
+            "mac": binascii.hexlify(mac).decode(),
         }
 
     def decrypt(self, encrypted_data, just_mac=""):
@@ -322,7 +402,11 @@ class Crypter(object):
         # compare the original mac with the new calculated one
         v_mac = self.mac(iv, crypted_data, just_mac)
 
-        if encrypted_data["mac"] != binascii.hexlify(v_mac):
+        mac = encrypted_data["mac"]
+        if isinstance(mac, bytes):
+            mac = mac.decode()
+
+        if not hmac.compare_digest(mac, binascii.hexlify(v_mac).decode()):
             raise DecryptionError("Data mismatch detected!")
 
         cipher = AES.new(self.enc_key, AES.MODE_CBC, iv)
@@ -41,6 +41,7 @@ from linotp.model import db
 from linotp.model.config import Config as config_model
 from linotp.model.realm import Realm
 from linotp.model.token import Token
+from linotp.model.token_counter import NO_REALM, get_token_counters
 from linotp.model.tokenRealm import TokenRealm
 
 
@@ -152,6 +153,55 @@ class MonitorHandler(object):
 
         return result
 
+    def token_counter_count(self, realm, status):
+        """
+        Give the number of tokens (with status) of one realm from the
+        incrementally maintained token counters without scanning the
+        token table
+
+        :param realm: the realm which must be queried
+        :param status: list of requested token status
+        :return: dict with the requested status as keys
+        """
+
+        realm = realm.strip().lower()
+        if "/:no realm:/" in realm or realm == "":
+            realm = NO_REALM
+
+        cells = get_token_counters(realm)
+
+        result = {}
+
+        for stat in status:
+            if stat == "total users":
+                # the distinct users could not be derived from the counters
+                result.update(self.token_count(realm, ["total users"]))
+                continue
+
+            if stat == "total":
+                result[stat] = sum(cells.values())
+                continue
+
+            # handle combinations like:
+            # status=unassigned & active, unassigned & inactive
+            stati = stat.split("&")
+            for stati_ in stati:
+                if stati_ not in [
+                    "active",
+                    "inactive",
+                    "assigned",
+                    "unassigned",
+                ]:
+                    raise ValueError("Unknown token_status %r" % stati_)
+
+            result[stat] = sum(
+                count
+                for cell, count in cells.items()
+                if set(stati).issubset(cell.split("_"))
+            )
+
+        return result
+
     def get_sync_status(self):
         """
         check if cache and config db are synced
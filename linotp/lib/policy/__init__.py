@@ -30,6 +30,7 @@
 import logging
 import re
 from copy import deepcopy
+from functools import partial
 from typing import Dict
 
 from flask_babel import gettext as _
@@ -2821,10 +2822,44 @@ def createRandomPin(user, min_pin_length):
     :param user: user defines the realm/user policy selection
     :return: the new pin
     """
-    character_pool = letters + digits
-
     pin_length = max(min_pin_length, _getRandomOTPPINLength(user))
 
+    character_pool = _getRandomOTPPINCharacters(user)
+
+    return generate_password(size=pin_length, characters=character_pool)
+
+
+def get_random_pin_creator(user):
+    """
+    evaluate the otp_pin_random policies once for a bulk of tokens
+
+    :param user: user defines the realm/user policy selection
+    :return: function, which creates a new random pin or None, if no
+             random pin is defined
+    """
+
+    pin_length = _getRandomOTPPINLength(user)
+    if pin_length <= 0:
+        return None
+
+    character_pool = _getRandomOTPPINCharacters(user)
+
+    return partial(
+        generate_password, size=pin_length, characters=character_pool
+    )
+
+
+def _getRandomOTPPINCharacters(user):
+    """
+    get the character pool of the random pin from the otp_pin_random_content
+    policy
+
+    :param user: user defines the realm/user policy selection
+    :return: string with the characters of the random pin
+    """
+
+    character_pool = letters + digits
+
     contents = _getRandomOTPPINContent(user)
 
     if contents:
@@ -2838,7 +2873,7 @@ def createRandomPin(user, min_pin_length):
         if "s" in contents:
             character_pool += special_characters
 
-    return generate_password(size=pin_length, characters=character_pool)
+    return character_pool
 
 
 def checkToolsAuthorisation(method, param=None):
@@ -476,6 +476,10 @@ POLICY_DEFINTIONS = {
             "type": "bool",
             "desc": "Allow to get information on active user count",
         },
+        "metrics": {
+            "type": "bool",
+            "desc": "Allow to get the request timing and cache metrics",
+        },
     },
     "reporting": {
         "token_total": {
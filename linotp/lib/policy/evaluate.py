@@ -30,6 +30,7 @@ from typing import Dict
 
 from netaddr import IPAddress, IPNetwork
 
+from linotp.lib import metrics
 from linotp.lib.realm import getRealms
 from linotp.lib.user import User
 
@@ -120,6 +121,7 @@ class PolicyEvaluator(object):
 
         return policies
 
+    @metrics.stage("policy")
     def evaluate(self, policy_set=None, strict_matches=True):
         """
         evaluate - compare all policies against the access request
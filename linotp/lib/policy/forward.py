@@ -32,6 +32,7 @@ import urllib.parse
 import urllib.request
 
 from linotp.lib.crypto import SecretObj
+from linotp.lib.remote_service import ServiceUnavailable
 from linotp.lib.request import HttpRequest, RadiusRequest
 
 log = logging.getLogger(__name__)
@@ -105,6 +106,10 @@ class ForwardServerPolicy(object):
     def do_request(servers, env, user, passw, options):
         """
         make the call to the foreign server
+
+        the servers are tried in the order of their definition - if a http
+        server is not reachable or marked as unavailable, the request is
+        forwarded to the next one.
         """
         log.debug("start request to foreign server: %r", servers)
 
@@ -141,8 +146,19 @@ class ForwardServerPolicy(object):
                 return res, opt
             elif "http://" in server_url or "https://" in server_url:
                 http = HttpRequest(server=server_url, env=env)
-                res, opt = http.do_request(user, passw, options)
+                try:
+                    res, opt = http.do_request(user, passw, options)
+                except ServiceUnavailable as exx:
+                    log.warning(
+                        "Forward server %r unavailable: %r - trying next one",
+                        server,
+                        exx,
+                    )
+                    continue
                 return res, opt
 
+        log.error("None of the forward servers %r is available", servers)
+        return False, {}
+
 
 # eof###########################################################################
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+on demand profiling of the requests of a controller action
+
+an admin arms the profiling for the next N requests of a controller action
+like 'validate/check' by /maintenance/setProfiling. The armed actions are
+stored in the expiring_item table, so that the N requests are counted
+across all LinOTP processes. Each process looks up the armed actions at
+most once per POLL_INTERVAL, thus a request of an action which is not
+armed only costs a time comparison.
+
+the requests are profiled by cProfile and the profiles are written in the
+pstats format to CACHE_DIR/profiles, from where they are listed and fetched
+by the `linotp profile` commands.
+"""
+
+import cProfile
+import logging
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import and_, select
+
+from flask import current_app
+
+from linotp.lib.fs_utils import ensure_dir
+from linotp.model import db
+from linotp.model.expiring_item import ExpiringItem
+
+log = logging.getLogger(__name__)
+
+PROFILING_ITEMS = "profiling"
+
+POLL_INTERVAL = 10  # seconds
+DEFAULT_TIMEOUT = 3600  # seconds
+MAX_REQUESTS = 1000
+
+TARGET_FORMAT = re.compile(r"^[A-Za-z0-9_]+/[A-Za-z0-9_]+$")
+
+# only one request per process is profiled at a time, as the profilers of
+# concurrent requests would interfere with each other
+
+_profiling_lock = threading.Lock()
+
+_armed = {}
+_next_poll = 0
+
+
+class ProfilingError(Exception):
+    pass
+
+
+def profile_dir() -> str:
+    """
+    :return: the directory of the captured profiles
+    """
+    return ensure_dir(current_app, "profiles", "CACHE_DIR", "profiles")
+
+
+def arm(target, requests, timeout=DEFAULT_TIMEOUT):
+    """
+    arm the profiling of the next requests of a controller action
+
+    :param target: the controller action like 'validate/check'
+    :param requests: the number of requests to profile - 0 disarms
+    :param timeout: the seconds after which the profiling is disarmed
+    """
+    global _next_poll
+
+    if not TARGET_FORMAT.match(target):
+        raise ProfilingError(
+            "invalid target %r - expected <controller>/<action>" % target
+        )
+
+    if not 0 <= requests <= MAX_REQUESTS:
+        raise ProfilingError(
+            "the number of requests must be between 0 and %d" % MAX_REQUESTS
+        )
+
+    table = ExpiringItem.__table__
+    now = time.time()
+
+    db.session.execute(
+        table.delete().where(
+            and_(
+                table.c.name == PROFILING_ITEMS,
+                (table.c.item == target) | (table.c.expiry < now),
+            )
+        )
+    )
+
+    if requests:
+        db.session.execute(
+            table.insert().values(
+                name=PROFILING_ITEMS,
+                item=target,
+                expiry=now + timeout,
+                value=str(requests),
+            )
+        )
+
+    db.session.commit()
+
+    # the armed actions of this process are looked up with the next request
+    _next_poll = 0
+
+
+def get_armed():
+    """
+    :return: dict with the number of requests which are still to be
+             profiled per controller action
+    """
+    table = ExpiringItem.__table__
+
+    rows = db.session.execute(
+        select([table.c.item, table.c.value]).where(
+            and_(
+                table.c.name == PROFILING_ITEMS,
+                table.c.expiry >= time.time(),
+            )
+        )
+    )
+
+    return {item: int(value) for item, value in rows}
+
+
+def _claim(target, remaining):
+    """
+    take one of the remaining requests of the target
+
+    the remaining number is updated only if no other process took it in
+    the meantime, so that not more than the armed number of requests are
+    profiled.
+
+    :return: boolean - True if this request is to be profiled
+    """
+    table = ExpiringItem.__table__
+
+    condition = and_(
+        table.c.name == PROFILING_ITEMS,
+        table.c.item == target,
+        table.c.value == str(remaining),
+    )
+
+    if remaining > 1:
+        statement = table.update().where(condition)
+        statement = statement.values(value=str(remaining - 1))
+    else:
+        statement = table.delete().where(condition)
+
+    result = db.session.execute(statement)
+    db.session.commit()
+
+    return result.rowcount == 1
+
+
+def start(target):
+    """
+    start the profiling of the current request if the target is armed
+
+    :param target: the controller action like 'validate/check'
+    :return: the running profiler or None
+    """
+    global _armed, _next_poll
+
+    now = time.time()
+    if now >= _next_poll:
+        _next_poll = now + POLL_INTERVAL
+        _armed = get_armed()
+
+    remaining = _armed.get(target)
+    if not remaining:
+        return None
+
+    if not _profiling_lock.acquire(blocking=False):
+        return None
+
+    try:
+        if not _claim(target, remaining):
+            # another process took it - look up the remaining requests
+            # with the next request
+            _next_poll = 0
+            _profiling_lock.release()
+            return None
+
+        _armed[target] = remaining - 1
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    except Exception:
+        _profiling_lock.release()
+        raise
+
+
+def stop(profiler, target, request_id):
+    """
+    stop the profiler and write the profile to the profile directory
+
+    :param profiler: the profiler returned by start
+    :param target: the controller action like 'validate/check'
+    :param request_id: the id of the request, to be part of the file name
+    :return: the name of the profile file
+    """
+    try:
+        profiler.disable()
+
+        filename = "%s-%s-%d-%s.prof" % (
+            time.strftime("%Y%m%d-%H%M%S"),
+            target.replace("/", "-"),
+            os.getpid(),
+            request_id[:8],
+        )
+        profiler.dump_stats(os.path.join(profile_dir(), filename))
+
+    finally:
+        _profiling_lock.release()
+
+    log.info("profile of request %r written to %r", request_id, filename)
+    return filename
+
+
+def list_profiles():
+    """
+    :return: list of (name, size, mtime) of the captured profiles, sorted
+             by name and thus by the time of the capture
+    """
+    directory = profile_dir()
+
+    profiles = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".prof"):
+            continue
+
+        stat = os.stat(os.path.join(directory, name))
+        profiles.append((name, stat.st_size, stat.st_mtime))
+
+    return profiles
+
+
+def get_profile_path(name):
+    """
+    :param name: the name of a captured profile
+    :return: the path of the profile
+    """
+    if os.path.basename(name) != name or not name.endswith(".prof"):
+        raise ProfilingError("invalid profile name %r" % name)
+
+    path = os.path.join(profile_dir(), name)
+    if not os.path.isfile(path):
+        raise ProfilingError("no profile %r found" % name)
+
+    return path
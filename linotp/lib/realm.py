@@ -46,6 +46,10 @@ from linotp.lib.config.parsing import ConfigNotRecognized, ConfigTree
 from linotp.lib.context import request_context as context
 from linotp.model import db
 from linotp.model.realm import Realm, db
+from linotp.model.token_counter import (
+    create_token_counter,
+    release_realm_tokens,
+)
 from linotp.model.tokenRealm import TokenRealm
 
 log = logging.getLogger(__name__)
@@ -106,6 +110,7 @@ def createDBRealm(realm):
     if not getRealmObject(name=realm):
         r = Realm(realm)
         r.storeRealm()
+        create_token_counter(r.name)
         ret = True
 
     return ret
@@ -537,6 +542,11 @@ def deleteRealm(realmname):
                 log.debug(
                     "Deleting token relations for realm with id %r", realmId
                 )
+
+                # the bulk delete of the token realm relations bypasses
+                # the incremental token counter update
+                release_realm_tokens(r)
+
                 TokenRealm.query.filter_by(realm_id=realmId).delete()
             _delete_realm_config(realmname=realmname)
             db.session.delete(r)
@@ -67,7 +67,7 @@ def token_reporting(event, tokenrealms):
     for realm in realms:
         action = check_token_reporting(realm)
         mh = MonitorHandler()
-        counters = mh.token_count(realm, action[:])
+        counters = mh.token_counter_count(realm, action[:])
         for key, val in list(counters.items()):
             report = Reporting(
                 event=event, realm=realm, parameter=key, count=val
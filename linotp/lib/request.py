@@ -35,8 +35,7 @@ import logging
 import urllib.error
 import urllib.parse
 import urllib.request
-
-import httplib2
+from threading import Lock
 
 # this is needed for the radius request
 import pyrad.packet
@@ -45,8 +44,20 @@ from pyrad.dictionary import Dictionary
 
 from flask import current_app
 
+from linotp.lib.http_client import http_request
+from linotp.lib.remote_service import RemoteService
+
 log = logging.getLogger(__name__)
 
+# health tracking of the remote http servers: after FAILURE_THRESHOLD
+# failed requests a server is skipped for RECOVERY_TIMEOUT seconds
+
+FAILURE_THRESHOLD = 3
+RECOVERY_TIMEOUT = 30
+
+_remote_services = {}
+_remote_services_lock = Lock()
+
 
 class RemoteRequest(object):
     """
@@ -127,6 +138,17 @@ class RemoteRequest(object):
 class HttpRequest(RemoteRequest):
     """
     HTTP request forwarding handler
+
+    the requests are submitted via the pooled http client, which keeps the
+    connections to the remote servers alive. The health of every server is
+    tracked, so that a server which failed repeatedly is skipped for the
+    recovery time and the forwarding fails over to the next server.
+
+    the request timeout could be defined per server by the query parameter
+    'timeout', either as single value or as 'connection, response' tuple:
+
+     action:
+         forward_server= https://remote:5001/validate/check?timeout=3
     """
 
     def do_request(self, user, password, options=None):
@@ -140,6 +162,9 @@ class HttpRequest(RemoteRequest):
                         for challenge response
 
         :return: Tuple of (success, and reply=remote response)
+
+        :raises ServiceUnavailable: if the remote server could not be reached
+                or is marked as unavailable
         """
 
         params = {}
@@ -157,45 +182,36 @@ class HttpRequest(RemoteRequest):
         ssl_verify = (
             query_params.get("verify_ssl_certificate", "").lower() == "true"
         )
+        timeout = query_params.get("timeout")
 
         res = False
         reply = {}
         content = None
 
-        try:
-            # prepare the url
-            request_url = "%(scheme)s://%(netloc)s%(path)s" % server_config
-
-            # prepare the submit and receive headers
-            headers = {
-                "Content-type": "application/x-www-form-urlencoded",
-                "Accept": "text/plain",
-                "Connection": "close",
-            }
-
-            data = urllib.parse.urlencode(params)
-            # submit the request
-            try:
-                # is httplib compiled with ssl?
-                ns = not ssl_verify
-                http = httplib2.Http(disable_ssl_certificate_validation=ns)
-
-            except TypeError as exx:
-                # not so on squeeze:
-                # TypeError: __init__() got an unexpected keyword argument
-                # 'disable_ssl_certificate_validation'
+        # prepare the url
+        request_url = "%(scheme)s://%(netloc)s%(path)s" % server_config
 
-                log.warning(
-                    "httplib2 'disable_ssl_certificate_validation'"
-                    " attribute error: %r",
-                    exx,
-                )
-                # so we run in fallback mode
-                http = httplib2.Http()
+        # prepare the submit and receive headers
+        headers = {
+            "Content-type": "application/x-www-form-urlencoded",
+            "Accept": "text/plain",
+        }
 
-            (resp, content) = http.request(
-                request_url, method="POST", body=data, headers=headers
-            )
+        data = urllib.parse.urlencode(params)
+
+        # submit the request - transport errors will raise the
+        # ServiceUnavailable so that the caller could fail over
+
+        service = get_remote_service(request_url)
+        resp, content = service(
+            request_url,
+            body=data,
+            headers=headers,
+            timeout=timeout,
+            ssl_verify=ssl_verify,
+        )
+
+        try:
             if resp.status not in [200]:
                 raise Exception("Http Status not ok (%s)", resp.status)
 
@@ -222,6 +238,31 @@ class HttpRequest(RemoteRequest):
         return res, reply
 
 
+def get_remote_service(url):
+    """
+    get the health tracking service wrapper of the http client for an url
+
+    the service is kept beyond the request, so that a failing server will
+    be marked as unavailable after the failure_threshold is reached and
+    will not be contacted until the recovery timeout is over.
+
+    :param url: the request url of the remote server
+    :return: RemoteService, which wraps the pooled http request
+    """
+
+    with _remote_services_lock:
+        service = _remote_services.get(url)
+        if service is None:
+            service = RemoteService(
+                http_request,
+                failure_threshold=FAILURE_THRESHOLD,
+                recovery_timeout=RECOVERY_TIMEOUT,
+            )
+            _remote_services[url] = service
+
+    return service
+
+
 class RadiusRequest(RemoteRequest):
     """
     Radius request forwarding handler
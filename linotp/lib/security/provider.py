@@ -33,6 +33,7 @@ import _thread
 import logging
 import time
 
+from linotp.lib import metrics
 from linotp.lib.crypto.utils import zerome
 from linotp.lib.error import HSMException
 from linotp.lib.rw_lock import RWLock
@@ -390,6 +391,7 @@ class SecurityProvider(object):
             self.rwLock.release()
         return result is not None
 
+    @metrics.timed("linotp_hsm_wait_seconds")
     def getSecurityModule(self, hsm_id=None, sessionId=None):
         """
         Allocate a security module for the sessionId
@@ -28,9 +28,11 @@
 
 import base64
 import binascii
+import copy
 import datetime
 import logging
 import os
+import time
 
 from flask_babel import gettext as _
 
@@ -44,6 +46,7 @@ from linotp.lib.context import request_context as context
 from linotp.lib.crypto.encrypted_data import EncryptedData
 from linotp.lib.crypto.rsa import verify_rsa_signature
 from linotp.lib.token import getNumTokenUsers, getTokenNumResolver
+from linotp.model.token_counter import token_generation
 
 log = logging.getLogger(__name__)
 
@@ -112,6 +115,17 @@ SMyYfVhZKPgS3mjcSYsfUG9awcgfwUU/ssEw0FLqSbTQiIJf2gWN9dx02iVSJREUnlf80Gy3ZQd0l4EV
 
 GRACE_VOLUME = 2
 
+# the license volume verdict is cached for the given seconds - token changes
+# of the local process invalidate the verdict immediately, the changes of
+# other processes are recognized after the expiration
+VOLUME_VERDICT_TTL = 10
+
+# the parsed and verified license, keyed by the license config entry
+_license_cache = {}
+
+# the license volume verdict, keyed by the license and the token generation
+_volume_verdict_cache = {}
+
 
 class LicenseException(Exception):
     pass
@@ -264,6 +278,60 @@ def isSupportLicenseValid(
     return res, reason, lic_dict
 
 
+def _get_verified_license(license_str):
+    """
+    get the parsed license and its signature verification result
+
+    parsing and the rsa signature verification are only done once per
+    license config entry, as long as the license is not changed.
+
+    :param license_str: the hexlified license from the config
+    :return: tuple of a copy of the license dict and the license type,
+             which is None or False if the signature could not be verified
+    """
+
+    cached = _license_cache.get(license_str)
+
+    if cached is None:
+        licString = binascii.unhexlify(license_str).decode()
+        lic_dict, lic_sign = parseSupportLicense(licString)
+        license_type = verify_signature(lic_dict, lic_sign)
+
+        cached = (lic_dict, license_type)
+
+        _license_cache.clear()
+        _license_cache[license_str] = cached
+
+    lic_dict, license_type = cached
+
+    # the license dict is adjusted by the expiration check
+    return copy.copy(lic_dict), license_type
+
+
+def _verify_volume_cached(license_str, lic_dict):
+    """
+    verify the license volume with a short living cached verdict
+
+    :param license_str: the hexlified license from the config
+    :param lic_dict: the license dict
+    :return: tuple with boolean and error detail if False
+    """
+
+    key = (license_str, token_generation())
+    now = time.time()
+
+    cached = _volume_verdict_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    verdict = verify_volume(lic_dict)
+
+    _volume_verdict_cache.clear()
+    _volume_verdict_cache[key] = (now + VOLUME_VERDICT_TTL, verdict)
+
+    return verdict
+
+
 def check_license_restrictions():
     """
     check if there are restrictions, which are caused by the license
@@ -275,26 +343,24 @@ def check_license_restrictions():
     if not license_str:
         return False
 
-    licString = binascii.unhexlify(license_str).decode()
-    lic_dict, lic_sign = parseSupportLicense(licString)
-    res, reason = verifyLicenseInfo(
-        lic_dict, lic_sign, checkVolume=False, raiseException=False
-    )
+    lic_dict, license_type = _get_verified_license(license_str)
 
-    if not res:
-        log.info("license check: %r", reason)
+    if not license_type:
+        log.info("license check: signature could not be verified!")
         return True
 
-    res, msg = verify_volume(lic_dict)
-    if not res:
-        log.info("License check: Too many tokens enrolled %r", msg)
-        return True
+    lic_dict.license_type = license_type
 
     res, _msg = verify_expiration(lic_dict)
     if res is False:
         log.info("License check: License expired!")
         return True
 
+    res, msg = _verify_volume_cached(license_str, lic_dict)
+    if not res:
+        log.info("License check: Too many tokens enrolled %r", msg)
+        return True
+
     return False
 
 
@@ -47,6 +47,7 @@ from linotp.lib.config import getFromConfig
 from linotp.lib.context import request_context as context
 from linotp.lib.error import ParameterError, TokenAdminError
 from linotp.lib.realm import createDBRealm, getRealmObject, realm2Objects
+from linotp.lib.token_time_info import get_token_time_info_buffer
 from linotp.lib.type_utils import DEFAULT_TIMEFORMAT, parse_duration
 from linotp.lib.user import (
     User,
@@ -58,7 +59,8 @@ from linotp.lib.user import (
 from linotp.lib.util import generate_password
 from linotp.model import db
 from linotp.model.realm import Realm
-from linotp.model.token import Token, createToken
+from linotp.model.token import Token, createToken, normalize_resolver_class
+from linotp.model.token_counter import release_token_realms
 from linotp.model.tokenRealm import TokenRealm
 from linotp.provider.notification import NotificationException, notify_user
 from linotp.tokens import tokenclass_registry
@@ -1105,6 +1107,9 @@ class TokenHandler(object):
             #  foreign key relation could not be deleted
             #  so we do this manualy
 
+            for token in tokens:
+                release_token_realms(token)
+
             for t_id in set(token_ids):
                 TokenRealm.query.filter(TokenRealm.token_id == t_id).delete()
 
@@ -1485,6 +1490,119 @@ def getRealms4Token(user, tokenrealm=None):
     return realmList
 
 
+# the number of tokens, which are written with one flush during the import
+IMPORT_CHUNK_SIZE = 500
+
+
+def import_tokens(tokens, tokenrealm=None, chunk_size=None):
+    """
+    bulk import of tokens - create or update the tokens chunk by chunk
+
+    in difference to the TokenHandler.initToken, which does all lookups
+    per token, the realms and the random pin policy are evaluated once,
+    the existing tokens of a chunk are looked up with one query and the
+    tokens of a chunk are written with one flush.
+
+    :param tokens: iterable of (serial, token init parameters) tuples
+    :param tokenrealm: the realm, to which the tokens belong
+    :param chunk_size: the number of tokens per chunk - defaults to the
+                       IMPORT_CHUNK_SIZE
+    :return: generator, which yields the list of serials of every
+             imported chunk
+    """
+
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+
+    realms = getRealms4Token(None, tokenrealm)
+
+    # the random pin policy is not token specific - it depends on the
+    # (empty) user of the imported tokens
+
+    create_random_pin = linotp.lib.policy.get_random_pin_creator(
+        User("", "", "")
+    )
+
+    chunk = {}
+
+    for serial, init_param in tokens:
+        # if a serial occures multiple times, the last definition wins
+        chunk[serial] = init_param
+
+        if len(chunk) >= chunk_size:
+            _import_token_chunk(chunk, realms, create_random_pin)
+            yield list(chunk.keys())
+            chunk = {}
+
+    if chunk:
+        _import_token_chunk(chunk, realms, create_random_pin)
+        yield list(chunk.keys())
+
+
+def _import_token_chunk(chunk, realms, create_random_pin):
+    """
+    helper - create or update the tokens of one import chunk
+
+    :param chunk: dict of serial and token init parameters
+    :param realms: the realm objects of the imported tokens
+    :param create_random_pin: function to create a random pin or None
+    """
+
+    existing_tokens = {
+        token.LinOtpTokenSerialnumber: token
+        for token in Token.query.filter(
+            Token.LinOtpTokenSerialnumber.in_(list(chunk.keys()))
+        )
+    }
+
+    for serial, init_param in chunk.items():
+        typ = init_param.get("type") or "hmac"
+
+        if typ.lower() not in tokenclass_registry:
+            log.error(
+                "Token type %r not found. Available types are: %r",
+                typ,
+                list(tokenclass_registry.keys()),
+            )
+            raise TokenAdminError(
+                "[import_tokens] failed: unknown token type %r" % typ,
+                id=1610,
+            )
+
+        token = existing_tokens.get(serial)
+
+        if token is None:
+            token = createToken(serial)
+
+        elif token.LinOtpTokenType.lower() != typ.lower():
+            msg = (
+                "token %r already exist with type %r. Can not "
+                "initialize token with new type %r"
+                % (serial, token.LinOtpTokenType, typ)
+            )
+            log.error("[import_tokens] %s", msg)
+            raise TokenAdminError("import_tokens failed: %s" % msg)
+
+        token.setRealms(list(realms))
+
+        tokenObj = createTokenClassObject(token, typ)
+
+        if serial not in existing_tokens:
+            tokenObj.setDefaults()
+
+        tokenObj.update(init_param)
+
+        if create_random_pin:
+            tokenObj.setPin(create_random_pin())
+
+        db.session.add(token)
+
+    try:
+        db.session.flush()
+    except Exception as exx:
+        log.error("Could not import tokens")
+        raise TokenAdminError("token import failed %r" % exx, id=1112)
+
+
 def get_tokenserial_of_transaction(transId):
     """
     get the serial number of a token from a challenge state / transaction
@@ -1517,23 +1635,15 @@ def getRolloutToken4User(user=None, serial=None, tok_type="ocra2"):
             v = resolverUid.get(k)
         user_id = v
 
-        # in the database could be tokens of ResolverClass:
-        #    useridresolver. or useridresolveree.
-        # so we have to make sure
-        # - there is no 'useridresolveree' in the searchterm and
-        # - there is a wildcard search: second replace
-        # Remark: when the token is loaded the response to the
-        # resolver class is adjusted
-
-        user_resolver = k.replace("useridresolveree.", "useridresolver.")
-        user_resolver = user_resolver.replace(
-            "useridresolver.", "useridresolver%."
-        )
+        # the resolver class of the tokens is stored normalized, thus
+        # we could compare exactly
+
+        user_resolver = normalize_resolver_class(k)
 
         """ coout tokens: 0 1 or more """
         tokens = Token.query.filter(
             Token.LinOtpTokenType == str(tok_type),
-            Token.LinOtpIdResClass.like(str(user_resolver)),
+            Token.LinOtpIdResClass == str(user_resolver),
             Token.LinOtpUserid == str(user_id),
         )
 
@@ -1692,10 +1802,9 @@ def getNumTokenUsers(
         session = db.session.query(TokenRealm, Realm, Token)
 
     elif resolver:
-        resolver = resolver.resplace("useridresolveree.", "useridresolver.")
-        resolver = resolver.resplace("useridresolver.", "useridresolver%.")
+        resolver = normalize_resolver_class(resolver)
 
-        conditions += (and_(Token.LinOtpIdResClass.like(resolver)),)
+        conditions += (and_(Token.LinOtpIdResClass == resolver),)
 
     if active:
         conditions += (and_(Token.LinOtpIsactive),)
@@ -1714,14 +1823,6 @@ def getTokenNumResolver(
     """
     get the number of used tokens
 
-     in the database could be tokens of ResolverClass:
-        useridresolver. or useridresolveree.
-     so we have to make sure
-     - there is no 'useridresolveree' in the searchterm and
-     - there is a wildcard search: second replace
-     Remark: when the token is loaded the response to the
-     resolver class is adjusted
-
     :param resolver: count only the token users per resolver
     :param active: boolean - count base only on active tokens
     :param count_forward_tokens: boolean - count the forward tokens
@@ -1731,10 +1832,9 @@ def getTokenNumResolver(
     conditions = ()
 
     if resolver:
-        resolver = resolver.resplace("useridresolveree.", "useridresolver.")
-        resolver = resolver.resplace("useridresolver.", "useridresolver%.")
+        resolver = normalize_resolver_class(resolver)
 
-        conditions += (and_(Token.LinOtpIdResClass.like(resolver)),)
+        conditions += (and_(Token.LinOtpIdResClass == resolver),)
 
     if active:
         conditions += (and_(Token.LinOtpIsactive),)
@@ -1860,29 +1960,19 @@ def get_raw_tokens(
     if user and user.login:
         for user_definition in user.get_uid_resolver():
             uid, resolverClass = user_definition
-            # in the database could be tokens of ResolverClass:
-            #    useridresolver. or useridresolveree.
-            # so we have to make sure
-            # - there is no 'useridresolveree' in the searchterm and
-            # - there is a wildcard search: second replace
-            # Remark: when the token is loaded the response to the
-            # resolver class is adjusted
+            # the resolver class of the tokens is stored normalized, thus
+            # the user id and resolver class could be compared exactly
 
             uconditions = sconditions
 
-            resolverClass = resolverClass.replace(
-                "useridresolveree.", "useridresolver."
-            )
-            resolverClass = resolverClass.replace(
-                "useridresolver.", "useridresolver%."
-            )
+            resolverClass = normalize_resolver_class(resolverClass)
 
             if isinstance(uid, int):
                 uconditions += ((Token.LinOtpUserid == "%d" % uid),)
             else:
                 uconditions += ((Token.LinOtpUserid == uid),)
 
-            uconditions += ((Token.LinOtpIdResClass.like(resolverClass)),)
+            uconditions += ((Token.LinOtpIdResClass == resolverClass),)
 
             sqlQuery = Token.query.filter(*uconditions)
 
@@ -2091,12 +2181,29 @@ def add_time_info(list_of_tokens, mode="accessed"):
 
     # finally add the time to the token
 
+    if mode == "verified":
+        column = "LinOtpLastAuthSuccess"
+    else:
+        column = "LinOtpLastAuthMatch"
+
     for token in list_of_tokens:
-        if mode == "verified":
-            token.token.LinOtpLastAuthSuccess = now_stripped
-        else:
-            token.token.LinOtpLastAuthMatch = now_stripped
+        # with a truncating time format the time info mostly is unchanged,
+        # which does not require to update the token
+
+        if getattr(token.token, column) != now_stripped:
+            token_id = getattr(token.token, "LinOtpTokenId", None)
+
+            # the time info of the stored tokens might be written in
+            # batches by the write-behind buffer
+
+            time_info_buffer = token_id and get_token_time_info_buffer()
 
+            if time_info_buffer:
+                time_info_buffer.add(column, token_id, now_stripped)
+            else:
+                setattr(token.token, column, now_stripped)
+
+        if mode != "verified":
             # we softly migrate the last_access away from the token info
 
             if token.getFromTokenInfo("last_access"):
@@ -2409,6 +2516,8 @@ def remove_token(token):
         db.session.delete(chall)
 
     # cleanup of the realm references
+    release_token_realms(token)
+
     token_id = token.LinOtpTokenId
     TokenRealm.query.filter_by(token_id=token_id).delete()
 
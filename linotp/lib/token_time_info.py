@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+write-behind buffer for the last access and last verification time of
+the tokens
+
+every validation updates the last access time of the token, which results
+in a row update of the token in the request transaction. With the write
+behind, the time info of the tokens is collected in memory per LinOTP
+process and written with batched updates by a background thread every
+TOKEN_TIME_INFO_FLUSH_INTERVAL seconds.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from sqlalchemy import and_, bindparam, or_
+
+from flask import current_app
+
+from linotp.model import db
+from linotp.model.token import Token
+
+log = logging.getLogger(__name__)
+
+
+class TokenTimeInfoBuffer:
+    """
+    buffer of the pending time info updates of the tokens
+    """
+
+    def __init__(self, engine, interval):
+        """
+        :param engine: the database engine for the batched updates
+        :param interval: the number of seconds between two flushes
+        """
+
+        self.engine = engine
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._pending = {}
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="token-time-info", daemon=True
+        )
+        self._thread.start()
+
+    def add(self, column, token_id, timestamp):
+        """
+        remember the time info of a token - only the latest time info of
+        a token is kept
+
+        :param column: the name of the time info column of the token
+        :param token_id: the id of the token
+        :param timestamp: the new time info
+        """
+
+        key = (column, token_id)
+
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is None or previous < timestamp:
+                self._pending[key] = timestamp
+
+    def flush(self):
+        """
+        write all pending time infos with one batched update per column
+
+        a time info is only written if it is newer than the stored one, as
+        an other LinOTP process might have written a newer one in between.
+        If the update fails, the time infos are kept for the next flush.
+
+        :return: the number of written time infos
+        """
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        updates = defaultdict(list)
+        for (column, token_id), timestamp in pending.items():
+            updates[column].append({"b_id": token_id, "b_time": timestamp})
+
+        table = Token.__table__
+
+        try:
+            with self.engine.begin() as connection:
+                for column, rows in updates.items():
+                    time_column = table.c[column]
+
+                    connection.execute(
+                        table.update()
+                        .where(
+                            and_(
+                                table.c.LinOtpTokenId == bindparam("b_id"),
+                                or_(
+                                    time_column.is_(None),
+                                    time_column < bindparam("b_time"),
+                                ),
+                            )
+                        )
+                        .values({column: bindparam("b_time")}),
+                        rows,
+                    )
+
+        except Exception as exx:
+            log.error("Failed to write the token time info: %r", exx)
+
+            for (column, token_id), timestamp in pending.items():
+                self.add(column, token_id, timestamp)
+
+            return 0
+
+        log.debug("%d token time infos written", len(pending))
+
+        return len(pending)
+
+    def stop(self):
+        """
+        stop the background thread and write the pending time infos
+        """
+
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+_buffer = None
+_buffer_pid = None
+_buffer_lock = threading.Lock()
+
+
+def get_token_time_info_buffer():
+    """
+    get the process wide buffer for the token time info
+
+    :return: the buffer or None if the write-behind is disabled
+    """
+    global _buffer, _buffer_pid
+
+    interval = current_app.config["TOKEN_TIME_INFO_FLUSH_INTERVAL"]
+    if not interval:
+        return None
+
+    with _buffer_lock:
+        # the background thread does not survive a fork of the server process
+        if _buffer is None or _buffer_pid != os.getpid():
+            _buffer = TokenTimeInfoBuffer(db.engine, interval)
+            _buffer_pid = os.getpid()
+
+            atexit.register(_buffer.stop)
+
+        return _buffer
+
+
+# eof #
@@ -25,7 +25,15 @@
 #    Support: www.linotp.de
 #
 
+import heapq
+import threading
 import time
+from itertools import count
+
+from sqlalchemy import and_, select
+
+from linotp.model import db
+from linotp.model.expiring_item import ExpiringItem
 
 
 class ExpiringList:
@@ -61,10 +69,19 @@ class CustomExpiringList(ExpiringList):
     A simple item container with expiry time.
     A janitor runs after every new item is added to clean
     the expired items up.
+
+    The expiry times are kept in a heap, so that the janitor only has to
+    remove the expired items from the top of the heap instead of scanning
+    all items.
     """
 
     def __init__(self):
         self._itemsdic = {}
+        self._expiry_heap = []
+        # the counter orders items with the same expiry, which could not
+        # be compared with each other
+        self._counter = count()
+        self._lock = threading.Lock()
 
     def item_in_list(self, item):
         """
@@ -81,18 +98,125 @@ class CustomExpiringList(ExpiringList):
         """
         if expiry is None:
             expiry = self.DEFAULT_EXPIRY_IN
-        self.__janitor__()
-        self._itemsdic[item] = expiry + self._now()
+
+        with self._lock:
+            self.__janitor__()
+            expires = expiry + self._now()
+            self._itemsdic[item] = expires
+            heapq.heappush(
+                self._expiry_heap, (expires, next(self._counter), item)
+            )
 
     def _now(self):
         return time.time()
 
     def _is_expired(self, item):
         """assumes that item is in the list"""
-        return self._itemsdic[item] < self._now()
+        return self._itemsdic.get(item, 0) < self._now()
 
     def __janitor__(self):
         now = self._now()
-        self._itemsdic = {
-            item: ex for (item, ex) in self._itemsdic.items() if ex > now
-        }
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires, _count, item = heapq.heappop(self._expiry_heap)
+
+            # the item might have been added again with a later expiry
+            if self._itemsdic.get(item) == expires:
+                del self._itemsdic[item]
+
+
+class DatabaseExpiringList(ExpiringList):
+    """
+    An item container with expiry time, which is stored in the database,
+    so that the items are shared by all LinOTP processes.
+
+    The items are looked up by the primary key. The janitor runs at most
+    once per JANITOR_INTERVAL and removes the expired items by their
+    indexed expiry. As the items are never removed before their expiry,
+    the items which are found are kept in a local list as well.
+
+    The changes are committed with the request session, as a separate
+    connection could be blocked by the request transaction.
+    """
+
+    JANITOR_INTERVAL = 60  # seconds
+
+    def __init__(self, name):
+        """
+        :param name: the name of the list, which allows to share the
+                     database table between different lists
+        """
+        self.name = name
+        self._known_items = CustomExpiringList()
+        self._next_janitor = 0
+
+    def item_in_list(self, item):
+        """
+        :returns: True if item is in the list and not expired
+        """
+        item = str(item)
+
+        if self._known_items.item_in_list(item):
+            return True
+
+        table = ExpiringItem.__table__
+
+        expires = db.session.execute(
+            select([table.c.expiry]).where(
+                and_(table.c.name == self.name, table.c.item == item)
+            )
+        ).scalar()
+
+        now = self._now()
+
+        if expires is None or expires < now:
+            return False
+
+        self._known_items.add_item(item, expires - now)
+        return True
+
+    def add_item(self, item, expiry=None):
+        """
+        Function to add an Item to the list
+
+        :param item: the item to be kept
+        :param ex: expiry in seconds
+        """
+        if expiry is None:
+            expiry = self.DEFAULT_EXPIRY_IN
+
+        item = str(item)
+        now = self._now()
+
+        table = ExpiringItem.__table__
+
+        if now >= self._next_janitor:
+            self.__janitor__(now)
+
+        db.session.execute(
+            table.delete().where(
+                and_(table.c.name == self.name, table.c.item == item)
+            )
+        )
+        db.session.execute(
+            table.insert().values(
+                name=self.name, item=item, expiry=now + expiry
+            )
+        )
+
+        # the item must be known to the other processes immediately
+        db.session.commit()
+
+        self._known_items.add_item(item, expiry)
+
+    def _now(self):
+        return time.time()
+
+    def __janitor__(self, now):
+        table = ExpiringItem.__table__
+
+        db.session.execute(
+            table.delete().where(
+                and_(table.c.name == self.name, table.c.expiry < now)
+            )
+        )
+        self._next_janitor = now + self.JANITOR_INTERVAL
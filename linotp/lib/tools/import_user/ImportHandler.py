@@ -80,6 +80,27 @@ class ImportHandler(object):
 
     # ---------------------------------------------------------------------- --
 
+    # bulk interface - used by the UserImport to process all users at once
+
+    def lookup_all(self):
+        """
+        get all already existing users of the import with one lookup
+
+        :return: dict of the existing users by userid
+        """
+        raise NotImplementedError
+
+    def add_users(self, users):
+        raise NotImplementedError
+
+    def update_users(self, users):
+        raise NotImplementedError
+
+    def delete_users(self, user_ids):
+        raise NotImplementedError
+
+    # ---------------------------------------------------------------------- --
+
     # inner class to process the orm user object
 
     class User(object):
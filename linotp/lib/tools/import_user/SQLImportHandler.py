@@ -36,6 +36,7 @@
 import json
 import logging
 
+from sqlalchemy import and_, bindparam, select
 from sqlalchemy.engine import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -349,6 +350,131 @@ class SQLImportHandler(ImportHandler):
 
     # ---------------------------------------------------------------------- --
 
+    # bulk user functions - the users are written with one statement per
+    # call, which is executed with the parameters of all users (executemany)
+
+    def _get_user_row(self, user):
+        """
+        helper - get the column values of a user for the bulk statements
+
+        :param user: the user with the new values
+        :return: dict with the values of all user entries
+        """
+        user_row = {}
+
+        for entry in ImportedUser.user_entries:
+            value = getattr(user, entry, None)
+            user_row[entry] = value if value is not None else ""
+
+        user_row["groupid"] = self.groupid
+
+        return user_row
+
+    def lookup_all(self):
+        """
+        get all users of the groupid with one query
+
+        :return: dict of the existing users by userid
+        """
+
+        session = self.db_context.get_session()
+        table = ImportedUser.__table__
+
+        rows = session.execute(
+            select([table]).where(table.c.groupid == self.groupid)
+        )
+
+        former_users = {}
+
+        for row in rows:
+            user = ImportedUser()
+            for entry in ImportedUser.user_entries:
+                user.set(entry, row[entry])
+
+            former_users[user.userid] = user
+
+        return former_users
+
+    def add_users(self, users):
+        """
+        insert the new users
+
+        :param users: list of the new users
+        """
+
+        if not users:
+            return
+
+        session = self.db_context.get_session()
+        table = ImportedUser.__table__
+
+        session.execute(
+            table.insert(), [self._get_user_row(user) for user in users]
+        )
+
+    def update_users(self, users):
+        """
+        update the modified users
+
+        :param users: list of the users with the new values
+        """
+
+        if not users:
+            return
+
+        session = self.db_context.get_session()
+        table = ImportedUser.__table__
+
+        update = (
+            table.update()
+            .where(
+                and_(
+                    table.c.groupid == bindparam("b_groupid"),
+                    table.c.userid == bindparam("b_userid"),
+                )
+            )
+            .values(
+                {
+                    entry: bindparam(entry)
+                    for entry in ImportedUser.user_entries
+                    if entry not in ("groupid", "userid")
+                }
+            )
+        )
+
+        user_rows = []
+        for user in users:
+            user_row = self._get_user_row(user)
+            user_row["b_groupid"] = user_row.pop("groupid")
+            user_row["b_userid"] = user_row.pop("userid")
+            user_rows.append(user_row)
+
+        session.execute(update, user_rows)
+
+    def delete_users(self, user_ids):
+        """
+        delete the users, which are not contained in the import anymore
+
+        :param user_ids: list of the user ids
+        """
+
+        if not user_ids:
+            return
+
+        session = self.db_context.get_session()
+        table = ImportedUser.__table__
+
+        session.execute(
+            table.delete().where(
+                and_(
+                    table.c.groupid == self.groupid,
+                    table.c.userid.in_(user_ids),
+                )
+            )
+        )
+
+    # ---------------------------------------------------------------------- --
+
     # inner class to process the orm user object
 
 
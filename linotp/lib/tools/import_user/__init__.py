@@ -46,6 +46,9 @@ from linotp.model.imported_user import ImportedUser
 
 log = logging.getLogger(__name__)
 
+# the number of users, which are written with one statement
+IMPORT_CHUNK_SIZE = 1000
+
 
 class FormatReader(object):
     """
@@ -167,36 +170,41 @@ class UserImport(object):
         dryrun=False,
         format_reader=DefaultFormatReader,
         passwords_in_plaintext=False,
+        chunk_size=IMPORT_CHUNK_SIZE,
     ):
         """
         insert and update users
 
-        update of users is done in 2 steps
+        the import is done in bulk:
 
-        0. get a list of all former stored userid
-        1. insert all csv data, either update or create
-        2. all former entries, which have not been update, will be removed
+        0. get all former stored users of the import with one lookup
+        1. compare the csv data with the former users in memory to get the
+           users to be created, modified and deleted
+        2. write the differences chunk wise with one statement per chunk
 
+        :param chunk_size: the number of users, which are written at once
+        :return: dict with the created, updated (not modified), modified
+                 and deleted users and a summary with the numbers of users
         """
-        users_deleted = {}
         users_created = {}
         users_not_modified = {}
         users_modified = {}
         processed_users = {}
-
-        former_userids_to_be_removed = self.import_handler.prepare()
+        processed_usernames = set()
 
         try:
+            former_users = self.import_handler.lookup_all()
+
             # -------------------------------------------------------------- --
 
-            # finally remove all former, not updated users
-            # update or insert all user from the csv data
+            # compare the users from the csv data with the former users -
+            # the passwords are hashed later, only for the changed users
 
             for user in self.get_users_from_data(
                 csv_data,
                 format_reader,
                 passwords_in_plaintext=passwords_in_plaintext,
-                hash_passwords=not dryrun,
+                hash_passwords=False,
             ):
                 # only store valid users that have a userid and a username
                 if not user.userid or not user.username:
@@ -204,39 +212,35 @@ class UserImport(object):
 
                 # prevent processing user multiple times
                 if (user.userid in processed_users) or (
-                    user.username in processed_users.values()
+                    user.username in processed_usernames
                 ):
                     raise Exception(
                         "Violation of unique constraint - "
                         "duplicate user in data: %r" % user
                     )
-                else:
-                    processed_users[user.userid] = user.username
 
-                # search for the user
-                former_user = self.import_handler.lookup(user)
-                # if it does not exist we create a new one
+                processed_users[user.userid] = user.username
+                processed_usernames.add(user.username)
+
+                # if the user does not exist we create a new one
+                former_user = former_users.get(user.userid)
+
                 if not former_user:
                     users_created[user.userid] = user
+
+                elif user == former_user:
+                    users_not_modified[user.userid] = user
+
                 else:
-                    # if it already exists remove it from the list of annihilation
-                    # those who remain in former_userids_to_be_removed will be deleted
-                    if former_user.userid in former_userids_to_be_removed:
-                        del former_userids_to_be_removed[former_user.userid]
-
-                    if user == former_user:
-                        users_not_modified[user.userid] = user
-                    else:
-                        users_modified[user.userid] = {
-                            "former_user": former_user,
-                            "new_user": user,
-                        }
+                    users_modified[user.userid] = user
 
             # finally remove all former, not updated users
-            for del_userid, del_user_name in list(
-                former_userids_to_be_removed.items()
-            ):
-                users_deleted[del_userid] = del_user_name
+
+            users_deleted = {
+                userid: former_user.username
+                for userid, former_user in former_users.items()
+                if userid not in processed_users
+            }
 
             # prepare the results to send back
             result = {
@@ -249,20 +253,52 @@ class UserImport(object):
                     for userid, user in users_not_modified.items()
                 },
                 "modified": {
-                    userid: u["new_user"].username
-                    for userid, u in users_modified.items()
+                    userid: user.username
+                    for userid, user in users_modified.items()
                 },
                 "deleted": users_deleted,
+                "summary": {
+                    "created": len(users_created),
+                    "updated": len(users_not_modified),
+                    "modified": len(users_modified),
+                    "deleted": len(users_deleted),
+                },
             }
 
+            log.info("user import summary: %r", result["summary"])
+
             # wet run:
             if not dryrun:
-                for user in users_created.values():
-                    self.import_handler.add(user)
-                for u in users_modified.values():
-                    self.import_handler.update(u["former_user"], u["new_user"])
-                for del_userid in users_deleted:
-                    self.import_handler.delete_by_id(del_userid)
+                changed_users = list(users_created.values()) + list(
+                    users_modified.values()
+                )
+
+                if passwords_in_plaintext:
+                    for user in changed_users:
+                        user.password = user.create_password_hash(
+                            user.plain_password
+                        )
+
+                self._process_chunks(
+                    "created",
+                    self.import_handler.add_users,
+                    list(users_created.values()),
+                    chunk_size,
+                )
+
+                self._process_chunks(
+                    "modified",
+                    self.import_handler.update_users,
+                    list(users_modified.values()),
+                    chunk_size,
+                )
+
+                self._process_chunks(
+                    "deleted",
+                    self.import_handler.delete_users,
+                    list(users_deleted.keys()),
+                    chunk_size,
+                )
 
                 self.import_handler.commit()
 
@@ -276,6 +312,26 @@ class UserImport(object):
         finally:
             self.import_handler.close()
 
+    @staticmethod
+    def _process_chunks(action, process, items, chunk_size):
+        """
+        helper - process the list of users or userids in chunks
+
+        :param action: the name of the action for the progress report
+        :param process: the bulk function of the import handler
+        :param items: the list of users or userids
+        :param chunk_size: the number of items per chunk
+        """
+
+        total = len(items)
+
+        for start in range(0, total, chunk_size):
+            chunk = items[start : start + chunk_size]
+            process(chunk)
+
+            done = start + len(chunk)
+            log.info("user import: %s %d of %d users", action, done, total)
+
 
 # ------------------------------------------------------------------------- --
 
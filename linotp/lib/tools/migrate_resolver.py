@@ -34,31 +34,56 @@ import logging
 from datetime import datetime
 
 from flask_babel import gettext as _
-from sqlalchemy import and_
+from sqlalchemy import and_, bindparam
 
 from flask import g
 
-from linotp.lib.context import request_context as context
 from linotp.lib.resolver import getResolverClassName, getResolverObject
 from linotp.lib.tools import ToolsHandler
-from linotp.lib.user import getUserInfo
 from linotp.model import Token, db
+from linotp.model.token import normalize_resolver_class
+from linotp.model.token_counter import mark_bulk_token_changes
 
 log = logging.getLogger(__name__)
 
+# the number of tokens, which are migrated with one bulk lookup in the
+# resolvers and one bulk update of the token table
+MIGRATION_CHUNK_SIZE = 500
+
 
 class MigrateResolverHandler(ToolsHandler):
-    def migrate_resolver(self, src=None, target=None, filter_serials=None):
+    def migrate_resolver(
+        self,
+        src=None,
+        target=None,
+        filter_serials=None,
+        dryrun=False,
+        chunk_size=None,
+        commit=False,
+    ):
         """
         support the migration of owned tokens from one resolver to a new one
 
         the idea is:
-        - get all tokens from one resolver
-        - for each token, the the owner
-        - from the owner get the login name
-        - with the login name get the uid from the target resolver
-        - update the new_id in the token
+        - get the serial and owner of all tokens from one resolver
+        - process the tokens in chunks, where for each chunk
+          - the login names of the owners are looked up in the src resolver
+          - with the login names the uids are looked up in the target
+            resolver - both with one bulk lookup
+          - the resolver and new uid of the tokens are updated with one
+            bulk update statement
+
+        as only the tokens of the src resolver are selected, a migration
+        with commit per chunk, which was interrupted, could be resumed by
+        simply starting it again.
 
+        :param src: the src resolver definition
+        :param target: the target resolver definition
+        :param filter_serials: optional comma separated list of serials
+        :param dryrun: only report which tokens could be migrated
+        :param chunk_size: number of tokens per chunk
+        :param commit: commit the database transaction after each chunk
+        :return: dict with the migration result
         """
 
         ret = {}
@@ -66,6 +91,8 @@ class MigrateResolverHandler(ToolsHandler):
         if not src or not target:
             raise Exception("Missing src or target resolver defintion!")
 
+        chunk_size = chunk_size or MIGRATION_CHUNK_SIZE
+
         now = datetime.now()
         stime = now.strftime("%s")
 
@@ -84,80 +111,166 @@ class MigrateResolverHandler(ToolsHandler):
             target["type"], target["resolvername"]
         )
 
-        # get all tokens of src resolver
-        tokens = self._get_tokens_for_resolver(search, serials=filter_serials)
+        # get the serial and owner of all tokens of src resolver
+        token_owners = self._get_token_owners(search, serials=filter_serials)
 
-        num_migration = 0
+        src_resolver_obj = getResolverObject(search)
+        target_resolver_obj = getResolverObject(target_resolver)
+
+        total = len(token_owners)
         serials = set()
-        for token in tokens:
-            serial = token.get("LinOtpTokenSerialnumber")
-            userid = token.get("LinOtpUserid")
-            resolverC = token.get("LinOtpIdResClass")
-            # now do the lookup of the uid in the
-            # src resolver to get the login
-            uInfo = getUserInfo(userid, "", resolverC)
-
-            login = uInfo.get("username")
+        not_found = []
+
+        for start in range(0, total, chunk_size):
+            chunk = token_owners[start : start + chunk_size]
+
+            # a failing lookup must not be taken for users, which could not
+            # be found - the migration is aborted instead
+
             try:
-                y = getResolverObject(target_resolver)
-                uid = y.getUserId(login)
+                usernames = src_resolver_obj.getUsernames(
+                    {userid for _serial, userid in chunk}
+                )
+                target_userids = target_resolver_obj.getUserIds(
+                    set(usernames.values())
+                )
+
+            except Exception as exx:
+                log.error(
+                    "resolver migration aborted after %d of %d tokens: %r",
+                    start,
+                    total,
+                    exx,
+                )
+                raise Exception(
+                    "User lookup failed - migration aborted after %d of %d "
+                    "tokens: %r" % (start, total, exx)
+                ) from exx
+
+            migrations = []
+            for serial, userid in chunk:
+                login = usernames.get(userid)
+                uid = target_userids.get(login) if login else None
+
                 if not uid:
                     log.warning(
                         "User %s not found in target resolver %r",
                         login,
                         target_resolver,
                     )
+                    not_found.append(serial)
                     continue
 
-                token.LinOtpIdResClass = target_resolver
-                token.LinOtpUserid = uid
-                # TODO: adjust
-                token.LinOtpIdResolver = target["type"]
-                db.session.add(token)
-
-                num_migration += 1
+                migrations.append({"b_serial": serial, "b_userid": uid})
                 serials.add(serial)
 
-            except Exception as exx:
-                log.error(
-                    "Faild to set new resolver data for token %s: %r",
-                    serial,
-                    exx,
+            if not dryrun and migrations:
+                self._update_tokens(
+                    migrations, search, target_resolver, target["type"]
                 )
 
+                if commit:
+                    db.session.commit()
+
+            done = start + len(chunk)
+            log.info(
+                "resolver migration: %d of %d tokens processed", done, total
+            )
+
         ret["value"] = True
-        ret["message"] = _("%d tokens of %d migrated") % (
-            num_migration,
-            len(tokens),
-        )
+        ret["report"] = {
+            "dryrun": dryrun,
+            "tokens": total,
+            "migrated": len(serials),
+            "not_found": not_found,
+        }
+
+        if dryrun:
+            ret["message"] = _("%d tokens of %d could be migrated") % (
+                len(serials),
+                total,
+            )
+        else:
+            ret["message"] = _("%d tokens of %d migrated") % (
+                len(serials),
+                total,
+            )
+
         g.audit["info"] = "[%s] %s" % (stime, ret["message"])
-        g.audit["serial"] = ",".join(list(serials))
+        g.audit["serial"] = ",".join(sorted(serials))
         g.audit["success"] = True
 
         return ret
 
-    def _get_tokens_for_resolver(self, resolverClass, serials=None):
+    @staticmethod
+    def _update_tokens(migrations, src_class, target_class, target_type):
         """
-        get the tokens of the src resolver
+        update the owner of the tokens with one bulk update statement
+
+        the bulk update bypasses the orm events of the token:
+        - the resolver class is normalized here like by the attribute event
+        - the token counters are not affected, as the active state and the
+          realms of the tokens are not changed and the tokens stay assigned:
+          only tokens of a src resolver owner, who has a userid in the
+          target resolver, are migrated
+        - the token changes generation is incremented, as the token owners
+          are part of the token user volume
 
-        :param resolverClass: the resolver class defintions as in the tokendb
-        :param serials: the set of serials, which should be worked out
-                        - if None, all tokens of the resolvers are searched
+        :param migrations: list of dicts with the serial and the new userid
+        :param src_class: the resolver class of the src resolver - only
+                          tokens still owned by the src resolver are updated
+        :param target_class: the resolver class of the target resolver
+        :param target_type: the type of the target resolver
         """
 
-        rcondition = and_(Token.LinOtpIdResClass.like(resolverClass))
-        scondition = None
-        if serials:
-            # filter token serials
-            serials = ",".join(serials.split(","))
-            scondition = and_(Token.LinOtpTokenSerialnumber.in_(serials))
+        table = Token.__table__
+
+        statement = (
+            table.update()
+            .where(
+                and_(
+                    table.c.LinOtpTokenSerialnumber == bindparam("b_serial"),
+                    table.c.LinOtpIdResClass == src_class,
+                )
+            )
+            .values(
+                LinOtpUserid=bindparam("b_userid"),
+                LinOtpIdResClass=normalize_resolver_class(target_class),
+                # TODO: adjust
+                LinOtpIdResolver=target_type,
+            )
+        )
 
-        #  create the final condition as AND of all conditions
-        condTuple = ()
-        for conn in (scondition, rcondition):
-            if type(conn).__name__ != "NoneType":
-                condTuple += (conn,)
+        db.session.execute(statement, migrations)
 
-        tokens = Token.query.filter(*condTuple).all()
+        mark_bulk_token_changes()
+
+    @staticmethod
+    def _get_token_owners(resolverClass, serials=None):
+        """
+        get the serial and owner userid of the tokens of the src resolver
+
+        :param resolverClass: the resolver class defintion as in the tokendb
+        :param serials: the comma separated serials, which should be worked
+                        out - if None, all tokens of the resolver are searched
+        :return: list of tuples of serial and userid, ordered by serial
+        """
+
+        conditions = [Token.LinOtpIdResClass == resolverClass]
+
+        if serials:
+            if isinstance(serials, str):
+                serials = serials.split(",")
+            conditions.append(
+                Token.LinOtpTokenSerialnumber.in_(
+                    [serial.strip() for serial in serials]
+                )
+            )
+
+        query = (
+            db.session.query(Token.LinOtpTokenSerialnumber, Token.LinOtpUserid)
+            .filter(*conditions)
+            .order_by(Token.LinOtpTokenSerialnumber)
+        )
 
-        return tokens
+        return [(serial, userid) for serial, userid in query]
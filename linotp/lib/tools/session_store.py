@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+stores for the authenticated userservice sessions
+
+the sessions expire by their time to live. The memory store is limited in
+size and is local to the LinOTP process, while the database store is shared
+by all LinOTP processes, so that the requests of a session could be served
+by any of them.
+"""
+
+import heapq
+import json
+import threading
+import time
+from itertools import count
+
+from sqlalchemy import and_, select
+
+from linotp.model import db
+from linotp.model.expiring_item import ExpiringItem
+
+
+class SessionStore:
+
+    """
+    An interface class for a storage of session data in which each
+    session has it's own expiry time
+    """
+
+    def get(self, key):
+        """
+        :returns: the session data or None if unknown or expired
+        """
+        pass
+
+    def set(self, key, data, expiry):
+        """
+        store the session data
+
+        :param key: the session key
+        :param data: the json serializable session data
+        :param expiry: expiry in seconds
+        """
+        pass
+
+    def delete(self, key):
+        """
+        remove the session
+        """
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    session store of the LinOTP process with a maximum number of sessions
+
+    the expiry times are kept in a heap, so that the expired sessions are
+    removed from the top of the heap. If the store is full, the sessions
+    which expire first are evicted.
+    """
+
+    def __init__(self, max_sessions):
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._expiry_heap = []
+        # the counter orders sessions with the same expiry
+        self._counter = count()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        expires, data = self._sessions.get(key, (0, None))
+        if expires < time.time():
+            return None
+        return data
+
+    def set(self, key, data, expiry):
+        expires = time.time() + expiry
+
+        with self._lock:
+            self._janitor(time.time())
+
+            while len(self._sessions) >= self.max_sessions:
+                self._pop()
+
+            self._sessions[key] = (expires, data)
+            heapq.heappush(
+                self._expiry_heap, (expires, next(self._counter), key)
+            )
+
+    def delete(self, key):
+        # the heap entry is dropped by the janitor
+        self._sessions.pop(key, None)
+
+    def _pop(self):
+        expires, _count, key = heapq.heappop(self._expiry_heap)
+
+        # the session might have been replaced with a later expiry
+        if self._sessions.get(key, (None,))[0] == expires:
+            del self._sessions[key]
+
+    def _janitor(self, now):
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            self._pop()
+
+
+class DatabaseSessionStore(SessionStore):
+    """
+    session store in the database, which is shared by all LinOTP processes
+
+    the sessions are looked up by the primary key. The janitor runs at most
+    once per JANITOR_INTERVAL and removes the expired sessions by their
+    indexed expiry. The changes are committed with the request session, as
+    a separate connection could be blocked by the request transaction.
+    """
+
+    JANITOR_INTERVAL = 60  # seconds
+
+    def __init__(self, name):
+        """
+        :param name: the name of the store in the expiring item table
+        """
+        self.name = name
+        self._next_janitor = 0
+
+    def _condition(self, key):
+        table = ExpiringItem.__table__
+        return and_(table.c.name == self.name, table.c.item == key)
+
+    def get(self, key):
+        table = ExpiringItem.__table__
+
+        row = db.session.execute(
+            select([table.c.expiry, table.c.value]).where(self._condition(key))
+        ).first()
+
+        if row is None or row.expiry < time.time():
+            return None
+
+        return json.loads(row.value)
+
+    def set(self, key, data, expiry):
+        now = time.time()
+        table = ExpiringItem.__table__
+
+        if now >= self._next_janitor:
+            db.session.execute(
+                table.delete().where(
+                    and_(table.c.name == self.name, table.c.expiry < now)
+                )
+            )
+            self._next_janitor = now + self.JANITOR_INTERVAL
+
+        db.session.execute(table.delete().where(self._condition(key)))
+        db.session.execute(
+            table.insert().values(
+                name=self.name,
+                item=key,
+                expiry=now + expiry,
+                value=json.dumps(data),
+            )
+        )
+
+        # the session must be known to the other processes immediately
+        db.session.commit()
+
+    def delete(self, key):
+        table = ExpiringItem.__table__
+
+        db.session.execute(table.delete().where(self._condition(key)))
+        db.session.commit()
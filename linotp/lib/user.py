@@ -28,14 +28,21 @@
 
 import json
 import logging
+import os
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from functools import partial
 from typing import Dict
 
 from flask_jwt_extended.utils import get_jwt_identity
 
-from flask import g
+from flask import current_app, g
 
+from linotp.lib import metrics
 from linotp.lib.cache import get_cache
 from linotp.lib.config import getFromConfig, getLinotpConfig, storeConfig
 from linotp.lib.context import request_context
@@ -63,6 +70,10 @@ class NoResolverFound(Exception):
     pass
 
 
+class ResolverTimeout(ResolverNotAvailable):
+    pass
+
+
 class User(object):
     def __init__(self, login="", realm="", resolver_config_identifier=""):
         log.debug(
@@ -916,6 +927,302 @@ def getResolversOfUser(user):
     return resolver_match
 
 
+# -------------------------------------------------------------------------- --
+
+# fan-out of the resolver requests:
+# the user lookups in the resolvers of a realm are queried concurrently by a
+# process wide pool of worker threads, so that a realm with multiple (remote)
+# resolvers pays the latency of the slowest resolver and not the sum of all
+# latencies. The long running user list iterators are read by worker threads
+# of their own request, so that a large user list does not block the user
+# lookups of the other requests.
+
+_resolver_executor = None
+_resolver_executor_pid = None
+_resolver_executor_lock = threading.Lock()
+
+# the number of user chunks, which are buffered per resolver user iterator
+USER_ITERATOR_BUFFER = 8
+
+
+def _get_fanout_workers():
+    """
+    helper - get the number of resolver worker threads
+
+    :return: the number of workers or 0 if the fan-out is disabled
+    """
+
+    max_workers = current_app.config["RESOLVER_FANOUT_WORKERS"]
+    if max_workers < 2:
+        return 0
+
+    return max_workers
+
+
+def _get_resolver_executor():
+    """
+    get the process wide thread pool for the resolver requests
+
+    :return: the executor or None if the fan-out is disabled
+    """
+    global _resolver_executor, _resolver_executor_pid
+
+    max_workers = _get_fanout_workers()
+    if not max_workers:
+        return None
+
+    with _resolver_executor_lock:
+        # the worker threads do not survive a fork of the server process
+        if _resolver_executor is None or _resolver_executor_pid != os.getpid():
+            _resolver_executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="resolver"
+            )
+            _resolver_executor_pid = os.getpid()
+
+        return _resolver_executor
+
+
+def _in_request_scope(func):
+    """
+    wrap a function to be run by a resolver worker thread
+
+    the worker runs in its own application context, which shares the request
+    globals of the calling request like the request_context with the config,
+    the hsm and the request local lookup caches and the audit entry
+
+    :param func: the function to be wrapped
+    :return: the wrapped function
+    """
+    app = current_app._get_current_object()
+    request_globals = dict(g.__dict__)
+
+    # the time of the workers is part of the request stage of the caller
+    request_globals.pop("request_timer", None)
+
+    def run(*args, **kwargs):
+        with app.app_context():
+            g.__dict__.update(request_globals)
+            return func(*args, **kwargs)
+
+    return run
+
+
+def _resolver_timed_out(resolver_spec):
+    """
+    helper - log and audit a resolver, which did not answer in time
+    """
+
+    log.error("timeout while waiting for resolver %r", resolver_spec)
+
+    if not g.audit["action_detail"]:
+        g.audit["action_detail"] = "Failed to connect to:"
+
+    g.audit["action_detail"] += "%s, " % resolver_spec
+
+
+def fan_out_resolvers(func, resolver_specs):
+    """
+    call func(resolver_spec) for all resolvers concurrently
+
+    the results are yielded in the order of the resolver specs, so that the
+    first match precedence of the resolver order is preserved.
+
+    :param func: the function, which is called with the resolver spec
+    :param resolver_specs: list of the resolver specs
+    :return: generator of (resolver_spec, result) tuples
+    :raises ResolverTimeout: if a resolver does not answer within
+                             RESOLVER_FANOUT_TIMEOUT seconds - the results
+                             are incomplete and the caller can not tell if
+                             the resolver would have had a result
+    """
+
+    executor = _get_resolver_executor()
+
+    if executor is None or len(resolver_specs) < 2:
+        for resolver_spec in resolver_specs:
+            yield resolver_spec, func(resolver_spec)
+        return
+
+    run = _in_request_scope(func)
+    futures = [
+        (resolver_spec, executor.submit(run, resolver_spec))
+        for resolver_spec in resolver_specs
+    ]
+
+    # all resolvers are queried at the same time - so the per resolver
+    # timeout is one common deadline
+
+    deadline = time.monotonic() + current_app.config["RESOLVER_FANOUT_TIMEOUT"]
+
+    try:
+        for resolver_spec, future in futures:
+            try:
+                result = future.result(
+                    timeout=max(0, deadline - time.monotonic())
+                )
+            except FutureTimeoutError:
+                _resolver_timed_out(resolver_spec)
+                raise ResolverTimeout(
+                    "timeout while waiting for resolver %r" % resolver_spec
+                )
+
+            yield resolver_spec, result
+
+    finally:
+        for _resolver_spec, future in futures:
+            future.cancel()
+
+
+def _buffer_user_iterator(user_iterator, chunks, slots, stop, timeout):
+    """
+    worker - read the user iterator of a resolver into the chunk queue
+
+    the queue entries are tuples of (kind, data), where kind is one of
+    'users', 'error' or 'end'. The number of buffered user chunks is limited
+    by the slots semaphore, so that the final 'error' or 'end' entry can
+    always be put into the queue.
+
+    :param user_iterator: the user iterator of the resolver
+    :param chunks: the queue of the user chunks
+    :param slots: semaphore of the free user chunk slots in the queue
+    :param stop: event, which is set if the consumer is gone
+    :param timeout: seconds to wait for the consumer to take a chunk
+    """
+
+    def acquire_slot():
+        deadline = time.monotonic() + timeout
+        while not stop.is_set():
+            if slots.acquire(timeout=1):
+                return True
+            if time.monotonic() > deadline:
+                return False
+        return False
+
+    try:
+        for user_data in user_iterator:
+            if not acquire_slot():
+                if stop.is_set():
+                    return
+
+                log.warning("user list consumer stalled - giving up")
+                chunks.put(
+                    ("error", ResolverTimeout("user list consumer stalled"))
+                )
+                return
+
+            chunks.put(("users", user_data))
+
+    except Exception as exx:
+        chunks.put(("error", exx))
+        return
+
+    chunks.put(("end", None))
+
+
+def _read_user_iterator(chunks, slots, resolver_spec, stop, timeout):
+    """
+    generator - yield the buffered user chunks of a resolver
+
+    :param chunks: the queue of the user chunks
+    :param slots: semaphore of the free user chunk slots in the queue
+    :param resolver_spec: the resolver of the user iterator
+    :param stop: event, which stops the workers when the consumer is gone
+    :param timeout: seconds to wait for the next chunk of the resolver
+    :return: generator of user chunks
+    :raises ResolverTimeout: if the resolver does not answer in time
+    """
+
+    try:
+        while True:
+            try:
+                kind, data = chunks.get(timeout=timeout)
+            except queue.Empty:
+                _resolver_timed_out(resolver_spec)
+                raise ResolverTimeout(
+                    "timeout while waiting for resolver %r" % resolver_spec
+                )
+
+            if kind == "end":
+                return
+
+            if kind == "error":
+                raise data
+
+            slots.release()
+            yield data
+
+    except GeneratorExit:
+        # the consumer is gone
+        stop.set()
+        raise
+
+
+def fan_out_user_iterators(user_iterators):
+    """
+    read the user iterators of the resolvers concurrently
+
+    every user iterator is consumed by a worker thread, which buffers the
+    user chunks in a bounded queue. The returned iterators yield from these
+    queues, so that the consumer keeps the order of the resolvers while all
+    resolvers are queried in parallel.
+
+    The worker threads belong to the calling request: a user list might be
+    read for a long time and must not occupy the process wide workers of
+    the user lookups.
+
+    :param user_iterators: list of tuple (userlist iterators, resolver spec)
+    :return: list of tuple (userlist iterators, resolver spec)
+    """
+
+    max_workers = _get_fanout_workers()
+
+    if not max_workers or len(user_iterators) < 2:
+        return user_iterators
+
+    timeout = current_app.config["RESOLVER_FANOUT_TIMEOUT"]
+
+    # a common stop event - if the consumer stops reading one of the
+    # iterators, the response is gone and all workers could stop
+
+    stop = threading.Event()
+    buffer_user_iterator = _in_request_scope(_buffer_user_iterator)
+
+    executor = ThreadPoolExecutor(
+        max_workers=min(max_workers, len(user_iterators)),
+        thread_name_prefix="userlist",
+    )
+
+    buffered_iterators = []
+
+    try:
+        for user_iterator, resolver_spec in user_iterators:
+            chunks = queue.Queue()
+            slots = threading.Semaphore(USER_ITERATOR_BUFFER)
+            executor.submit(
+                buffer_user_iterator,
+                user_iterator,
+                chunks,
+                slots,
+                stop,
+                timeout,
+            )
+            buffered_iterators.append(
+                (
+                    _read_user_iterator(
+                        chunks, slots, resolver_spec, stop, timeout
+                    ),
+                    resolver_spec,
+                )
+            )
+
+    finally:
+        # the submitted workers continue - the threads terminate when done
+        executor.shutdown(wait=False)
+
+    return buffered_iterators
+
+
+@metrics.stage("resolver")
 def get_resolvers_of_user(login, realm):
     """
     get the resolvers of a given user, identified by loginname and realm
@@ -928,6 +1235,7 @@ def get_resolvers_of_user(login, realm):
             return []
 
         log.info("cache miss %r@%r", login, realm)
+        metrics.inc("linotp_cache_misses_total", cache="resolver_lookup")
         Resolvers = []
         resolvers_of_realm = (
             getRealms(realm).get(realm, {}).get("useridresolver", [])
@@ -937,14 +1245,16 @@ def get_resolvers_of_user(login, realm):
             "check if user %r is in resolver %r", login, resolvers_of_realm
         )
 
-        # Search for user in each resolver in the realm
+        # Search for user in all resolvers of the realm
 
-        for resolver_spec in resolvers_of_realm:
+        def _lookup_user(resolver_spec):
             log.debug("checking in %r", resolver_spec)
+            return lookup_user_in_resolver(login, None, resolver_spec)
 
-            r_login, r_uid, r_user_info = lookup_user_in_resolver(
-                login, None, resolver_spec
-            )
+        for resolver_spec, result in fan_out_resolvers(
+            _lookup_user, resolvers_of_realm
+        ):
+            r_login, r_uid, r_user_info = result
 
             if not any((r_login, r_uid, r_user_info)):
                 continue
@@ -987,6 +1297,8 @@ def get_resolvers_of_user(login, realm):
     # if no caching is enabled, we just return the result of the inner func
     # otherwise we have to provide the partial function to the beaker cache
 
+    metrics.inc("linotp_cache_lookups_total", cache="resolver_lookup")
+
     try:
         if not resolvers_lookup_cache:
             Resolvers = _get_resolvers_of_user(login=login, realm=realm)
@@ -1004,6 +1316,13 @@ def get_resolvers_of_user(login, realm):
         log.info("No resolver found for user %r in realm %r", login, realm)
         return []
 
+    except ResolverTimeout:
+        # the lookup is incomplete: the user might be in the resolver, which
+        # did not answer - so the result is neither cached nor taken as
+        # user not found
+        log.error("resolver lookup for %r in realm %r timed out", login, realm)
+        raise
+
     except Exception as exx:
         log.error("unknown exception during resolver lookup")
         raise exx
@@ -1063,6 +1382,7 @@ def delete_from_realm_resolver_local_cache(login, realmname):
         del request_context["UserRealmLookup"][p_key]
 
 
+@metrics.stage("resolver")
 def lookup_user_in_resolver(login, user_id, resolver_spec, user_info=None):
     """
     lookup login or uid in resolver to get userinfo
@@ -1108,6 +1428,8 @@ def lookup_user_in_resolver(login, user_id, resolver_spec, user_info=None):
             r_user_id = user_info["userid"]
             return r_login, r_user_id, user_info
 
+        metrics.inc("linotp_cache_misses_total", cache="user_lookup")
+
         if not resolver_spec:
             log.error("missing resolver spec %r", resolver_spec)
             raise Exception("missing resolver spec %r" % resolver_spec)
@@ -1120,19 +1442,29 @@ def lookup_user_in_resolver(login, user_id, resolver_spec, user_info=None):
                 "Failed to access Resolver: %r" % resolver_spec
             )
 
+        _cls_identifier, resolver_name = parse_resolver_spec(resolver_spec)
+
         if login:
-            r_user_id = y.getUserId(login)
+            with metrics.timed(
+                "linotp_resolver_lookup_seconds", resolver=resolver_name
+            ):
+                r_user_id = y.getUserId(login)
+                if r_user_id:
+                    r_user_info = y.getUserInfo(r_user_id)
+
             if not r_user_id:
                 log.error("Failed get user info for login %r", login)
                 raise NoResolverFound(
                     "Failed get user info for login %r" % login
                 )
 
-            r_user_info = y.getUserInfo(r_user_id)
             return login, r_user_id, r_user_info
 
         elif user_id:
-            r_user_info = y.getUserInfo(user_id)
+            with metrics.timed(
+                "linotp_resolver_lookup_seconds", resolver=resolver_name
+            ):
+                r_user_info = y.getUserInfo(user_id)
 
             if not r_user_info:
                 log.error("Failed get user info for user_id %r", user_id)
@@ -1169,6 +1501,9 @@ def lookup_user_in_resolver(login, user_id, resolver_spec, user_info=None):
 
     user_lookup_cache = _get_user_lookup_cache(resolver_spec)
 
+    if not user_info:
+        metrics.inc("linotp_cache_lookups_total", cache="user_lookup")
+
     try:
         if not user_lookup_cache:
             log.info("lookup user without user lookup cache")
@@ -1206,6 +1541,8 @@ def lookup_user_in_resolver(login, user_id, resolver_spec, user_info=None):
 
                 p_key2 = json.dumps(key2)
 
+                metrics.inc("linotp_cache_lookups_total", cache="user_lookup")
+
                 p_lookup_user_in_resolver = partial(
                     _lookup_user_in_resolver,
                     None,
@@ -1585,7 +1922,7 @@ def getUserListIterators(param, search_user):
             log.error("[ resolver class %r:%r ]", cls_identifier, exx)
             continue
 
-    return user_iters
+    return fan_out_user_iterators(user_iters)
 
 
 def getUserInfo(userid, resolver, resolver_spec):
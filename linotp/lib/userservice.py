@@ -36,6 +36,8 @@ import json
 import logging
 import os
 
+from flask import current_app
+
 # for the temporary rendering context, we use 'c'
 from linotp.flap import render_mako as render
 from linotp.flap import tmpl_context as c
@@ -48,6 +50,10 @@ from linotp.lib.policy.action import (
 from linotp.lib.realm import getDefaultRealm, getRealms
 from linotp.lib.selfservice import get_imprint
 from linotp.lib.token import get_tokens
+from linotp.lib.tools.session_store import (
+    DatabaseSessionStore,
+    MemorySessionStore,
+)
 from linotp.lib.type_utils import DEFAULT_TIMEFORMAT as TIMEFORMAT
 from linotp.lib.type_utils import parse_duration
 from linotp.lib.user import User, get_userinfo, getRealmBox
@@ -60,7 +66,32 @@ log = logging.getLogger(__name__)
 SECRET_LEN = 32
 
 Cookie_Secret = binascii.hexlify(os.urandom(SECRET_LEN))
-Cookie_Cache = {}
+
+# the session stores per store type - the database store is shared by all
+# LinOTP processes
+Session_Stores = {}
+
+
+def get_session_store():
+    """
+    get the store of the authenticated userservice sessions as configured
+    by USERSERVICE_SESSION_STORE
+
+    :return: the session store
+    """
+    store_type = current_app.config["USERSERVICE_SESSION_STORE"]
+
+    if store_type not in Session_Stores:
+        if store_type == "database":
+            Session_Stores[store_type] = DatabaseSessionStore(
+                "userservice_session"
+            )
+        else:
+            Session_Stores[store_type] = MemorySessionStore(
+                current_app.config["USERSERVICE_SESSION_MAX_ENTRIES"]
+            )
+
+    return Session_Stores[store_type]
 
 
 def getTokenForUser(user, active=None, exclude_rollout=True):
@@ -160,7 +191,7 @@ def create_auth_cookie(user, client, state="authenticated", state_data=None):
     digest = hmac.new(key, hash_data, digestmod=hashlib.sha256).digest()
     auth_cookie = base64.urlsafe_b64encode(digest).decode().strip("=")
 
-    Cookie_Cache[auth_cookie] = data
+    get_session_store().set(auth_cookie, data, delta.total_seconds())
 
     return auth_cookie, expires, expiration
 
@@ -174,7 +205,7 @@ def get_cookie_authinfo(cookie):
     :return: triple of user, state and state_data
     """
 
-    data = Cookie_Cache.get(cookie)
+    data = get_session_store().get(cookie)
 
     if not data:
         return None, None, None, None
@@ -204,8 +235,8 @@ def remove_auth_cookie(cookie):
     :return: boolean
     """
 
-    if cookie in Cookie_Cache:
-        del Cookie_Cache[cookie]
+    if cookie:
+        get_session_store().delete(cookie)
 
 
 def check_auth_cookie(cookie, user, client):
@@ -219,7 +250,7 @@ def check_auth_cookie(cookie, user, client):
     :return: boolean
     """
 
-    data = Cookie_Cache.get(cookie)
+    data = get_session_store().get(cookie)
 
     if not data:
         return False
@@ -74,10 +74,12 @@ SYS_EXIT_CODE = 4
 from linotp.model.challange import Challenge  # noqa
 from linotp.model.config import Config, set_config  # noqa
 from linotp.model.db_logging import LoggingConfig  # noqa
+from linotp.model.expiring_item import ExpiringItem  # noqa
 from linotp.model.migrate import Migration, run_data_model_migration  # noqa
 from linotp.model.realm import Realm  # noqa
 from linotp.model.reporting import Reporting  # noqa
 from linotp.model.token import Token, createToken  # noqa
+from linotp.model.token_counter import TokenCounter  # noqa
 from linotp.model.tokenRealm import TokenRealm  # noqa
 
 
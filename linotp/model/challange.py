@@ -27,7 +27,7 @@
 
 import json
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Tuple, Union
 
 from linotp.lib.crypto.utils import get_rand_digit_str
@@ -77,6 +77,8 @@ class Challenge(ChallengeSchema):
         self.received_count = 0
         self.received_tan = False
         self.valid_tan = False
+        self.status = "open"
+        self.expiry = None
 
     @classmethod
     def createTransactionId(cls, length: int = 20) -> str:
@@ -133,6 +135,14 @@ class Challenge(ChallengeSchema):
         else:
             return fallback
 
+    def set_validity(self, validity: int) -> None:
+        """
+        set the expiry time of the challenge
+
+        :param validity: the challenge validity in seconds
+        """
+        self.expiry = self.timestamp + timedelta(seconds=validity)
+
     def getId(self) -> int:
         return self.id
 
@@ -182,6 +192,8 @@ class Challenge(ChallengeSchema):
         session["status"] = session.get("status", "open")
         session["mac"] = mac
 
+        self.status = session["status"]
+
         self.setSession(json.dumps(session))
 
     def checkChallengeSignature(self, hsm: DefaultSecurityModule) -> bool:
@@ -253,6 +265,7 @@ class Challenge(ChallengeSchema):
             self.valid_tan = False
 
         self.session = json.dumps(session_info)
+        self.status = "closed"
 
     def is_open(self) -> bool:
         """
@@ -29,6 +29,7 @@ database schema migration hook
 """
 import binascii
 import logging
+from datetime import timedelta
 from typing import Any, Optional, Tuple, Union
 
 import sqlalchemy as sa
@@ -84,6 +85,27 @@ def _compile_name(name: str, dialect: Optional[str] = None) -> str:
     )  # pylint: disable=E1120
 
 
+def has_index(engine: Engine, table_name: str, column: sa.Column) -> bool:
+    """Check if there is already an index on the column.
+
+    :param engine: database engine
+    :param table_name: the name of the table with the column
+    :param column: the instantiated column defintion
+
+    :return: boolean
+
+    """
+
+    insp = inspect(engine)
+    if table_name not in insp.get_table_names():
+        return False
+
+    for index in insp.get_indexes(table_name):
+        if index.get("column_names") == [column.name]:
+            return True
+    return False
+
+
 def add_column(engine: Engine, table_name: str, column: sa.Column):
     """Create an index based on the column index definition.
 
@@ -376,6 +398,7 @@ class Migration:
         "3.2.0.0",
         "3.2.2.0",
         "3.2.3.0",
+        "3.3.0.0",
     ]
     #!! the migration number should be the same as the linotp release number /
     # debian release number !!
@@ -942,3 +965,208 @@ class Migration:
         return True, (
             "Migration to 3.2.3 - to trigger debian dbconfig upgrade"
         )
+
+    def migrate_3_3_0_0(self):
+        """
+        Migration to 3.3 adds the indexed challenge status and expiry column,
+        normalizes and indexes the token resolver class and initializes the
+        per realm token counters
+
+        the status is initialized from the session info of the challenge, so
+        that the lookup for open challenges does not require a LIKE scan on
+        the session column anymore, and the expiry from the challenge
+        validity of the token, so that the challenges are cleaned up by
+        their expiry.
+        """
+
+        challenge_table = "challenges"
+
+        status = sa.Column("status", sa.types.String(16), index=True)
+
+        if not has_column(self.engine, challenge_table, status):
+            add_column(self.engine, challenge_table, status)
+            add_index(self.engine, challenge_table, status)
+
+        expiry = sa.Column("expiry", sa.types.DateTime, index=True)
+
+        if not has_column(self.engine, challenge_table, expiry):
+            add_column(self.engine, challenge_table, expiry)
+            add_index(self.engine, challenge_table, expiry)
+
+        Challenge = model.Challenge
+
+        Challenge.query.filter(
+            Challenge.session.like('%"status": "closed"%')
+        ).update({"status": "closed"}, synchronize_session=False)
+
+        Challenge.query.filter(Challenge.status.is_(None)).update(
+            {"status": "open"}, synchronize_session=False
+        )
+
+        self._migrate_challenge_expiry()
+
+        # the resolver class of the tokens is normalized, so that the
+        # user tokens could be looked up by an exact, indexed comparison
+
+        token_table = "Token"
+
+        res_class = sa.Column("LinOtpIdResClass", sa.types.Unicode(120))
+
+        if not has_index(self.engine, token_table, res_class):
+            add_index(self.engine, token_table, res_class)
+
+        Token = model.Token
+        prefix = "useridresolveree."
+
+        Token.query.filter(Token.LinOtpIdResClass.like(prefix + "%")).update(
+            {
+                "LinOtpIdResClass": sa.literal("useridresolver.")
+                + sa.func.substr(Token.LinOtpIdResClass, len(prefix) + 1)
+            },
+            synchronize_session=False,
+        )
+
+        # the token counter table is created by the create_all of the
+        # database setup - initially the counters are calculated from the
+        # existing tokens
+
+        from linotp.model.token_counter import reconcile_token_counters
+
+        reconcile_token_counters()
+
+        if current_app.config["AUDIT_DATABASE_URI"] != "OFF":
+            self._migrate_audit_timestamp()
+
+        return True, (
+            "Migration to 3.3 - challenge status and expiry column, "
+            "token resolver class index, token counters and typed audit "
+            "timestamp added."
+        )
+
+    def _migrate_challenge_expiry(self, chunk_size: int = 1000):
+        """
+        initialize the expiry of the challenges
+
+        the expiry is the challenge timestamp plus the challenge validity of
+        the token - the challenges of tokens, which do not exist anymore,
+        are expired.
+
+        :param chunk_size: the number of challenges updated at once
+        """
+
+        from linotp.lib.token import get_tokens
+
+        Challenge = model.Challenge
+        table = Challenge.__table__
+
+        statement = (
+            table.update()
+            .where(table.c.id == sa.bindparam("b_id"))
+            .values(expiry=sa.bindparam("b_expiry"))
+        )
+
+        validities = {}
+        last_id = 0
+
+        while True:
+            rows = (
+                model.db.session.query(
+                    Challenge.id, Challenge.tokenserial, Challenge.timestamp
+                )
+                .filter(Challenge.expiry.is_(None), Challenge.id > last_id)
+                .order_by(Challenge.id)
+                .limit(chunk_size)
+                .all()
+            )
+
+            if not rows:
+                break
+
+            last_id = rows[-1].id
+
+            expiries = []
+            for row in rows:
+                if row.tokenserial not in validities:
+                    tokens = get_tokens(serial=row.tokenserial)
+                    validities[row.tokenserial] = (
+                        tokens[0].get_challenge_validity() if tokens else 0
+                    )
+
+                expiries.append(
+                    {
+                        "b_id": row.id,
+                        "b_expiry": row.timestamp
+                        + timedelta(seconds=validities[row.tokenserial]),
+                    }
+                )
+
+            model.db.session.execute(statement, expiries)
+
+    def _migrate_audit_timestamp(self, chunk_size: int = 10000):
+        """
+        add the typed and indexed audit timestamp column
+
+        the column is initialized from the ISO timestamp string of the
+        entries, which are all in UTC since linotp 3. The fractional seconds
+        are dropped, as the representation of the former entries differs.
+
+        the audit table might be huge, so the column is initialized in id
+        ranges, each committed on its own to keep the transactions and locks
+        short, and the index is created afterwards. An interrupted migration
+        continues with the entries, which are not initialized yet.
+
+        :param chunk_size: the size of the id range updated at once
+        """
+
+        from linotp.lib.audit.SQLAudit import AuditTable
+
+        engine = model.db.get_engine(bind="auditdb")
+        table = AuditTable.__table__
+
+        timestamp_utc = sa.Column("timestamp_utc", sa.types.DateTime)
+
+        if not has_column(engine, table.name, timestamp_utc):
+            add_column(engine, table.name, timestamp_utc)
+
+        # 2023-01-31T12:00:00.123+00:00 -> 2023-01-31 12:00:00
+
+        value = sa.func.replace(
+            sa.func.substr(table.c.timestamp, 1, 19), "T", " "
+        )
+
+        if engine.dialect.name == "sqlite":
+            # sqlite stores the datetime in the sqlalchemy string format
+            value = value.concat(".000000")
+        else:
+            value = sa.cast(value, sa.types.DateTime)
+
+        not_initialized = table.c.timestamp_utc.is_(None)
+
+        min_id, max_id = engine.execute(
+            sa.select(
+                [sa.func.min(table.c.id), sa.func.max(table.c.id)]
+            ).where(not_initialized)
+        ).first()
+
+        if min_id is not None:
+            for start in range(min_id, max_id + 1, chunk_size):
+                with engine.begin() as connection:
+                    connection.execute(
+                        table.update()
+                        .where(
+                            sa.and_(
+                                table.c.id >= start,
+                                table.c.id < start + chunk_size,
+                                not_initialized,
+                            )
+                        )
+                        .values(timestamp_utc=value)
+                    )
+
+        indexes = {
+            index["name"] for index in inspect(engine).get_indexes(table.name)
+        }
+
+        for index in table.indexes:
+            if "timestamp_utc" in index.columns and index.name not in indexes:
+                index.create(bind=engine)
@@ -25,7 +25,7 @@
 #    Support: www.linotp.de
 from enum import Enum
 from logging import getLogger
-from typing import Dict, List, Optional, Set, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import linotp
 from linotp.lib.realm import getRealms
@@ -104,6 +104,18 @@ class User:
         }
 
 
+# mapping of the sortable User.as_dict keys to the resolver user attributes
+USER_SORT_ATTRIBUTES = {
+    "userId": "userid",
+    "username": "username",
+    "surname": "surname",
+    "givenName": "givenname",
+    "email": "email",
+    "mobile": "mobile",
+    "phone": "phone",
+}
+
+
 class Resolver:
     """
     Class to represent a resolver instance.
@@ -278,6 +290,87 @@ class Resolver:
             )
         return users
 
+    def get_users_page(
+        self,
+        search_dictionary: dict,
+        sort_by: str = "username",
+        sort_order: str = "asc",
+        page: int = 0,
+        page_size: int = 0,
+    ) -> Tuple[int, List[User]]:
+        """
+        List one page of the sorted users of a resolver.
+
+        The sorting and paging is done by the resolver if it supports it, so
+        that not all users have to be fetched. Otherwise the complete user
+        list is sorted and sliced.
+
+        :param search_dictionary: restrict the users by their attributes
+        :param sort_by: the User.as_dict key to sort by
+        :param sort_order: 'asc' or 'desc'
+        :param page: the requested page, starting with 0
+        :param page_size: the number of users per page - 0 for all users
+        :return: tuple of the total number of users and the users of the page
+        """
+
+        resolver_sort_by = USER_SORT_ATTRIBUTES.get(sort_by)
+
+        user_page = None
+        if resolver_sort_by:
+            user_page = self.configuration_instance.getUserListPage(
+                dict(search_dictionary),
+                sortBy=resolver_sort_by,
+                sortOrder=sort_order,
+                page=page,
+                pageSize=page_size,
+            )
+
+        if user_page is None:
+            return self._sort_and_slice_users(
+                search_dictionary, sort_by, sort_order, page, page_size
+            )
+
+        total, user_dicts = user_page
+
+        users: List[User] = []
+        for user_dict in user_dicts:
+            users.append(User.from_dict(self.name, self.type, user_dict))
+
+            user_dict["useridresolver"] = self.spec
+            linotp.lib.user._refresh_user_lookup_cache(user_dict)
+
+        return total, users
+
+    def _sort_and_slice_users(
+        self,
+        search_dictionary: dict,
+        sort_by: str,
+        sort_order: str,
+        page: int,
+        page_size: int,
+    ) -> Tuple[int, List[User]]:
+        """
+        Fallback for resolvers without paging support: fetch all users,
+        sort them and slice out the requested page.
+        """
+
+        users = self.get_users(search_dictionary)
+
+        try:
+            users = sorted(
+                users,
+                key=lambda user: user.as_dict()[sort_by] or "",
+                reverse=sort_order == "desc",
+            )
+        except KeyError:
+            raise KeyError(f"users can't be sorted by parameter {sort_by}")
+
+        if not page_size:
+            return len(users), users
+
+        start = page_size * page
+        return len(users), users[start : start + page_size]
+
     def as_dict(self):
         """
         Return a JSON-serializable dictionary with the attributes of the
@@ -1,8 +1,10 @@
 from linotp.model.schema.challange_schema import ChallengeSchema  # noqa
 from linotp.model.schema.config_schema import ConfigSchema  # noqa
 from linotp.model.schema.db_logging_schema import LoggingSchema  # noqa
+from linotp.model.schema.expiring_item_schema import ExpiringItemSchema  # noqa
 from linotp.model.schema.imported_user_schema import ImportedUserSchema  # noqa
 from linotp.model.schema.realm_schema import RealmSchema  # noqa
 from linotp.model.schema.reporting_schema import ReportingSchema  # noqa
+from linotp.model.schema.token_counter_schema import TokenCounterSchema  # noqa
 from linotp.model.schema.token_realm_schema import TokenRealmSchema  # noqa
 from linotp.model.schema.token_schema import TokenSchema  # noqa
@@ -73,3 +73,7 @@ class ChallengeSchema(db.Model):
     received_count = Column("received_count", Integer, default=False)
     received_tan = Column("received_tan", Boolean, default=False)
     valid_tan = Column("valid_tan", Boolean, default=False)
+    # the open / closed status of the session and the expiry time are
+    # redundant to the signed session info, but allow an indexed lookup
+    status = Column("status", String(16), default="open", index=True)
+    expiry = Column("expiry", DateTime, default=None, index=True)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+
+from sqlalchemy import Column, Float, String, Text
+
+from linotp.model import db, implicit_returning
+
+
+class ExpiringItemSchema(db.Model):
+
+    """
+    items with an expiry time, which are shared by all LinOTP processes,
+    like the revoked jwt tokens or the userservice sessions with their
+    optional value - the expiry is the unix time
+    """
+
+    __tablename__ = "expiring_item"
+    __table_args__ = {"implicit_returning": implicit_returning}
+
+    name = Column("name", String(40), primary_key=True, nullable=False)
+    item = Column("item", String(255), primary_key=True, nullable=False)
+    expiry = Column("expiry", Float(), index=True, nullable=False)
+    value = Column("value", Text(), nullable=True)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+
+from sqlalchemy import Column, Integer, String
+
+from linotp.model import db, implicit_returning
+
+
+class TokenCounterSchema(db.Model):
+
+    """
+    summary table with the number of tokens per realm and token status
+    """
+
+    __tablename__ = "token_counter"
+    __table_args__ = {"implicit_returning": implicit_returning}
+
+    realm = Column("realm", String(255), primary_key=True, nullable=False)
+
+    active_assigned = Column("active_assigned", Integer(), default=0)
+    active_unassigned = Column("active_unassigned", Integer(), default=0)
+    inactive_assigned = Column("inactive_assigned", Integer(), default=0)
+    inactive_unassigned = Column("inactive_unassigned", Integer(), default=0)
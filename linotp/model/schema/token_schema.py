@@ -27,6 +27,7 @@
 from datetime import datetime
 
 from sqlalchemy import Boolean, Column, DateTime, Integer, Sequence, Unicode
+from sqlalchemy.orm import column_property
 
 from linotp.model import db, implicit_returning
 from linotp.model.tokenRealm import TokenRealmSchema
@@ -71,8 +72,15 @@ class TokenSchema(db.Model):
     LinOtpIdResolver = Column(
         "LinOtpIdResolver", Unicode(120), default="", index=True
     )
-    LinOtpIdResClass = Column("LinOtpIdResClass", Unicode(120), default="")
-    LinOtpUserid = Column("LinOtpUserid", Unicode(320), default="", index=True)
+    LinOtpIdResClass = Column(
+        "LinOtpIdResClass", Unicode(120), default="", index=True
+    )
+    # the token counters require the previous value of the user and the
+    # active status on change, thus the active_history is enabled for them
+    LinOtpUserid = column_property(
+        Column("LinOtpUserid", Unicode(320), default="", index=True),
+        active_history=True,
+    )
     LinOtpSeed = Column("LinOtpSeed", Unicode(32), default="")
     LinOtpOtpLen = Column("LinOtpOtpLen", Integer(), default=6)
     # # hashed
@@ -81,7 +89,10 @@ class TokenSchema(db.Model):
     LinOtpKeyEnc = Column("LinOtpKeyEnc", Unicode(1024), default="")
     LinOtpKeyIV = Column("LinOtpKeyIV", Unicode(32), default="")
     LinOtpMaxFail = Column("LinOtpMaxFail", Integer(), default=10)
-    LinOtpIsactive = Column("LinOtpIsactive", Boolean(), default=True)
+    LinOtpIsactive = column_property(
+        Column("LinOtpIsactive", Boolean(), default=True),
+        active_history=True,
+    )
     LinOtpFailCount = Column("LinOtpFailCount", Integer(), default=0)
     LinOtpCount = Column("LinOtpCount", Integer(), default=0)
     LinOtpCountWindow = Column("LinOtpCountWindow", Integer(), default=10)
@@ -107,6 +118,6 @@ class TokenSchema(db.Model):
     realms = db.relationship(
         "Realm",
         secondary=TokenRealmSchema.__table__,
-        lazy="subquery",
+        lazy="selectin",
         backref=db.backref("tokens", lazy=True),
     )
@@ -25,10 +25,15 @@
 #    Support: www.linotp.de
 
 import binascii
+import json
 import logging
 from datetime import datetime
 from typing import Any, Optional, Tuple, Union
 
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
 from linotp.lib.type_utils import DEFAULT_TIMEFORMAT
 from linotp.model import db
 from linotp.model.schema import TokenSchema
@@ -231,7 +236,7 @@ class Token(TokenSchema):
         ret["LinOtp.TokenSerialnumber"] = self.LinOtpTokenSerialnumber or ""
 
         ret["LinOtp.TokenType"] = self.LinOtpTokenType or "hmac"
-        ret["LinOtp.TokenInfo"] = self._fix_spaces(self.LinOtpTokenInfo or "")
+        ret["LinOtp.TokenInfo"] = self.getInfo()
         # ret['LinOtpTokenPinUser']   = self.LinOtpTokenPinUser
         # ret['LinOtpTokenPinSO']     = self.LinOtpTokenPinSO
 
@@ -302,14 +307,84 @@ class Token(TokenSchema):
         return self.LinOtpCountWindow
 
     def getInfo(self) -> str:
+        # the pending changes of the parsed token info are serialized first
+        self._write_info_dict()
+
         # Fix for working with MS SQL servers
         # MS SQL servers sometimes return a '<space>' when the column is empty:
         # ''
         return self._fix_spaces(self.LinOtpTokenInfo or "")
 
     def setInfo(self, info: str) -> None:
+        self._info_dict = None
+        self._info_dirty = False
         self.LinOtpTokenInfo = info
 
+    def getInfoDict(self) -> dict:
+        """
+        get the parsed token info
+
+        the parsed token info is cached on the token as long as the
+        serialized token info is unchanged, thus the token info is not
+        parsed for every single info entry that is read.
+
+        :return: the token info dict, which must not be modified - use
+                 setInfoDict to change the token info
+        """
+
+        info_dict = getattr(self, "_info_dict", None)
+
+        if info_dict is not None and (
+            getattr(self, "_info_dirty", False)
+            or self._info_raw == self.LinOtpTokenInfo
+        ):
+            return info_dict
+
+        info_dict = {}
+
+        token_info = self._fix_spaces(self.LinOtpTokenInfo or "")
+        if token_info:
+            try:
+                info_dict = json.loads(token_info)
+            except Exception as exx:
+                log.error("JSON loading error in token info: %r", exx)
+
+        self._info_dict = info_dict
+        self._info_raw = self.LinOtpTokenInfo
+        self._info_dirty = False
+
+        return info_dict
+
+    def setInfoDict(self, info: dict) -> None:
+        """
+        set the token info from a dict
+
+        the token info is serialized only once, when the token is flushed
+        or the serialized token info is read.
+
+        :param info: the token info dict, which is taken over by the token
+        """
+
+        self._info_dict = info
+        self._info_dirty = True
+
+        # mark the token as modified, so that it is part of the next flush
+        if self.LinOtpTokenInfo is None:
+            self.LinOtpTokenInfo = ""
+        flag_modified(self, "LinOtpTokenInfo")
+
+    def _write_info_dict(self) -> None:
+        """
+        serialize the pending changes of the parsed token info
+        """
+
+        if not getattr(self, "_info_dirty", False):
+            return
+
+        self.LinOtpTokenInfo = json.dumps(self._info_dict, indent=0)
+        self._info_raw = self.LinOtpTokenInfo
+        self._info_dirty = False
+
     def storeToken(self) -> bool:
         if self.LinOtpUserid is None:
             self.LinOtpUserid = ""
@@ -345,6 +420,23 @@ class Token(TokenSchema):
             log.error("assigning empty realm!")
 
 
+def normalize_resolver_class(resolver_class: str) -> str:
+    """
+    normalize the resolver class of a token or user
+
+    the resolver classes of former versions might start with the prefix
+    'useridresolveree.', which is the same as 'useridresolver.'
+
+    :param resolver_class: the resolver class
+    :return: the resolver class with the 'useridresolver.' prefix
+    """
+
+    if resolver_class and resolver_class.startswith("useridresolveree."):
+        return "useridresolver." + resolver_class[len("useridresolveree.") :]
+
+    return resolver_class
+
+
 def createToken(serial: str) -> Token:
     log.debug("createToken(%s)", serial)
     serial = "" + serial
@@ -352,3 +444,20 @@ def createToken(serial: str) -> Token:
     log.debug("token object created")
 
     return token
+
+
+@event.listens_for(Token.LinOtpIdResClass, "set", retval=True)
+def _normalize_resolver_class(_token, value, _oldvalue, _initiator):
+    """Attribute event to store the resolver class normalized, so that it
+    could be compared exactly."""
+
+    return normalize_resolver_class(value)
+
+
+@event.listens_for(Session, "before_flush")
+def _write_token_info(session, _flush_context, _instances):
+    """Session event to serialize the changed token info once on flush."""
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Token):
+            obj._write_info_dict()
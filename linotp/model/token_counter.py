@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+"""
+token counter - the number of tokens per realm and token status
+
+the counters are maintained incrementally by a session event within the
+same transaction as the token change itself, so that the token reporting
+does not have to count the tokens by scanning the token table.
+
+changes which bypass the orm, like bulk deletes of the token realm
+relations, are not covered by the session event - these are fixed by the
+reconciliation with `reconcile_token_counters`.
+"""
+
+import logging
+from collections import defaultdict
+from itertools import chain
+
+from sqlalchemy import and_, case, event, exists, func, inspect, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from linotp.model import db
+from linotp.model.realm import Realm
+from linotp.model.schema import TokenCounterSchema
+from linotp.model.token import Token
+from linotp.model.tokenRealm import TokenRealm
+
+log = logging.getLogger(__name__)
+
+NO_REALM = "/:no realm:/"
+
+COUNTER_CELLS = (
+    "active_assigned",
+    "active_unassigned",
+    "inactive_assigned",
+    "inactive_unassigned",
+)
+
+# process local generation of the token changes, which allows to invalidate
+# cached values, which are derived from the token table, like the license
+# volume verdict
+_token_generation = 0
+
+# token attributes, which are relevant for the token and token user volume
+VOLUME_ATTRIBUTES = (
+    "LinOtpIsactive",
+    "LinOtpUserid",
+    "LinOtpIdResClass",
+    "LinOtpTokenType",
+)
+
+
+class TokenCounter(TokenCounterSchema):
+    def __init__(self, realm: str):
+        super().__init__(
+            realm=realm,
+            active_assigned=0,
+            active_unassigned=0,
+            inactive_assigned=0,
+            inactive_unassigned=0,
+        )
+
+
+def _counter_cell(active: bool, userid: str) -> str:
+    """Get the counter cell for a token status."""
+
+    return "%s_%s" % (
+        "active" if active else "inactive",
+        "assigned" if userid else "unassigned",
+    )
+
+
+def _token_cells(realms: list, active: bool, userid: str) -> set:
+    """Get all (realm, cell) tuples a token is counted in."""
+
+    cell = _counter_cell(active, userid)
+    realm_names = set(realm.name for realm in realms) or set([NO_REALM])
+
+    return set((realm_name, cell) for realm_name in realm_names)
+
+
+def _token_states(session: Session, token: Token) -> tuple:
+    """Get the counter cells of the token before and after the flush.
+
+    :param session: the session which is flushed
+    :param token: the new, modified or deleted token
+    :return: tuple of the previous cells and the cells after the flush
+    """
+
+    state = inspect(token)
+
+    previous = {}
+    current = {}
+
+    for key in ("LinOtpIsactive", "LinOtpUserid"):
+        history = state.attrs[key].load_history()
+        unchanged = list(history.unchanged or [])
+        previous[key] = (list(history.deleted or []) + unchanged + [None])[0]
+        current[key] = (list(history.added or []) + unchanged + [None])[0]
+
+    history = state.attrs.realms.load_history()
+    unchanged = list(history.unchanged or [])
+    previous_realms = unchanged + list(history.deleted or [])
+    current_realms = unchanged + list(history.added or [])
+
+    previous_cells = set()
+    if not state.pending:
+        previous_cells = _token_cells(
+            previous_realms,
+            previous["LinOtpIsactive"],
+            previous["LinOtpUserid"],
+        )
+
+    current_cells = set()
+    if token not in session.deleted:
+        current_cells = _token_cells(
+            current_realms, current["LinOtpIsactive"], current["LinOtpUserid"]
+        )
+
+    return previous_cells, current_cells
+
+
+def token_generation() -> int:
+    """Get the process local generation of the token changes."""
+
+    return _token_generation
+
+
+def _next_token_generation(session: Session) -> None:
+    """Start a new generation of the token changes.
+
+    the session is marked to start a new generation on rollback as well.
+    """
+
+    global _token_generation
+    _token_generation += 1
+
+    session.info["token_changes"] = True
+
+
+def mark_bulk_token_changes() -> None:
+    """Invalidate the values derived from the token table after a bulk
+    change of the tokens.
+
+    bulk updates of the token table bypass the session event, which starts
+    a new generation of the token changes.
+    """
+
+    _next_token_generation(db.session)
+
+
+def _is_volume_change(session: Session, token: Token) -> bool:
+    """Check if the token change is relevant for the token volume."""
+
+    if token in session.new or token in session.deleted:
+        return True
+
+    state = inspect(token)
+
+    return any(
+        state.attrs[key].history.has_changes() for key in VOLUME_ATTRIBUTES
+    )
+
+
+def _update_counter(session: Session, realm: str, cells: dict) -> int:
+    """Add the cell deltas to the counter row of the realm.
+
+    :return: the number of updated rows - 0 if there is no counter row
+    """
+
+    table = TokenCounter.__table__
+
+    result = session.execute(
+        table.update()
+        .where(table.c.realm == realm)
+        .values({cell: table.c[cell] + delta for cell, delta in cells.items()})
+    )
+
+    return result.rowcount
+
+
+def _insert_counter(session: Session, realm: str, cells: dict) -> bool:
+    """Insert the counter row of the realm.
+
+    the insert runs in a savepoint, so that the concurrent insert of the
+    same counter row by an other transaction does not fail the session
+    transaction.
+
+    :return: boolean - False if the counter row already exists
+    """
+
+    table = TokenCounter.__table__
+    values = {cell: cells.get(cell, 0) for cell in COUNTER_CELLS}
+
+    connection = session.connection()
+    savepoint = connection.begin_nested()
+    try:
+        connection.execute(table.insert().values(realm=realm, **values))
+        savepoint.commit()
+        return True
+
+    except IntegrityError:
+        savepoint.rollback()
+        return False
+
+
+def update_token_counters(session: Session, deltas: dict) -> None:
+    """Apply the counter deltas to the token counter table.
+
+    :param session: the session in which the deltas are applied
+    :param deltas: dict with the realm as key and a dict of
+                   counter cells with their delta as value
+    """
+
+    for realm, cells in deltas.items():
+        cells = {cell: delta for cell, delta in cells.items() if delta}
+        if not cells:
+            continue
+
+        if _update_counter(session, realm, cells):
+            continue
+
+        if _insert_counter(session, realm, cells):
+            continue
+
+        # the counter row was inserted by a concurrent transaction
+
+        _update_counter(session, realm, cells)
+
+
+def create_token_counter(realm: str) -> None:
+    """Create the empty counter row of a new realm.
+
+    the counter row is created with the realm, so that the token changes
+    only have to update it.
+
+    :param realm: the realm name
+    """
+
+    table = TokenCounter.__table__
+
+    row = (
+        db.session.query(table.c.realm).filter(table.c.realm == realm).first()
+    )
+
+    if not row:
+        _insert_counter(db.session, realm, {})
+
+
+def _add_deltas(deltas: dict, previous_cells: set, current_cells: set):
+    """Add the changes between the previous and current cells to deltas."""
+
+    for realm, cell in previous_cells - current_cells:
+        deltas[realm][cell] -= 1
+
+    for realm, cell in current_cells - previous_cells:
+        deltas[realm][cell] += 1
+
+
+@event.listens_for(Session, "before_flush")
+def _count_token_changes(session, _flush_context, _instances):
+    """Session event to adjust the token counters by the token changes."""
+
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    tokens = {
+        id(obj): obj
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, Token)
+    }
+
+    volume_changed = False
+
+    for token in tokens.values():
+        _add_deltas(deltas, *_token_states(session, token))
+        volume_changed = volume_changed or _is_volume_change(session, token)
+
+    if volume_changed:
+        _next_token_generation(session)
+
+    if deltas:
+        update_token_counters(session, deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_token_changes(session):
+    session.info.pop("token_changes", None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _rollback_token_changes(session):
+    """Session event to invalidate the values derived from rolled back
+    token changes."""
+
+    global _token_generation
+
+    if session.info.pop("token_changes", None):
+        _token_generation += 1
+
+
+def release_token_realms(token: Token) -> None:
+    """Adjust the token counters for the bulk delete of the realm relations.
+
+    the bulk delete of the token realm relations bypasses the session event,
+    thus the token is moved explicitly to the tokens without realm - this
+    has to be called before the relations are deleted.
+
+    :param token: the token, which realm relations will be deleted
+    """
+
+    db.session.flush()
+
+    active = token.LinOtpIsactive
+    userid = token.LinOtpUserid
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    _add_deltas(
+        deltas,
+        _token_cells(token.realms, active, userid),
+        _token_cells([], active, userid),
+    )
+
+    update_token_counters(db.session, deltas)
+
+
+def release_realm_tokens(realm: Realm) -> None:
+    """Adjust the token counters for the deletion of a realm.
+
+    the bulk delete of the token realm relations of the realm bypasses the
+    session event. The tokens, which are only in this realm, are moved to
+    the tokens without realm and the counter row of the realm is dropped -
+    this has to be called before the relations are deleted.
+
+    :param realm: the realm, which will be deleted
+    """
+
+    db.session.flush()
+
+    other_realms = aliased(TokenRealm)
+
+    assigned = case(
+        [(or_(Token.LinOtpUserid == None, Token.LinOtpUserid == ""), 0)],
+        else_=1,
+    )
+
+    rows = (
+        db.session.query(
+            Token.LinOtpIsactive,
+            assigned,
+            func.count(Token.LinOtpTokenId.distinct()),
+        )
+        .join(TokenRealm, TokenRealm.token_id == Token.LinOtpTokenId)
+        .filter(TokenRealm.realm_id == realm.id)
+        .filter(
+            ~exists().where(
+                and_(
+                    other_realms.token_id == Token.LinOtpTokenId,
+                    other_realms.realm_id != realm.id,
+                )
+            )
+        )
+        .group_by(Token.LinOtpIsactive, assigned)
+        .all()
+    )
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for active, is_assigned, count in rows:
+        deltas[NO_REALM][_counter_cell(active, is_assigned)] += count
+
+    update_token_counters(db.session, deltas)
+
+    table = TokenCounter.__table__
+    db.session.execute(table.delete().where(table.c.realm == realm.name))
+
+
+def get_token_counters(realm: str) -> dict:
+    """Get the token counters of a realm.
+
+    :param realm: the realm name or NO_REALM
+    :return: dict with the counter cells as keys and the number of tokens
+    """
+
+    table = TokenCounter.__table__
+
+    # the counters are read by a column query as the orm objects in the
+    # identity map would not reflect the incremental updates
+
+    row = (
+        db.session.query(*[table.c[cell] for cell in COUNTER_CELLS])
+        .filter(table.c.realm == realm)
+        .first()
+    )
+
+    if not row:
+        return {cell: 0 for cell in COUNTER_CELLS}
+
+    return {cell: count or 0 for cell, count in zip(COUNTER_CELLS, row)}
+
+
+def reconcile_token_counters() -> dict:
+    """Recalculate all token counters from the token table.
+
+    the token counters are recalculated with one grouped query and replace
+    the current counter table content, which fixes any drift caused by
+    token changes that bypass the orm.
+
+    :return: dict with the realm as key and the dict of counter cells
+    """
+
+    db.session.flush()
+
+    assigned = case(
+        [(or_(Token.LinOtpUserid == None, Token.LinOtpUserid == ""), 0)],
+        else_=1,
+    )
+
+    rows = (
+        db.session.query(
+            Realm.name,
+            Token.LinOtpIsactive,
+            assigned,
+            func.count(Token.LinOtpTokenId.distinct()),
+        )
+        .select_from(Token)
+        .outerjoin(TokenRealm, TokenRealm.token_id == Token.LinOtpTokenId)
+        .outerjoin(Realm, Realm.id == TokenRealm.realm_id)
+        .group_by(Realm.name, Token.LinOtpIsactive, assigned)
+        .all()
+    )
+
+    counters = defaultdict(lambda: {cell: 0 for cell in COUNTER_CELLS})
+
+    for realm_name, active, is_assigned, count in rows:
+        cell = _counter_cell(active, is_assigned)
+        counters[realm_name or NO_REALM][cell] += count
+
+    table = TokenCounter.__table__
+
+    db.session.execute(table.delete())
+
+    for realm_name, cells in counters.items():
+        db.session.execute(table.insert().values(realm=realm_name, **cells))
+
+    log.info("token counters reconciled for %d realms", len(counters))
+
+    return dict(counters)
@@ -30,6 +30,7 @@ provider notification handling
 import logging
 
 import linotp.lib.policy
+from linotp.lib import metrics
 from linotp.lib.context import request_context
 from linotp.lib.policy.action import get_action_value
 
@@ -128,12 +129,13 @@ def notify_user_by_email(provider_name, user, action, info):
     try:
         provider = loadProvider("email", provider_name=provider_name)
 
-        provider.submitMessage(
-            email_to=user_email,
-            message=info.get("message", ""),
-            subject=info.get("Subject", ""),
-            replacements=replacements,
-        )
+        with metrics.timed("linotp_provider_send_seconds", provider="email"):
+            provider.submitMessage(
+                email_to=user_email,
+                message=info.get("message", ""),
+                subject=info.get("Subject", ""),
+                replacements=replacements,
+            )
 
     except Exception as exx:
         log.error("Failed to notify user %r by email", user_email)
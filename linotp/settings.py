@@ -452,6 +452,21 @@ _config_schema = ConfigSchema(
                 "`LOG_FILE_*` and `LOGGING_*` parameters."
             ),
         ),
+        ConfigItem(
+            "METRICS_ENABLED",
+            bool,
+            convert=to_boolean,
+            default=False,
+            help=(
+                "If set to `True`, LinOTP measures the time spent in the "
+                "stages of each request (like the policy evaluation, the "
+                "resolver lookup or the token check), the cache lookups, "
+                "the resolver latency, the hsm wait time and the provider "
+                "send time. The metrics of each LinOTP process are "
+                "exported in the Prometheus text format by "
+                "`/monitoring/metrics`."
+            ),
+        ),
         ConfigItem(
             "BEAKER_CACHE_TYPE",
             str,
@@ -504,6 +519,20 @@ _config_schema = ConfigSchema(
                 "accessed with the proper credentials and permissions."
             ),
         ),
+        ConfigItem(
+            "AUDIT_PARTITIONING",
+            str,
+            validate=check_membership({"OFF", "DAILY", "MONTHLY"}),
+            default="OFF",
+            help=(
+                "The time based partitioning of the audit table on "
+                "PostgreSQL and MySQL/MariaDB audit databases. Valid "
+                "values are: `OFF` (one audit table), `DAILY` or "
+                "`MONTHLY` (one partition per day or month). The audit "
+                "table is converted by `linotp audit partition` and the "
+                "expired partitions are dropped by `linotp audit rotate`."
+            ),
+        ),
         ConfigItem(
             "AUDIT_ERROR_ON_TRUNCATION",
             bool,
@@ -526,6 +555,18 @@ _config_schema = ConfigSchema(
             default="audit-private.pem",
             help=("The private key used for the audit log."),
         ),
+        ConfigItem(
+            "AUDIT_VERIFY_WORKERS",
+            int,
+            validate=check_int_in_range(min=0),
+            default=4,
+            help=(
+                "The number of worker threads per LinOTP process, which "
+                "verify the signatures of the audit entries of large audit "
+                "search results and exports concurrently. The values 0 and "
+                "1 disable the concurrent verification."
+            ),
+        ),
         ConfigItem(
             "CUSTOM_TEMPLATES_DIR",
             str,
@@ -729,6 +770,42 @@ _config_schema = ConfigSchema(
                 "@jwt.token_in_blocklist_loader to check tokens in blocklist"
             ),
         ),
+        ConfigItem(
+            "JWT_BLOCKLIST_STORE",
+            str,
+            validate=check_membership({"database", "memory"}),
+            default="database",
+            help=(
+                "The store of the blocklisted jwt tokens: `database` "
+                "shares the blocklist between all LinOTP processes, so "
+                "that a logout is effective for all of them, while "
+                "`memory` keeps the blocklist per process."
+            ),
+        ),
+        ConfigItem(
+            "USERSERVICE_SESSION_STORE",
+            str,
+            validate=check_membership({"database", "memory"}),
+            default="database",
+            help=(
+                "The store of the authenticated selfservice sessions: "
+                "`database` shares the sessions between all LinOTP "
+                "processes, so that no sticky load balancing is required, "
+                "while `memory` keeps the sessions per process."
+            ),
+        ),
+        ConfigItem(
+            "USERSERVICE_SESSION_MAX_ENTRIES",
+            int,
+            validate=check_int_in_range(min=1),
+            default=10000,
+            help=(
+                "The maximum number of selfservice sessions in the "
+                "`memory` session store of a LinOTP process. If the "
+                "store is full, the sessions which expire first are "
+                "dropped."
+            ),
+        ),
         ConfigItem(
             "ADMIN_REALM_NAME",
             str,
@@ -832,6 +909,71 @@ _config_schema = ConfigSchema(
                 "HSM/defining_lunasa.html"
             ),
         ),
+        ConfigItem(
+            "CHALLENGE_JANITOR_IN_REQUEST",
+            bool,
+            convert=to_boolean,
+            default=True,
+            help=(
+                "Whether expired challenges are deleted during the "
+                "validation. Set this to 'false' if the challenge table "
+                "is cleaned up periodically by the "
+                "`linotp challenge cleanup` command."
+            ),
+        ),
+        ConfigItem(
+            "CHECK_STATUS_MAX_WAIT",
+            int,
+            validate=check_int_in_range(min=0),
+            default=0,
+            help=(
+                "The maximum number of seconds a `/validate/check_status` "
+                "request with the `wait` parameter blocks until the "
+                "pending transaction is answered (long polling). Every "
+                "waiting request occupies a worker thread, so the number "
+                "of workers has to be sized accordingly. The value 0 "
+                "disables the long polling."
+            ),
+        ),
+        ConfigItem(
+            "RESOLVER_FANOUT_WORKERS",
+            int,
+            validate=check_int_in_range(min=0),
+            default=0,
+            help=(
+                "The number of worker threads per LinOTP process, which "
+                "query the resolvers of a realm concurrently for the user "
+                "lookup, and the maximum number of worker threads per "
+                "request, which read the user lists of the resolvers. The "
+                "values 0 and 1 disable the concurrent queries, so that the "
+                "resolvers are queried one after another."
+            ),
+        ),
+        ConfigItem(
+            "RESOLVER_FANOUT_TIMEOUT",
+            int,
+            validate=check_int_in_range(min=1),
+            default=30,
+            help=(
+                "The maximum number of seconds to wait for a resolver "
+                "answer, when the resolvers are queried concurrently. If a "
+                "resolver does not answer in time, the user lookup fails "
+                "and is not cached, and the users of the resolver are "
+                "missing in the user list."
+            ),
+        ),
+        ConfigItem(
+            "TOKEN_TIME_INFO_FLUSH_INTERVAL",
+            int,
+            validate=check_int_in_range(min=0),
+            default=0,
+            help=(
+                "The number of seconds, after which the buffered last access "
+                "and last verification times of the tokens are written to "
+                "the database in one batch. With 0 the times are written "
+                "directly with the token in the request."
+            ),
+        ),
         ConfigItem(
             "PROFILE",
             bool,
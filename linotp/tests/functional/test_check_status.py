@@ -746,5 +746,72 @@ class TestCheckStatus(TestController):
 
         return
 
+    def test_check_status_long_poll(self):
+        """
+        test check_status with wait blocks until the transaction is answered
+
+        - a pending transaction is waited for up to the wait time
+        - an answered transaction returns without waiting
+        """
+
+        policy = {
+            "name": "hmac_challenge_response",
+            "scope": "authentication",
+            "action": "challenge_response=hmac",
+            "realm": "*",
+            "user": "*",
+        }
+
+        response = self.make_system_request("setPolicy", params=policy)
+        assert '"status": true' in response, response
+
+        serial, otps = self.create_hmac_token(user="passthru_user1", pin="")
+
+        params = {"user": "passthru_user1", "pass": ""}
+        response = self.make_validate_request("check", params)
+        assert '"value": false' in response, response
+
+        transid = response.json.get("detail", {}).get("transactionid", "")
+
+        params = {
+            "user": "passthru_user1",
+            "pass": "",
+            "transactionid": transid,
+            "wait": "60",
+        }
+
+        # the wait time is limited by the server setting
+
+        self.app.config["CHECK_STATUS_MAX_WAIT"] = 1
+        try:
+            start = datetime.datetime.now()
+            response = self.make_validate_request("check_status", params)
+            duration = datetime.datetime.now() - start
+
+            transaction = response.json["detail"]["transactions"][transid]
+            assert transaction["status"] == "open", response
+            assert 1 <= duration.total_seconds() < 30
+
+            # answer the challenge - now there is no waiting anymore
+
+            answer = {"user": "passthru_user1", "pass": otps[0]}
+            answer["transactionid"] = transid
+            response = self.make_validate_request("check", answer)
+            assert '"value": true' in response, response
+
+            start = datetime.datetime.now()
+            response = self.make_validate_request("check_status", params)
+            duration = datetime.datetime.now() - start
+
+            transaction = response.json["detail"]["transactions"][transid]
+            assert transaction["status"] == "closed", response
+            assert duration.total_seconds() < 1
+
+        finally:
+            self.app.config["CHECK_STATUS_MAX_WAIT"] = 0
+
+        self.delete_token(serial)
+        self.delete_policy("hmac_challenge_response")
+
 
 # eof #########################################################################
@@ -208,6 +208,47 @@ class TestResolver(TestController):
         records = value["pageRecords"]
         assert isinstance(records, list)
 
+    def test_resolver_users_paging_parameters(self):
+        """
+        Request the users page by page and ensure that the pages add up to
+        the complete user list.
+        """
+
+        value = self.make_api_v2_request(
+            "/resolvers/myDefRes/users", params={"sortBy": "userId"}
+        ).json["result"]["value"]
+
+        all_records = value["pageRecords"]
+        assert value["totalRecords"] == len(all_records) == 27
+        assert value["pageSize"] == 27
+        assert value["totalPages"] == 1
+
+        paged_records = []
+        for page in range(4):
+            value = self.make_api_v2_request(
+                "/resolvers/myDefRes/users",
+                params={"sortBy": "userId", "page": page, "pageSize": 10},
+            ).json["result"]["value"]
+
+            assert value["page"] == page
+            assert value["pageSize"] == 10
+            assert value["totalPages"] == 3
+            assert value["totalRecords"] == 27
+
+            paged_records.extend(value["pageRecords"])
+
+        # the fourth page is beyond the last page and is empty
+        assert value["pageRecords"] == []
+        assert paged_records == all_records
+
+        # users could not be sorted by an unknown attribute
+
+        response = self.make_api_v2_request(
+            "/resolvers/myDefRes/users", params={"sortBy": "unknown"}
+        )
+        assert response.status_code == 500
+        assert not response.json["result"]["status"]
+
     def test_resolver_users_sorting(self):
         """
         Request the users from a resolver sorted by `search_param`
@@ -28,10 +28,14 @@
 
 """
 """
+import io
 import json
 import os
 
+from mock import patch
+
 from linotp.lib.ImportOTP import PSKC, eTokenDat
+from linotp.lib.ImportOTP.oath import iterate_oath_csv
 from linotp.lib.ImportOTP.safenet import parseSafeNetXML
 from linotp.lib.ImportOTP.yubico import parseYubicoCSV
 from linotp.tests import TestController
@@ -270,6 +274,56 @@ class TestImportOTP(TestController):
 
         return
 
+    @patch("linotp.lib.token.IMPORT_CHUNK_SIZE", 2)
+    def test_import_OATH_in_chunks(self):
+        """
+        test that the tokencount policy is checked for every import chunk
+        """
+        self.create_common_resolvers()
+        self.create_common_realms()
+
+        params = {
+            "name": "token_count",
+            "scope": "enrollment",
+            "action": "tokencount=3, otp_pin_random=6",
+            "realm": "mydefrealm",
+            "user": "*",
+        }
+        response = self.make_system_request("setPolicy", params=params)
+        assert '"status": true' in response, response
+
+        # the second chunk exceeds the token count - nothing is imported
+
+        params = {"type": "oathcsv", "targetrealm": "mydefrealm"}
+        response = self.upload_tokens("oath_tokens.csv", params=params)
+        assert '"status": false' in response, response
+        assert "tokencount" in response, response
+
+        response = self.make_admin_request("show", params={})
+        assert response.json["result"]["value"]["resultset"]["tokens"] == 0
+
+        params = {
+            "name": "token_count",
+            "scope": "enrollment",
+            "action": "tokencount=10",
+            "realm": "mydefrealm",
+            "user": "*",
+        }
+        response = self.make_system_request("setPolicy", params=params)
+        assert '"status": true' in response, response
+
+        params = {"type": "oathcsv", "targetrealm": "mydefrealm"}
+        response = self.upload_tokens("oath_tokens.csv", params=params)
+        assert "<imported>4</imported>" in response, response
+
+        response = self.make_admin_request(
+            "show", params={"tokenrealm": "mydefrealm"}
+        )
+        assert response.json["result"]["value"]["resultset"]["tokens"] == 4
+
+        self.delete_all_realms()
+        self.delete_all_resolvers()
+
     def test_import_OATH_256(self):
         """
         test to import token data sha256 seeds
@@ -394,6 +448,38 @@ class TestImportOTP(TestController):
 
         return
 
+    def test_import_streamed(self):
+        """
+        the csv and pskc uploads are parsed from the uploaded file and not
+        from the file content, which is read into memory as a whole
+        """
+
+        with patch(
+            "linotp.controllers.admin.iterate_oath_csv",
+            wraps=iterate_oath_csv,
+        ) as mock_iterate:
+            params = {"type": "oathcsv"}
+            response = self.upload_tokens("oath_tokens.csv", params=params)
+            assert "<imported>4</imported>" in response, response
+
+        csv_lines = mock_iterate.call_args[0][0]
+        assert not isinstance(csv_lines, io.StringIO)
+
+        with patch.object(
+            PSKC, "iterate_pskc_data", wraps=PSKC.iterate_pskc_data
+        ) as mock_iterate:
+            params = {
+                "type": "pskc",
+                "pskc_type": "plain",
+                "pskc_password": "",
+                "pskc_preshared": "",
+            }
+            response = self.upload_tokens("pskc_tokens.xml", params=params)
+            assert "<imported>6</imported>" in response, response
+
+        xml = mock_iterate.call_args[0][0]
+        assert not isinstance(xml, (str, bytes))
+
     def test_import_empty_file(self):
         """
         Test loading empty file
@@ -142,6 +142,25 @@ class TestImportUser(TestController):
             ],
         )
 
+        # run the migration as dryrun first, which does not change the token
+
+        params = {"from": "black1", "to": "black2", "dryrun": True}
+
+        response = self.make_tools_request(
+            action="migrate_resolver", params=params
+        )
+
+        assert "1 tokens of 1 could be migrated" in response, response
+
+        report = response.json["result"]["value"]["report"]
+        assert report["dryrun"]
+        assert report["migrated"] == 1
+        assert report["not_found"] == []
+
+        params = {"resConf": "black1"}
+        response = self.make_admin_request("show", params)
+        assert "migration_token" in response, response
+
         # run the migration
 
         params = {"from": "black1", "to": "black2"}
@@ -152,6 +171,10 @@ class TestImportUser(TestController):
 
         assert "1 tokens of 1 migrated" in response, response
 
+        report = response.json["result"]["value"]["report"]
+        assert not report["dryrun"]
+        assert report["migrated"] == 1
+
         # verify the tokens in the token list
         params = {"resConf": "black2"}
         response = self.make_admin_request("show", params)
@@ -0,0 +1,784 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+benchmark of the validate, admin and selfservice request paths
+
+the benchmark runs in process against its own LinOTP app - no server is
+required. The app uses a temporary sqlite database by default or the
+database given by --database-uri, e.g. a local PostgreSQL. A passwd
+resolver with the generated users, a realm, the tokens and a set of
+policies are seeded before the scenarios are measured:
+
+    validate_check_hmac     /validate/check with an HMAC token
+    validate_check_totp     /validate/check with a TOTP token
+    validate_check_pw       /validate/check with a password token
+    validate_check_push     /validate/check triggering a push challenge
+    admin_show              /admin/show of one page of the tokens
+    admin_init              /admin/init of an HMAC token
+    userservice_login       /userservice/login with the user password
+    policy_evaluation       the evaluation of the authentication policies
+
+the results are written as JSON, so that runs of different commits can
+be compared:
+
+    python -m linotp.tests.load.benchmark --output before.json
+    python -m linotp.tests.load.benchmark --compare before.json
+
+the comparison exits with 1 if the median latency of a scenario got worse
+than --threshold percent.
+
+The push provider is replaced by a stand-in, which accepts every push
+notification, and the admin requests are made with a faked admin identity
+like in the unit tests.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import hmac
+import json
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from base64 import b64encode
+from unittest.mock import patch
+
+from passlib.hash import sha512_crypt
+from pysodium import crypto_sign_keypair
+
+from linotp import __version__
+from linotp.app import create_app
+from linotp.cli.init_cmd import create_audit_keys, create_secret_key
+from linotp.lib.policy.processing import get_client_policy
+from linotp.lib.token import get_tokens
+from linotp.lib.user import User
+from linotp.model import db, init_db_tables
+
+REALM = "bench"
+RESOLVER = "bench_resolver"
+PASSWORD = "Test123!"
+PIN = "1234"
+CLIENT = "192.168.17.1"
+
+USER_PREFIXES = ("hmac", "totp", "pw", "push", "login")
+
+
+def hotp(key, counter, digits=6):
+    """
+    the rfc 4226 one time password of the key for the counter
+    """
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    code = struct.unpack(">I", digest[offset : offset + 4])[0] & 0x7FFFFFFF
+    return "%0*d" % (digits, code % 10**digits)
+
+
+def token_key(serial):
+    """
+    the reproducible seed of a token
+    """
+    return hashlib.sha256(serial.encode("utf-8")).digest()[:20]
+
+
+def percentile(values, percent):
+    """
+    the nearest rank percentile of the sorted values
+    """
+    rank = max(0, int(round(percent / 100.0 * len(values) + 0.5)) - 1)
+    return values[min(rank, len(values) - 1)]
+
+
+# -------------------------------------------------------------------------- --
+
+# the benchmark environment
+
+
+class Benchmark:
+    """
+    the app with the seeded users, realm and policies
+    """
+
+    def __init__(self, workdir, database_uri=None, users=100, policies=50):
+        self.workdir = workdir
+        self.users = users
+        self.policies = policies
+
+        self.app = self._create_app(database_uri)
+        self.client = self.app.test_client()
+
+        self._seed()
+
+    def _create_app(self, database_uri):
+        if not database_uri:
+            database_uri = "sqlite:///" + os.path.join(
+                self.workdir, "linotp.sqlite"
+            )
+
+        config = dict(
+            TESTING=True,
+            DATABASE_URI=database_uri,
+            AUDIT_DATABASE_URI="SHARED",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            ROOT_DIR=self.workdir,
+            CACHE_DIR=os.path.join(self.workdir, "cache"),
+            DATA_DIR=os.path.join(self.workdir, "data"),
+            LOG_FILE_DIR=os.path.join(self.workdir, "logs"),
+            AUDIT_PUBLIC_KEY_FILE=os.path.join(self.workdir, "audit-pub.pem"),
+            AUDIT_PRIVATE_KEY_FILE=os.path.join(self.workdir, "audit.pem"),
+            SECRET_FILE=os.path.join(self.workdir, "encKey"),
+            LOGGING_LEVEL="WARNING",
+            LOGGING_CONSOLE_LEVEL="ERROR",
+            DISABLE_CONTROLLERS="",
+        )
+
+        for key in ("CACHE_DIR", "DATA_DIR", "LOG_FILE_DIR"):
+            os.makedirs(config[key], mode=0o770, exist_ok=True)
+
+        create_secret_key(config["SECRET_FILE"])
+        create_audit_keys(
+            config["AUDIT_PRIVATE_KEY_FILE"], config["AUDIT_PUBLIC_KEY_FILE"]
+        )
+
+        # the environment must not override the benchmark configuration
+
+        os.environ["LINOTP_CFG"] = ""
+        os.environ.pop("LINOTP_DATABASE_URI", None)
+        os.environ["LINOTP_CMD"] = "init-database"
+
+        app = create_app("testing", config)
+
+        with app.app_context():
+            init_db_tables(app, drop_data=True, add_defaults=True)
+
+        return app
+
+    @contextlib.contextmanager
+    def admin_identity(self):
+        """
+        make the requests as authenticated admin
+        """
+        identity = {
+            "username": "admin",
+            "realm": self.app.config["ADMIN_REALM_NAME"],
+            "resolver": "useridresolver.PasswdIdResolver.IdResolver.admin",
+        }
+
+        with patch(
+            "linotp.controllers.base.verify_jwt_in_request", lambda: None
+        ), patch("linotp.app.get_jwt_identity", lambda: identity):
+            yield
+
+    def admin(self, path, **params):
+        """
+        make an admin or system request and verify its success
+        """
+        with self.admin_identity():
+            response = self.client.post("/" + path, data=params)
+
+        result = response.json["result"]
+        if not result["status"] or result["value"] is False:
+            raise Exception("%s failed: %r" % (path, response.json))
+
+        return response.json
+
+    @contextlib.contextmanager
+    def request_context(self):
+        """
+        an app and request context like the one of a validate request
+        """
+        with self.app.test_request_context(
+            "/", environ_base={"REMOTE_ADDR": CLIENT}
+        ):
+            self.app.preprocess_request()
+            yield
+            db.session.commit()
+
+    def user(self, prefix, index):
+        return "%s%05d" % (prefix, index % self.users)
+
+    def _seed(self):
+        passwd_file = os.path.join(self.workdir, "bench-passwd")
+        password_hash = sha512_crypt.using(rounds=5000).hash(PASSWORD)
+
+        uid = 1000
+        with open(passwd_file, "w") as passwd:
+            for prefix in USER_PREFIXES:
+                for index in range(self.users):
+                    login = self.user(prefix, index)
+                    passwd.write(
+                        "%s:%s:%d:%d:%s:/home/%s:/bin/bash\n"
+                        % (login, password_hash, uid, uid, login, login)
+                    )
+                    uid += 1
+
+        self.admin(
+            "system/setResolver",
+            name=RESOLVER,
+            type="passwdresolver",
+            fileName=passwd_file,
+        )
+        self.admin(
+            "system/setRealm",
+            realm=REALM,
+            resolvers="useridresolver.PasswdIdResolver.IdResolver." + RESOLVER,
+        )
+
+        # once there are admin policies, the admin needs its own one
+
+        self.admin(
+            "system/setPolicy",
+            name="bench_admin",
+            scope="admin",
+            realm="*",
+            action="*",
+            user="*",
+            client="",
+        )
+
+        # the policies of other realms are part of every policy evaluation
+
+        scopes = [
+            ("authentication", "otppin=1"),
+            ("selfservice", "history"),
+            ("admin", "show"),
+        ]
+
+        for index in range(self.policies):
+            scope, action = scopes[index % len(scopes)]
+            self.admin(
+                "system/setPolicy",
+                name="bench_other_%d" % index,
+                scope=scope,
+                realm="other%d" % index,
+                action=action,
+                user="*",
+                client="",
+            )
+
+        self.admin(
+            "system/setPolicy",
+            name="bench_selfservice",
+            scope="selfservice",
+            realm=REALM,
+            action="history",
+            user="*",
+            client="",
+        )
+
+        self.admin(
+            "system/setPolicy",
+            name="bench_push",
+            scope="authentication",
+            realm=REALM,
+            action="pushtoken_pairing_callback_url=https://localhost/pair, "
+            "pushtoken_challenge_callback_url=https://localhost/challenge",
+            user="*",
+            client="",
+        )
+
+
+# -------------------------------------------------------------------------- --
+
+# the scenarios
+
+
+class Scenario:
+    """
+    a benchmarked request path
+
+    setup is called once before the requests with the total number of
+    requests, request is called with the running number of the request
+    and returns True if the request succeeded.
+    """
+
+    name = ""
+
+    def context(self, bench):
+        return contextlib.nullcontext()
+
+    def setup(self, bench, count):
+        pass
+
+    def request(self, bench, index):
+        raise NotImplementedError()
+
+
+class ValidateScenario(Scenario):
+    token_type = ""
+
+    def setup(self, bench, count):
+        self.uses = {}
+
+        for index in range(min(count, bench.users)):
+            login = bench.user(self.token_type, index)
+            bench.admin("admin/init", **self.init_params(login))
+
+    def init_params(self, login):
+        serial = "B" + login
+        return {
+            "type": self.token_type,
+            "serial": serial,
+            "otpkey": token_key(serial).hex(),
+            "user": login + "@" + REALM,
+            "pin": PIN,
+        }
+
+    def password(self, login, use):
+        raise NotImplementedError()
+
+    def request(self, bench, index):
+        login = bench.user(self.token_type, index)
+
+        use = self.uses.get(login, 0)
+        self.uses[login] = use + 1
+
+        response = bench.client.post(
+            "/validate/check",
+            data={
+                "user": login + "@" + REALM,
+                "pass": self.password(login, use),
+            },
+        )
+        return response.json["result"]["value"] is True
+
+
+class HmacCheck(ValidateScenario):
+    name = "validate_check_hmac"
+    token_type = "hmac"
+
+    def password(self, login, use):
+        return PIN + hotp(token_key("B" + login), use)
+
+
+class TotpCheck(ValidateScenario):
+    """
+    each totp otp could be used only once, so the repeated requests of a
+    user use the otps of the following time steps - the otp window is
+    sized to cover all of them
+    """
+
+    name = "validate_check_totp"
+    token_type = "totp"
+
+    def setup(self, bench, count):
+        uses = -(-count // bench.users)
+        self.time_window = 30 * (uses + 2)
+
+        super().setup(bench, count)
+        self.time_step = int(time.time()) // 30
+
+    def init_params(self, login):
+        params = super().init_params(login)
+        params["timeStep"] = 30
+        params["timeWindow"] = self.time_window
+        return params
+
+    def password(self, login, use):
+        return PIN + hotp(token_key("B" + login), self.time_step + use)
+
+
+class PasswordCheck(ValidateScenario):
+    name = "validate_check_pw"
+    token_type = "pw"
+
+    def init_params(self, login):
+        params = super().init_params(login)
+        params["otpkey"] = "bench-" + login
+        return params
+
+    def password(self, login, use):
+        return PIN + "bench-" + login
+
+
+class PushProvider:
+    """
+    stand-in of the push notification proxy
+    """
+
+    def push_notification(self, challenge, gda, transaction_id):
+        return True, None
+
+
+class PushCheck(ValidateScenario):
+    """
+    the push tokens are activated without the pairing by the smartphone
+    """
+
+    name = "validate_check_push"
+    token_type = "push"
+
+    def context(self, bench):
+        return patch(
+            "linotp.tokens.pushtoken.pushtoken.loadProviderFromPolicy",
+            lambda *args, **kwargs: PushProvider(),
+        )
+
+    def setup(self, bench, count):
+        for index in range(min(count, bench.users)):
+            login = bench.user(self.token_type, index)
+            bench.admin(
+                "admin/init",
+                type="push",
+                serial="B" + login,
+                user=login + "@" + REALM,
+                pin=PIN,
+            )
+
+        public_key, _secret_key = crypto_sign_keypair()
+
+        with bench.request_context():
+            for token in get_tokens(serial="Bpush*", token_type="push"):
+                token.addToTokenInfo("user_token_id", 1)
+                token.addToTokenInfo(
+                    "user_dsa_public_key", b64encode(public_key).decode()
+                )
+                token.addToTokenInfo("gda", "bench-gda")
+                token.change_state("active")
+                token.enable(True)
+
+    def request(self, bench, index):
+        login = bench.user(self.token_type, index)
+
+        response = bench.client.post(
+            "/validate/check",
+            data={
+                "user": login + "@" + REALM,
+                "pass": PIN,
+                "data": "benchmark transaction %d" % index,
+            },
+        )
+        return "transactionid" in response.json.get("detail", {})
+
+
+class AdminShow(Scenario):
+    name = "admin_show"
+
+    def context(self, bench):
+        return bench.admin_identity()
+
+    def setup(self, bench, count):
+        for index in range(bench.users):
+            serial = "BS%05d" % index
+            bench.admin(
+                "admin/init",
+                type="hmac",
+                serial=serial,
+                otpkey=token_key(serial).hex(),
+            )
+
+    def request(self, bench, index):
+        response = bench.client.get(
+            "/admin/show", query_string={"page": 1, "pagesize": 50}
+        )
+        return response.json["result"]["status"] is True
+
+
+class AdminInit(Scenario):
+    name = "admin_init"
+
+    def context(self, bench):
+        return bench.admin_identity()
+
+    def request(self, bench, index):
+        serial = "BI%06d" % index
+
+        response = bench.client.post(
+            "/admin/init",
+            data={
+                "type": "hmac",
+                "serial": serial,
+                "otpkey": token_key(serial).hex(),
+            },
+        )
+        return response.json["result"]["value"] is True
+
+
+class UserserviceLogin(Scenario):
+    name = "userservice_login"
+
+    def request(self, bench, index):
+        login = bench.user("login", index)
+
+        response = bench.client.post(
+            "/userservice/login",
+            data={"username": login + "@" + REALM, "password": PASSWORD},
+        )
+        return response.json["result"]["value"] is True
+
+
+class PolicyEvaluation(Scenario):
+    name = "policy_evaluation"
+
+    def context(self, bench):
+        return bench.request_context()
+
+    def request(self, bench, index):
+        user = User(bench.user("hmac", index), REALM)
+
+        get_client_policy(
+            CLIENT,
+            scope="authentication",
+            action="otppin",
+            realm=REALM,
+            userObj=user,
+        )
+        return True
+
+
+SCENARIOS = [
+    HmacCheck,
+    TotpCheck,
+    PasswordCheck,
+    PushCheck,
+    AdminShow,
+    AdminInit,
+    UserserviceLogin,
+    PolicyEvaluation,
+]
+
+
+# -------------------------------------------------------------------------- --
+
+# running and comparing
+
+
+def run_scenario(bench, scenario, rounds, warmup):
+    """
+    measure the requests of a scenario
+
+    :return: dict with the throughput and the latency percentiles
+    """
+    count = warmup + rounds
+    scenario.setup(bench, count)
+
+    latencies = []
+    errors = 0
+
+    with scenario.context(bench):
+        started = time.perf_counter()
+
+        for index in range(count):
+            if index == warmup:
+                started = time.perf_counter()
+
+            start = time.perf_counter()
+            success = scenario.request(bench, index)
+            latency = time.perf_counter() - start
+
+            if index >= warmup:
+                latencies.append(latency)
+                errors += 0 if success else 1
+
+        total = time.perf_counter() - started
+
+    latencies.sort()
+
+    def ms(value):
+        return round(value * 1000, 3)
+
+    return {
+        "rounds": rounds,
+        "errors": errors,
+        "total_s": round(total, 3),
+        "throughput_rps": round(rounds / total, 1) if total else 0.0,
+        "latency_ms": {
+            "min": ms(latencies[0]),
+            "mean": ms(sum(latencies) / len(latencies)),
+            "p50": ms(percentile(latencies, 50)),
+            "p90": ms(percentile(latencies, 90)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1]),
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    names=None,
+    rounds=200,
+    warmup=10,
+    users=100,
+    policies=50,
+    database_uri=None,
+):
+    """
+    seed a new benchmark environment and run the scenarios
+
+    :param names: the names of the scenarios - all if None
+    :return: dict with the meta data and the results per scenario
+    """
+    scenarios = [
+        scenario()
+        for scenario in SCENARIOS
+        if names is None or scenario.name in names
+    ]
+
+    with tempfile.TemporaryDirectory(prefix="linotp-benchmark-") as workdir:
+        bench = Benchmark(workdir, database_uri, users, policies)
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = run_scenario(
+                bench, scenario, rounds, warmup
+            )
+
+        with bench.app.app_context():
+            dialect = db.engine.dialect.name
+
+    return {
+        "meta": {
+            "linotp_version": __version__,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": dialect,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "rounds": rounds,
+            "warmup": warmup,
+            "users": users,
+            "policies": policies,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    compare the median latencies of two benchmark runs
+
+    :return: tuple of the report lines and the names of the scenarios,
+             which got slower than threshold percent
+    """
+    lines = [
+        "%-22s %10s %10s %8s" % ("scenario", "before ms", "after ms", "change")
+    ]
+    regressions = []
+
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+
+        old = before["latency_ms"]["p50"]
+        new = result["latency_ms"]["p50"]
+        change = (new - old) / old * 100 if old else 0.0
+
+        lines.append("%-22s %10.3f %10.3f %+7.1f%%" % (name, old, new, change))
+
+        if change > threshold:
+            regressions.append(name)
+
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="benchmark of the LinOTP request paths"
+    )
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--policies", type=int, default=50)
+    parser.add_argument(
+        "--database-uri", help="the database - a temporary sqlite by default"
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="run only the given scenario - could be repeated",
+    )
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument(
+        "--compare", help="compare the results with this earlier result file"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="the allowed increase of the median latency in percent",
+    )
+    args = parser.parse_args(argv)
+
+    result = run(
+        names=args.scenario,
+        rounds=args.rounds,
+        warmup=args.warmup,
+        users=args.users,
+        policies=args.policies,
+        database_uri=args.database_uri,
+    )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+
+    for name, values in result["results"].items():
+        latency = values["latency_ms"]
+        print(
+            "%-22s %8.1f req/s  p50 %8.3f ms  p99 %8.3f ms  errors %d"
+            % (
+                name,
+                values["throughput_rps"],
+                latency["p50"],
+                latency["p99"],
+                values["errors"],
+            )
+        )
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        lines, regressions = compare(baseline, result, args.threshold)
+        print("\n".join(lines))
+
+        if regressions:
+            print("slower than %.1f%%: %s" % (args.threshold, regressions))
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
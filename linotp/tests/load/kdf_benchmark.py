@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+benchmark of the pbkdf2 key derivation
+
+compares the pure python PBKDF2 implementation with the hashlib based
+pbkdf2 for the parameters of the ocra2 rollout and the pskc password
+based encryption:
+
+    python -m linotp.tests.load.kdf_benchmark [rounds]
+"""
+
+import sys
+import timeit
+from hashlib import sha1, sha256
+
+from linotp.lib.crypto.pbkdf2 import pbkdf2
+from linotp.lib.ext.pbkdf2 import PBKDF2
+
+# (name, password, salt, key length, iterations, hash function)
+
+VECTORS = [
+    ("ocra2 kdf2", b"\x01" * 42, b"\x12\x34\x56\x78" * 2, 32, 10000, sha256),
+    (
+        "pskc pbe",
+        b"qwerty",
+        b"\x12\x3e\xff\x3c\x4a\x72\x12\x9c",
+        16,
+        1000,
+        sha1,
+    ),
+]
+
+
+def pure_python(password, salt, dk_length, iterations, hashfunc):
+    return PBKDF2(password, salt, iterations, hashfunc).read(dk_length)
+
+
+def main(rounds=10):
+    for name, password, salt, dk_length, iterations, hashfunc in VECTORS:
+        args = (password, salt, dk_length, iterations, hashfunc)
+
+        assert pure_python(*args) == pbkdf2(*args)
+
+        old = timeit.timeit(lambda: pure_python(*args), number=rounds)
+        new = timeit.timeit(lambda: pbkdf2(*args), number=rounds)
+
+        print(
+            "%-12s  pure python: %8.2f ms  hashlib: %8.2f ms  (%.0fx)"
+            % (
+                name,
+                old / rounds * 1000,
+                new / rounds * 1000,
+                old / new,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+smoke test of the request path benchmark with a minimal number of requests
+"""
+
+import json
+
+from linotp.tests.load import benchmark
+
+
+def test_hotp():
+    # the test vectors of rfc 4226 appendix D
+    key = b"12345678901234567890"
+    assert benchmark.hotp(key, 0) == "755224"
+    assert benchmark.hotp(key, 9) == "520489"
+
+
+def test_benchmark_run(tmp_path):
+    result = benchmark.run(rounds=3, warmup=1, users=2, policies=3)
+
+    assert result["meta"]["database"] == "sqlite"
+    assert set(result["results"]) == {
+        scenario.name for scenario in benchmark.SCENARIOS
+    }
+
+    for name, values in result["results"].items():
+        assert values["errors"] == 0, name
+        assert values["rounds"] == 3
+        latency = values["latency_ms"]
+        assert latency["min"] <= latency["p50"] <= latency["max"]
+
+    # the results are comparable with the results of an earlier run
+
+    output = tmp_path / "result.json"
+    output.write_text(json.dumps(result))
+    baseline = json.loads(output.read_text())
+
+    lines, regressions = benchmark.compare(baseline, result, threshold=0.0)
+    assert len(lines) == len(benchmark.SCENARIOS) + 1
+    assert regressions == []
+
+
+def test_compare_regression():
+    def result(p50):
+        return {"results": {"admin_show": {"latency_ms": {"p50": p50}}}}
+
+    _lines, regressions = benchmark.compare(result(10.0), result(12.0), 10.0)
+    assert regressions == ["admin_show"]
+
+    _lines, regressions = benchmark.compare(result(10.0), result(10.5), 10.0)
+    assert regressions == []
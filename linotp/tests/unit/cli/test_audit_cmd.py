@@ -35,6 +35,7 @@ from flask.testing import FlaskCliRunner
 
 from linotp.app import LinOTPApp
 from linotp.cli import main as cli_main
+from linotp.cli.audit_cmd import SQLJanitor
 from linotp.lib.audit.SQLAudit import AuditTable
 from linotp.model import db
 
@@ -243,3 +244,82 @@ def test_run_janitor_max_min(runner: FlaskCliRunner, setup_audit_table: None):
     assert (
         "Error: --max must be greater than or equal to --min" in result.stderr
     )
+
+
+@pytest.fixture
+def setup_aged_audit_table(app: LinOTPApp, freezer: FrozenDateTimeFactory):
+    """Add audit entries of two different days into the audit database"""
+
+    entry = {
+        "action": "validate/check",
+    }
+
+    freezer.move_to("2020-01-01 09:50:00")
+    for _ in range(AUDIT_AMOUNT_ENTRIES):
+        app.audit_obj.log_entry(entry)
+
+    freezer.move_to("2020-01-10 09:50:00")
+    for _ in range(10):
+        app.audit_obj.log_entry(entry)
+
+
+def test_audit_rotate(
+    app: LinOTPApp,
+    runner: FlaskCliRunner,
+    setup_aged_audit_table: None,
+):
+    """Run audit rotate on an unpartitioned audit table"""
+
+    result = runner.invoke(
+        cli_main, ["-vv", "audit", "rotate", "--keep", "5", "--no-export"]
+    )
+
+    assert result.exit_code == 0
+    assert (
+        f"{AUDIT_AMOUNT_ENTRIES} entries older than 5 days removed"
+        in result.stderr
+    )
+    assert db.session.query(AuditTable).count() == 10
+
+
+def test_janitor_rotate_batches(
+    app: LinOTPApp,
+    export_dir: Path,
+    setup_aged_audit_table: None,
+):
+    """The expired entries are exported and deleted in batches"""
+
+    janitor = SQLJanitor(export_dir=export_dir)
+
+    rotate_infos = janitor.rotate(5, batch_size=7)
+
+    assert rotate_infos["rotated"]
+    assert rotate_infos["entries_deleted"] == AUDIT_AMOUNT_ENTRIES
+    assert rotate_infos["partitions_dropped"] == []
+
+    export_file = Path(rotate_infos["export_filename"])
+    assert export_file.name.endswith(f".{AUDIT_AMOUNT_ENTRIES}.csv")
+    num_lines = sum(1 for _ in export_file.open())
+    # expected: Number of deleted lines + header row
+    assert num_lines == AUDIT_AMOUNT_ENTRIES + 1
+
+    remaining = db.session.query(AuditTable.id).order_by(AuditTable.id)
+    assert [row.id for row in remaining] == list(
+        range(AUDIT_AMOUNT_ENTRIES + 1, AUDIT_AMOUNT_ENTRIES + 11)
+    )
+
+    # nothing is left to rotate
+
+    rotate_infos = janitor.rotate(5, batch_size=7)
+    assert not rotate_infos["rotated"]
+    assert rotate_infos["export_filename"] is None
+
+
+@pytest.mark.app_config({"AUDIT_PARTITIONING": "DAILY"})
+def test_audit_partition_unsupported(runner: FlaskCliRunner):
+    """The partitioning is not supported for sqlite audit databases"""
+
+    result = runner.invoke(cli_main, ["audit", "partition"])
+
+    assert result.exit_code == 1
+    assert "not supported for sqlite databases" in result.stderr
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from flask.testing import FlaskCliRunner
+
+from linotp.app import LinOTPApp
+from linotp.cli import main as cli_main
+from linotp.cli.challenge_cmd import ChallengeJanitor
+from linotp.model import db
+from linotp.model.challange import Challenge
+
+# -------------------------------------------------------------------------- --
+
+CHALLENGE_AMOUNT = 10
+
+
+@pytest.fixture
+def setup_challenge_table(app: LinOTPApp):
+    """
+    add open, closed, expired and challenges without expiry - the first
+    half of each kind is one hour old
+    """
+
+    now = datetime.now()
+
+    for num in range(4 * CHALLENGE_AMOUNT):
+        challenge = Challenge(
+            transid="%012d" % num, tokenserial="Tok%d" % num, session="{}"
+        )
+
+        if num % CHALLENGE_AMOUNT < CHALLENGE_AMOUNT // 2:
+            challenge.timestamp = now - timedelta(hours=1)
+
+        if num < CHALLENGE_AMOUNT:
+            challenge.set_validity(3 * 3600)
+        elif num < 2 * CHALLENGE_AMOUNT:
+            challenge.set_validity(3 * 3600)
+            challenge.close()
+        elif num < 3 * CHALLENGE_AMOUNT:
+            challenge.set_validity(0)
+        else:
+            # created before the expiry column - the token does not exist
+            # anymore, so the challenge is expired - open or closed
+            if num % 2:
+                challenge.close()
+
+        db.session.add(challenge)
+
+    db.session.commit()
+
+
+@pytest.fixture
+def runner(app: LinOTPApp) -> FlaskCliRunner:
+    """Creates a testing instance of the flask cli runner class"""
+    return app.test_cli_runner(mix_stderr=False)
+
+
+@pytest.mark.parametrize(
+    "retention,expired,legacy",
+    [
+        (0, CHALLENGE_AMOUNT, CHALLENGE_AMOUNT),
+        (60, CHALLENGE_AMOUNT // 2, CHALLENGE_AMOUNT // 2),
+        (2 * 3600, 0, 0),
+    ],
+)
+@pytest.mark.usefixtures("setup_challenge_table")
+def test_challenge_janitor(retention: int, expired: int, legacy: int):
+    """only expired challenges beyond the retention are deleted"""
+
+    janitor = ChallengeJanitor(chunk_size=3)
+    cleanup_infos = janitor.cleanup(retention)
+
+    assert cleanup_infos["expired_deleted"] == expired
+    assert cleanup_infos["legacy_deleted"] == legacy
+    assert cleanup_infos["entries_deleted"] == expired + legacy
+
+    remaining = Challenge.query.count()
+    assert remaining == 4 * CHALLENGE_AMOUNT - expired - legacy
+
+    # the open and closed challenges, which are not expired, are kept
+    assert Challenge.query.filter(
+        Challenge.expiry > datetime.now()
+    ).count() == (2 * CHALLENGE_AMOUNT)
+
+
+@pytest.mark.usefixtures("setup_challenge_table")
+def test_closed_challenge_kept_until_expired():
+    """closed challenges are kept for the status check until they expire"""
+
+    janitor = ChallengeJanitor()
+    janitor.cleanup(0)
+
+    closed = Challenge.query.filter(Challenge.status == "closed").all()
+    assert len(closed) == CHALLENGE_AMOUNT
+    assert all(challenge.expiry > datetime.now() for challenge in closed)
+
+
+@pytest.mark.usefixtures("setup_challenge_table")
+def test_challenge_cleanup_cmd(runner: FlaskCliRunner):
+    """the cli command reports the number of deleted challenges"""
+
+    result = runner.invoke(cli_main, ["-v", "challenge", "cleanup"])
+
+    assert result.exit_code == 0
+    assert (
+        f"{CHALLENGE_AMOUNT} expired challenges and {CHALLENGE_AMOUNT} "
+        "expired challenges without expiry time deleted." in result.stderr
+    )
+    assert Challenge.query.count() == 2 * CHALLENGE_AMOUNT
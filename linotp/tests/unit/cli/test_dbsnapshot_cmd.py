@@ -32,12 +32,22 @@ the test does not cover restore_legacy as this could only be verified
 against a mysql database which could not be used in a unit test
 """
 
+import gzip
+import json
 from datetime import datetime
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
+from linotp.cli import Echo
 from linotp.cli import main as cli_main
+from linotp.cli.dbsnapshot_cmd import (
+    backup_database_tables,
+    restore_database_tables,
+)
+from linotp.model import db
+from linotp.model.config import Config
 
 
 @pytest.fixture
@@ -68,21 +78,40 @@ def test_dbsnapshot(app, runner, freezer):
     backup_dir = Path(app.config["BACKUP_DIR"])
     assert backup_dir.is_dir()
 
-    backup_file = backup_dir / f"linotp_backup_{str_now}.sqldb"
+    backup_file = backup_dir / f"linotp_backup_{str_now}.jsonl.gz"
     assert backup_file.is_file()
 
-    assert "Config" in backup_file.read_text()
+    with gzip.open(backup_file, "rt") as snapshot:
+        assert "Config" in snapshot.read()
+
+    manifest_file = backup_dir / f"linotp_backup_{str_now}.manifest.json"
+    assert "Config" in json.loads(manifest_file.read_text())["tables"]
 
     # list database backups
     result = runner.invoke(cli_main, ["dbsnapshot", "list"])
     assert str_now in result.output
 
 
+def test_dbsnapshot_list_error(runner):
+    """the error of the snapshot listing is reported"""
+
+    with patch(
+        "linotp.cli.dbsnapshot_cmd.list_database_backups",
+        side_effect=Exception("no backup dir"),
+    ):
+        result = runner.invoke(cli_main, ["dbsnapshot", "list"])
+
+    assert result.exit_code == 1
+    assert "Failed to list snapshot files: Exception('no backup dir')" in (
+        result.stderr
+    )
+
+
 @pytest.mark.parametrize(
     "args,result",
     [
         (["--date", "NOW"], 0),
-        (["--file", "linotp_backup_NOW.sqldb"], 0),
+        (["--file", "linotp_backup_NOW.jsonl.gz"], 0),
         (["--date", "NOW", "--table", "Config"], 0),
         (
             ["--date", "NOW", "--table", "Foo"],
@@ -100,3 +129,90 @@ def test_dbsnapshot_restore_cmd(app, runner, freezer, args, result):
     args = [a.replace("NOW", str_now) for a in args]
     cmd_result = runner.invoke(cli_main, ["dbsnapshot", "restore"] + args)
     assert cmd_result.exit_code == result
+
+
+@pytest.mark.parametrize("parallel", [1, 2])
+def test_snapshot_roundtrip(app, freezer, parallel):
+    """verify that a snapshot restores the former state of the tables
+
+    - the modified rows are updated, the removed rows are inserted again
+    - the manifest contains the row count of each table
+    """
+
+    app.echo = Echo()
+    app.config["AUDIT_DATABASE_URI"] = "OFF"
+    freezer.move_to("2020-08-18 19:25:33")
+
+    db.session.add(Config(Key="linotp.snapshot_test", Value="before"))
+    db.session.add(Config(Key="linotp.snapshot_gone", Value="gone"))
+    db.session.commit()
+
+    backup_file = Path(backup_database_tables(parallel=parallel))
+    assert backup_file.is_file()
+
+    manifest_file = Path(
+        str(backup_file).replace(".jsonl.gz", ".manifest.json")
+    )
+    manifest = json.loads(manifest_file.read_text())
+    assert manifest["tables"]["Config"]["rows"] == Config.query.count()
+
+    Config.query.filter_by(Key="linotp.snapshot_test").update(
+        {"Value": "after"}
+    )
+    Config.query.filter_by(Key="linotp.snapshot_gone").delete()
+    db.session.commit()
+
+    restore_database_tables(filename=str(backup_file), table="config")
+
+    assert Config.query.get("linotp.snapshot_test").Value == "before"
+    assert Config.query.get("linotp.snapshot_gone").Value == "gone"
+
+
+def test_snapshot_shared_audit(app, freezer):
+    """verify that the shared audit table is dumped from the audit database
+
+    the audit table is bound to the audit database, which is a separate
+    database file for sqlite
+    """
+
+    app.echo = Echo()
+    assert app.config["AUDIT_DATABASE_URI"] == "SHARED"
+    freezer.move_to("2020-08-18 19:25:33")
+
+    backup_file = backup_database_tables(parallel=2)
+
+    manifest_file = Path(backup_file.replace(".jsonl.gz", ".manifest.json"))
+    manifest = json.loads(manifest_file.read_text())
+
+    assert "AuditTable" in manifest["tables"]
+    assert "Config" in manifest["tables"]
+
+
+def test_snapshot_checksum_mismatch(app, freezer):
+    """verify that a snapshot, which does not match its manifest, is not
+    restored at all
+    """
+
+    app.echo = Echo()
+    app.config["AUDIT_DATABASE_URI"] = "OFF"
+    freezer.move_to("2020-08-18 19:25:33")
+
+    db.session.add(Config(Key="linotp.snapshot_test", Value="before"))
+    db.session.commit()
+
+    backup_file = backup_database_tables()
+
+    manifest_file = Path(backup_file.replace(".jsonl.gz", ".manifest.json"))
+    manifest = json.loads(manifest_file.read_text())
+    manifest["tables"]["Config"]["rows"] += 1
+    manifest_file.write_text(json.dumps(manifest))
+
+    Config.query.filter_by(Key="linotp.snapshot_test").update(
+        {"Value": "after"}
+    )
+    db.session.commit()
+
+    with pytest.raises(ValueError):
+        restore_database_tables(filename=backup_file)
+
+    assert Config.query.get("linotp.snapshot_test").Value == "after"
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+
+import pytest
+
+from flask.testing import FlaskCliRunner
+
+from linotp.app import LinOTPApp
+from linotp.cli import Echo
+from linotp.cli.profile_cmd import profile_cmds
+from linotp.lib import profiling
+
+# -------------------------------------------------------------------------- --
+
+
+@pytest.fixture
+def runner(app: LinOTPApp) -> FlaskCliRunner:
+    """Creates a testing instance of the flask cli runner class"""
+    app.echo = Echo()
+    return app.test_cli_runner(mix_stderr=False)
+
+
+@pytest.fixture
+def profile_name(app: LinOTPApp) -> str:
+    """capture a profile and return its name"""
+
+    profiling.arm("validate/check", 1)
+    profiler = profiling.start("validate/check")
+    sorted(range(100))
+    return profiling.stop(profiler, "validate/check", "0123456789abcdef")
+
+
+def test_profile_list(runner: FlaskCliRunner, profile_name: str):
+    result = runner.invoke(profile_cmds, ["list"])
+
+    assert result.exit_code == 0
+    assert result.stdout.startswith(profile_name + "\t")
+
+
+def test_profile_get(runner: FlaskCliRunner, profile_name: str, tmp_path):
+    output = tmp_path / "validate-check.prof"
+
+    result = runner.invoke(
+        profile_cmds, ["get", profile_name, "--output", str(output)]
+    )
+
+    assert result.exit_code == 0
+    with runner.app.app_context():
+        path = profiling.get_profile_path(profile_name)
+    with open(path, "rb") as profile:
+        assert output.read_bytes() == profile.read()
+
+
+def test_profile_show(runner: FlaskCliRunner, profile_name: str):
+    result = runner.invoke(
+        profile_cmds, ["show", profile_name, "--sort", "tottime"]
+    )
+
+    assert result.exit_code == 0
+    assert "function calls" in result.stdout
+
+
+def test_profile_unknown(runner: FlaskCliRunner, profile_name: str):
+    result = runner.invoke(profile_cmds, ["get", "unknown.prof"])
+
+    assert result.exit_code == 1
+    assert "no profile 'unknown.prof' found" in result.stderr
@@ -27,9 +27,12 @@
 # pylint: disable=redefined-outer-name
 # pylint: disable=unused-argument
 
+import datetime
+
 import pytest
 
 from linotp.lib.audit.SQLAudit import AuditTable
+from linotp.model import db
 
 
 @pytest.fixture
@@ -185,6 +188,143 @@ class TestAuditSearch(object):
             "system/getConfig" == returned_entries_desc[0]["action"]
         ), returned_entries_desc
 
+    def test_audit_with_v2_time_range(self, adminclient):
+        for _i in range(4):
+            adminclient.get("/system/getConfig")
+
+        # move the first two entries one day back
+
+        yesterday = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        AuditTable.query.filter(AuditTable.id <= 2).update(
+            {"timestamp_utc": yesterday}, synchronize_session=False
+        )
+        db.session.commit()
+
+        one_hour_ago = datetime.datetime.now(
+            datetime.timezone.utc
+        ) - datetime.timedelta(hours=1)
+
+        response = adminclient.get(
+            "/api/v2/auditlog/",
+            query_string={
+                "from": one_hour_ago.isoformat(),
+                "action": "system/getConfig",
+                "sortOrder": "asc",
+            },
+        )
+        value = response.json["result"]["value"]
+        assert [entry["id"] for entry in value["pageRecords"]] == [3, 4]
+        assert value["totalRecords"] == 2
+
+        response = adminclient.get(
+            "/api/v2/auditlog/",
+            query_string={"to": one_hour_ago.isoformat(), "total": "false"},
+        )
+        value = response.json["result"]["value"]
+        assert len(value["pageRecords"]) == 2
+        assert value["totalRecords"] is None
+        assert value["totalPages"] is None
+
+        response = adminclient.get(
+            "/api/v2/auditlog/", query_string={"from": "yesterday"}
+        )
+        assert response.json["result"]["status"] is False
+
+    @pytest.mark.parametrize("sort_by", ["id", "timestamp"])
+    def test_audit_with_v2_keyset_pagination(self, adminclient, sort_by):
+        for _i in range(5):
+            adminclient.get("/system/getConfig")
+
+        ids = []
+        after = ""
+
+        while True:
+            response = adminclient.get(
+                "/api/v2/auditlog/",
+                query_string={
+                    "action": "system/getConfig",
+                    "sortBy": sort_by,
+                    "sortOrder": "desc",
+                    "pageSize": 2,
+                    "after": after,
+                },
+            )
+            records = response.json["result"]["value"]["pageRecords"]
+            if not records:
+                break
+
+            ids.extend(record["id"] for record in records)
+            after = records[-1]["id"]
+
+        assert ids == [5, 4, 3, 2, 1]
+
+    def test_audit_search_time_range(self, adminclient, search):
+        adminclient.get("/system/getConfig")
+
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+
+        response = search(**{"to": tomorrow.isoformat(), "total": "false"})
+        assert response.json["rows"]
+        assert response.json["total"] is None
+
+        response = search(**{"from": tomorrow.isoformat()})
+        assert response.json["rows"] == []
+        assert response.json["total"] == 0
+
+    @pytest.mark.parametrize("workers", [0, 4])
+    def test_audit_search_verify(self, app, search, monkeypatch, workers):
+        app.config["AUDIT_VERIFY_WORKERS"] = workers
+        monkeypatch.setattr("linotp.lib.audit.iterator.VERIFY_BATCH_SIZE", 3)
+
+        for _i in range(7):
+            search()
+
+        def sig_checks(**params):
+            rows = search(action="audit/search", **params).json["rows"]
+            return [(row["id"], row["cell"][2]) for row in rows]
+
+        # the entries are returned in order with the verified signatures
+
+        checks = sig_checks()
+        assert [check for _id, check in checks] == ["OK"] * 7
+        assert [_id for _id, _check in checks] == sorted(
+            _id for _id, _check in checks
+        )
+
+        assert {check for _id, check in sig_checks(verify="none")} == {""}
+        assert {check for _id, check in sig_checks(verify="page")} == {""}
+        assert {
+            check for _id, check in sig_checks(verify="page", rp=5, page=1)
+        } == {"OK"}
+
+        # a modified entry is detected, even if it was verified before
+
+        AuditTable.query.filter(AuditTable.id == 2).update(
+            {"info": "modified"}, synchronize_session=False
+        )
+        db.session.commit()
+
+        assert dict(sig_checks())[2] == "FAIL"
+
+        response = search(action="audit/search", verify="partly")
+        assert response.json["result"]["status"] is False
+
+    def test_audit_with_v2_verify(self, adminclient):
+        adminclient.get("/system/getConfig")
+
+        response = adminclient.get(
+            "/api/v2/auditlog/", query_string={"action": "system/getConfig"}
+        )
+        (record,) = response.json["result"]["value"]["pageRecords"]
+        assert record["signatureCheck"] is True
+
+        response = adminclient.get(
+            "/api/v2/auditlog/",
+            query_string={"action": "system/getConfig", "verify": "none"},
+        )
+        (record,) = response.json["result"]["value"]["pageRecords"]
+        assert record["signatureCheck"] is None
+
 
 # class TestAuditRecord(object):
 #     """
@@ -26,6 +26,7 @@
 
 import json
 import os
+import pstats
 
 import pytest
 from mock import patch
@@ -34,6 +35,7 @@ from sqlalchemy.exc import OperationalError
 import flask
 
 from linotp.flap import HTTPUnauthorized, config
+from linotp.lib import profiling
 from linotp.model import Config, LoggingConfig, db
 
 
@@ -80,6 +82,39 @@ class TestMaintenance(object):
         config_entry = LoggingConfig.query.get(name)
         assert config_entry.level == 10
 
+    def test_set_profiling(self, app, adminclient):
+        params = dict(target="system/getConfig", requests=2)
+        response = adminclient.post("/maintenance/setProfiling", json=params)
+        assert response.json["result"]["value"] == {"system/getConfig": 2}
+
+        for _i in range(3):
+            adminclient.get("/system/getConfig")
+        adminclient.get("/system/getRealms")
+
+        with app.app_context():
+            profiles = profiling.list_profiles()
+            armed = profiling.get_armed()
+
+        # only the armed number of requests of the action are profiled
+
+        assert len(profiles) == 2
+        assert all("-system-getConfig-" in name for name, _s, _m in profiles)
+        assert armed == {}
+
+        stats = pstats.Stats(
+            os.path.join(app.config["CACHE_DIR"], "profiles", profiles[0][0])
+        )
+        assert stats.total_calls > 0
+
+    def test_set_profiling_error(self, adminclient):
+        params = dict(target="validate", requests=2)
+        response = adminclient.post("/maintenance/setProfiling", json=params)
+        assert response.json["result"]["status"] is False
+
+        params = dict(target="validate/check", requests="many")
+        response = adminclient.post("/maintenance/setProfiling", json=params)
+        assert response.json["result"]["status"] is False
+
 
 class TestMaintCertificateHandling(object):
     maint = None
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+Tests the chunked backup and restore of the migrate controller
+"""
+
+from unittest import mock
+
+import pytest
+
+from linotp.lib.migrate import MigrationHandler
+
+SEED = "3132333435363738393031323334353637383930"
+
+# rfc 4226 hotp values of the seed
+OTPS = ["755224", "287082", "359152"]
+
+
+@pytest.fixture
+def tokens(adminclient, monkeypatch, tmp_path):
+    """create some hmac tokens and run the migration in the tmp dir"""
+
+    monkeypatch.chdir(tmp_path)
+
+    for i in range(5):
+        response = adminclient.post(
+            "/admin/init",
+            data={
+                "serial": "MIGRATE%d" % i,
+                "type": "hmac",
+                "otpkey": SEED,
+                "pin": "pin%d" % i,
+                "encryptpin": "true" if i % 2 else "false",
+            },
+        )
+        assert response.json["result"]["value"] is True
+
+    return ["MIGRATE%d" % i for i in range(5)]
+
+
+def check_s(client, serial, otp):
+    response = client.post(
+        "/validate/check_s", data={"serial": serial, "pass": otp}
+    )
+    return response.json["result"]["value"]
+
+
+@pytest.mark.app_config({"ENABLE_CONTROLLERS": "ALL migrate"})
+def test_backup_restore(adminclient, tokens, tmp_path):
+    params = {"backupid": "backup1", "pass": "Test123!", "chunk_size": 2}
+
+    response = adminclient.post("/migrate/backup", data=params)
+    assert response.json["result"]["value"]["Token"] == 5
+
+    response = adminclient.post("/migrate/restore", data=params)
+    assert response.json["result"]["value"]["Token"] == 5
+
+    # the backup and progress file are removed after the restore
+    assert not list(tmp_path.glob("*.hbak*"))
+
+    for serial in tokens:
+        assert check_s(adminclient, serial, "pin%s%s" % (serial[-1], OTPS[0]))
+
+
+@pytest.mark.app_config({"ENABLE_CONTROLLERS": "ALL migrate"})
+def test_resume_restore(adminclient, tokens, tmp_path):
+    params = {"backupid": "backup2", "pass": "Test123!", "chunk_size": 2}
+
+    response = adminclient.post("/migrate/backup", data=params)
+    assert response.json["result"]["value"]["Token"] == 5
+
+    set_tokens_data = MigrationHandler.set_tokens_data
+    restored = []
+
+    def interrupted(self, tokens_data):
+        if restored:
+            raise Exception("interrupted")
+
+        restored.extend(data["Serial"] for data in tokens_data)
+        set_tokens_data(self, tokens_data)
+
+    with mock.patch.object(MigrationHandler, "set_tokens_data", interrupted):
+        response = adminclient.post("/migrate/restore", data=params)
+        assert response.json["result"]["status"] is False
+
+    assert restored == tokens[:2]
+
+    # the backup file is kept to continue the restore
+
+    assert len(list(tmp_path.glob("*.hbak"))) == 1
+    assert len(list(tmp_path.glob("*.hbak.progress"))) == 1
+
+    response = adminclient.post("/migrate/restore", data=params)
+    assert response.json["result"]["value"]["Token"] == 5
+    assert not list(tmp_path.glob("*.hbak*"))
+
+    for serial in tokens:
+        assert check_s(adminclient, serial, "pin%s%s" % (serial[-1], OTPS[0]))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+# pylint: disable=redefined-outer-name
+# pylint: disable=unused-argument
+
+import pytest
+
+from linotp.lib import metrics
+
+
+@pytest.fixture
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.mark.app_config({"METRICS_ENABLED": True})
+def test_metrics(adminclient, clean_metrics):
+    adminclient.get("/system/getConfig")
+
+    response = adminclient.get("/monitoring/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+
+    lines = response.get_data(as_text=True).splitlines()
+
+    assert "# TYPE linotp_request_duration_seconds histogram" in lines
+    assert (
+        'linotp_request_duration_seconds_count{controller="system"} 1' in lines
+    )
+
+    for stage in ("context", "policy", "audit", "commit"):
+        assert (
+            'linotp_request_stage_seconds_count{stage="%s"} 1' % stage
+        ) in lines
+
+
+@pytest.mark.app_config({"METRICS_ENABLED": False})
+def test_metrics_disabled(adminclient, clean_metrics):
+    adminclient.get("/system/getConfig")
+
+    response = adminclient.get("/monitoring/metrics")
+
+    assert response.json["result"]["status"] is False
+    assert "METRICS_ENABLED" in response.json["result"]["error"]["message"]
+    assert metrics.render() == "\n"
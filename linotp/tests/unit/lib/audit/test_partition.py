@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+Unit tests for the audit table partitioning
+"""
+
+import re
+from datetime import datetime
+
+import pytest
+from mock import MagicMock
+
+from linotp.lib.audit.partition import (
+    TIME_FORMAT,
+    AuditPartitionError,
+    MySQLPartitioner,
+    PostgreSQLPartitioner,
+    get_partitioner,
+    parse_upper_bound,
+    partition_periods,
+)
+
+
+class FakeResult(list):
+    rowcount = 0
+
+    def scalar(self):
+        return self[0][0] if self else None
+
+
+class FakeConnection:
+    """records the statements and returns the configured partitions"""
+
+    def __init__(self, partitions=None):
+        self.partitions = partitions or []
+        self.statements = []
+
+    def execute(self, statement, **params):
+        sql = str(statement)
+        self.statements.append(sql)
+
+        if "pg_partitioned_table" in sql:
+            return FakeResult([(1,)] if self.partitions else [])
+        if "relpartbound" in sql or "PARTITION_DESCRIPTION" in sql:
+            return FakeResult(self.partitions)
+        return FakeResult()
+
+
+class FakeCatchAllConnection(FakeConnection):
+    """
+    keeps the entries of the PostgreSQL default partition and, like
+    PostgreSQL, refuses to create a partition, while the attached default
+    partition contains entries of its period
+    """
+
+    def __init__(self, partitions, catch_all_entries):
+        super().__init__(partitions)
+        self.catch_all_entries = list(catch_all_entries)
+        self.attached = True
+        self.moved = {}
+
+    def _in_period(self, params):
+        return [
+            entry
+            for entry in self.catch_all_entries
+            if params["start"] <= entry < params["end"]
+        ]
+
+    def execute(self, statement, **params):
+        sql = str(statement)
+
+        if sql.startswith('SELECT 1 FROM "audit_pmax"'):
+            self.statements.append(sql)
+            return FakeResult([(1,)] if self._in_period(params) else [])
+
+        if sql.startswith("CREATE TABLE") and "FOR VALUES" in sql:
+            start, end = (
+                datetime.strptime(bound, TIME_FORMAT)
+                for bound in re.findall(r"'([^']+)'", sql)
+            )
+            if self.attached and self._in_period(dict(start=start, end=end)):
+                raise Exception(
+                    "updated partition constraint for default partition "
+                    '"audit_pmax" would be violated by some row'
+                )
+
+        elif "DETACH PARTITION" in sql:
+            self.attached = False
+
+        elif "ATTACH PARTITION" in sql and sql.endswith("DEFAULT"):
+            self.attached = True
+
+        elif sql.startswith("INSERT INTO"):
+            name = re.match(r'INSERT INTO "(\w+)"', sql).group(1)
+            self.moved[name] = self._in_period(params)
+
+        elif sql.startswith('DELETE FROM "audit_pmax"'):
+            self.statements.append(sql)
+
+            if "ctid" in sql:
+                deleted = [
+                    entry
+                    for entry in self.catch_all_entries
+                    if entry < params["before"]
+                ][: params["limit"]]
+            else:
+                deleted = self._in_period(params)
+
+            for entry in deleted:
+                self.catch_all_entries.remove(entry)
+
+            result = FakeResult()
+            result.rowcount = len(deleted)
+            return result
+
+        return super().execute(statement, **params)
+
+
+def fake_engine(dialect, conn):
+    engine = MagicMock()
+    engine.dialect.name = dialect
+    engine.begin.return_value.__enter__.return_value = conn
+    engine.connect.return_value.__enter__.return_value = conn
+    return engine
+
+
+PG_PARTITIONS = [
+    ("audit_plegacy", "FOR VALUES FROM (MINVALUE) TO ('2023-10-01 00:00:00')"),
+    (
+        "audit_p20231001",
+        "FOR VALUES FROM ('2023-10-01 00:00:00') TO ('2023-10-02 00:00:00')",
+    ),
+    (
+        "audit_p20231002",
+        "FOR VALUES FROM ('2023-10-02 00:00:00') TO ('2023-10-03 00:00:00')",
+    ),
+    ("audit_pmax", "DEFAULT"),
+]
+
+
+def test_partition_periods():
+    periods = partition_periods(datetime(2023, 12, 15, 13, 20), "MONTHLY", 2)
+
+    assert periods == [
+        ("audit_p202312", datetime(2023, 12, 1), datetime(2024, 1, 1)),
+        ("audit_p202401", datetime(2024, 1, 1), datetime(2024, 2, 1)),
+        ("audit_p202402", datetime(2024, 2, 1), datetime(2024, 3, 1)),
+    ]
+
+    periods = partition_periods(datetime(2023, 12, 31, 23, 59), "DAILY", 1)
+
+    assert periods == [
+        ("audit_p20231231", datetime(2023, 12, 31), datetime(2024, 1, 1)),
+        ("audit_p20240101", datetime(2024, 1, 1), datetime(2024, 1, 2)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "bound,upper",
+    [
+        (PG_PARTITIONS[0][1], datetime(2023, 10, 1)),
+        (PG_PARTITIONS[1][1], datetime(2023, 10, 2)),
+        ("DEFAULT", None),
+        ("'2023-11-01 00:00:00'", datetime(2023, 11, 1)),
+        ("MAXVALUE", None),
+    ],
+)
+def test_parse_upper_bound(bound, upper):
+    assert parse_upper_bound(bound) == upper
+
+
+def test_get_partitioner():
+    assert get_partitioner(fake_engine("postgresql", None), "OFF") is None
+
+    partitioner = get_partitioner(fake_engine("postgresql", None), "DAILY")
+    assert isinstance(partitioner, PostgreSQLPartitioner)
+
+    partitioner = get_partitioner(fake_engine("mysql", None), "MONTHLY")
+    assert isinstance(partitioner, MySQLPartitioner)
+
+    with pytest.raises(AuditPartitionError, match="not supported for sqlite"):
+        get_partitioner(fake_engine("sqlite", None), "DAILY")
+
+
+def test_postgresql_rotation():
+    conn = FakeConnection(PG_PARTITIONS)
+    partitioner = PostgreSQLPartitioner(
+        fake_engine("postgresql", conn), "DAILY"
+    )
+
+    # the partitions are only dropped if all their entries are expired
+
+    before = partitioner.expired_before(datetime(2023, 10, 2, 12, 0))
+    assert before == datetime(2023, 10, 2)
+
+    dropped = partitioner.drop_partitions(before)
+    assert dropped == ["audit_plegacy", "audit_p20231001"]
+    assert 'DROP TABLE "audit_plegacy"' in conn.statements
+
+    # the partitions of the next days are created ahead
+
+    created = partitioner.add_partitions(now=datetime(2023, 10, 2, 12, 0))
+    assert created == ["audit_p202310%02d" % day for day in range(3, 10)]
+    assert (
+        'CREATE TABLE "audit_p20231003" PARTITION OF "audit" '
+        "FOR VALUES FROM ('2023-10-03 00:00:00') TO ('2023-10-04 00:00:00')"
+        in conn.statements
+    )
+
+
+def test_postgresql_delayed_rotation():
+    """
+    the rotation has not been run for some days, so the entries since the
+    last partition ended up in the default partition
+    """
+
+    entries = [datetime(2023, 9, 30, 10)] * 3 + [
+        datetime(2023, 10, 3, 8),
+        datetime(2023, 10, 5, 9),
+        datetime(2023, 10, 5, 17),
+    ]
+
+    conn = FakeCatchAllConnection(PG_PARTITIONS, entries)
+    partitioner = PostgreSQLPartitioner(
+        fake_engine("postgresql", conn), "DAILY"
+    )
+
+    # the expired entries of the default partition are deleted in batches
+
+    dropped = partitioner.drop_partitions(datetime(2023, 10, 2), batch_size=2)
+    assert dropped == ["audit_plegacy", "audit_p20231001"]
+
+    purges = [sql for sql in conn.statements if "ctid" in sql]
+    assert len(purges) == 2
+    assert datetime(2023, 9, 30, 10) not in conn.catch_all_entries
+
+    # the partitions are created, though the default partition contains
+    # entries of their periods, which are moved into the new partitions
+
+    created = partitioner.add_partitions(now=datetime(2023, 10, 3, 12, 0))
+    assert created == ["audit_p202310%02d" % day for day in range(3, 11)]
+
+    assert conn.attached
+    assert conn.catch_all_entries == []
+    assert conn.moved == {
+        "audit_p20231003": [datetime(2023, 10, 3, 8)],
+        "audit_p20231005": [
+            datetime(2023, 10, 5, 9),
+            datetime(2023, 10, 5, 17),
+        ],
+    }
+
+    # the default partition is only detached for the periods with entries
+
+    detached = [sql for sql in conn.statements if "DETACH" in sql]
+    assert len(detached) == 2
+
+
+def test_postgresql_partition_table():
+    conn = FakeConnection()
+    partitioner = PostgreSQLPartitioner(
+        fake_engine("postgresql", conn), "DAILY"
+    )
+
+    partitions = partitioner.partition_table(now=datetime(2023, 10, 2, 12, 0))
+    assert partitions[:2] == ["audit_plegacy", "audit_p20231002"]
+
+    assert 'ALTER TABLE "audit" RENAME TO "audit_plegacy"' in conn.statements
+    assert (
+        'ALTER TABLE "audit" ATTACH PARTITION "audit_plegacy" '
+        "FOR VALUES FROM (MINVALUE) TO ('2023-10-02 00:00:00')"
+        in conn.statements
+    )
+    assert conn.statements[-1] == (
+        'CREATE TABLE "audit_pmax" PARTITION OF "audit" DEFAULT'
+    )
+
+    # a partitioned table is not converted again
+
+    conn.partitions = PG_PARTITIONS
+
+    with pytest.raises(AuditPartitionError, match="already partitioned"):
+        partitioner.partition_table()
+
+
+def test_mysql_partition_table():
+    conn = FakeConnection()
+    partitioner = MySQLPartitioner(fake_engine("mysql", conn), "MONTHLY")
+
+    partitioner.partition_table(now=datetime(2023, 10, 2, 12, 0))
+
+    statement = conn.statements[-1]
+    assert "PARTITION BY RANGE COLUMNS (timestamp_utc)" in statement
+    assert (
+        "PARTITION audit_plegacy VALUES LESS THAN ('2023-10-01 00:00:00'), "
+        "PARTITION audit_p202310 VALUES LESS THAN ('2023-11-01 00:00:00'), "
+        "PARTITION audit_p202311 VALUES LESS THAN ('2023-12-01 00:00:00'), "
+        "PARTITION audit_p202312 VALUES LESS THAN ('2024-01-01 00:00:00'), "
+        "PARTITION audit_pmax VALUES LESS THAN (MAXVALUE)"
+    ) in statement
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+Unit test for the migration of the typed audit timestamp
+"""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from linotp.lib.audit.SQLAudit import AuditTable
+from linotp.model import db
+from linotp.model.migrate import Migration
+
+INDEX_NAME = "ix_audit_timestamp_utc_id"
+
+
+def test_migrate_audit_timestamp(app):
+    """the timestamp is initialized in chunks and indexed afterwards"""
+
+    engine = db.get_engine(bind="auditdb")
+    table = AuditTable.__table__
+
+    # entries of a former audit table without the typed timestamp
+
+    engine.execute(
+        table.insert(),
+        [
+            {
+                "timestamp": "2023-01-%02dT12:00:00.123+00:00" % day,
+                "timestamp_utc": None,
+            }
+            for day in range(1, 6)
+        ],
+    )
+    engine.execute("DROP INDEX %s" % INDEX_NAME)
+
+    Migration(db.engine)._migrate_audit_timestamp(chunk_size=2)
+
+    rows = engine.execute(
+        sa.select([table.c.timestamp_utc]).order_by(table.c.id)
+    ).fetchall()
+    assert [row[0] for row in rows] == [
+        datetime(2023, 1, day, 12, 0) for day in range(1, 6)
+    ]
+
+    indexes = sa.inspect(engine).get_indexes(table.name)
+    assert INDEX_NAME in {index["name"] for index in indexes}
+
+    # a second run does not touch the initialized entries
+
+    Migration(db.engine)._migrate_audit_timestamp(chunk_size=2)
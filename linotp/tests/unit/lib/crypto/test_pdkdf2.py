@@ -27,11 +27,14 @@
 
 """
 
+import base64
 import binascii
 import unittest
-from hashlib import sha1
+from hashlib import sha1, sha256, sha512
 
 from linotp.lib.crypto.pbkdf2 import pbkdf2
+from linotp.lib.crypto.utils import kdf2
+from linotp.lib.ext.pbkdf2 import PBKDF2
 
 
 class TestComparePDKDF(unittest.TestCase):
@@ -213,5 +216,50 @@ class TestComparePDKDF(unittest.TestCase):
 
         return
 
+    def test_compare_with_pure_python(self):
+        """
+        the hashlib based pbkdf2 is bit identical to the pure python one
+
+        the parameters are the ones of the pskc password based encryption
+        and of the ocra2 rollout
+        """
+
+        parameters = [
+            ("qwerty", b"Ej7/PEpyEpw=", 16, 1000, sha1),
+            (b"\x01\x02\xff", b"\x12\x34\x56\x78", 32, 10000, sha256),
+            ("pässwörd", "sält", 64, 10, sha512),
+        ]
+
+        for password, salt, dk_length, iterations, hashfunc in parameters:
+            expected = PBKDF2(password, salt, iterations, hashfunc).read(
+                dk_length
+            )
+
+            derived = pbkdf2(password, salt, dk_length, iterations, hashfunc)
+            assert derived == expected
+
+    def test_kdf2(self):
+        """
+        the ocra2 kdf2 derives the same key as the pure python pbkdf2
+        """
+
+        sharedsecret = "0102030405060708090a0b0c0d0e0f10"
+        nonce = "a1b2c3d4e5f60718293a4b5c6d7e8f90"
+        activationcode = "GEZDGNBVGY3TQOJQ"
+
+        key = kdf2(sharedsecret, nonce, activationcode, 32, checksum=False)
+
+        passphrase = (
+            sharedsecret + base64.b32decode(activationcode).hex() + nonce[:-16]
+        )
+        expected = PBKDF2(
+            bytes.fromhex(passphrase),
+            bytes.fromhex(nonce[-16:]),
+            iterations=10000,
+            digestmodule=sha256,
+        ).read(32)
+
+        assert key == expected
+
 
 # eof #
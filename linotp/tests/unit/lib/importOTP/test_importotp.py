@@ -28,7 +28,7 @@
 import os
 import unittest
 
-from linotp.lib.ImportOTP.oath import parseOATHcsv
+from linotp.lib.ImportOTP.oath import iterate_oath_csv, parseOATHcsv
 
 
 class TestCacheActivation(unittest.TestCase):
@@ -97,5 +97,25 @@ class TestCacheActivation(unittest.TestCase):
 
         return
 
+    def test_iterate_OATH(self):
+        """
+        Test the incremental OATH csv import from the file object
+        """
+
+        with open(self._get_file_name("oath_tokens.csv"), "r") as csv_file:
+            tokens = iterate_oath_csv(csv_file)
+
+            serial, token = next(tokens)
+            assert serial == "tok1"
+            assert token["type"] == "hmac"
+
+            assert [serial for serial, _token in tokens] == [
+                "tok2",
+                "tok3",
+                "tok4",
+            ]
+
+        return
+
 
 # eof #
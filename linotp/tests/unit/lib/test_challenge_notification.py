@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+verify the wake up of long polling waiters on challenge updates
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from linotp.lib import challenge_notification
+from linotp.lib.auth.validate import ValidationHandler
+from linotp.lib.challenge_notification import (
+    notify_challenge_update,
+    wait_for_challenge_update,
+)
+from linotp.model import db
+from linotp.model.challange import Challenge
+
+
+def run_waiter(app, transid, timeout):
+    """start a waiter thread and return its result holder"""
+
+    result = {}
+
+    def waiter():
+        with app.app_context():
+            start = time.monotonic()
+            result["updated"] = wait_for_challenge_update(transid, timeout)
+            result["duration"] = time.monotonic() - start
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+
+    # give the waiter the time to register
+    for _ in range(100):
+        if challenge_notification._waiters:
+            break
+        time.sleep(0.01)
+
+    return thread, result
+
+
+@pytest.mark.usefixtures("app")
+class TestChallengeNotification:
+    def test_timeout(self):
+        """without update the waiter returns after the timeout"""
+
+        assert wait_for_challenge_update("123456789012", 0.3) is False
+        assert not challenge_notification._waiters
+
+    def test_in_process_wakeup(self, app):
+        """the waiter is woken up by the notification of the parent id"""
+
+        thread, result = run_waiter(app, "123456789012", 10)
+
+        notify_challenge_update(["123456789012.01"])
+        thread.join()
+
+        assert result["updated"] is True
+        assert result["duration"] < 5
+
+    def test_cross_worker_wakeup(self, app):
+        """the waiter is woken up by the signal file of another worker"""
+
+        thread, result = run_waiter(app, "123456789012", 10)
+
+        # simulate the notification of a different worker process
+
+        for signal_file in challenge_notification._signal_files(
+            "123456789012"
+        ):
+            with open(signal_file, "a") as f:
+                f.write(".")
+
+        thread.join()
+
+        assert result["updated"] is True
+        assert result["duration"] < 5
+
+    def test_waiters_keep_their_signal_files(self, app):
+        """a waiter, which returns, does not remove the signal of others"""
+
+        thread, result = run_waiter(app, "123456789012", 10)
+
+        assert wait_for_challenge_update("123456789012", 0.1) is False
+
+        signal_files = challenge_notification._signal_files("123456789012")
+        assert len(signal_files) == 1
+
+        for signal_file in signal_files:
+            with open(signal_file, "a") as f:
+                f.write(".")
+
+        thread.join()
+
+        assert result["updated"] is True
+        assert not challenge_notification._signal_files("123456789012")
+
+    def test_notify_on_commit(self, app):
+        """the commit of a challenge update notifies the waiters"""
+
+        challenge = Challenge(
+            transid="123456789012", tokenserial="Tok1", session="{}"
+        )
+        db.session.add(challenge)
+        db.session.commit()
+
+        thread, result = run_waiter(app, "123456789012", 10)
+
+        challenge.close()
+        db.session.commit()
+
+        thread.join()
+
+        assert result["updated"] is True
+        assert result["duration"] < 5
+
+    def test_check_status_no_lost_wakeup(self, app):
+        """
+        an update committed right after the status lookup is not missed,
+        as the waiter is registered before the lookup
+        """
+
+        pending = {"transactions": {"123456789012": {"status": "open"}}}
+        done = {"transactions": {"123456789012": {"status": "closed"}}}
+
+        lookups = []
+
+        def lookup_status(**kwargs):
+            lookups.append(kwargs)
+            if len(lookups) == 1:
+                # the accept of the transaction is committed in between
+                notify_challenge_update(["123456789012"])
+                return True, pending
+            return True, done
+
+        with app.test_request_context():
+            handler = ValidationHandler()
+            with patch.object(handler, "_lookup_status", lookup_status):
+                start = time.monotonic()
+                ok, reply = handler.check_status(
+                    transid="123456789012", password="pin", wait=10
+                )
+
+        assert time.monotonic() - start < 5
+        assert ok is True
+        assert reply == done
+        assert len(lookups) == 2
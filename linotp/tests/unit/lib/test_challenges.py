@@ -29,12 +29,17 @@
 Test lib challenge methods
 """
 
+import datetime
 import unittest
 
 import pytest
 from mock import patch
 
 from linotp.lib.challenges import Challenges
+from linotp.model import db
+from linotp.model.challange import Challenge
+from linotp.model.migrate import Migration
+from linotp.model.token import Token
 
 
 @pytest.mark.usefixtures("app")
@@ -66,3 +71,79 @@ class TestChallengesTransactionidLength(unittest.TestCase):
                 Challenges.get_transactionid_length()
 
             assert str(wrong_range.value) == wrong_range_message
+
+
+@pytest.mark.usefixtures("app")
+class TestChallengesStatusLookup:
+    def test_status_column_follows_session(self, hsm_obj):
+        """the indexed status column is maintained by close and sign"""
+
+        challenge = Challenge(transid="123456789012", tokenserial="Tok1")
+        challenge.signChallenge(hsm_obj)
+        challenge.save()
+
+        assert challenge.status == "open"
+        assert challenge.is_open()
+
+        challenge.close()
+        challenge.signChallenge(hsm_obj)
+        challenge.save()
+
+        assert challenge.status == "closed"
+        assert not challenge.is_open()
+        assert challenge.checkChallengeSignature(hsm_obj)
+
+    def test_lookup_open_challenges(self, hsm_obj):
+        """only challenges with status open are returned"""
+
+        for num, serial in enumerate(["Tok1", "Tok1", "Tok2"]):
+            challenge = Challenge(
+                transid="12345678901%d" % num, tokenserial=serial
+            )
+            challenge.set_validity(120)
+            challenge.signChallenge(hsm_obj)
+            challenge.save()
+
+        challenge.close()
+        challenge.save()
+
+        open_challenges = Challenges.lookup_challenges(filter_open=True)
+        assert len(open_challenges) == 2
+        assert {ch.tokenserial for ch in open_challenges} == {"Tok1"}
+
+        assert len(Challenges.lookup_challenges(serial="Tok2")) == 1
+        assert (
+            Challenges.lookup_challenges(serial="Tok2", filter_open=True) == []
+        )
+
+        expected = challenge.timestamp + datetime.timedelta(seconds=120)
+        assert challenge.expiry == expected
+
+    @patch(
+        "linotp.tokens.base.TokenClass.get_challenge_validity",
+        return_value=300,
+    )
+    def test_migrate_challenge_expiry(self, _mock_validity):
+        """the migration sets the expiry from the token validity"""
+
+        token = Token("Tok1")
+        token.LinOtpTokenType = "hmac"
+        db.session.add(token)
+
+        for num, serial in enumerate(["Tok1", "Tok1", "Gone"]):
+            challenge = Challenge(
+                transid="12345678901%d" % num, tokenserial=serial
+            )
+            db.session.add(challenge)
+
+        db.session.commit()
+
+        Migration(db.engine)._migrate_challenge_expiry(chunk_size=2)
+        db.session.commit()
+
+        for challenge in Challenge.query.all():
+            validity = 300 if challenge.tokenserial == "Tok1" else 0
+            expected = challenge.timestamp + datetime.timedelta(
+                seconds=validity
+            )
+            assert challenge.expiry == expected
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+verify the pooled http client and the failover of the forward servers
+"""
+
+import threading
+
+import httplib2
+import pytest
+from mock import patch
+
+from linotp.lib import request as remote_request
+from linotp.lib.http_client import (
+    DEFAULT_TIMEOUT,
+    close_http_clients,
+    get_http_client,
+)
+from linotp.lib.policy.forward import ForwardServerPolicy
+from linotp.lib.user import User
+
+RESPONSE = b'{"result": {"status": true, "value": true}}'
+
+
+class Response(dict):
+    status = 200
+
+
+@pytest.fixture
+def fresh_pool():
+    close_http_clients()
+    remote_request._remote_services.clear()
+    yield
+    close_http_clients()
+    remote_request._remote_services.clear()
+
+
+@pytest.mark.usefixtures("fresh_pool")
+class TestHttpClientPool:
+    def test_client_is_reused(self):
+        """the same client is returned for the same settings"""
+
+        http = get_http_client(timeout="3", ssl_verify=True)
+        assert http is get_http_client(timeout=3.0, ssl_verify=True)
+        assert http.timeout == 3.0
+
+        assert http is not get_http_client(timeout=3.0, ssl_verify=False)
+        assert get_http_client().timeout == DEFAULT_TIMEOUT
+
+    def test_timeout_tuple(self):
+        """httplib2 supports only one timeout - the larger one is used"""
+
+        assert get_http_client(timeout="2, 7").timeout == 7.0
+
+    def test_client_per_thread(self):
+        """every thread has its own client as httplib2 is not thread safe"""
+
+        clients = []
+
+        def get_client():
+            clients.append(get_http_client())
+
+        thread = threading.Thread(target=get_client)
+        thread.start()
+        thread.join()
+
+        assert clients[0] is not get_http_client()
+
+
+@pytest.mark.usefixtures("fresh_pool")
+class TestForwardFailover:
+    servers = (
+        "http://first:5001/validate/check http://second:5001/validate/check"
+    )
+
+    def test_failover_to_next_server(self):
+        """an unreachable server is skipped and marked as unavailable"""
+
+        called = []
+
+        def request(http, url, **kwargs):
+            called.append(url)
+            if "first" in url:
+                raise httplib2.ServerNotFoundError("unreachable")
+            return Response(), RESPONSE
+
+        user = User("passthru_user1", "myrealm")
+
+        with patch.object(httplib2.Http, "request", request):
+            for _ in range(remote_request.FAILURE_THRESHOLD + 2):
+                res, _opt = ForwardServerPolicy.do_request(
+                    self.servers, {}, user, "geheim1", {}
+                )
+                assert res is True
+
+        # after the failure threshold is reached, the first server is
+        # not contacted anymore until the recovery timeout is over
+
+        first = [url for url in called if "first" in url]
+        assert len(first) == remote_request.FAILURE_THRESHOLD
+
+    def test_all_servers_unavailable(self):
+        """if no server is reachable, the request fails"""
+
+        def request(http, url, **kwargs):
+            raise httplib2.ServerNotFoundError("unreachable")
+
+        user = User("passthru_user1", "myrealm")
+
+        with patch.object(httplib2.Http, "request", request):
+            res, opt = ForwardServerPolicy.do_request(
+                self.servers, {}, user, "geheim1", {}
+            )
+
+        assert res is False
+        assert opt == {}
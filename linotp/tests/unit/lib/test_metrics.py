@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+# pylint: disable=redefined-outer-name
+
+import pytest
+
+from linotp.lib import metrics
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", False)
+    metrics.reset()
+
+    metrics.inc("linotp_cache_lookups_total", cache="user_lookup")
+    metrics.observe("linotp_hsm_wait_seconds", 0.1)
+    with metrics.timed("linotp_hsm_wait_seconds"):
+        pass
+
+    assert metrics.render() == "\n"
+
+
+def test_counter(enabled):
+    metrics.inc("linotp_cache_lookups_total", cache="user_lookup")
+    metrics.inc("linotp_cache_lookups_total", 2, cache="user_lookup")
+    metrics.inc("linotp_cache_lookups_total", cache='a"b')
+
+    lines = metrics.render().splitlines()
+
+    assert lines[:2] == [
+        "# HELP linotp_cache_lookups_total Number of lookups in the caches.",
+        "# TYPE linotp_cache_lookups_total counter",
+    ]
+    assert 'linotp_cache_lookups_total{cache="user_lookup"} 3' in lines
+    assert 'linotp_cache_lookups_total{cache="a\\"b"} 1' in lines
+
+
+def test_histogram(enabled):
+    for value in (0.0001, 0.001, 0.3, 100):
+        metrics.observe("linotp_provider_send_seconds", value, provider="sms")
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE linotp_provider_send_seconds histogram" in lines
+
+    def bucket(bound):
+        return (
+            'linotp_provider_send_seconds_bucket{provider="sms",le="%s"} '
+            % bound
+        )
+
+    # the buckets are cumulative and the upper bounds are inclusive
+
+    assert bucket("0.0005") + "1" in lines
+    assert bucket("0.001") + "2" in lines
+    assert bucket("0.25") + "2" in lines
+    assert bucket("0.5") + "3" in lines
+    assert bucket("10.0") + "3" in lines
+    assert bucket("+Inf") + "4" in lines
+    assert 'linotp_provider_send_seconds_count{provider="sms"} 4' in lines
+    assert any(
+        line.startswith(
+            'linotp_provider_send_seconds_sum{provider="sms"} 100.3'
+        )
+        for line in lines
+    )
+
+
+def test_nested_stages(enabled, monkeypatch):
+    timer = metrics.RequestTimer()
+    monkeypatch.setattr(metrics, "_request_timer", lambda: timer)
+
+    with metrics.stage("resolver"):
+        with metrics.stage("resolver"):
+            with metrics.stage("policy"):
+                pass
+
+    # the leave without enter of the commit stage, e.g. by a rollback
+    # without commit, is ignored
+
+    metrics.leave_stage("commit")
+
+    assert set(timer.stages) == {"resolver", "policy"}
+    assert timer.stages["resolver"] >= timer.stages["policy"]
+    assert not any(timer._depth.values())
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+# pylint: disable=redefined-outer-name
+# pylint: disable=unused-argument
+
+import os
+
+import pytest
+
+from linotp.lib import profiling
+
+
+@pytest.mark.parametrize(
+    "target,requests",
+    [
+        ("validate", 1),
+        ("validate/check/x", 1),
+        ("../validate/check", 1),
+        ("validate/check", -1),
+        ("validate/check", profiling.MAX_REQUESTS + 1),
+    ],
+)
+def test_arm_invalid(app, target, requests):
+    with pytest.raises(profiling.ProfilingError):
+        profiling.arm(target, requests)
+
+
+def test_arm(app):
+    profiling.arm("validate/check", 3)
+    profiling.arm("admin/show", 1)
+    assert profiling.get_armed() == {"validate/check": 3, "admin/show": 1}
+
+    profiling.arm("validate/check", 0)
+    assert profiling.get_armed() == {"admin/show": 1}
+
+    profiling.arm("validate/check", 1, timeout=-1)
+    assert profiling.get_armed() == {"admin/show": 1}
+
+
+def test_claim(app):
+    profiling.arm("validate/check", 2)
+
+    # a claim with an outdated number of remaining requests fails
+
+    assert profiling._claim("validate/check", 2)
+    assert not profiling._claim("validate/check", 2)
+    assert profiling.get_armed() == {"validate/check": 1}
+
+    assert profiling._claim("validate/check", 1)
+    assert profiling.get_armed() == {}
+
+
+def test_start_stop(app):
+    profiling.arm("validate/check", 1)
+
+    profiler = profiling.start("validate/check")
+    assert profiler is not None
+
+    # only one request per process is profiled at a time
+
+    profiling.arm("admin/show", 1)
+    assert profiling.start("admin/show") is None
+
+    name = profiling.stop(profiler, "validate/check", "0123456789abcdef")
+    assert name.endswith("-validate-check-%d-01234567.prof" % os.getpid())
+    assert [entry[0] for entry in profiling.list_profiles()] == [name]
+
+    assert profiling.start("validate/check") is None
+
+    with pytest.raises(profiling.ProfilingError):
+        profiling.get_profile_path("../" + name)
@@ -26,12 +26,18 @@
 #
 
 
+import binascii
 import unittest
 
 import pytest
 from mock import patch
 
-from linotp.lib.support import verify_token_volume
+import linotp.lib.support
+from linotp.lib.support import (
+    DEMO_LICENSE,
+    check_license_restrictions,
+    verify_token_volume,
+)
 
 LICENSE = {
     "version": "2",
@@ -78,3 +84,51 @@ class LicenseSupportTestCase(unittest.TestCase):
         assert "Grace limit reached" not in detail
 
         return
+
+    @patch("linotp.lib.support._get_license_duration")
+    @patch("linotp.lib.support.token_generation")
+    @patch("linotp.lib.support.getTokenNumResolver")
+    @patch("linotp.lib.support.verify_signature")
+    @patch("linotp.lib.support.getFromConfig")
+    def test_cached_license_verdict(
+        self,
+        mocked_getFromConfig,
+        mocked_verify_signature,
+        mocked_getTokenNumResolver,
+        mocked_token_generation,
+        mocked_get_license_duration,
+    ):
+        """the license is verified once and the volume per token change"""
+
+        linotp.lib.support._license_cache.clear()
+        linotp.lib.support._volume_verdict_cache.clear()
+
+        mocked_getFromConfig.return_value = binascii.hexlify(
+            DEMO_LICENSE.encode("utf-8")
+        ).decode()
+        mocked_verify_signature.return_value = "demo"
+        mocked_getTokenNumResolver.return_value = 2
+        mocked_token_generation.return_value = 1
+        mocked_get_license_duration.return_value = None
+
+        for _i in range(3):
+            assert check_license_restrictions() is False
+
+        assert mocked_verify_signature.call_count == 1
+        assert mocked_getTokenNumResolver.call_count == 1
+
+        # a token change invalidates the volume verdict
+
+        mocked_token_generation.return_value = 2
+        mocked_getTokenNumResolver.return_value = 8
+
+        assert check_license_restrictions() is True
+        assert mocked_verify_signature.call_count == 1
+        assert mocked_getTokenNumResolver.call_count == 2
+
+        # an invalid signature is a restriction as well
+
+        linotp.lib.support._license_cache.clear()
+        mocked_verify_signature.return_value = None
+
+        assert check_license_restrictions() is True
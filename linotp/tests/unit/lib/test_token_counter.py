@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+unit test for the incrementally maintained token counters
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from linotp.lib.monitoring import MonitorHandler
+from linotp.lib.realm import createDBRealm, deleteRealm
+from linotp.lib.token import remove_token
+from linotp.model import db, token_counter
+from linotp.model.realm import Realm
+from linotp.model.token import Token
+from linotp.model.token_counter import (
+    NO_REALM,
+    TokenCounter,
+    get_token_counters,
+    reconcile_token_counters,
+    token_generation,
+    update_token_counters,
+)
+
+
+def _all_counters(realms):
+    return {realm: get_token_counters(realm) for realm in realms}
+
+
+@pytest.mark.usefixtures("app")
+class TestTokenCounter:
+    def test_counters_follow_token_changes(self):
+        """the counters are updated with every token change"""
+
+        realm_a = Realm("realm_a")
+        realm_b = Realm("realm_b")
+        db.session.add_all([realm_a, realm_b])
+        db.session.commit()
+
+        tokens = []
+        for num in range(4):
+            token = Token("Tok%d" % num)
+            db.session.add(token)
+            tokens.append(token)
+        db.session.commit()
+
+        assert get_token_counters(NO_REALM)["active_unassigned"] == 4
+
+        tokens[0].realms = [realm_a]
+        tokens[1].realms = [realm_a, realm_b]
+        tokens[1].LinOtpUserid = "1234"
+        tokens[2].realms = [realm_b]
+        tokens[2].LinOtpIsactive = False
+        db.session.commit()
+
+        # modify an expired token without loading the previous values
+
+        tokens[1].LinOtpIsactive = False
+        db.session.commit()
+
+        counters = _all_counters(["realm_a", "realm_b", NO_REALM])
+
+        assert counters["realm_a"] == {
+            "active_assigned": 0,
+            "active_unassigned": 1,
+            "inactive_assigned": 1,
+            "inactive_unassigned": 0,
+        }
+        assert counters["realm_b"]["inactive_assigned"] == 1
+        assert counters["realm_b"]["inactive_unassigned"] == 1
+        assert counters[NO_REALM]["active_unassigned"] == 1
+        assert sum(counters[NO_REALM].values()) == 1
+
+        db.session.delete(tokens[1])
+        db.session.commit()
+
+        assert sum(get_token_counters("realm_a").values()) == 1
+        assert sum(get_token_counters("realm_b").values()) == 1
+
+        # the incremental counters must match the recalculated ones
+
+        reconciled = reconcile_token_counters()
+        db.session.commit()
+
+        assert _all_counters(["realm_a", "realm_b", NO_REALM]) == {
+            realm: reconciled[realm]
+            for realm in ["realm_a", "realm_b", NO_REALM]
+        }
+
+    def test_reconcile_fixes_drift(self):
+        """a bulk update bypasses the counters and is fixed by reconcile"""
+
+        for num in range(3):
+            db.session.add(Token("Tok%d" % num))
+        db.session.commit()
+
+        Token.query.update(
+            {"LinOtpIsactive": False}, synchronize_session=False
+        )
+        db.session.commit()
+
+        assert get_token_counters(NO_REALM)["active_unassigned"] == 3
+
+        counters = reconcile_token_counters()
+        db.session.commit()
+
+        assert counters[NO_REALM]["inactive_unassigned"] == 3
+        assert get_token_counters(NO_REALM)["active_unassigned"] == 0
+        assert get_token_counters(NO_REALM)["inactive_unassigned"] == 3
+
+    def test_remove_token_with_bulk_deleted_realms(self):
+        """the bulk delete of the token realm relations is counted"""
+
+        realm = Realm("realm_a")
+        db.session.add(realm)
+        db.session.commit()
+
+        token = Token("Tok1")
+        token.realms = [realm]
+        db.session.add(token)
+        db.session.commit()
+
+        assert get_token_counters("realm_a")["active_unassigned"] == 1
+
+        remove_token(token)
+        db.session.commit()
+
+        assert sum(get_token_counters("realm_a").values()) == 0
+        assert sum(get_token_counters(NO_REALM).values()) == 0
+
+    def test_token_generation(self):
+        """the generation changes with volume relevant token changes"""
+
+        token = Token("Tok1")
+        token.LinOtpUserid = "1"
+        db.session.add(token)
+        db.session.commit()
+
+        generation = token_generation()
+
+        token.LinOtpCount = 12
+        db.session.commit()
+
+        assert token_generation() == generation
+
+        # a new owner does not change the counters but the token volume
+
+        token.LinOtpUserid = "2"
+        db.session.commit()
+
+        assert token_generation() > generation
+
+        generation = token_generation()
+
+        token.LinOtpIsactive = False
+        db.session.flush()
+        db.session.rollback()
+
+        assert token_generation() == generation + 2
+
+    def test_token_counter_count(self):
+        """the reporting stati are derived from the counter cells"""
+
+        realm = Realm("realm_a")
+        db.session.add(realm)
+        db.session.commit()
+
+        for num, (active, user) in enumerate(
+            [(True, ""), (True, "1"), (False, "2"), (False, "")]
+        ):
+            token = Token("Tok%d" % num)
+            token.LinOtpIsactive = active
+            token.LinOtpUserid = user
+            token.realms = [realm]
+            db.session.add(token)
+        db.session.commit()
+
+        stati = [
+            "total",
+            "active",
+            "inactive",
+            "assigned",
+            "unassigned",
+            "active&assigned",
+            "inactive&unassigned",
+        ]
+
+        handler = MonitorHandler()
+        result = handler.token_counter_count("Realm_A", stati)
+
+        assert result == handler.token_count("realm_a", stati)
+        assert result["total"] == 4
+        assert result["active&assigned"] == 1
+
+        with pytest.raises(ValueError):
+            handler.token_counter_count("realm_a", ["active&unknown"])
+
+    def test_concurrent_counter_insert(self):
+        """the counter row inserted by a concurrent transaction is updated"""
+
+        db.session.execute(
+            TokenCounter.__table__.insert().values(
+                realm="realm_a",
+                active_assigned=0,
+                active_unassigned=1,
+                inactive_assigned=0,
+                inactive_unassigned=0,
+            )
+        )
+
+        # the first update does not find the counter row, which is then
+        # inserted by a concurrent transaction before our insert
+
+        update_counter = token_counter._update_counter
+        results = [0]
+
+        def missed_update(*args):
+            if results:
+                return results.pop()
+            return update_counter(*args)
+
+        with patch.object(
+            token_counter, "_update_counter", side_effect=missed_update
+        ) as mocked:
+            update_token_counters(
+                db.session, {"realm_a": {"active_unassigned": 1}}
+            )
+
+        db.session.commit()
+
+        assert mocked.call_count == 2
+        assert get_token_counters("realm_a")["active_unassigned"] == 2
+
+    def test_delete_realm(self):
+        """the tokens of a deleted realm are moved to the tokens without
+        realm, if they are in no other realm"""
+
+        createDBRealm("realm_a")
+        createDBRealm("realm_b")
+        db.session.commit()
+
+        realm_a = Realm.query.filter_by(name="realm_a").one()
+        realm_b = Realm.query.filter_by(name="realm_b").one()
+
+        only_a = Token("Tok1")
+        only_a.realms = [realm_a]
+        both = Token("Tok2")
+        both.realms = [realm_a, realm_b]
+        db.session.add_all([only_a, both])
+        db.session.commit()
+
+        with patch("linotp.lib.realm._delete_realm_config"), patch(
+            "linotp.lib.user.delete_realm_resolver_cache"
+        ), patch("linotp.lib.realm.context") as context:
+            context.config = {"ADMIN_REALM_NAME": "admin_realm"}
+            assert deleteRealm("realm_a") is True
+        db.session.commit()
+
+        assert sum(get_token_counters("realm_a").values()) == 0
+        assert get_token_counters("realm_b")["active_unassigned"] == 1
+        assert get_token_counters(NO_REALM)["active_unassigned"] == 1
+
+        row = (
+            db.session.query(TokenCounter.__table__.c.realm)
+            .filter(TokenCounter.__table__.c.realm == "realm_a")
+            .first()
+        )
+        assert row is None
+
+        reconciled = reconcile_token_counters()
+        db.session.commit()
+
+        assert get_token_counters(NO_REALM) == reconciled[NO_REALM]
+        assert get_token_counters("realm_b") == reconciled["realm_b"]
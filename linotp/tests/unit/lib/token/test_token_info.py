@@ -0,0 +1,99 @@
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+Tests the last_access token info
+"""
+
+import unittest
+
+"""
+Tests the cached token info of the token model
+"""
+
+import json
+
+import pytest
+from mock import patch
+
+from linotp.model import db
+from linotp.model.token import Token
+from linotp.tokens.hmactoken import HmacTokenClass
+
+
+@pytest.mark.usefixtures("app")
+class TestTokenInfo:
+    def test_token_info_is_parsed_once(self):
+        """the token info is only parsed again if it has changed"""
+
+        token = Token("INFO1")
+        token.setInfo(json.dumps({"hashlib": "sha256", "timeStep": 30}))
+
+        with patch("linotp.model.token.json.loads", wraps=json.loads) as loads:
+            hmac_token = HmacTokenClass(token)
+
+            assert hmac_token.getFromTokenInfo("hashlib") == "sha256"
+            assert hmac_token.getFromTokenInfo("timeStep") == 30
+            assert hmac_token.getFromTokenInfo("missing", "x") == "x"
+
+            assert loads.call_count == 1
+
+            # a direct change of the serialized token info is recognized
+
+            token.setInfo(json.dumps({"hashlib": "sha1"}))
+            assert hmac_token.getFromTokenInfo("hashlib") == "sha1"
+
+            assert loads.call_count == 2
+
+    def test_token_info_is_serialized_on_flush(self):
+        """the changed token info is serialized once on flush"""
+
+        token = Token("INFO2")
+        db.session.add(token)
+        db.session.flush()
+
+        hmac_token = HmacTokenClass(token)
+
+        with patch("linotp.model.token.json.dumps", wraps=json.dumps) as dumps:
+            hmac_token.addToTokenInfo("count_auth", 1)
+            hmac_token.addToTokenInfo("count_auth_max", 10)
+            hmac_token.removeFromTokenInfo("count_auth")
+
+            assert dumps.call_count == 0
+            assert hmac_token.getFromTokenInfo("count_auth_max") == 10
+
+            db.session.flush()
+
+            assert dumps.call_count == 1
+
+        assert json.loads(token.LinOtpTokenInfo) == {"count_auth_max": 10}
+
+        # the modified copy of the info does not change the token info
+
+        info = hmac_token.getTokenInfo()
+        info["count_auth_max"] = 20
+        assert hmac_token.getFromTokenInfo("count_auth_max") == 10
+
+    def test_pending_token_info_is_read(self):
+        """the serialized token info contains the pending changes"""
+
+        token = Token("INFO3")
+        hmac_token = HmacTokenClass(token)
+        hmac_token.addToTokenInfo("validity_period_end", "01/01/30 00:00")
+
+        assert json.loads(token.getInfo()) == {
+            "validity_period_end": "01/01/30 00:00"
+        }
+        assert "validity_period_end" in token.get_vars()["LinOtp.TokenInfo"]
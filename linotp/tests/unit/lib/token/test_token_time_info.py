@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+Tests the write-behind of the token time info
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from linotp.lib.token_time_info import TokenTimeInfoBuffer
+from linotp.model import db
+from linotp.model.token import Token
+
+
+@pytest.fixture
+def token_id(app):
+    token = Token("TIMEINFO01")
+    db.session.add(token)
+    db.session.commit()
+
+    return token.LinOtpTokenId
+
+
+@pytest.fixture
+def time_info_buffer(app):
+    time_info_buffer = TokenTimeInfoBuffer(db.engine, interval=3600)
+    yield time_info_buffer
+    time_info_buffer.stop()
+
+
+def last_auth_match(token_id):
+    db.session.expire_all()
+    return Token.query.get(token_id).LinOtpLastAuthMatch
+
+
+def test_flush_writes_latest_time(token_id, time_info_buffer):
+    now = datetime(2023, 1, 1, 12, 0)
+
+    time_info_buffer.add("LinOtpLastAuthMatch", token_id, now)
+    time_info_buffer.add(
+        "LinOtpLastAuthMatch", token_id, now - timedelta(hours=1)
+    )
+
+    assert last_auth_match(token_id) is None
+
+    assert time_info_buffer.flush() == 1
+    assert last_auth_match(token_id) == now
+
+    # nothing is pending anymore
+
+    assert time_info_buffer.flush() == 0
+
+
+def test_flush_keeps_newer_stored_time(token_id, time_info_buffer):
+    now = datetime(2023, 1, 1, 12, 0)
+
+    time_info_buffer.add("LinOtpLastAuthMatch", token_id, now)
+    time_info_buffer.flush()
+
+    # an other process might have written a newer time in between
+
+    time_info_buffer.add(
+        "LinOtpLastAuthMatch", token_id, now - timedelta(hours=1)
+    )
+    time_info_buffer.flush()
+
+    assert last_auth_match(token_id) == now
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+"""
+Tests the lookup of the tokens of a user
+"""
+
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import event
+
+from linotp.lib.token import get_raw_tokens
+from linotp.model import db
+from linotp.model.realm import Realm
+from linotp.model.token import Token
+
+RESOLVER_CLASS = "useridresolver.PasswdIdResolver.IdResolver.myDefRes"
+
+
+@pytest.fixture
+def user_tokens(app):
+    """create tokens of the user in the realms 'realm1' and 'realm2'"""
+
+    db.session.add_all([Realm("realm1"), Realm("realm2")])
+    db.session.commit()
+    db.session.expunge_all()
+
+    realm1 = Realm.query.filter_by(name="realm1").one()
+    realm2 = Realm.query.filter_by(name="realm2").one()
+
+    for i in range(10):
+        token = Token("USER%02d" % i)
+        token.LinOtpUserid = "1000"
+        token.LinOtpIdResolver = "passwdresolver"
+        # tokens of former versions with the 'ee' resolver class prefix
+        token.LinOtpIdResClass = RESOLVER_CLASS.replace(
+            "useridresolver.", "useridresolveree."
+        )
+        token.setRealms([realm1] if i % 2 else [realm2])
+        db.session.add(token)
+
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def test_user_token_lookup(user_tokens):
+    """the tokens of the user and their realms are loaded with two queries"""
+
+    user = Mock()
+    user.login = "passthru_user1"
+    user.realm = "realm1"
+    user.get_uid_resolver.return_value = [("1000", RESOLVER_CLASS)]
+
+    statements = []
+
+    def count_statements(*_args):
+        statements.append(_args[2])
+
+    event.listen(db.engine, "before_cursor_execute", count_statements)
+    try:
+        tokens = get_raw_tokens(user=user)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_statements)
+
+    assert sorted(token.getSerial() for token in tokens) == [
+        "USER01",
+        "USER03",
+        "USER05",
+        "USER07",
+        "USER09",
+    ]
+
+    assert len(statements) == 2
+
+    # the resolver class is stored normalized
+
+    assert {token.LinOtpIdResClass for token in tokens} == {RESOLVER_CLASS}
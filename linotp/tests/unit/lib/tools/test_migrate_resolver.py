@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+unit test for the chunk wise resolver migration
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from flask import g
+
+from linotp.lib.tools.migrate_resolver import MigrateResolverHandler
+from linotp.model import db
+from linotp.model.token import Token
+from linotp.model.token_counter import (
+    NO_REALM,
+    get_token_counters,
+    token_generation,
+)
+
+SRC = {"type": "passwdresolver", "resolvername": "src_res"}
+TARGET = {"type": "passwdresolver", "resolvername": "target_res"}
+
+SRC_CLASS = "useridresolver.PasswdIdResolver.IdResolver.src_res"
+TARGET_CLASS = "useridresolver.PasswdIdResolver.IdResolver.target_res"
+
+
+@pytest.fixture
+def tokens(app):
+    """tokens of the users 1..3 of the src resolver"""
+
+    g.audit = {}
+
+    for num in range(1, 4):
+        token = Token("Mig%d" % num)
+        token.LinOtpUserid = str(num)
+        token.LinOtpIdResClass = SRC_CLASS
+        db.session.add(token)
+
+    db.session.commit()
+
+
+def _resolvers(src_resolver, target_resolver):
+    resolvers = {SRC_CLASS: src_resolver, TARGET_CLASS: target_resolver}
+    return patch(
+        "linotp.lib.tools.migrate_resolver.getResolverObject",
+        side_effect=resolvers.get,
+    )
+
+
+def _owners():
+    return {
+        token.LinOtpTokenSerialnumber: (
+            token.LinOtpIdResClass,
+            token.LinOtpUserid,
+        )
+        for token in Token.query.all()
+    }
+
+
+@pytest.mark.usefixtures("tokens")
+def test_migrate_resolver():
+    src_resolver = Mock()
+    src_resolver.getUsernames.side_effect = lambda userids: {
+        userid: "user%s" % userid for userid in userids
+    }
+
+    target_resolver = Mock()
+    target_resolver.getUserIds.side_effect = lambda names: {
+        name: "new_" + name for name in names if name != "user3"
+    }
+
+    counters = get_token_counters(NO_REALM)
+    generation = token_generation()
+
+    with _resolvers(src_resolver, target_resolver):
+        ret = MigrateResolverHandler().migrate_resolver(
+            src=SRC, target=TARGET, chunk_size=2
+        )
+
+    assert ret["report"]["migrated"] == 2
+    assert ret["report"]["not_found"] == ["Mig3"]
+
+    db.session.expire_all()
+    assert _owners() == {
+        "Mig1": (TARGET_CLASS, "new_user1"),
+        "Mig2": (TARGET_CLASS, "new_user2"),
+        "Mig3": (SRC_CLASS, "3"),
+    }
+
+    # the bulk update invalidates the values derived from the token owners
+    # and the token counters are not affected
+
+    assert token_generation() > generation
+    assert get_token_counters(NO_REALM) == counters
+
+
+@pytest.mark.usefixtures("tokens")
+def test_migrate_resolver_aborts_on_lookup_error():
+    """a failing resolver lookup is not taken for users, who are not found"""
+
+    src_resolver = Mock()
+    src_resolver.getUsernames.side_effect = lambda userids: {
+        userid: "user%s" % userid for userid in userids
+    }
+
+    target_resolver = Mock()
+    target_resolver.getUserIds.side_effect = [
+        {"user1": "new_user1", "user2": "new_user2"},
+        Exception("database is gone"),
+    ]
+
+    with _resolvers(src_resolver, target_resolver):
+        with pytest.raises(Exception, match="after 2 of 3 tokens"):
+            MigrateResolverHandler().migrate_resolver(
+                src=SRC, target=TARGET, chunk_size=2
+            )
+
+    # the first chunk was migrated before the lookup of the second failed
+
+    db.session.expire_all()
+    assert _owners()["Mig1"] == (TARGET_CLASS, "new_user1")
+    assert _owners()["Mig3"] == (SRC_CLASS, "3")
@@ -1,3 +1,4 @@
+import logging
 from typing import Any, Dict, List
 from unittest.mock import Mock, patch
 
@@ -62,3 +63,84 @@ class TestSqlImportHandler:
 
         with pytest.raises(DuplicateUserError):
             import_handler.delete_by_id("some_user")
+
+
+@pytest.mark.usefixtures("app")
+@patch.object(SQLImportHandler, "_create_resolver")
+def test_bulk_user_import(mock_create_resolver: Mock, caplog) -> None:
+    from linotp.lib.tools.import_user import UserImport
+    from linotp.model import db
+    from linotp.model.imported_user import ImportedUser
+
+    db_context_mock = Mock()
+    db_context_mock.get_session.return_value = db.session
+
+    import_handler = SQLImportHandler(
+        groupid="grp_id",
+        resolver_name="res_name",
+        database_context=db_context_mock,
+    )
+
+    user_import = UserImport(import_handler)
+    user_import.set_mapping(
+        {
+            "username": 0,
+            "userid": 1,
+            "surname": 2,
+            "givenname": 3,
+            "email": 4,
+            "phone": 5,
+            "mobile": 6,
+            "password": 7,
+        }
+    )
+
+    csv_data = "hans,1,Meier,,,,,\nanna,2,Schulz,,,,,\nberta,3,Kurz,,,,,\n"
+    result = user_import.import_csv_users(csv_data)
+
+    assert result["summary"] == {
+        "created": 3,
+        "updated": 0,
+        "modified": 0,
+        "deleted": 0,
+    }
+
+    # the dry run reports the differences without writing them
+
+    csv_data = "hans,1,Meier,,,,,\nanna,2,Lang,,,,,\ncarl,4,Klein,,,,,\n"
+    result = user_import.import_csv_users(csv_data, dryrun=True)
+
+    assert result["summary"] == {
+        "created": 1,
+        "updated": 1,
+        "modified": 1,
+        "deleted": 1,
+    }
+    assert result["deleted"] == {"3": "berta"}
+
+    # the progress of the chunk wise import is logged
+
+    caplog.set_level(logging.INFO)
+    caplog.clear()
+
+    result = user_import.import_csv_users(csv_data, chunk_size=1)
+
+    assert [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("user import:")
+    ] == [
+        "user import: created 1 of 1 users",
+        "user import: modified 1 of 1 users",
+        "user import: deleted 1 of 1 users",
+    ]
+
+    users = {
+        user.userid: (user.username, user.surname)
+        for user in ImportedUser.query.filter_by(groupid="grp_id")
+    }
+    assert users == {
+        "1": ("hans", "Meier"),
+        "2": ("anna", "Lang"),
+        "4": ("carl", "Klein"),
+    }
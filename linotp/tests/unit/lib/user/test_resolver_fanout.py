@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+#
+#   LinOTP - the open source solution for two factor authentication
+#   Copyright (C) 2010-2019 KeyIdentity GmbH
+#
+#   This file is part of LinOTP userid resolvers.
+#
+#   This program is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU Affero General Public
+#   License, version 3, as published by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the
+#              GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   E-mail: info@linotp.de
+#   Contact: www.linotp.org
+#   Support: www.linotp.de
+
+
+"""
+verify the concurrent queries of the resolvers
+"""
+
+import queue
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from flask import g
+
+from linotp.lib.context import request_context
+from linotp.lib.user import (
+    ResolverTimeout,
+    _buffer_user_iterator,
+    _read_user_iterator,
+    fan_out_resolvers,
+    fan_out_user_iterators,
+    get_resolvers_of_user,
+)
+from linotp.lib.useriterator import iterate_users
+
+SPECS = ["res.slow", "res.fast", "res.other"]
+
+
+@pytest.fixture
+def fanout_app(app, monkeypatch):
+    """app with the request globals used by the resolver lookups"""
+
+    monkeypatch.setitem(app.config, "RESOLVER_FANOUT_WORKERS", 4)
+    monkeypatch.setitem(app.config, "RESOLVER_FANOUT_TIMEOUT", 1)
+    g.audit = {"action_detail": ""}
+
+    return app
+
+
+def lookup(resolver_spec):
+    """resolver lookup, which takes longer for the first resolver"""
+
+    time.sleep(0.4 if resolver_spec == "res.slow" else 0.2)
+
+    # the request globals are available in the worker thread
+    return resolver_spec, request_context["config"]["linotp.root"]
+
+
+@pytest.mark.usefixtures("fanout_app")
+def test_fan_out_keeps_resolver_order():
+    start = time.monotonic()
+    results = list(fan_out_resolvers(lookup, SPECS))
+    duration = time.monotonic() - start
+
+    assert [spec for spec, _result in results] == SPECS
+    assert [result[0] for _spec, result in results] == SPECS
+
+    # the resolvers were queried concurrently
+    assert duration < 0.75
+
+
+@pytest.mark.usefixtures("fanout_app")
+def test_fan_out_raises_on_timed_out_resolver():
+    def hanging_lookup(resolver_spec):
+        if resolver_spec == "res.fast":
+            time.sleep(1.5)
+        return resolver_spec
+
+    results = []
+    with pytest.raises(ResolverTimeout):
+        for result in fan_out_resolvers(hanging_lookup, SPECS):
+            results.append(result)
+
+    assert results == [("res.slow", "res.slow")]
+    assert "res.fast" in g.audit["action_detail"]
+
+
+@pytest.mark.usefixtures("fanout_app")
+def test_timed_out_resolver_lookup_is_not_cached():
+    """a resolver timeout is no 'user not found' and is not cached"""
+
+    request_context["UserRealmLookup"] = {}
+    realms = {"realm": {"useridresolver": SPECS}}
+
+    def hanging_lookup(login, user_id, resolver_spec):
+        if resolver_spec == "res.fast":
+            time.sleep(1.5)
+        return None, None, None
+
+    with patch("linotp.lib.user.getRealms", return_value=realms), patch(
+        "linotp.lib.user._get_resolver_lookup_cache", return_value=None
+    ), patch(
+        "linotp.lib.user.lookup_user_in_resolver", side_effect=hanging_lookup
+    ):
+        with pytest.raises(ResolverTimeout):
+            get_resolvers_of_user("hans", "realm")
+
+    assert request_context["UserRealmLookup"] == {}
+
+
+def test_fan_out_disabled_by_default(app):
+    assert app.config["RESOLVER_FANOUT_WORKERS"] == 0
+
+
+def test_fan_out_disabled(fanout_app, monkeypatch):
+    monkeypatch.setitem(fanout_app.config, "RESOLVER_FANOUT_WORKERS", 0)
+
+    start = time.monotonic()
+    results = list(fan_out_resolvers(lookup, SPECS))
+
+    assert [spec for spec, _result in results] == SPECS
+    assert time.monotonic() - start >= 0.8
+
+
+@pytest.mark.usefixtures("fanout_app")
+def test_fan_out_user_iterators():
+    def user_iterator(name, count, fail=False):
+        for i in range(count):
+            time.sleep(0.1)
+            yield [{"username": "%s%d" % (name, i)}]
+        if fail:
+            raise Exception("resolver failed")
+
+    user_iters = [
+        (user_iterator("a", 3), "res.a"),
+        (user_iterator("b", 2, fail=True), "res.b"),
+        (user_iterator("c", 3), "res.c"),
+    ]
+
+    start = time.monotonic()
+    users = list(iterate_users(fan_out_user_iterators(user_iters)))
+    duration = time.monotonic() - start
+
+    assert [user.split('"')[3] for user in users] == [
+        "a0",
+        "a1",
+        "a2",
+        "b0",
+        "b1",
+        "c0",
+        "c1",
+        "c2",
+    ]
+    assert duration < 0.6
+
+
+def test_stalled_consumer_gets_error_entry():
+    """the worker gives up on a stalled consumer with a final error entry"""
+
+    chunks = queue.Queue()
+    slots = threading.Semaphore(2)
+    stop = threading.Event()
+
+    user_iterator = iter([[{"username": "u%d" % i}] for i in range(5)])
+
+    _buffer_user_iterator(user_iterator, chunks, slots, stop, timeout=0)
+
+    entries = [chunks.get_nowait() for _i in range(chunks.qsize())]
+
+    assert [kind for kind, _data in entries] == ["users", "users", "error"]
+    assert isinstance(entries[-1][1], ResolverTimeout)
+
+    # the reader raises the error after the buffered users
+
+    for entry in entries:
+        chunks.put(entry)
+
+    users = []
+    reader = _read_user_iterator(chunks, slots, "res.a", stop, 1)
+    with pytest.raises(ResolverTimeout):
+        for user_data in reader:
+            users.extend(user_data)
+
+    assert [user["username"] for user in users] == ["u0", "u1"]
+
+
+@pytest.mark.usefixtures("fanout_app")
+def test_read_user_iterator_timeout():
+    chunks = queue.Queue()
+    slots = threading.Semaphore(2)
+    stop = threading.Event()
+
+    reader = _read_user_iterator(chunks, slots, "res.a", stop, 0.1)
+    with pytest.raises(ResolverTimeout):
+        next(reader)
+
+    assert "res.a" in g.audit["action_detail"]
@@ -34,13 +34,19 @@ import pytest
 from mock import patch
 
 from linotp.lib.user import User
-from linotp.lib.userservice import create_auth_cookie
+from linotp.lib.userservice import (
+    check_auth_cookie,
+    create_auth_cookie,
+    get_cookie_authinfo,
+    remove_auth_cookie,
+)
 
 Secret = "012345678901234567890123456789012"
 RFC6265_TIMEFORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 OLD_TIMEFORMAT = "%Y-%m-%d %H:%M:%S"
 
 
+@pytest.mark.usefixtures("app")
 class TestCookieActivation(unittest.TestCase):
     @patch("linotp.lib.userservice.get_cookie_secret")
     @patch("linotp.lib.userservice.get_cookie_expiry")
@@ -65,4 +71,34 @@ class TestCookieActivation(unittest.TestCase):
             datetime.datetime.strptime(expiration_str, OLD_TIMEFORMAT)
 
 
+@pytest.mark.parametrize("store", ["database", "memory"])
+def test_auth_cookie_session(app, store):
+    """
+    verify that the session of the auth cookie is kept in the session store
+    """
+    app.config["USERSERVICE_SESSION_STORE"] = store
+
+    with patch("linotp.lib.userservice.get_cookie_expiry") as mock_expiry:
+        mock_expiry.return_value = False
+
+        cookie, _expires, _expiration = create_auth_cookie(
+            User("hans", realm="myrealm"),
+            "127.0.0.1",
+            state="challenge_triggered",
+            state_data={"transactionid": "1234"},
+        )
+
+    user, client, state, state_data = get_cookie_authinfo(cookie)
+
+    assert (user.login, user.realm) == ("hans", "myrealm")
+    assert client == "127.0.0.1"
+    assert state == "challenge_triggered"
+    assert state_data == {"transactionid": "1234"}
+
+    remove_auth_cookie(cookie)
+
+    assert get_cookie_authinfo(cookie) == (None, None, None, None)
+    assert not check_auth_cookie(cookie, User("hans"), "127.0.0.1")
+
+
 # eof
@@ -120,3 +120,53 @@ def test_getUsername(passwd_resolver):
 
 
 # eof #
+
+
+def test_getUserListPage(passwd_resolver):
+    """
+    testing the sorted and paged userlist
+    """
+    y = passwd_resolver
+
+    total, user_list = y.getUserListPage({}, sortBy="username", pageSize=1)
+    assert total == 2
+    assert [user["username"] for user in user_list] == ["user1"]
+
+    total, user_list = y.getUserListPage(
+        {}, sortBy="surname", sortOrder="desc", page=0, pageSize=1
+    )
+    assert total == 2
+    assert [user["surname"] for user in user_list] == ["Zwei"]
+
+    total, user_list = y.getUserListPage({}, page=2, pageSize=1)
+    assert total == 2
+    assert user_list == []
+
+    # the search restricts the total number of users
+
+    total, user_list = y.getUserListPage({"username": "*2"}, pageSize=10)
+    assert total == 1
+    assert user_list[0]["userid"] == "11"
+
+    # the sort index is preserved for the unchanged file
+
+    z = PasswdResolver()
+    z.loadConfig({"linotp.passwdresolver.fileName.my": y.fileName}, "my")
+    assert z.sortIndex is y.sortIndex
+
+
+def test_bulk_lookup(passwd_resolver):
+    """
+    testing the bulk lookup of userids and login names
+    """
+    y = passwd_resolver
+
+    assert y.getUserIds(["user1", "user2", "unknown"]) == {
+        "user1": "10",
+        "user2": "11",
+    }
+
+    assert y.getUsernames(["10", "11", "12"]) == {
+        "10": "user1",
+        "11": "user2",
+    }
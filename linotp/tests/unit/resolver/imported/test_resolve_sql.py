@@ -226,6 +226,23 @@ class TestSQLResolver(TestCase):
         user_list = self.getUserList(self.y, {"username": "*1"})
         assert len(user_list) == 1
 
+    def test_sql_getUserListPage(self):
+        """
+        SQL: testing the sorted and paged userlist
+        """
+        total, user_list = self.y.getUserListPage(
+            {}, sortBy="username", sortOrder="desc", page=1, pageSize=3
+        )
+        assert total == 4
+        assert [user["username"] for user in user_list] == ["user1"]
+
+        total, user_list = self.w.getUserListPage({}, pageSize=10)
+        assert total == 2
+        assert [user["username"] for user in user_list] == [
+            "user_3",
+            "userx3",
+        ]
+
     def test_sql_getUsername(self):
         """
         SQL: testing getting the username
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+#
+#   LinOTP - the open source solution for two factor authentication
+#   Copyright (C) 2010-2019 KeyIdentity GmbH
+#   Copyright (C) 2019-     netgo software GmbH
+#
+#   This file is part of LinOTP userid resolvers.
+#
+#   This program is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU Affero General Public
+#   License, version 3, as published by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the
+#              GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   E-mail: info@linotp.de
+#   Contact: www.linotp.org
+#   Support: www.linotp.de
+
+"""
+LDAP Resolver unit test - sorted and paged user list by the server side
+sort and virtual list view controls
+"""
+
+import ldap
+import pytest
+from ldap.controls.sss import SSSRequestControl
+from ldap.controls.vlv import VLVRequestControl, VLVResponseControl
+from mock import MagicMock, patch
+
+from linotp.useridresolver.LDAPIdResolver import IdResolver as LDAPResolver
+
+USERS = [
+    ("cn=anna,dc=example,dc=net", {"uid": [b"anna"], "sn": [b"Zett"]}),
+    ("cn=bert,dc=example,dc=net", {"uid": [b"bert"], "sn": [b"Yps"]}),
+]
+
+
+class VLVResponse:
+    controlType = VLVResponseControl.controlType
+
+    def __init__(self, content_count):
+        self.content_count = content_count
+
+
+def ldap_connection(result_data, serverctrls):
+    """a bound ldap connection with the given search result"""
+
+    connection = MagicMock()
+    connection.search_ext.return_value = 1
+    connection.result3.return_value = (
+        ldap.RES_SEARCH_RESULT,
+        result_data,
+        1,
+        serverctrls,
+    )
+    return connection
+
+
+@pytest.fixture
+def resolver():
+    resolver = LDAPResolver()
+    resolver.searchfilter = "(objectClass=inetOrgPerson)"
+    resolver.uidType = "DN"
+    resolver.userinfo = {"username": "uid", "surname": "sn"}
+    return resolver
+
+
+@pytest.mark.usefixtures("app")
+class TestLDAPResolverUserListPage:
+    def test_sorted_page(self, resolver):
+        """the page is requested with the sort and the vlv control"""
+
+        connection = ldap_connection(USERS, [VLVResponse(12)])
+
+        with patch.object(resolver, "bind", return_value=connection):
+            total, user_list = resolver.getUserListPage(
+                {}, sortBy="surname", sortOrder="desc", page=2, pageSize=5
+            )
+
+        assert total == 12
+        assert [user["username"] for user in user_list] == ["anna", "bert"]
+        assert user_list[0]["userid"] == "cn=anna,dc=example,dc=net"
+
+        serverctrls = connection.search_ext.call_args[1]["serverctrls"]
+        sort_control, vlv_control = serverctrls
+
+        assert isinstance(sort_control, SSSRequestControl)
+        assert sort_control.ordering_rules == ["-sn"]
+
+        # the offset of the virtual list view is 1 based
+        assert isinstance(vlv_control, VLVRequestControl)
+        assert vlv_control.offset == 11
+        assert vlv_control.after_count == 4
+
+    def test_page_beyond_the_last(self, resolver):
+        """the server returns the last entries for an offset out of range"""
+
+        connection = ldap_connection(USERS, [VLVResponse(2)])
+
+        with patch.object(resolver, "bind", return_value=connection):
+            total, user_list = resolver.getUserListPage({}, page=1, pageSize=5)
+
+        assert total == 2
+        assert user_list == []
+
+    @pytest.mark.parametrize(
+        "search_error,serverctrls",
+        [
+            (ldap.UNAVAILABLE_CRITICAL_EXTENSION({}), None),
+            (None, []),
+        ],
+    )
+    def test_fallback(self, resolver, search_error, serverctrls):
+        """without support of the controls the full listing is used"""
+
+        connection = ldap_connection(USERS, serverctrls)
+        connection.search_ext.side_effect = search_error
+
+        with patch.object(resolver, "bind", return_value=connection):
+            assert resolver.getUserListPage({}, page=0, pageSize=5) is None
+
+    def test_not_sortable(self, resolver):
+        """unmapped attributes, the dn or all users are not paged"""
+
+        assert resolver.getUserListPage({}, sortBy="email", pageSize=5) is None
+        assert (
+            resolver.getUserListPage({}, sortBy="userid", pageSize=5) is None
+        )
+        assert resolver.getUserListPage({}, pageSize=0) is None
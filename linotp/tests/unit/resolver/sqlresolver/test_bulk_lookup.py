@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+SQL Resolver unit test - bulk lookup of userids and login names
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from linotp.useridresolver.SQLIdResolver import IdResolver as SQLResolver
+
+
+@pytest.fixture
+def sql_resolver(hsm_obj, tmp_path):
+    """a sql resolver with a sqlite user table"""
+
+    database = str(tmp_path / "users.sqlite")
+
+    connection = sqlite3.connect(database)
+    connection.execute("create table users (id integer, username text)")
+    connection.executemany(
+        "insert into users values (?, ?)", [(1, "anna"), (2, "bert")]
+    )
+    connection.commit()
+    connection.close()
+
+    def create_resolver(table="users"):
+        resolver = SQLResolver()
+        resolver.loadConfig(
+            {
+                "Driver": "sqlite",
+                "Port": "",
+                "Database": database,
+                "Server": "",
+                "User": "",
+                "Password": "",
+                "Table": table,
+                "Map": json.dumps({"username": "username", "userid": "id"}),
+            },
+            "",
+        )
+        return resolver
+
+    return create_resolver
+
+
+def test_bulk_lookup(sql_resolver):
+    resolver = sql_resolver()
+
+    assert resolver.getUserIds(["anna", "bert", "carl"]) == {
+        "anna": 1,
+        "bert": 2,
+    }
+    assert resolver.getUsernames([2, 3]) == {2: "bert"}
+
+
+def test_bulk_lookup_error(sql_resolver):
+    """a failing query is not taken for users, who do not exist"""
+
+    resolver = sql_resolver(table="no_users")
+
+    with pytest.raises(Exception):
+        resolver.getUserIds(["anna", "bert"])
+
+    with pytest.raises(Exception):
+        resolver.getUsernames([1, 2])
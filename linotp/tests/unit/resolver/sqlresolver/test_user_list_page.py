@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+SQL Resolver unit test - sorted and paged user list
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from linotp.useridresolver.SQLIdResolver import IdResolver as SQLResolver
+
+# the user table has no unique userid - bert is listed twice
+
+USERS = [
+    (1, "anna", "Zett"),
+    (2, "bert", "Yps"),
+    (2, "bert", "Yps"),
+    (3, "carl", "Ix"),
+    (4, "dora", "Weh"),
+    (5, "emil", "Vau"),
+]
+
+
+@pytest.fixture
+def sql_resolver(hsm_obj, tmp_path):
+    """a sql resolver with a sqlite user table"""
+
+    database = str(tmp_path / "users.sqlite")
+
+    connection = sqlite3.connect(database)
+    connection.execute(
+        "create table users (id integer, username text, surname text, "
+        "password text, active integer)"
+    )
+    connection.executemany(
+        "insert into users values (?, ?, ?, 'secret', 1)", USERS
+    )
+    connection.commit()
+    connection.close()
+
+    def create_resolver(limit=None, where=None):
+        config = {
+            "Driver": "sqlite",
+            "Port": "",
+            "Database": database,
+            "Server": "",
+            "User": "",
+            "Password": "",
+            "Table": "users",
+            "Map": json.dumps(
+                {
+                    "username": "username",
+                    "userid": "id",
+                    "surname": "surname",
+                    "password": "password",
+                }
+            ),
+        }
+        if limit:
+            config["Limit"] = limit
+        if where:
+            config["Where"] = where
+
+        resolver = SQLResolver()
+        resolver.loadConfig(config, "")
+        return resolver
+
+    return create_resolver
+
+
+def _usernames(user_list):
+    return [user["username"] for user in user_list]
+
+
+def test_pages_are_unique_by_userid(sql_resolver):
+    """the pages contain the users of the unpaged user list only once"""
+
+    resolver = sql_resolver()
+
+    unpaged = resolver.getUserList({})
+
+    pages = []
+    for page in range(3):
+        total, user_list = resolver.getUserListPage(
+            {}, sortBy="username", page=page, pageSize=2
+        )
+        assert total == 5
+        pages.extend(user_list)
+
+    assert _usernames(pages) == ["anna", "bert", "carl", "dora", "emil"]
+    assert sorted(_usernames(pages)) == sorted(_usernames(unpaged))
+
+
+def test_sorted_descending(sql_resolver):
+    """the users are sorted by the mapped attribute"""
+
+    resolver = sql_resolver()
+
+    total, user_list = resolver.getUserListPage(
+        {}, sortBy="surname", sortOrder="desc", page=0, pageSize=3
+    )
+
+    assert total == 5
+    assert _usernames(user_list) == ["anna", "bert", "dora"]
+
+    # users could not be sorted by an attribute, which is not mapped
+    assert resolver.getUserListPage({}, sortBy="email") is None
+
+
+def test_pages_are_capped_by_limit(sql_resolver):
+    """the resolver limit caps the total and the pages beyond it"""
+
+    resolver = sql_resolver(limit="3")
+
+    total, user_list = resolver.getUserListPage({}, page=1, pageSize=2)
+    assert total == 3
+    assert _usernames(user_list) == ["carl"]
+
+    total, user_list = resolver.getUserListPage({}, page=2, pageSize=2)
+    assert total == 3
+    assert user_list == []
+
+    total, user_list = resolver.getUserListPage({})
+    assert total == 3
+    assert _usernames(user_list) == ["anna", "bert", "carl"]
+
+
+def test_pages_respect_where_clause(sql_resolver, tmp_path):
+    """the users of the page are read from the rows of the where clause"""
+
+    # a former entry of carl, which is excluded by the where clause
+
+    connection = sqlite3.connect(str(tmp_path / "users.sqlite"))
+    connection.execute(
+        "insert into users values (3, 'carl_old', 'Aa', 'secret', 0)"
+    )
+    connection.commit()
+    connection.close()
+
+    resolver = sql_resolver(where="active = 1")
+
+    total, user_list = resolver.getUserListPage(
+        {}, sortBy="surname", page=0, pageSize=5
+    )
+
+    assert total == 5
+    assert _usernames(user_list) == ["carl", "emil", "dora", "bert", "anna"]
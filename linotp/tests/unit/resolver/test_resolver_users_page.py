@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+"""
+verify the paged user listing of the resolver model and its fallback
+"""
+
+import pytest
+from mock import MagicMock
+
+from linotp.model.resolver import Resolver, ResolverType, User
+
+
+def _users(names):
+    return [
+        User("%d" % num, "myLdap", ResolverType.LDAP, name, "", "", "", "", "")
+        for num, name in enumerate(names)
+    ]
+
+
+def test_fallback_sort_and_slice():
+    """the full user list is sorted and sliced, if the resolver - e.g. an
+    ldap server without the sort and virtual list view controls - does not
+    support paging"""
+
+    resolver = MagicMock(spec=Resolver)
+    resolver.configuration_instance.getUserListPage.return_value = None
+    resolver.get_users.return_value = _users(["dora", "anna", "carl", "bert"])
+    resolver._sort_and_slice_users = (
+        lambda *args: Resolver._sort_and_slice_users(resolver, *args)
+    )
+
+    total, users = Resolver.get_users_page(
+        resolver, {}, sort_by="username", page=1, page_size=3
+    )
+
+    assert total == 4
+    assert [user.username for user in users] == ["dora"]
+
+    total, users = Resolver.get_users_page(
+        resolver, {}, sort_by="username", sort_order="desc"
+    )
+
+    assert total == 4
+    assert [user.username for user in users] == [
+        "dora",
+        "carl",
+        "bert",
+        "anna",
+    ]
+
+
+def test_unknown_sort_attribute():
+    """users could not be sorted by unknown attributes"""
+
+    resolver = MagicMock(spec=Resolver)
+    resolver.get_users.return_value = _users(["anna"])
+    resolver._sort_and_slice_users = (
+        lambda *args: Resolver._sort_and_slice_users(resolver, *args)
+    )
+
+    with pytest.raises(KeyError, match="unknown"):
+        Resolver.get_users_page(resolver, {}, sort_by="unknown")
+
+    resolver.configuration_instance.getUserListPage.assert_not_called()
@@ -54,6 +54,12 @@ class FakeTokenModel(object):
     def getInfo(self):
         return ""
 
+    def getInfoDict(self):
+        return {}
+
+    def setInfoDict(self, info):
+        pass
+
     def storeToken(self):
         pass
 
@@ -20,6 +20,11 @@ class FakeTokenModel(object):
             return json.dumps({"hashlib": self.hashlib})
         return ""
 
+    def getInfoDict(self):
+        if self.hashlib:
+            return {"hashlib": self.hashlib}
+        return {}
+
 
 @patch("linotp.tokens.hmactoken.getFromConfig")
 def test_hmac_hashlib_sha256(mock_getFromConfig):
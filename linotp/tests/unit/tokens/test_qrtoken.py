@@ -65,6 +65,12 @@ class FakeTokenModel(object):
     def getInfo(self):
         return json.dumps(self.info_dict)
 
+    def setInfoDict(self, info):
+        self.info_dict = info
+
+    def getInfoDict(self):
+        return self.info_dict
+
     def get_encrypted_seed(self):
         return "foo", "bar"
 
@@ -26,7 +26,6 @@
 #
 
 import binascii
-import json
 import logging
 import unittest
 
@@ -87,16 +86,16 @@ class YubikeyTokenClassTestCase(unittest.TestCase):
             spec=[
                 "getSerial",
                 "getHOtpKey",
-                "getInfo",
-                "setInfo",
+                "getInfoDict",
+                "setInfoDict",
                 "setType",
                 "LinOtpCountWindow",
             ]
         )
         model_token.getSerial.return_value = serial
-        model_token.getInfo.return_value = json.dumps(
-            {"yubikey.tokenid": self.private_uid}
-        )
+        model_token.getInfoDict.return_value = {
+            "yubikey.tokenid": self.private_uid
+        }
 
         # LinOtpCountWindow is not required in the Yubikey Token
         model_token.LinOtpCountWindow = None
@@ -208,7 +207,7 @@ class YubikeyTokenClassTestCase(unittest.TestCase):
 
         # Passing not matching prefix
         token_info = {"public_uid": self.public_uid}
-        self.model_token.getInfo.return_value = json.dumps(token_info)
+        self.model_token.getInfoDict.return_value = token_info
 
         wrong_pub_id = self.public_uid.replace("e", "i")
         otp = wrong_pub_id + "fcniufvgvjturjgvinhebbbertjnihit"
@@ -265,23 +264,23 @@ class YubikeyTokenClassTestCase(unittest.TestCase):
         setting it is called.
         """
         # yubikey.tokenid is not set
-        self.model_token.getInfo.return_value = "{}"
+        self.model_token.getInfoDict.return_value = {}
         otp = self.public_uid + "fcniufvgvjturjgvinhebbbertjnihit"
         self.yubikey_token.checkOtp(otp)
         # Verify that the tokenid is passed onto linotp.model.Token
-        expected_tokeninfo = (
-            "" + '{\n"yubikey.tokenid": "' + self.private_uid + '"\n}'
+        expected_tokeninfo = {"yubikey.tokenid": self.private_uid}
+        self.model_token.setInfoDict.assert_called_once_with(
+            expected_tokeninfo
         )
-        self.model_token.setInfo.assert_called_once_with(expected_tokeninfo)
 
     def test_checkotp_wrong_tokenid(self):
         """
         Verify that if the stored uid differs from the one contained in the OTP then an error
         is returned.
         """
-        self.model_token.getInfo.return_value = (
-            "" + '{\n"yubikey.tokenid": "wrong-value"\n}'
-        )
+        self.model_token.getInfoDict.return_value = {
+            "yubikey.tokenid": "wrong-value"
+        }
         otp = self.public_uid + "fcniufvgvjturjgvinhebbbertjnihit"
         counter_expected = -2
         # We want to suppress the warning generated because of the wrong CRC
@@ -29,9 +29,15 @@
 import datetime
 import unittest
 
+import pytest
 from freezegun import freeze_time
 
-from linotp.lib.tools.expiring_list import CustomExpiringList
+from linotp.lib.tools.expiring_list import (
+    CustomExpiringList,
+    DatabaseExpiringList,
+)
+from linotp.model import db
+from linotp.model.expiring_item import ExpiringItem
 
 
 class TestExpiringList(unittest.TestCase):
@@ -71,3 +77,43 @@ class TestExpiringList(unittest.TestCase):
             # all other items should be janitored by now
             assert len(ex_list._itemsdic) == 1
             assert ex_list.item_in_list("a new item")
+
+    def test_item_readded(self):
+        ex_list = CustomExpiringList()
+
+        ex_list.add_item("item", 10)
+        ex_list.add_item("item", 100)
+
+        # the janitor keeps the item with the later expiry
+        with freeze_time(datetime.timedelta(seconds=50)):
+            ex_list.add_item("other item", 10)
+            assert ex_list.item_in_list("item")
+            assert len(ex_list._expiry_heap) == 2
+
+
+@pytest.mark.usefixtures("app")
+def test_database_expiring_list():
+    ex_list = DatabaseExpiringList("test_list")
+
+    ex_list.add_item("item", 10)
+    ex_list.add_item(12, 100)
+
+    # the items are shared with the lists of the other processes
+
+    other_list = DatabaseExpiringList("test_list")
+    assert other_list.item_in_list("item")
+    assert other_list.item_in_list(12)
+    assert not other_list.item_in_list("unknown item")
+    assert not DatabaseExpiringList("another_list").item_in_list("item")
+
+    with freeze_time(datetime.timedelta(seconds=50)):
+        assert not other_list.item_in_list("item")
+        assert other_list.item_in_list(12)
+
+    # the janitor removes the expired items from the database
+
+    with freeze_time(datetime.timedelta(seconds=120)):
+        other_list.add_item("new item", 10)
+
+    items = [entry.item for entry in db.session.query(ExpiringItem)]
+    assert items == ["new item"]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010-2019 KeyIdentity GmbH
+#    Copyright (C) 2019-     netgo software GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: info@linotp.de
+#    Contact: www.linotp.org
+#    Support: www.linotp.de
+#
+
+
+import datetime
+
+import pytest
+from freezegun import freeze_time
+
+from linotp.lib.tools.session_store import (
+    DatabaseSessionStore,
+    MemorySessionStore,
+)
+from linotp.model import db
+from linotp.model.expiring_item import ExpiringItem
+
+
+def test_memory_session_store():
+    store = MemorySessionStore(max_sessions=3)
+
+    store.set("a", ["data a"], 10)
+    store.set("b", ["data b"], 100)
+    store.set("c", ["data c"], 50)
+
+    assert store.get("a") == ["data a"]
+    assert store.get("unknown") is None
+
+    with freeze_time(datetime.timedelta(seconds=20)):
+        assert store.get("a") is None
+
+    # if the store is full, the sessions which expire first are dropped
+
+    store.set("d", ["data d"], 200)
+    assert store.get("a") is None
+    assert [store.get(key) for key in "bcd"] == [
+        ["data b"],
+        ["data c"],
+        ["data d"],
+    ]
+
+    store.delete("c")
+    store.set("e", ["data e"], 10)
+    assert store.get("c") is None
+    assert store.get("b") == ["data b"]
+    assert len(store._sessions) == 3
+
+    # the expired sessions are removed on the next insert
+
+    with freeze_time(datetime.timedelta(seconds=150)):
+        store.set("f", ["data f"], 10)
+        assert sorted(store._sessions) == ["d", "f"]
+
+
+@pytest.mark.usefixtures("app")
+def test_database_session_store():
+    store = DatabaseSessionStore("test_sessions")
+
+    store.set("a", [{"login": "hans"}, "127.0.0.1"], 10)
+    store.set("b", ["data b"], 100)
+
+    # the sessions are shared with the stores of the other processes
+
+    other_store = DatabaseSessionStore("test_sessions")
+    assert other_store.get("a") == [{"login": "hans"}, "127.0.0.1"]
+    assert DatabaseSessionStore("other_sessions").get("a") is None
+
+    other_store.delete("b")
+    assert store.get("b") is None
+
+    with freeze_time(datetime.timedelta(seconds=20)):
+        assert store.get("a") is None
+
+    # the janitor removes the expired sessions from the database
+
+    with freeze_time(datetime.timedelta(seconds=120)):
+        other_store.set("c", ["data c"], 10)
+
+    items = [entry.item for entry in db.session.query(ExpiringItem)]
+    assert items == ["c"]
@@ -29,55 +29,42 @@
 """
 """
 
-import json
 import logging
 
 log = logging.getLogger(__name__)
 
 
 class TokenInfoMixin(object):
-    def getTokenInfo(self):
-        info = {}
+    """
+    access to the token info of the token
 
-        tokeninfo = self.token.getInfo()
-        if tokeninfo is not None and len(tokeninfo.strip()) > 0:
-            try:
-                info = json.loads(tokeninfo)
-            except Exception as e:
-                log.error("JSON loading error in token info: %r", e)
+    the token info is parsed once and cached on the token model object,
+    which serializes the changed token info once on flush
+    """
 
-        return info
+    def getTokenInfo(self):
+        # the caller might modify the info, thus a copy is returned
+        return dict(self.token.getInfoDict())
 
     def setTokenInfo(self, info):
         if info is not None:
-            tokeninfo = "" + json.dumps(info, indent=0)
-            self.token.setInfo(tokeninfo)
+            self.token.setInfoDict(dict(info))
 
     def addToTokenInfo(self, key, value):
-        info = {}
-        tokeninfo = self.token.getInfo()
-
-        if tokeninfo:
-            info = json.loads(tokeninfo)
-
+        info = dict(self.token.getInfoDict())
         info[key] = value
 
-        self.setTokenInfo(info)
+        self.token.setInfoDict(info)
 
     def getFromTokenInfo(self, key, default=None):
-        ret = default
-
-        info = self.getTokenInfo()
-
-        if key in info:
-            ret = info.get(key, default)
-        return ret
+        return self.token.getInfoDict().get(key, default)
 
     def removeFromTokenInfo(self, key):
-        info = self.getTokenInfo()
+        info = self.token.getInfoDict()
         if key in info:
+            info = dict(info)
             del info[key]
-            self.setTokenInfo(info)
+            self.token.setInfoDict(info)
 
 
 # eof #
@@ -33,6 +33,7 @@ import logging
 
 from flask_babel import gettext as _
 
+from linotp.lib import metrics
 from linotp.lib.auth.validate import check_pin, split_pin_otp
 from linotp.lib.challenges import Challenges
 from linotp.lib.config import getFromConfig
@@ -520,12 +521,15 @@ class EmailTokenClass(HmacTokenClass):
                 provider_type="email", user=owner
             )
 
-            status, status_message = email_provider.submitMessage(
-                email_address,
-                subject=subject,
-                message=message,
-                replacements=replacements,
-            )
+            with metrics.timed(
+                "linotp_provider_send_seconds", provider="email"
+            ):
+                status, status_message = email_provider.submitMessage(
+                    email_address,
+                    subject=subject,
+                    message=message,
+                    replacements=replacements,
+                )
 
         except Exception as exx:
             LOG.error("Failed to submit EMail: %r", exx)
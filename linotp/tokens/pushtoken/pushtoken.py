@@ -41,6 +41,7 @@ from pysodium import crypto_sign_detached
 from pysodium import crypto_sign_verify_detached as verify_sig
 
 from linotp.flap import config
+from linotp.lib import metrics
 from linotp.lib.challenges import Challenges, transaction_id_to_u64
 from linotp.lib.config import getFromConfig
 from linotp.lib.context import request_context as context
@@ -468,9 +469,10 @@ class PushTokenClass(TokenClass, StatefulTokenMixin):
 
         log.debug("pushing notification: %r : %r", challenge_url, gda)
 
-        success, response = push_provider.push_notification(
-            challenge_url, gda, transaction_id
-        )
+        with metrics.timed("linotp_provider_send_seconds", provider="push"):
+            success, response = push_provider.push_notification(
+                challenge_url, gda, transaction_id
+            )
 
         if not success:
             raise Exception(
@@ -33,11 +33,10 @@ import urllib.error
 import urllib.parse
 import urllib.request
 
-import httplib2
-
 from linotp.lib.auth.validate import check_pin, split_pin_otp
 from linotp.lib.config import getFromConfig
 from linotp.lib.error import ParameterError
+from linotp.lib.http_client import DEFAULT_TIMEOUT, http_request
 from linotp.tokens import tokenclass_registry
 from linotp.tokens.base import TokenClass
 
@@ -307,6 +306,8 @@ class RemoteTokenClass(TokenClass):
         )
         ssl_verify = str(ssl_verify_config).lower().strip() == "true"
 
+        timeout = getFromConfig("remote.timeout", DEFAULT_TIMEOUT)
+
         # here we also need to check for remote.user and so on....
         params = {}
 
@@ -358,30 +359,15 @@ class RemoteTokenClass(TokenClass):
             headers = {
                 "Content-type": "application/x-www-form-urlencoded",
                 "Accept": "text/plain",
-                "Connection": "close",
             }
 
-            # submit the request
-            try:
-                # is httplib compiled with ssl?
-                http = httplib2.Http(
-                    disable_ssl_certificate_validation=not (ssl_verify)
-                )
-            except TypeError as exx:
-                # not so on squeeze:
-                # TypeError: __init__() got an unexpected keyword argument
-                # 'disable_ssl_certificate_validation'
-
-                log.warning(
-                    "httplib2 'disable_ssl_certificate_validation' "
-                    "attribute error: %r",
-                    exx,
-                )
-                # so we run in fallback mode
-                http = httplib2.Http()
-
-            (resp, content) = http.request(
-                request_url, method="POST", body=data, headers=headers
+            # submit the request via the pooled, keep-alive http client
+            (resp, content) = http_request(
+                request_url,
+                body=data,
+                headers=headers,
+                timeout=timeout,
+                ssl_verify=ssl_verify,
             )
             result = json.loads(content)
             status = result["result"]["status"]
@@ -107,6 +107,7 @@ import time
 
 from flask_babel import gettext as _
 
+from linotp.lib import metrics
 from linotp.lib.auth.validate import check_otp, check_pin, split_pin_otp
 from linotp.lib.config import getFromConfig
 from linotp.lib.context import request_context as context
@@ -995,7 +996,10 @@ class SmsTokenClass(HmacTokenClass):
                 raise Exception("unable to load provider")
 
             try:
-                success = sms_provider.submitMessage(phone, message)
+                with metrics.timed(
+                    "linotp_provider_send_seconds", provider="sms"
+                ):
+                    success = sms_provider.submitMessage(phone, message)
                 available = True
 
                 log.info(
@@ -31,6 +31,7 @@ import logging
 
 from flask_babel import gettext as _
 
+from linotp.lib import metrics
 from linotp.lib.auth.validate import check_otp, check_pin, split_pin_otp
 from linotp.lib.config import getFromConfig
 from linotp.lib.context import request_context as context
@@ -524,12 +525,13 @@ class VoiceTokenClass(HmacTokenClass):
             provider_type="voice", realm=owner.realm, user=owner
         )
 
-        success, result = voice_provider.submitVoiceMessage(
-            calleeNumber=self.get_mobile_number(owner),
-            messageTemplate=message,
-            otp=otp_value,
-            locale=language,
-        )
+        with metrics.timed("linotp_provider_send_seconds", provider="voice"):
+            success, result = voice_provider.submitVoiceMessage(
+                calleeNumber=self.get_mobile_number(owner),
+                messageTemplate=message,
+                otp=otp_value,
+                locale=language,
+            )
 
         return success, result
 
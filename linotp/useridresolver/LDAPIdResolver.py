@@ -50,6 +50,8 @@ except ImportError:
 
 import click
 from ldap.controls import SimplePagedResultsControl
+from ldap.controls.sss import SSSRequestControl
+from ldap.controls.vlv import VLVRequestControl, VLVResponseControl
 
 from flask import current_app
 from flask.cli import with_appcontext
@@ -669,6 +671,91 @@ class IdResolver(UserIdResolver):
 
         return userid
 
+    def getUserIds(self, loginNames):
+        """
+        bulk lookup of the userids of a list of login names
+
+        the user filters of all login names are combined into one 'or'
+        search request. The login names, which could not be mapped from
+        the search result, e.g. as the filter matches on an alternative
+        attribute, are looked up one by one.
+
+        :param loginNames: list of login names
+        :return: dict with the userid per login name
+        """
+
+        loginNames = [loginName for loginName in loginNames if loginName]
+
+        userids = {}
+
+        if not loginNames:
+            return userids
+
+        user_filter_expression = self._replace_macros(self.filter)
+        num_values = user_filter_expression.count("%s")
+
+        user_filter_string = "(|%s)" % "".join(
+            ldap.filter.filter_format(
+                user_filter_expression, [loginName] * num_values
+            )
+            for loginName in loginNames
+        )
+
+        attrlist = [self.loginnameattribute]
+        if self.uidType.lower() != "dn":
+            attrlist.append(self.uidType)
+
+        resultList = []
+
+        l_obj = self.bind()
+
+        if l_obj:
+            try:
+                l_id = l_obj.search_ext(
+                    self.base,
+                    ldap.SCOPE_SUBTREE,
+                    filterstr=user_filter_string,
+                    sizelimit=self.sizelimit,
+                    attrlist=attrlist,
+                    timeout=self.response_timeout,
+                )
+
+                resultList = l_obj.result(l_id, all=1)[1]
+
+            except ldap.LDAPError as exc:
+                log.error("[getUserIds] LDAP error: %r", exc)
+
+            finally:
+                self.unbind(l_obj)
+
+        requested = {loginName.lower(): loginName for loginName in loginNames}
+
+        for entry in resultList or []:
+            if not isinstance(entry, tuple) or entry[0] is None:
+                continue
+
+            for key, values in entry[1].items():
+                if key.lower() != self.loginnameattribute.lower():
+                    continue
+
+                for value in values:
+                    if isinstance(value, bytes):
+                        value = value.decode("utf-8")
+
+                    loginName = requested.get(value.lower())
+                    if loginName:
+                        userids[loginName] = self._get_uid_from_result(
+                            entry, self.uidType
+                        )
+
+        for loginName in loginNames:
+            if loginName not in userids:
+                userid = self.getUserId(loginName)
+                if userid:
+                    userids[loginName] = userid
+
+        return userids
+
     def getUsername(self, userid):
         """
         get the loginname from the given userid
@@ -1472,6 +1559,121 @@ class IdResolver(UserIdResolver):
 
         # we do no unbind here, as this is done at the request end
 
+    def getUserListPage(
+        self,
+        searchDict,
+        sortBy="username",
+        sortOrder="asc",
+        page=0,
+        pageSize=0,
+    ):
+        """
+        retrieve one page of the sorted user list
+
+        the sorting and paging is done by the ldap server with the server
+        side sort control (RFC 2891) in combination with the virtual list
+        view control, so that only the entries of the page are transfered.
+
+        :param searchDict: the dict with a search filter expression
+        :param sortBy: the user attribute to sort by
+        :param sortOrder: 'asc' or 'desc'
+        :param page: the requested page, starting with 0
+        :param pageSize: the number of users per page - 0 for all users
+        :return: tuple of the total number of users and the list of user
+                 info dicts of the page or None, if the sort attribute is
+                 not mapped or the server does not support the sort and
+                 virtual list view controls
+        """
+
+        if not pageSize:
+            return None
+
+        if sortBy.lower() == "userid":
+            # the dn is not an attribute, which could be sorted by
+            if self.uidType.lower() == "dn":
+                return None
+            sort_key = self.uidType
+
+        else:
+            ldap_keys = [
+                ldap_key
+                for user_key, ldap_key in self.userinfo.items()
+                if user_key.lower() == sortBy.lower()
+            ]
+            if not ldap_keys:
+                return None
+            sort_key = ldap_keys[0]
+
+        searchFilter = self._prepare_searchFilter(dict(searchDict))
+
+        attrlist = list(self.userinfo.values())
+        if self.uidType.lower() != "dn":
+            attrlist.append(self.uidType)
+
+        ordering_rule = sort_key
+        if sortOrder == "desc":
+            ordering_rule = "-" + sort_key
+
+        sort_control = SSSRequestControl(
+            criticality=True, ordering_rules=[ordering_rule]
+        )
+
+        # the virtual list view offset is 1 based
+        vlv_control = VLVRequestControl(
+            criticality=True,
+            before_count=0,
+            after_count=pageSize - 1,
+            offset=page * pageSize + 1,
+            content_count=0,
+        )
+
+        l_obj = self.bind()
+
+        try:
+            msgid = l_obj.search_ext(
+                self.base,
+                ldap.SCOPE_SUBTREE,
+                filterstr=searchFilter,
+                attrlist=attrlist,
+                serverctrls=[sort_control, vlv_control],
+                timeout=self.response_timeout,
+            )
+
+            (_rtype, result_data, _rmsgid, serverctrls) = l_obj.result3(
+                msgid, timeout=self.response_timeout
+            )
+
+        except ldap.LDAPError as exce:
+            log.info(
+                "Server side sorting and paging is not available: %r", exce
+            )
+            return None
+
+        vlv_responses = [
+            ctrl
+            for ctrl in serverctrls or []
+            if ctrl.controlType == VLVResponseControl.controlType
+        ]
+
+        if not vlv_responses:
+            log.info("Server ignores the virtual list view control.")
+            return None
+
+        total = vlv_responses[0].content_count
+
+        # the server returns the last entries if the offset is out of range
+        if page * pageSize >= total:
+            return total, []
+
+        user_list = []
+        for result_entry in result_data:
+            user_info = self._process_result(result_entry)
+
+            if user_info:
+                user_list.append(user_info)
+
+        return total, user_list[:pageSize]
+
     @staticmethod
     def _get_uid_from_result(result, uidType):
         """
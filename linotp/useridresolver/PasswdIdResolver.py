@@ -59,6 +59,11 @@ from .UserIdResolver import (
 
 log = logging.getLogger(__name__)
 
+# the pre-sorted user id indexes per passwd file - as the resolver object
+# is created per request, the indexes are preserved as long as the file
+# is not modified
+SORT_INDEXES = {}
+
 
 def str2unicode(input_str):
     """
@@ -169,6 +174,9 @@ class IdResolver(UserIdResolver):
         self.givennameDict = {}
         self.emailDict = {}
 
+        # pre-sorted user ids per sort attribute, built on first usage
+        self.sortIndex = {}
+
     def close(self):
         """
         request hook - to close down resolver object
@@ -185,6 +193,15 @@ class IdResolver(UserIdResolver):
         if self.fileName == "":
             self.fileName = "/etc/passwd"
 
+        # the sort indexes are preserved, as long as the file is unchanged
+        file_stat = os.stat(self.fileName)
+        file_stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        stamp, self.sortIndex = SORT_INDEXES.get(self.fileName, (None, {}))
+        if stamp != file_stamp:
+            self.sortIndex = {}
+            SORT_INDEXES[self.fileName] = (file_stamp, self.sortIndex)
+
         log.info("[loadFile] loading users from file %s", self.fileName)
 
         fileHandle = open(self.fileName, "r")
@@ -363,6 +380,19 @@ class IdResolver(UserIdResolver):
         """
         return self.nameDict.get(LoginName, "") or ""
 
+    def getUsernames(self, userIds):
+        """
+        bulk lookup of the login names of a list of userids
+
+        :param userIds: list of userids
+        :return: dict with the login name per userid
+        """
+        return {
+            userId: self.reversDict[userId]
+            for userId in userIds
+            if userId in self.reversDict
+        }
+
     def getSearchFields(self, searchDict=None):
         """
         show, which search fields this userIdResolver supports
@@ -382,6 +412,52 @@ class IdResolver(UserIdResolver):
 
         return self.searchFields
 
+    def _userMatchesSearchDict(self, searchDict: dict, user_value) -> bool:
+        """
+        check if the user matches the search criteria of the searchdict
+
+        :param searchDict: dict of search expressions
+        :param user_value: the fields of the passwd file line of the user
+        :return: boolean
+        """
+
+        searchKeyToCheckFunctionMapping = {
+            "username": self.checkUserName,
+            "userid": self.checkUserId,
+            "description": self.checkDescription,
+            "email": self.checkEmail,
+        }
+
+        # OR filter
+        # is true if no `searchTerm` in given `searchDict` or
+        # value of `searchTerm` matches at least one searchable field
+        searchTermValue = searchDict.get("searchTerm", None)
+        orFilter = False if searchTermValue else True
+        if searchTermValue:
+            for checkingFunc in searchKeyToCheckFunctionMapping.values():
+                try:
+                    if checkingFunc(user_value, searchTermValue):
+                        orFilter = True
+                        break
+                except:
+                    pass
+        # AND filter
+        # is true if all `search_keys` match their `search_value`.
+        # Note: a `search_keys` is only evaluated if it's a searchable field
+        andFilter = True
+        filteredSearchDict = {
+            search_key: search_value
+            for search_key, search_value in searchDict.items()
+            if (search_key in self.searchFields)
+        }
+        for search_key, pattern in filteredSearchDict.items():
+            checkingFunc = searchKeyToCheckFunctionMapping[search_key]
+            if not checkingFunc(user_value, pattern):
+                andFilter = False
+                break
+
+        return orFilter and andFilter
+
     def getUserList(self, searchDict: dict):
         """
         get a list of all users matching the search criteria of the searchdict
@@ -389,52 +465,11 @@ class IdResolver(UserIdResolver):
         :param searchDict: dict of search expressions
         """
 
-        def _userMatchesSearchDict(userDict):
-            """
-            `searchDict` refers to the one given to `getUserList`
-            """
-            user_key, user_value = userDict
-
-            searchKeyToCheckFunctionMapping = {
-                "username": self.checkUserName,
-                "userid": self.checkUserId,
-                "description": self.checkDescription,
-                "email": self.checkEmail,
-            }
-
-            # OR filter
-            # is true if no `searchTerm` in given `searchDict` or
-            # value of `searchTerm` matches at least one searchable field
-            searchTermValue = searchDict.get("searchTerm", None)
-            orFilter = False if searchTermValue else True
-            if searchTermValue:
-                for checkingFunc in searchKeyToCheckFunctionMapping.values():
-                    try:
-                        if checkingFunc(user_value, searchTermValue):
-                            orFilter = True
-                            break
-                    except:
-                        pass
-            # AND filter
-            # is true if all `search_keys` match their `search_value`.
-            # Note: a `search_keys` is only evaluated if it's a searchable field
-            andFilter = True
-            filteredSearchDict = {
-                search_key: search_value
-                for search_key, search_value in searchDict.items()
-                if (search_key in self.searchFields)
-            }
-            for search_key, pattern in filteredSearchDict.items():
-                checkingFunc = searchKeyToCheckFunctionMapping[search_key]
-                if not checkingFunc(user_value, pattern):
-                    andFilter = False
-                    break
-
-            return orFilter and andFilter
-
-        matchingUserDicts = dict(
-            filter(_userMatchesSearchDict, self.descDict.items())
-        )
+        matchingUserDicts = {
+            user_key: user_value
+            for user_key, user_value in self.descDict.items()
+            if self._userMatchesSearchDict(searchDict, user_value)
+        }
 
         userInfoList = [
             self.getUserInfo(user_value[self.sF["userid"]], no_passwd=True)
@@ -442,6 +477,84 @@ class IdResolver(UserIdResolver):
         ]
         return userInfoList
 
+    def _getSortIndex(self, sortBy):
+        """
+        get the list of user ids, sorted by the given user attribute
+
+        the index is built once per attribute and preserved until the
+        file is modified
+
+        :param sortBy: the user attribute to sort by
+        :return: list of user ids
+        """
+
+        attribute_dicts = {
+            "userid": {userId: userId for userId in self.reversDict},
+            "username": self.reversDict,
+            "givenname": self.givennameDict,
+            "surname": self.surnameDict,
+            "phone": self.homePhoneDict,
+            "mobile": self.officePhoneDict,
+            "email": self.emailDict,
+        }
+
+        sortBy = sortBy.lower()
+        if sortBy not in attribute_dicts:
+            raise KeyError("users can't be sorted by %s" % sortBy)
+
+        if sortBy not in self.sortIndex:
+            values = attribute_dicts[sortBy]
+            self.sortIndex[sortBy] = sorted(
+                self.reversDict,
+                key=lambda userId: (values.get(userId) or "", userId),
+            )
+
+        return self.sortIndex[sortBy]
+
+    def getUserListPage(
+        self,
+        searchDict,
+        sortBy="username",
+        sortOrder="asc",
+        page=0,
+        pageSize=0,
+    ):
+        """
+        get one page of the sorted list of users matching the search criteria
+
+        the users are taken in the order of the pre-sorted index, so that
+        only the user info of the users of the page is built
+
+        :param searchDict: dict of search expressions
+        :param sortBy: the user attribute to sort by
+        :param sortOrder: 'asc' or 'desc'
+        :param page: the requested page, starting with 0
+        :param pageSize: the number of users per page - 0 for all users
+        :return: tuple of the total number of users and the list of user
+                 info dicts of the page
+        """
+
+        userIds = self._getSortIndex(sortBy)
+        if sortOrder == "desc":
+            userIds = reversed(userIds)
+
+        matchingUserIds = [
+            userId
+            for userId in userIds
+            if userId in self.descDict
+            and self._userMatchesSearchDict(searchDict, self.descDict[userId])
+        ]
+
+        start = page * pageSize
+        end = start + pageSize if pageSize else None
+
+        userInfoList = [
+            self.getUserInfo(userId, no_passwd=True)
+            for userId in matchingUserIds[start:end]
+        ]
+
+        return len(matchingUserIds), userInfoList
+
     def checkUserName(self, line, pattern):
         """
         check for user name
@@ -44,7 +44,17 @@ from typing import Any, Callable, Dict, Tuple, Union
 
 from passlib.context import CryptContext
 from passlib.exc import MissingBackendError
-from sqlalchemy import MetaData, Table, and_, cast, create_engine, or_, types
+from sqlalchemy import (
+    MetaData,
+    Table,
+    and_,
+    cast,
+    create_engine,
+    func,
+    or_,
+    select,
+    types,
+)
 from sqlalchemy.exc import NoSuchColumnError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import expression
@@ -867,6 +877,65 @@ class IdResolver(UserIdResolver):
 
         return userName
 
+    def getUserIds(self, loginNames):
+        """
+        bulk lookup of the userids of a list of login names with one query
+
+        :param loginNames: list of login names
+        :return: dict with the userid per login name
+        """
+        return self._bulk_lookup(loginNames, "username", "userid")
+
+    def getUsernames(self, userids):
+        """
+        bulk lookup of the login names of a list of userids with one query
+
+        :param userids: list of userids
+        :return: dict with the login name per userid
+        """
+        return self._bulk_lookup(userids, "userid", "username")
+
+    def _bulk_lookup(self, values, search_attribute, result_attribute):
+        """
+        helper - map a list of user attribute values to an other attribute
+
+        :param values: the list of values to search for
+        :param search_attribute: the user attribute of the values
+        :param result_attribute: the user attribute which should be returned
+        :return: dict with the result attribute per found value
+        :raises Exception: if the user table could not be queried - an
+                           empty result would be taken for users, which
+                           do not exist
+        """
+
+        result = {}
+
+        if not values:
+            return result
+
+        search_column = self.sqlUserInfo.get(search_attribute)
+        result_column = self.sqlUserInfo.get(result_attribute)
+
+        if search_column is None or result_column is None:
+            raise Exception(
+                "%s and %s column definition required!"
+                % (search_attribute, result_attribute)
+            )
+
+        dbObj = self.connect(self.sqlConnect)
+
+        table = dbObj.getTable(self.sqlTable)
+        select = table.select(
+            self._add_where_clause_to_filter(
+                table.c[search_column].in_(list(values))
+            )
+        )
+
+        for row in dbObj.query(select):
+            result[row[search_column]] = row[result_column]
+
+        return result
+
     def getUserInfo(self, userId, suppress_password=True):
         """
         return all user related information
@@ -972,6 +1041,103 @@ class IdResolver(UserIdResolver):
         log.debug("[getUserList] returning userlist %r", list(users.values()))
         return list(users.values())
 
+    def getUserListPage(
+        self,
+        searchDict,
+        sortBy="username",
+        sortOrder="asc",
+        page=0,
+        pageSize=0,
+    ):
+        """
+        retrieve one page of the sorted user list
+
+        the sorting and paging is done by the database with ORDER BY and
+        LIMIT / OFFSET, so that only the users of the page are fetched
+
+        :param searchDict: dictionary of the search criterias
+        :param sortBy: the user attribute to sort by
+        :param sortOrder: 'asc' or 'desc'
+        :param page: the requested page, starting with 0
+        :param pageSize: the number of users per page - 0 for all users
+        :return: tuple of the total number of users and the list of user
+                 descriptions (as dict) of the page or None if the sort
+                 attribute is not mapped
+        """
+        searchDict = dict(searchDict or {"username": "*"})
+        log.debug("[getUserListPage] %r", searchDict)
+
+        dbObj = self.connect()
+        self.checkMapping()
+
+        table = dbObj.getTable(self.sqlTable)
+
+        # users could not be sorted by attributes, which are not mapped
+        try:
+            sort_column = self._get_column(table, sortBy)
+        except KeyError:
+            return None
+
+        userid_column = self._get_column(table, "userid")
+
+        sStr = self._creatSearchString(dbObj, table, searchDict)
+
+        # like the unpaged user list, the users are unique by their userid
+
+        select_count = select(
+            [func.count(userid_column.distinct())]
+        ).select_from(table)
+        if sStr is not None:
+            select_count = select_count.where(sStr)
+
+        total = dbObj.query(select_count).scalar()
+
+        # the user list is restricted by the resolver limit
+        if self.limit:
+            total = min(total, int(self.limit))
+
+        start = page * pageSize
+        size = total - start
+        if pageSize:
+            size = min(pageSize, size)
+
+        if size <= 0:
+            return total, []
+
+        # the userids of the page are selected first, sorted by the sort
+        # attribute of their first or last row
+
+        if sortOrder == "desc":
+            sort_key = func.max(sort_column)
+            order = [sort_key.desc(), userid_column.desc()]
+        else:
+            sort_key = func.min(sort_column)
+            order = [sort_key, userid_column]
+
+        select_ids = select([userid_column]).group_by(userid_column)
+        if sStr is not None:
+            select_ids = select_ids.where(sStr)
+        select_ids = select_ids.order_by(*order).limit(size).offset(start)
+
+        userids = [row[0] for row in dbObj.query(select_ids)]
+        if not userids:
+            return total, []
+
+        # the rows of the page are restricted by the search filter and the
+        # where clause as well, as the userid might not be unique
+
+        filtr = userid_column.in_(userids)
+        if sStr is not None:
+            filtr = and_(sStr, filtr)
+
+        rows = dbObj.query(table.select(filtr))
+
+        users = {}
+        for row in rows:
+            users[row[userid_column]] = self._getUserInfo(dbObj, row)
+
+        return total, [users[userid] for userid in userids if userid in users]
+
     #######################
     #   Helper functions
     #######################
@@ -1066,30 +1232,41 @@ class IdResolver(UserIdResolver):
             table.c[column_name] == loginId
         )
 
-    def _creatSearchString(self, dbObj, table, searchDict: dict):
-        def get_column(column_name: str):
-            # case-insensitive fetching of all possible column_names
-            possible_column_name_list = [
-                possible_column_name
-                for column_mapping_key, possible_column_name in self.sqlUserInfo.items()
-                if column_name.lower() == column_mapping_key.lower()
-            ]
-            if not possible_column_name_list:
-                raise KeyError(
-                    "[_creatSearchString] no column found for %s", column_name
-                )
+    def _get_column(self, table, column_name: str):
+        """
+        get the table column for a user attribute of the column mapping
+
+        :param table: the database table
+        :param column_name: the user attribute name like 'username'
+        :return: the table column
+        """
+
+        # case-insensitive fetching of all possible column_names
+        possible_column_name_list = [
+            possible_column_name
+            for column_mapping_key, possible_column_name in self.sqlUserInfo.items()
+            if column_name.lower() == column_mapping_key.lower()
+        ]
+        if not possible_column_name_list:
+            raise KeyError(
+                "[_creatSearchString] no column found for %s", column_name
+            )
 
-            # more tolerant mapping of column names for some sql dialects
-            # as you can define columnnames in mixed case but table mapping
-            # might be only available in upper or lower case (s. postgresql)
-            for column_name in possible_column_name_list:
+        # more tolerant mapping of column names for some sql dialects
+        # as you can define columnnames in mixed case but table mapping
+        # might be only available in upper or lower case (s. postgresql)
+        for column_name in possible_column_name_list:
+            try:
+                return table.c[column_name]
+            except KeyError as _err:
                 try:
-                    return table.c[column_name]
+                    return table.c[column_name.lower()]
                 except KeyError as _err:
-                    try:
-                        return table.c[column_name.lower()]
-                    except KeyError as _err:
-                        return table.c[column_name.upper()]
+                    return table.c[column_name.upper()]
+
+    def _creatSearchString(self, dbObj, table, searchDict: dict):
+        def get_column(column_name: str):
+            return self._get_column(table, column_name)
 
         def get_sql_expression(column, value):
             log.debug(
@@ -213,6 +213,46 @@ class UserIdResolver(object):
 
         return self.name
 
+    def getUserIds(self, loginNames):
+        """
+        bulk lookup of the userids of a list of login names
+
+        resolvers, which are able to resolve many users with one request
+        to the user store, should overwrite this method
+
+        :param loginNames: list of login names
+        :return: dict with the userid per login name - users which could
+                 not be resolved are not contained
+        """
+        userids = {}
+
+        for loginName in loginNames:
+            userid = self.getUserId(loginName)
+            if userid:
+                userids[loginName] = userid
+
+        return userids
+
+    def getUsernames(self, userids):
+        """
+        bulk lookup of the login names of a list of userids
+
+        resolvers, which are able to resolve many users with one request
+        to the user store, should overwrite this method
+
+        :param userids: list of userids
+        :return: dict with the login name per userid - users which could
+                 not be resolved are not contained
+        """
+        usernames = {}
+
+        for userid in userids:
+            username = self.getUsername(userid)
+            if username:
+                usernames[userid] = username
+
+        return usernames
+
     def getUserInfo(self, userid):
         """
         This function returns all user information for a given user object
@@ -236,6 +276,31 @@ class UserIdResolver(object):
         """
         return [{}]
 
+    def getUserListPage(
+        self,
+        searchDict,
+        sortBy="username",
+        sortOrder="asc",
+        page=0,
+        pageSize=0,
+    ):
+        """
+        This function returns one page of the sorted user list, where the
+        sorting and paging is done by the user store.
+
+        :param searchDict: dict with key values of user attributes
+        :param sortBy: the user attribute to sort by
+        :param sortOrder: 'asc' or 'desc'
+        :param page: the requested page, starting with 0
+        :param pageSize: the number of users per page - 0 for all users
+
+        :return: tuple of the total number of matching users and the list
+                 of user dictionaries of the page or None if the resolver
+                 does not support paging, so that the caller has to fall
+                 back to getUserList
+        """
+        return None
+
     def getResolverId(self):
         """
         get resolver specific information
@@ -225,6 +225,7 @@ setup(
             [
                 "man/man1/linotp-audit-janitor.1",
                 "man/man1/linotp-backup.1",
+                "man/man1/linotp-challenge-janitor.1",
                 "man/man1/linotp-config.1",
                 "man/man1/linotp-init.1",
             ],
@@ -275,10 +276,12 @@ setup(
             "audit = linotp.cli.audit_cmd:audit_cmds",
             "admin = linotp.cli.admin_cmd:admin_cmds",
             "backup = linotp.cli.mysql_cmd:backup_cmds",
+            "challenge = linotp.cli.challenge_cmd:challenge_cmds",
             "config = linotp.settings:config_cmds",
             "dbsnapshot = linotp.cli.dbsnapshot_cmd:dbsnapshot_cmds",
             "init = linotp.cli.init_cmd:init_cmds",
             "ldap-test = linotp.useridresolver.LDAPIdResolver:ldap_test",
+            "profile = linotp.cli.profile_cmd:profile_cmds",
             "support = linotp.cli.support_cmd:support_cmds",
             "local-admins = linotp.cli.local_admins_cmd:local_admins_cmds",
         ],